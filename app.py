@@ -10,13 +10,21 @@ load_dotenv()
 # ===== IMPORTS =====
 # ===== IMPORTS =====
 from pathlib import Path
-from flask import Flask, jsonify, request, redirect, url_for, session, flash, get_flashed_messages
+from flask import Flask, jsonify, request, redirect, url_for, session, flash, get_flashed_messages, Response, stream_with_context, send_from_directory, abort
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import insert, update, event, TypeDecorator, BigInteger
+from sqlalchemy.orm import selectinload, joinedload
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
+from urllib.parse import urlencode
+from html import escape as escape_html
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 import json
+import hashlib
 import random
+import re
 from functools import wraps
 from google.oauth2 import id_token
 from google.auth.transport import requests as google_requests
@@ -25,6 +33,13 @@ import smtplib
 from email.mime.text import MIMEText
 from werkzeug.utils import secure_filename
 import time
+import threading
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+import click
+import csv
+import gzip
+import io
 import os
 from dotenv import load_dotenv  # Pastikan ini diimpor
 
@@ -123,6 +138,9 @@ def save_product_image(file, product_name=None):
 
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], 'products', filename)
         file.save(filepath)
+        if not strip_image_metadata(filepath):
+            os.remove(filepath)
+            return None
         return f'uploads/products/{filename}'
     return None
 
@@ -135,13 +153,171 @@ def save_logo(file):
         return f'uploads/logos/{filename}'
     return None
 
-def get_product_cost_price(product_name):
-    """Mengembalikan harga cost berdasarkan nama produk"""
-    cost_prices = {
-        'Bibit Ikan Mas': 1000,
-        'Ikan Mas Konsumsi': 13500
-    }
-    return cost_prices.get(product_name, 1000)
+# ===== VARIAN GAMBAR PRODUK =====
+# Gambar upload diolah di worker pool menjadi varian ukuran tetap (WebP + JPEG, tanpa metadata).
+# Storefront memakai srcset varian ini; gambar asli tetap disimpan sebagai fallback, tetapi ditulis
+# ulang tanpa metadata saat upload karena URL-nya tetap publik.
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow opsional - tanpa Pillow hanya gambar asli yang dipakai
+    Image = ImageOps = None
+
+PRODUCT_IMAGE_VARIANTS = {
+    'thumb': {'size': (160, 160), 'crop': True},
+    'card': {'size': (480, 480), 'crop': True},
+    'detail': {'size': (1200, 1200), 'crop': False},
+}
+PRODUCT_IMAGE_FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+PRODUCT_IMAGE_WORKERS = int(os.getenv('PRODUCT_IMAGE_WORKERS', '2'))
+PRODUCT_IMAGE_EXECUTOR = None
+PRODUCT_IMAGE_EXECUTOR_LOCK = threading.Lock()
+
+def strip_image_metadata(filepath):
+    """Tulis ulang gambar upload tanpa EXIF/XMP (lokasi GPS, kamera). Orientasi EXIF diterapkan ke
+    piksel, profil warna ICC dipertahankan. False bila file tidak bisa dibaca sebagai gambar."""
+    if Image is None:
+        return True  # tanpa Pillow gambar disimpan apa adanya
+    temp_path = f'{filepath}.{os.getpid()}.{threading.get_ident()}'
+    try:
+        with Image.open(filepath) as original:
+            image_format = original.format
+            if image_format == 'GIF':  # GIF tidak membawa EXIF, dan encode ulang merusak animasi
+                return True
+            image = ImageOps.exif_transpose(original)
+            options = {'quality': 95} if image_format in ('JPEG', 'WEBP') else {}
+            if original.info.get('icc_profile'):
+                options['icc_profile'] = original.info['icc_profile']
+            image.save(temp_path, format=image_format, **options)
+        os.replace(temp_path, filepath)
+        return True
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        print(f"❌ Gambar upload tidak valid {filepath}: {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return False
+
+def get_product_image_path(image_url):
+    """Path file di UPLOAD_FOLDER untuk image_url '/static/uploads/products/...'"""
+    prefix = '/static/uploads/products/'
+    if not image_url or not image_url.startswith(prefix):
+        return None
+    return os.path.join(app.config['UPLOAD_FOLDER'], 'products', image_url[len(prefix):])
+
+def generate_product_image_variants(image_url):
+    """Buat semua varian gambar produk - return dict {varian: {format: url, 'width', 'height'}}"""
+    source_path = get_product_image_path(image_url)
+    if Image is None or not source_path or not os.path.exists(source_path):
+        return None
+
+    variant_dir = os.path.join(app.config['UPLOAD_FOLDER'], 'products', 'variants')
+    os.makedirs(variant_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+
+    with Image.open(source_path) as original:
+        original.seek(0)  # GIF animasi: pakai frame pertama
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+        # JPEG tidak punya alpha - ratakan ke latar putih sekali untuk semua varian
+        if image.mode == 'RGBA':
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+
+        variants = {}
+        for name, config in PRODUCT_IMAGE_VARIANTS.items():
+            if config['crop']:
+                resized = ImageOps.fit(image, config['size'], Image.LANCZOS)
+            else:
+                resized = image.copy()
+                resized.thumbnail(config['size'], Image.LANCZOS)
+
+            variant = {'width': resized.width, 'height': resized.height}
+            for extension, options in PRODUCT_IMAGE_FORMATS.items():
+                filename = f'{stem}_{name}.{extension}'
+                # Simpan tanpa exif/icc/info lain: metadata kamera (lokasi GPS dll) ikut terbuang
+                resized.save(os.path.join(variant_dir, filename), **options)
+                variant[extension] = f'/static/uploads/products/variants/{filename}'
+            variants[name] = variant
+    return variants
+
+def process_product_image(product_id, image_url):
+    """Job worker pool: buat varian lalu catat ke Product bila gambarnya belum diganti"""
+    with app.app_context():
+        try:
+            variants = generate_product_image_variants(image_url)
+            if variants:
+                db.session.execute(
+                    update(Product)
+                    .where(Product.id == product_id, Product.image_url == image_url)
+                    .values(image_variants=json.dumps(variants))
+                )
+                db.session.commit()
+                print(f"✅ Varian gambar produk {product_id} dibuat")
+            return variants
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Gagal membuat varian gambar produk {product_id}: {e}")
+            return None
+        finally:
+            db.session.remove()
+
+def queue_product_image_variants(product_id, image_url):
+    """Jadwalkan pembuatan varian di worker pool - panggil SETELAH produk di-commit"""
+    global PRODUCT_IMAGE_EXECUTOR
+    if Image is None or not image_url:
+        return None
+    if not PRODUCT_IMAGE_WORKERS:
+        return process_product_image(product_id, image_url)
+
+    with PRODUCT_IMAGE_EXECUTOR_LOCK:
+        if PRODUCT_IMAGE_EXECUTOR is None:
+            PRODUCT_IMAGE_EXECUTOR = ThreadPoolExecutor(
+                max_workers=PRODUCT_IMAGE_WORKERS, thread_name_prefix='product-image'
+            )
+    return PRODUCT_IMAGE_EXECUTOR.submit(process_product_image, product_id, image_url)
+
+def get_product_image_variants(product):
+    """Varian gambar yang tercatat di produk (dict kosong bila belum diproses)"""
+    if not product.image_variants:
+        return {}
+    try:
+        return json.loads(product.image_variants)
+    except ValueError:
+        return {}
+
+def product_image_html(product, variant='card', sizes='(max-width: 600px) 100vw, 480px', css_class='product-image', style='', onerror="this.style.display='none'"):
+    """Markup <picture> dengan srcset WebP/JPEG dan lazy-load; gambar asli bila varian belum ada"""
+    style_attr = f' style="{style}"' if style else ''
+    variants = get_product_image_variants(product)
+    if variant not in variants:
+        return (
+            f'<img src="{product.image_url}" alt="{product.name}" class="{css_class}"{style_attr} '
+            f'loading="lazy" decoding="async" onerror="{onerror}">'
+        )
+
+    def srcset(extension):
+        return ', '.join(
+            f"{variants[name][extension]} {variants[name]['width']}w"
+            for name in PRODUCT_IMAGE_VARIANTS if name in variants
+        )
+
+    main = variants[variant]
+    return (
+        f'<picture>'
+        f'<source type="image/webp" srcset="{srcset("webp")}" sizes="{sizes}">'
+        f'<img src="{main["jpeg"]}" srcset="{srcset("jpeg")}" sizes="{sizes}" '
+        f'width="{main["width"]}" height="{main["height"]}" alt="{product.name}" class="{css_class}"{style_attr} '
+        f'loading="lazy" decoding="async" onerror="{onerror}">'
+        f'</picture>'
+    )
+
+def product_image_data(product):
+    """Data gambar untuk respons JSON (URL asli + varian)"""
+    return {'image_url': product.image_url, 'image_variants': get_product_image_variants(product)}
 
 # ===== OAuth flow configuration =====
 os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1'
@@ -210,6 +386,30 @@ COLORS = {
     'gold-dark': '#7A6B5E'
 }
 
+# ===== NOMINAL UANG (RUPIAH UTUH) =====
+def to_rupiah(value):
+    """Bulatkan nominal ke rupiah utuh (half-up). None/'' dianggap 0, nilai tidak valid -> ValueError"""
+    if value is None or value == '':
+        return 0
+    if isinstance(value, int):
+        return int(value)
+    try:
+        return int(Decimal(str(value)).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+    except (InvalidOperation, ValueError):
+        raise ValueError(f'Nominal tidak valid: {value}')
+
+class Rupiah(TypeDecorator):
+    """Kolom uang: disimpan sebagai BIGINT rupiah utuh, dibaca sebagai int"""
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else to_rupiah(value)
+
+    def process_result_value(self, value, dialect):
+        # Database lama masih menyimpan FLOAT sampai migrate_money_columns() dijalankan
+        return None if value is None else to_rupiah(value)
+
 # ===== DATABASE MODELS =====
 class User(UserMixin, db.Model): #Menyimpan data pengguna
     id = db.Column(db.Integer, primary_key=True)
@@ -225,6 +425,7 @@ class User(UserMixin, db.Model): #Menyimpan data pengguna
     google_id = db.Column(db.String(100), unique=True)
     email_verified = db.Column(db.Boolean, default=False)
     verification_code = db.Column(db.String(6))
+    cart_version = db.Column(db.Integer, nullable=False, default=0)  # Naik setiap isi keranjang berubah
 
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
@@ -251,6 +452,13 @@ class Product(db.Model): #Menyimpan data produk ikan mas
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     image_url = db.Column(db.String(500))
+    image_variants = db.Column(db.Text)  # JSON varian gambar (thumb/card/detail, WebP + JPEG)
+
+class ProductRole(db.Model):
+    """Peran persediaan (mis. 'bibit', 'konsumsi') -> produk yang dipakai jurnal & template"""
+    role = db.Column(db.String(50), primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 class CartItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -263,7 +471,7 @@ class Order(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     order_number = db.Column(db.String(20), unique=True, nullable=False)
     customer_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    total_amount = db.Column(db.Float, nullable=False)
+    total_amount = db.Column(Rupiah, nullable=False)
     status = db.Column(db.String(20), default='pending')
     payment_method = db.Column(db.String(50))
     payment_status = db.Column(db.String(20), default='unpaid')
@@ -287,15 +495,16 @@ class Account(db.Model):
     name = db.Column(db.String(100), nullable=False)
     type = db.Column(db.String(50), nullable=False)
     category = db.Column(db.String(20), nullable=False)
-    balance = db.Column(db.Float, default=0)
+    balance = db.Column(Rupiah, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 class JournalEntry(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     transaction_number = db.Column(db.String(50), unique=True, nullable=False)
-    date = db.Column(db.DateTime, nullable=False)
+    date = db.Column(db.DateTime, nullable=False, index=True)
     description = db.Column(db.Text, nullable=False)
     journal_type = db.Column(db.String(50), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), index=True)  # Jurnal penjualan otomatis dari order
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     journal_details = db.relationship(
         'JournalDetail',
@@ -307,21 +516,36 @@ class JournalDetail(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     journal_id = db.Column(db.Integer, db.ForeignKey('journal_entry.id'), nullable=False)
     account_id = db.Column(db.Integer, db.ForeignKey('account.id'), nullable=False)
-    debit = db.Column(db.Float, default=0)
-    credit = db.Column(db.Float, default=0)
+    debit = db.Column(Rupiah, default=0)
+    credit = db.Column(Rupiah, default=0)
     description = db.Column(db.Text)
     account = db.relationship('Account', backref='journal_details')
 
+class AccountBalanceSnapshot(db.Model):
+    """Akumulasi debit/kredit per akun, per periode (YYYY-MM) dan per jenis jurnal"""
+    __table_args__ = (
+        db.UniqueConstraint('account_id', 'period', 'journal_type', name='uq_balance_snapshot_bucket'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    account_id = db.Column(db.Integer, db.ForeignKey('account.id'), nullable=False, index=True)
+    period = db.Column(db.String(7), nullable=False, index=True)  # 'YYYY-MM'
+    journal_type = db.Column(db.String(50), nullable=False)
+    debit_total = db.Column(Rupiah, default=0, nullable=False)
+    credit_total = db.Column(Rupiah, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class CashFlow(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     date = db.Column(db.DateTime, nullable=False)
     description = db.Column(db.Text, nullable=False)
     category = db.Column(db.String(50), nullable=False)
-    amount = db.Column(db.Float, nullable=False)
+    amount = db.Column(Rupiah, nullable=False)
     type = db.Column(db.String(10), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 class InventoryCard(db.Model):
+    """Kartu persediaan lama - tidak ditulis lagi, diganti StockMovement"""
     id = db.Column(db.Integer, primary_key=True)
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
     date = db.Column(db.DateTime, nullable=False)
@@ -330,12 +554,13 @@ class InventoryCard(db.Model):
     quantity_in = db.Column(db.Integer, default=0)
     quantity_out = db.Column(db.Integer, default=0)
     unit_cost = db.Column(db.Float, nullable=False)
-    total_cost = db.Column(db.Float, nullable=False)
+    total_cost = db.Column(Rupiah, nullable=False)
     balance_quantity = db.Column(db.Integer, nullable=False)
-    balance_value = db.Column(db.Float, nullable=False)
+    balance_value = db.Column(Rupiah, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 class InventoryTransaction(db.Model):
+    """Transaksi persediaan lama - hanya dibaca untuk backfill ke StockMovement"""
     __tablename__ = 'inventory_transaction'
 
     id = db.Column(db.Integer, primary_key=True)
@@ -346,14 +571,82 @@ class InventoryTransaction(db.Model):
     quantity_in = db.Column(db.Integer, default=0)
     quantity_out = db.Column(db.Integer, default=0)
     unit_price = db.Column(db.Float, nullable=False)
-    total_amount = db.Column(db.Float, nullable=False)
+    total_amount = db.Column(Rupiah, nullable=False)
     balance_quantity = db.Column(db.Integer, nullable=False)
     balance_unit_price = db.Column(db.Float, nullable=False)
-    balance_total = db.Column(db.Float, nullable=False)
+    balance_total = db.Column(Rupiah, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     product = db.relationship('Product', backref='inventory_transactions')
 
+class StockMovement(db.Model):
+    """Ledger mutasi stok (append-only) - satu baris per mutasi, dengan saldo berjalan"""
+    __table_args__ = (
+        db.UniqueConstraint('product_id', 'reference', name='uq_stock_movement_reference'),
+        db.Index('ix_stock_movement_product_date', 'product_id', 'date', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    date = db.Column(db.DateTime, nullable=False)
+    reference = db.Column(db.String(100))  # nomor transaksi / ORDER-<nomor order>
+    description = db.Column(db.String(255), nullable=False, default='')
+    transaction_type = db.Column(db.String(20), nullable=False)  # 'saldo_awal', 'pembelian', 'penjualan', 'penyesuaian'
+    quantity_in = db.Column(db.Integer, default=0, nullable=False)
+    quantity_out = db.Column(db.Integer, default=0, nullable=False)
+    unit_price = db.Column(db.Float, nullable=False)
+    total_amount = db.Column(Rupiah, nullable=False)
+    balance_quantity = db.Column(db.Integer, nullable=False)
+    balance_unit_price = db.Column(db.Float, nullable=False)
+    balance_total = db.Column(Rupiah, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class StockHead(db.Model):
+    """Saldo stok terakhir per produk (jumlah, nilai, harga rata-rata) - diperbarui tiap mutasi"""
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), primary_key=True)
+    balance_quantity = db.Column(db.Integer, default=0, nullable=False)
+    balance_unit_price = db.Column(db.Float, default=0, nullable=False)
+    balance_total = db.Column(Rupiah, default=0, nullable=False)
+    last_movement_id = db.Column(db.Integer, db.ForeignKey('stock_movement.id'))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class CostLayer(db.Model):
+    """Lapisan biaya persediaan - satu lapisan per barang masuk, dikonsumsi penjualan secara FIFO"""
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    movement_id = db.Column(db.Integer, db.ForeignKey('stock_movement.id'))
+    date = db.Column(db.DateTime, nullable=False)
+    unit_price = db.Column(db.Float, nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    remaining_quantity = db.Column(db.Integer, nullable=False)
+    is_open = db.Column(db.Boolean, default=True, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_cost_layer_product_open_date', 'product_id', 'is_open', 'date', 'id'),
+    )
+
+class CostLayerUsage(db.Model):
+    """Lapisan biaya yang dipakai sebuah mutasi keluar - dipulihkan bila mutasi itu dibatalkan"""
+    id = db.Column(db.Integer, primary_key=True)
+    movement_id = db.Column(db.Integer, db.ForeignKey('stock_movement.id'), nullable=False, index=True)
+    layer_id = db.Column(db.Integer, db.ForeignKey('cost_layer.id'), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+
+class InventoryDailySnapshot(db.Model):
+    """Saldo persediaan akhir hari per produk - hanya untuk hari yang punya mutasi"""
+    __table_args__ = (
+        db.UniqueConstraint('product_id', 'day', name='uq_inventory_snapshot_day'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    closing_quantity = db.Column(db.Integer, default=0, nullable=False)
+    average_cost = db.Column(db.Float, default=0, nullable=False)
+    closing_value = db.Column(Rupiah, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class ClosingEntry(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     transaction_number = db.Column(db.String(50), unique=True, nullable=False)
@@ -366,8 +659,8 @@ class ClosingDetail(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     closing_id = db.Column(db.Integer, db.ForeignKey('closing_entry.id'), nullable=False)
     account_id = db.Column(db.Integer, db.ForeignKey('account.id'), nullable=False)
-    debit = db.Column(db.Float, default=0)
-    credit = db.Column(db.Float, default=0)
+    debit = db.Column(Rupiah, default=0)
+    credit = db.Column(Rupiah, default=0)
     description = db.Column(db.Text)
     account = db.relationship('Account', backref='closing_details')
 
@@ -378,6 +671,22 @@ class AppSetting(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+class AccountingJob(db.Model):
+    """Antrian job akuntansi (jurnal & kartu persediaan) yang diproses worker di latar belakang"""
+    id = db.Column(db.Integer, primary_key=True)
+    job_type = db.Column(db.String(50), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), index=True)
+    idempotency_key = db.Column(db.String(100), unique=True, nullable=False)
+    status = db.Column(db.String(20), default='pending', nullable=False, index=True)  # pending, running, done, failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    max_attempts = db.Column(db.Integer, default=5, nullable=False)
+    run_after = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    result = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
 @login_manager.user_loader
 def load_user(user_id):
     return User.query.get(int(user_id))
@@ -401,6 +710,92 @@ def reset_database_safe():
         print("Trying to continue with existing database...")
         return False
 
+# Index untuk tabel yang sudah ada sebelum kolomnya diberi index=True
+# (db.create_all() tidak menambahkan index ke tabel lama)
+DATABASE_INDEXES = [
+    'CREATE INDEX IF NOT EXISTS ix_journal_entry_date ON journal_entry (date)',
+    'CREATE INDEX IF NOT EXISTS ix_account_balance_snapshot_period ON account_balance_snapshot (period)',
+    'CREATE INDEX IF NOT EXISTS ix_product_catalog ON product (is_active, category, price)',
+    'CREATE INDEX IF NOT EXISTS ix_product_catalog_created ON product (is_active, created_at)',
+    'CREATE INDEX IF NOT EXISTS ix_journal_entry_order_id ON journal_entry (order_id)',
+]
+
+# Kolom baru untuk tabel yang sudah ada (db.create_all tidak menambah kolom ke tabel lama)
+DATABASE_COLUMNS = [
+    ('product', 'image_variants', 'TEXT'),
+    ('journal_entry', 'order_id', 'INTEGER'),
+    ('user', 'cart_version', 'INTEGER NOT NULL DEFAULT 0'),
+]
+
+# Kolom uang yang sekarang bertipe Rupiah (BIGINT) - database lama masih FLOAT
+MONEY_COLUMNS = [
+    ('account', 'balance'),
+    ('journal_detail', 'debit'),
+    ('journal_detail', 'credit'),
+    ('account_balance_snapshot', 'debit_total'),
+    ('account_balance_snapshot', 'credit_total'),
+    ('closing_detail', 'debit'),
+    ('closing_detail', 'credit'),
+    ('order', 'total_amount'),
+    ('cash_flow', 'amount'),
+    ('inventory_card', 'total_cost'),
+    ('inventory_card', 'balance_value'),
+    ('inventory_transaction', 'total_amount'),
+    ('inventory_transaction', 'balance_total'),
+]
+MONEY_MIGRATION_KEY = 'money_columns_rupiah'
+
+def migrate_money_columns():
+    """Sekali jalan: bulatkan kolom uang lama ke rupiah utuh (PostgreSQL: ubah tipe ke BIGINT)"""
+    if AppSetting.query.filter_by(key=MONEY_MIGRATION_KEY).first():
+        return
+
+    try:
+        is_postgres = db.engine.dialect.name == 'postgresql'
+        for table, column in MONEY_COLUMNS:
+            if is_postgres:
+                statement = f'ALTER TABLE "{table}" ALTER COLUMN {column} TYPE BIGINT USING ROUND({column})::BIGINT'
+            else:
+                statement = f'UPDATE "{table}" SET {column} = CAST(ROUND({column}) AS INTEGER) WHERE {column} IS NOT NULL'
+            db.session.execute(db.text(statement))
+
+        db.session.add(AppSetting(key=MONEY_MIGRATION_KEY, value=datetime.utcnow().isoformat()))
+        db.session.commit()
+        print("✅ Kolom uang dimigrasi ke rupiah utuh")
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Gagal migrasi kolom uang: {e}")
+        return
+
+    # Snapshot dihitung ulang dari detail jurnal yang sudah dibulatkan
+    if JournalDetail.query.first() is not None:
+        rebuild_balance_snapshots()
+
+def ensure_database_columns():
+    """Tambahkan kolom yang belum ada di database lama"""
+    inspector = db.inspect(db.engine)
+    for table, column, column_type in DATABASE_COLUMNS:
+        existing = {info['name'] for info in inspector.get_columns(table)}
+        if column in existing:
+            continue
+        try:
+            db.session.execute(db.text(f'ALTER TABLE "{table}" ADD COLUMN {column} {column_type}'))
+            db.session.commit()
+            print(f"✅ Kolom {table}.{column} ditambahkan")
+        except Exception as e:
+            db.session.rollback()
+            print(f"⚠️ Gagal menambah kolom {table}.{column}: {e}")
+
+def ensure_database_indexes():
+    """Buat index yang belum ada di database lama"""
+    for statement in DATABASE_INDEXES:
+        try:
+            db.session.execute(db.text(statement))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"⚠️ Gagal membuat index ({statement}): {e}")
+
 # ===== TEMPLATE TRANSAKSI OTOMATIS LENGKAP BUDIDAYA IKAN MAS =====
 TRANSACTION_TEMPLATES = {
     'setoran_modal': {
@@ -902,6 +1297,298 @@ def customer_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+# ===== CACHE LOOKUP AKUN =====
+AccountRef = namedtuple('AccountRef', ['id', 'code', 'name', 'type', 'category'])
+
+# {'by_type': {type: AccountRef}, 'by_code': {code: AccountRef}, 'by_id': {id: AccountRef}}
+ACCOUNT_LOOKUP_CACHE = {}
+
+def load_account_lookup():
+    """Muat ulang cache akun (type/code/id) dari SATU query ke tabel akun"""
+    by_type, by_code, by_id = {}, {}, {}
+    for row in db.session.query(
+        Account.id, Account.code, Account.name, Account.type, Account.category
+    ).order_by(Account.id).all():
+        ref = AccountRef(*row)
+        by_type.setdefault(ref.type, ref)  # sama dengan filter_by(type=...).first()
+        by_code.setdefault(ref.code, ref)
+        by_id[ref.id] = ref
+
+    ACCOUNT_LOOKUP_CACHE.clear()
+    ACCOUNT_LOOKUP_CACHE.update({'by_type': by_type, 'by_code': by_code, 'by_id': by_id})
+    return ACCOUNT_LOOKUP_CACHE
+
+def invalidate_account_lookup():
+    """Kosongkan cache akun - panggil setelah akun dibuat, diubah, atau direset"""
+    ACCOUNT_LOOKUP_CACHE.clear()
+
+def lookup_account(index, key):
+    """Ambil AccountRef dari cache; jika tidak ada, muat ulang sekali (akun baru dari proses lain)"""
+    if not ACCOUNT_LOOKUP_CACHE:
+        load_account_lookup()
+
+    ref = ACCOUNT_LOOKUP_CACHE[index].get(key)
+    if ref is None:
+        ref = load_account_lookup()[index].get(key)
+    return ref
+
+def get_account_by_type(account_type):
+    """AccountRef (id, code, name, type, category) untuk tipe akun, atau None"""
+    return lookup_account('by_type', account_type)
+
+def get_account_by_code(code):
+    """AccountRef untuk kode akun, atau None"""
+    return lookup_account('by_code', str(code))
+
+def get_account_category(account_id):
+    """Kategori akun berdasarkan id, atau None"""
+    ref = lookup_account('by_id', account_id)
+    return ref.category if ref else None
+
+def get_account_type_map():
+    """Mapping type -> account_id untuk semua akun"""
+    if not ACCOUNT_LOOKUP_CACHE:
+        load_account_lookup()
+    return {account_type: ref.id for account_type, ref in ACCOUNT_LOOKUP_CACHE['by_type'].items()}
+
+# ===== CACHE BERVERSI =====
+# Data yang jarang berubah (pengaturan, peran produk) dibaca dari snapshot di memori proses, bukan
+# query per request. Setiap flush yang mengubah model sumbernya menaikkan baris versi di AppSetting
+# dalam transaksi yang sama dan, setelah commit, file penanda di instance/ diganti - worker lain cukup
+# stat() file itu untuk tahu snapshot-nya basi. Versi di database tetap dicek berkala untuk
+# deployment yang tidak berbagi filesystem.
+CACHE_RECHECK_INTERVAL = 60  # detik
+VERSIONED_CACHES = {}
+# model -> handler yang dipanggil dari SATU pemindaian sesi per flush / per statement massal
+FLUSH_TRACKERS = {}
+STATEMENT_TRACKERS = {}
+
+def read_stamp_file(path):
+    """Stempel file penanda (inode, mtime_ns) - (0, 0) bila belum ada"""
+    try:
+        stat = os.stat(path)
+        return (stat.st_ino, stat.st_mtime_ns)
+    except OSError:
+        return (0, 0)
+
+def replace_stamp_file(path):
+    """Ganti file penanda secara atomik (inode & mtime baru) agar semua proses melihat perubahan"""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}'
+        with open(temp_path, 'w') as stamp_file:
+            stamp_file.write(str(time.time_ns()))
+        os.replace(temp_path, path)
+        return True
+    except OSError as e:
+        print(f"⚠️ Gagal memperbarui file penanda {path}: {e}")
+        return False
+
+def track_model_changes(model, on_flush=None, on_statement=None):
+    """Daftarkan handler perubahan model: on_flush(session, objects) untuk objek ORM yang
+    ditambah/diubah/dihapus, on_statement(session) untuk UPDATE/INSERT/DELETE massal"""
+    if on_flush:
+        FLUSH_TRACKERS.setdefault(model, []).append(on_flush)
+    if on_statement:
+        STATEMENT_TRACKERS.setdefault(model, []).append(on_statement)
+
+@event.listens_for(db.session, 'before_flush')
+def dispatch_flush_changes(session, flush_context, instances):
+    """Satu pemindaian new/dirty/deleted per flush, dibagi ke handler per model"""
+    changed = {}
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if type(obj) in FLUSH_TRACKERS:
+            changed.setdefault(type(obj), []).append(obj)
+    for model, objects in changed.items():
+        for handler in FLUSH_TRACKERS[model]:
+            handler(session, objects)
+
+@event.listens_for(db.session, 'do_orm_execute')
+def dispatch_statement_changes(orm_execute_state):
+    """UPDATE/INSERT/DELETE massal yang melewati unit of work"""
+    if orm_execute_state.is_update or orm_execute_state.is_insert or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None:
+            for handler in STATEMENT_TRACKERS.get(mapper.class_, ()):
+                handler(orm_execute_state.session)
+
+def register_versioned_cache(name, model, version_key, stamp_file, loader, ignore=None):
+    """Cache proses untuk data dari `model`: loader() memuat isinya, ignore(obj) menyaring perubahan
+    yang tidak menaikkan versi. Mengembalikan dict state cache."""
+    cache = VERSIONED_CACHES[name] = {
+        'version_key': version_key, 'stamp_file': stamp_file, 'loader': loader,
+        'stamp': None, 'version': None, 'checked_at': 0, 'value': None,
+    }
+
+    def track_changes(session, objects):
+        if any(ignore is None or not ignore(obj) for obj in objects):
+            bump_cache_version(session, name)
+
+    track_model_changes(model, on_flush=track_changes)
+    return cache
+
+def bump_cache_version(session, name):
+    """Naikkan baris versi cache di transaksi sesi. Lewat Core (bukan ORM) agar tidak memicu
+    listener/flush lagi."""
+    session.connection().execute(
+        update(AppSetting.__table__)
+        .where(AppSetting.__table__.c.key == VERSIONED_CACHES[name]['version_key'])
+        .values(
+            value=db.cast(db.cast(AppSetting.__table__.c.value, db.Integer) + 1, db.String),
+            updated_at=datetime.utcnow()
+        )
+    )
+    session.info.setdefault('dirty_caches', set()).add(name)
+
+def is_cache_version_row(setting):
+    """Baris versi milik cache berversi (dinaikkan lewat Core, bukan perubahan data)"""
+    return setting.key in {cache['version_key'] for cache in VERSIONED_CACHES.values()}
+
+def ensure_cache_version(name):
+    """Pastikan baris versi cache ada di AppSetting"""
+    version_key = VERSIONED_CACHES[name]['version_key']
+    if not AppSetting.query.filter_by(key=version_key).first():
+        db.session.add(AppSetting(key=version_key, value='0'))
+        db.session.commit()
+
+def get_cache_version(name):
+    """Versi cache di database - naik setiap flush yang mengubah model sumbernya"""
+    value = db.session.query(AppSetting.value).filter_by(key=VERSIONED_CACHES[name]['version_key']).scalar()
+    return int(value) if value else 0
+
+def load_versioned_cache(name):
+    """Isi cache - dimuat ulang lewat loader hanya bila file penanda atau versinya berubah"""
+    cache = VERSIONED_CACHES[name]
+    stamp = read_stamp_file(cache['stamp_file'])
+    now = time.monotonic()
+    if (cache['value'] is not None and stamp == cache['stamp']
+            and now - cache['checked_at'] < CACHE_RECHECK_INTERVAL):
+        return cache['value']
+
+    version = get_cache_version(name)
+    if cache['value'] is None or stamp != cache['stamp'] or version != cache['version']:
+        cache['value'] = cache['loader']()
+    cache.update(stamp=stamp, version=version, checked_at=now)
+    return cache['value']
+
+def invalidate_versioned_cache(name):
+    """Buang isi cache proses ini - dimuat ulang saat dibaca berikutnya"""
+    VERSIONED_CACHES[name]['value'] = None
+
+@event.listens_for(db.session, 'after_commit')
+def publish_cache_versions(session):
+    """Setelah commit: cache proses ini dibuang dan file penanda diganti"""
+    for name in session.info.pop('dirty_caches', ()):
+        invalidate_versioned_cache(name)
+        replace_stamp_file(VERSIONED_CACHES[name]['stamp_file'])
+
+@event.listens_for(db.session, 'after_rollback')
+def discard_cache_versions(session):
+    """Rollback: cache mungkin sudah memuat data yang batal"""
+    for name in session.info.pop('dirty_caches', ()):
+        invalidate_versioned_cache(name)
+
+# ===== PERAN PRODUK PERSEDIAAN =====
+# peran -> nama & kategori produk bawaan (hanya untuk pemetaan awal) dan harga cost default
+PRODUCT_ROLES = {
+    'bibit': {'label': 'Bibit Ikan Mas', 'category': 'bibit', 'default_cost': 1000},
+    'konsumsi': {'label': 'Ikan Mas Konsumsi', 'category': 'konsumsi', 'default_cost': 13500},
+}
+# tipe inventory_effect di TRANSACTION_TEMPLATES yang namanya berbeda dengan peran
+PRODUCT_ROLE_ALIASES = {'ikan_konsumsi': 'konsumsi'}
+
+# Cache {peran: product_id} per proses - cache berversi 'product_roles' (lihat CACHE BERVERSI)
+PRODUCT_ROLE_VERSION_KEY = 'product_roles_version'
+PRODUCT_ROLE_VERSION_FILE = os.getenv('PRODUCT_ROLE_VERSION_FILE', os.path.join(app.instance_path, 'product_roles.version'))
+PRODUCT_ROLE_MIGRATION_KEY = 'product_roles_mapped'
+PRODUCT_ROLE_CACHE = register_versioned_cache(
+    'product_roles', ProductRole, PRODUCT_ROLE_VERSION_KEY, PRODUCT_ROLE_VERSION_FILE,
+    loader=lambda: dict(db.session.query(ProductRole.role, ProductRole.product_id).all())
+)
+
+def get_product_roles_version():
+    """Versi pemetaan peran produk di database - naik setiap flush yang mengubah ProductRole"""
+    return get_cache_version('product_roles')
+
+def load_product_roles():
+    """Pemetaan {peran: product_id} dari cache - dimuat ulang dengan SATU query bila versinya berubah"""
+    return load_versioned_cache('product_roles')
+
+def invalidate_product_roles():
+    """Buang cache peran produk proses ini - panggil setelah pemetaan diubah"""
+    invalidate_versioned_cache('product_roles')
+
+def resolve_product_role(product_type):
+    """Nama peran untuk tipe produk/template ('ikan_konsumsi' -> 'konsumsi'), atau None"""
+    role = PRODUCT_ROLE_ALIASES.get(product_type, product_type)
+    return role if role in PRODUCT_ROLES else None
+
+def get_role_product(product_type):
+    """Produk untuk sebuah peran (lookup primary key dari cache), atau None"""
+    role = resolve_product_role(product_type)
+    if role is None:
+        return None
+
+    product_id = load_product_roles().get(role)
+    return db.session.get(Product, product_id) if product_id else None
+
+def get_product_roles(product_id):
+    """Daftar peran yang dipetakan ke sebuah produk"""
+    return [role for role, mapped_id in load_product_roles().items() if mapped_id == product_id]
+
+def get_product_cost_price(product_type):
+    """Harga cost produk untuk sebuah peran, atau harga default peran bila produk belum ada"""
+    product = get_role_product(product_type)
+    if product and product.cost_price:
+        return product.cost_price
+    role = resolve_product_role(product_type)
+    return PRODUCT_ROLES[role]['default_cost'] if role else 1000
+
+def assign_product_role(product_type, product_id):
+    """Petakan peran ke produk (menggantikan pemetaan lama). Tidak melakukan commit."""
+    role = resolve_product_role(product_type)
+    if role is None:
+        raise ValueError(f'Peran produk {product_type} tidak dikenal')
+
+    mapping = db.session.get(ProductRole, role)
+    if mapping is None:
+        db.session.add(ProductRole(role=role, product_id=product_id))
+    else:
+        mapping.product_id = product_id
+    invalidate_product_roles()
+
+def remove_product_roles(product_id):
+    """Lepaskan semua peran dari sebuah produk. Tidak melakukan commit."""
+    for mapping in ProductRole.query.filter_by(product_id=product_id).all():
+        db.session.delete(mapping)
+    invalidate_product_roles()
+
+def ensure_product_roles():
+    """Sekali jalan: petakan peran yang belum ada ke produk bawaan berdasarkan nama & kategori.
+
+    Setelahnya peran yang sengaja dilepas seller tidak dipetakan ulang saat restart.
+    """
+    ensure_cache_version('product_roles')
+    if AppSetting.query.filter_by(key=PRODUCT_ROLE_MIGRATION_KEY).first():
+        return
+
+    try:
+        mapped = {role for (role,) in db.session.query(ProductRole.role).all()}
+        for role, config in PRODUCT_ROLES.items():
+            if role in mapped:
+                continue
+            product = Product.query.filter_by(name=config['label'], category=config['category']).first() \
+                or Product.query.filter_by(name=config['label']).first()
+            if product:
+                db.session.add(ProductRole(role=role, product_id=product.id))
+                print(f"✅ Peran produk '{role}' dipetakan ke {product.name}")
+        db.session.add(AppSetting(key=PRODUCT_ROLE_MIGRATION_KEY, value=datetime.utcnow().isoformat()))
+        db.session.commit()
+        invalidate_product_roles()
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Gagal memetakan peran produk: {e}")
+
 # ===== AKUNTANSI FUNCTIONS =====
 def generate_unique_transaction_number(prefix='TRX'):
     """Generate unique transaction number dengan timestamp dan random number"""
@@ -924,10 +1611,10 @@ def create_cod_sales_journal(order):
         description = f"Penjualan COD Order #{order.order_number}"
 
         # Get accounts
-        kas_account = Account.query.filter_by(type='kas').first()
-        pendapatan_account = Account.query.filter_by(type='pendapatan').first()
-        hpp_account = Account.query.filter_by(type='hpp').first()
-        persediaan_account = Account.query.filter_by(type='persediaan').first()
+        kas_account = get_account_by_type('kas')
+        pendapatan_account = get_account_by_type('pendapatan')
+        hpp_account = get_account_by_type('hpp')
+        persediaan_account = get_account_by_type('persediaan')
 
         if kas_account and pendapatan_account and hpp_account and persediaan_account:
             entries = [
@@ -960,12 +1647,14 @@ def create_cod_sales_journal(order):
                 }
             ]
 
+            # Jurnal dan mutasi stok satu transaksi - gagal salah satu, keduanya batal
             journal = create_journal_entry(
                 transaction_number,
                 order.completed_date or datetime.now(),
                 description,
                 'sales',
-                entries
+                entries,
+                commit=False
             )
 
             print(f"✅ Jurnal COD LENGKAP dibuat untuk order #{order.order_number}:")
@@ -973,27 +1662,257 @@ def create_cod_sales_journal(order):
             print(f"   HPP: Rp {hpp_total:,.0f}")
             print(f"   Laba Kotor: Rp {product_total - hpp_total:,.0f}")
 
-            # Update kartu persediaan untuk setiap produk yang dijual
-            for item in OrderItem.query.filter_by(order_id=order.id).all():
-                product = Product.query.get(item.product_id)
-                if product:
-                    update_inventory_card(
-                        product_id=product.id,
-                        transaction_type='penjualan',
-                        transaction_number=transaction_number,
-                        quantity=item.quantity,
-                        unit_cost=product.cost_price,
-                        date=order.completed_date or datetime.now()
-                    )
-                    print(f"✅ Kartu persediaan penjualan updated untuk {product.name}: {item.quantity} units")
+            journal.order_id = order.id
+            record_order_stock_movements(order)
+            db.session.commit()
 
             return journal
 
     except Exception as e:
+        db.session.rollback()
         print(f"Error creating COD sales journal: {e}")
     return None
 
-def create_journal_entry(transaction_number, date, description, journal_type, entries): #Membuat jurnal dengan validasi balance
+# ===== SNAPSHOT SALDO AKUN =====
+def get_balance_effect(category, debit, credit):
+    """Efek debit/kredit terhadap saldo akun sesuai saldo normal kategorinya"""
+    if category in ['asset', 'expense']:
+        return (debit or 0) - (credit or 0)
+    return (credit or 0) - (debit or 0)
+
+def record_balance_snapshots(lines, sign=1):
+    """Tambah (sign=1) atau kurangi (sign=-1) detail jurnal ke snapshot saldo.
+
+    lines berisi tuple (account_id, date, journal_type, debit, credit).
+    Tidak melakukan commit - ikut transaksi pemanggil.
+    """
+    buckets = {}
+    for account_id, date, journal_type, debit, credit in lines:
+        key = (account_id, date.strftime('%Y-%m'), journal_type)
+        total_debit, total_credit = buckets.get(key, (0, 0))
+        buckets[key] = (total_debit + sign * (debit or 0), total_credit + sign * (credit or 0))
+
+    if not buckets:
+        return
+
+    existing = {
+        (snapshot.account_id, snapshot.period, snapshot.journal_type): snapshot
+        for snapshot in AccountBalanceSnapshot.query.filter(
+            AccountBalanceSnapshot.account_id.in_({key[0] for key in buckets}),
+            AccountBalanceSnapshot.period.in_({key[1] for key in buckets})
+        ).all()
+    }
+
+    for (account_id, period, journal_type), (debit, credit) in buckets.items():
+        snapshot = existing.get((account_id, period, journal_type))
+        if snapshot is None:
+            snapshot = AccountBalanceSnapshot(
+                account_id=account_id,
+                period=period,
+                journal_type=journal_type,
+                debit_total=0,
+                credit_total=0
+            )
+            db.session.add(snapshot)
+        snapshot.debit_total += debit
+        snapshot.credit_total += credit
+
+def record_journal_snapshots(journal, sign=1):
+    """Catat semua detail satu jurnal ke snapshot saldo"""
+    record_balance_snapshots(
+        [(detail.account_id, journal.date, journal.journal_type, detail.debit, detail.credit)
+         for detail in journal.journal_details],
+        sign=sign
+    )
+
+def get_snapshot_totals(journal_types=None):
+    """Total debit/kredit per akun dari snapshot: {account_id: (debit, credit)}"""
+    query = db.session.query(
+        AccountBalanceSnapshot.account_id,
+        db.func.sum(AccountBalanceSnapshot.debit_total),
+        db.func.sum(AccountBalanceSnapshot.credit_total)
+    )
+    if journal_types is not None:
+        query = query.filter(AccountBalanceSnapshot.journal_type.in_(journal_types))
+
+    return {
+        account_id: (debit or 0, credit or 0)
+        for account_id, debit, credit in query.group_by(AccountBalanceSnapshot.account_id).all()
+    }
+
+def get_snapshot_effect(account, totals):
+    """Efek total jurnal terhadap saldo satu akun berdasarkan hasil get_snapshot_totals"""
+    debit, credit = totals.get(account.id, (0, 0))
+    return get_balance_effect(account.category, debit, credit)
+
+def rebuild_balance_snapshots():
+    """Bangun ulang snapshot saldo dari seluruh JournalDetail (untuk database lama)"""
+    try:
+        AccountBalanceSnapshot.query.delete()
+        rows = db.session.query(
+            JournalDetail.account_id,
+            JournalEntry.date,
+            JournalEntry.journal_type,
+            JournalDetail.debit,
+            JournalDetail.credit
+        ).join(JournalEntry, JournalDetail.journal_id == JournalEntry.id).all()
+        record_balance_snapshots(rows)
+        db.session.commit()
+        print(f"✅ Snapshot saldo dibangun ulang dari {len(rows)} detail jurnal")
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Error rebuilding balance snapshots: {e}")
+
+# ===== SALDO PER TANGGAL (AS-OF) =====
+ReportAccount = namedtuple('ReportAccount', ['id', 'code', 'name', 'type', 'category', 'balance'])
+
+def parse_as_of_date(value):
+    """Parse parameter tanggal 'YYYY-MM-DD' - None jika kosong/tidak valid"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+    except (TypeError, ValueError):
+        return None
+
+def format_date_arg(value):
+    """Tanggal 'YYYY-MM-DD' yang aman ditampilkan ulang di form - '' jika kosong/tidak valid"""
+    parsed = parse_as_of_date(value)
+    return parsed.isoformat() if parsed else ''
+
+def get_journal_totals_after(as_of):
+    """Total debit/kredit jurnal SETELAH tanggal as_of: {(account_id, journal_type): (debit, credit)}
+
+    Bulan-bulan setelah as_of dibaca dari snapshot per periode (akumulasi bulanan),
+    sisa bulan berjalan dari detail jurnal lewat index JournalEntry.date - tidak
+    perlu memutar ulang seluruh JournalDetail.
+    """
+    period = as_of.strftime('%Y-%m')
+    start = datetime(as_of.year, as_of.month, as_of.day) + timedelta(days=1)
+    next_month = datetime(as_of.year + (as_of.month == 12), as_of.month % 12 + 1, 1)
+
+    totals = {}
+    later_periods = db.session.query(
+        AccountBalanceSnapshot.account_id,
+        AccountBalanceSnapshot.journal_type,
+        db.func.sum(AccountBalanceSnapshot.debit_total),
+        db.func.sum(AccountBalanceSnapshot.credit_total)
+    ).filter(
+        AccountBalanceSnapshot.period > period
+    ).group_by(AccountBalanceSnapshot.account_id, AccountBalanceSnapshot.journal_type).all()
+
+    rest_of_month = db.session.query(
+        JournalDetail.account_id,
+        JournalEntry.journal_type,
+        db.func.sum(JournalDetail.debit),
+        db.func.sum(JournalDetail.credit)
+    ).join(
+        JournalEntry, JournalDetail.journal_id == JournalEntry.id
+    ).filter(
+        JournalEntry.date >= start,
+        JournalEntry.date < next_month
+    ).group_by(JournalDetail.account_id, JournalEntry.journal_type).all()
+
+    for account_id, journal_type, debit, credit in later_periods + rest_of_month:
+        total_debit, total_credit = totals.get((account_id, journal_type), (0, 0))
+        totals[(account_id, journal_type)] = (total_debit + (debit or 0), total_credit + (credit or 0))
+
+    return totals
+
+def get_account_balances_as_of(as_of):
+    """Saldo semua akun per akhir hari as_of: {account_id: saldo}
+
+    Saldo per tanggal = saldo sekarang - efek jurnal yang terjadi setelah tanggal itu.
+    """
+    accounts = db.session.query(Account.id, Account.category, Account.balance).all()
+    categories = {account_id: category for account_id, category, _ in accounts}
+
+    effects_after = {}
+    for (account_id, journal_type), (debit, credit) in get_journal_totals_after(as_of).items():
+        effects_after[account_id] = effects_after.get(account_id, 0) + get_balance_effect(categories.get(account_id), debit, credit)
+
+    return {
+        account_id: balance - effects_after.get(account_id, 0)
+        for account_id, _, balance in accounts
+    }
+
+def get_report_accounts(as_of=None):
+    """Daftar akun (urut kode) untuk laporan, dengan saldo sekarang atau per tanggal as_of"""
+    accounts = Account.query.order_by(Account.code).all()
+    balances = get_account_balances_as_of(as_of) if as_of else {}
+
+    return [
+        ReportAccount(
+            account.id, account.code, account.name, account.type, account.category,
+            balances.get(account.id, account.balance)
+        )
+        for account in accounts
+    ]
+
+def get_category_totals(as_of=None):
+    """Total saldo per kategori akun dari SUM di SQL: {category: total}
+
+    Per tanggal as_of: dikurangi efek jurnal setelah tanggal itu.
+    """
+    totals = dict(db.session.query(
+        Account.category, db.func.sum(Account.balance)
+    ).group_by(Account.category).all())
+
+    if as_of:
+        for (account_id, journal_type), (debit, credit) in get_journal_totals_after(as_of).items():
+            category = get_account_category(account_id)
+            totals[category] = totals.get(category, 0) - get_balance_effect(category, debit, credit)
+
+    return totals
+
+# ===== VERSI BUKU BESAR =====
+LEDGER_VERSION_KEY = 'ledger_version'
+
+def ensure_ledger_version():
+    """Pastikan baris versi buku ada di AppSetting"""
+    if not AppSetting.query.filter_by(key=LEDGER_VERSION_KEY).first():
+        db.session.add(AppSetting(key=LEDGER_VERSION_KEY, value='0'))
+        db.session.commit()
+
+def get_ledger_version():
+    """Versi buku saat ini - naik setiap ada penulisan jurnal/saldo"""
+    value = db.session.query(AppSetting.value).filter_by(key=LEDGER_VERSION_KEY).scalar()
+    return int(value) if value else 0
+
+def bump_ledger_version():
+    """Naikkan versi buku secara atomik. Tidak commit - ikut transaksi pemanggil."""
+    db.session.execute(
+        update(AppSetting)
+        .where(AppSetting.key == LEDGER_VERSION_KEY)
+        .values(
+            value=db.cast(db.cast(AppSetting.value, db.Integer) + 1, db.String),
+            updated_at=datetime.utcnow()
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+# ===== PENGATURAN APLIKASI (CACHE) =====
+# AppSetting dibaca dari cache berversi 'settings' (lihat CACHE BERVERSI). Baris versi cache lain
+# seperti ledger_version dinaikkan lewat UPDATE massal dan memang tidak dilacak di sini.
+SETTINGS_VERSION_KEY = 'settings_version'
+SETTINGS_VERSION_FILE = os.getenv('SETTINGS_VERSION_FILE', os.path.join(app.instance_path, 'settings.version'))
+SETTINGS_CACHE = register_versioned_cache(
+    'settings', AppSetting, SETTINGS_VERSION_KEY, SETTINGS_VERSION_FILE,
+    loader=lambda: {s.key: s.value for s in AppSetting.query.all()}, ignore=is_cache_version_row
+)
+
+def ensure_settings_version():
+    """Pastikan baris versi pengaturan ada di AppSetting"""
+    ensure_cache_version('settings')
+
+def get_settings_version():
+    """Versi pengaturan di database - naik setiap flush yang mengubah AppSetting"""
+    return get_cache_version('settings')
+
+def get_app_settings():
+    """Semua AppSetting sebagai dict dari snapshot memori - dimuat ulang hanya bila versinya berubah"""
+    return load_versioned_cache('settings')
+
+def create_journal_entry(transaction_number, date, description, journal_type, entries, commit=True): #Membuat jurnal dengan validasi balance
+    """commit=False: jurnal hanya di-flush dan ikut transaksi pemanggil (commit/rollback oleh pemanggil)"""
     try:
         print(f"🔄 Memulai create_journal_entry: {transaction_number}")
 
@@ -1015,6 +1934,12 @@ def create_journal_entry(transaction_number, date, description, journal_type, en
 
         print(f"✅ Journal entry created: {journal.id}")
 
+        # Nominal dibulatkan ke rupiah utuh agar pengecekan balance eksak
+        entries = [
+            dict(entry, debit=to_rupiah(entry.get('debit', 0)), credit=to_rupiah(entry.get('credit', 0)))
+            for entry in entries
+        ]
+
         # VERIFIKASI: Total debit harus sama dengan total credit
         total_debit = sum(entry.get('debit', 0) for entry in entries)
         total_credit = sum(entry.get('credit', 0) for entry in entries)
@@ -1046,25 +1971,224 @@ def create_journal_entry(transaction_number, date, description, journal_type, en
                     account.balance += entry.get('credit', 0) - entry.get('debit', 0)
                     print(f"📈 Update {account.name}: +{entry.get('credit', 0)} -{entry.get('debit', 0)} = {account.balance}")
 
+        # Snapshot saldo ikut transaksi yang sama
+        record_balance_snapshots(
+            (entry['account_id'], date, journal_type, entry.get('debit', 0), entry.get('credit', 0))
+            for entry in entries
+        )
+        bump_ledger_version()
+
+        if not commit:
+            db.session.flush()
+            return journal
+
         db.session.commit()
         print(f"✅ Journal entry successfully committed: {journal.transaction_number}")
         return journal
     except Exception as e:
-        db.session.rollback()
+        if commit:
+            db.session.rollback()
         print(f"❌ Error creating journal entry: {e}")
         import traceback
         traceback.print_exc()
         raise e
 
+# ===== POSTING JURNAL MASSAL =====
+BULK_JOURNAL_TYPES = ['general', 'sales', 'purchase', 'hpp', 'adjustment']
+BULK_JOURNAL_LIMIT = 5000
+
+def validate_bulk_journals(journals):
+    """Validasi semua jurnal batch SEBELUM ada yang diposting.
+
+    Setiap jurnal: {'date': 'YYYY-MM-DD', 'description', 'journal_type' (default general),
+    'transaction_number' (opsional), 'entries': [{'account_id' atau 'account_code',
+    'debit', 'credit', 'description'}]}. Return (prepared, errors).
+    """
+    errors = []
+    prepared = []
+
+    if not isinstance(journals, list) or not journals:
+        return [], ['Daftar jurnal kosong']
+    if len(journals) > BULK_JOURNAL_LIMIT:
+        return [], [f'Maksimal {BULK_JOURNAL_LIMIT} jurnal per batch']
+
+    # Ambil semua akun yang dirujuk dalam SATU query
+    account_ids = set()
+    account_codes = set()
+    for journal in journals:
+        for entry in (journal.get('entries') or []) if isinstance(journal, dict) else []:
+            if isinstance(entry, dict) and entry.get('account_id') is not None:
+                account_ids.add(entry['account_id'])
+            elif isinstance(entry, dict) and entry.get('account_code') is not None:
+                account_codes.add(str(entry['account_code']))
+
+    accounts = Account.query.filter(
+        db.or_(Account.id.in_(account_ids), Account.code.in_(account_codes))
+    ).all() if account_ids or account_codes else []
+    accounts_by_id = {account.id: account for account in accounts}
+    accounts_by_code = {account.code: account for account in accounts}
+
+    batch_prefix = f"BLK{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    seen_numbers = set()
+
+    for index, journal in enumerate(journals, start=1):
+        if not isinstance(journal, dict):
+            errors.append(f'Jurnal #{index}: format tidak valid')
+            continue
+
+        journal_errors = []
+
+        try:
+            date = journal.get('date')
+            if not isinstance(date, datetime):
+                date = datetime.strptime(str(date), '%Y-%m-%d')
+        except ValueError:
+            journal_errors.append('tanggal harus berformat YYYY-MM-DD')
+            date = None
+
+        description = (journal.get('description') or '').strip()
+        if not description:
+            journal_errors.append('keterangan wajib diisi')
+
+        journal_type = journal.get('journal_type') or 'general'
+        if journal_type not in BULK_JOURNAL_TYPES:
+            journal_errors.append(f'jenis jurnal {journal_type} tidak diperbolehkan')
+
+        transaction_number = journal.get('transaction_number') or f"{batch_prefix}{index:05d}"
+        if transaction_number in seen_numbers:
+            journal_errors.append(f'nomor transaksi {transaction_number} duplikat dalam batch')
+        seen_numbers.add(transaction_number)
+
+        entries = journal.get('entries') or []
+        if len(entries) < 2:
+            journal_errors.append('minimal 2 baris entri')
+
+        lines = []
+        total_debit = total_credit = 0
+        for entry in entries:
+            if not isinstance(entry, dict):
+                journal_errors.append('format entri tidak valid')
+                continue
+
+            if entry.get('account_id') is not None:
+                account = accounts_by_id.get(entry['account_id'])
+            else:
+                account = accounts_by_code.get(str(entry.get('account_code')))
+            if not account:
+                journal_errors.append(f"akun {entry.get('account_id') or entry.get('account_code')} tidak ditemukan")
+                continue
+
+            try:
+                debit = to_rupiah(entry.get('debit'))
+                credit = to_rupiah(entry.get('credit'))
+            except (TypeError, ValueError):
+                journal_errors.append(f'nominal akun {account.code} tidak valid')
+                continue
+            if debit < 0 or credit < 0:
+                journal_errors.append(f'nominal akun {account.code} tidak boleh negatif')
+                continue
+
+            total_debit += debit
+            total_credit += credit
+            lines.append((account, debit, credit, entry.get('description', '')))
+
+        if total_debit != total_credit:
+            journal_errors.append(f'tidak balance (Debit: {total_debit}, Kredit: {total_credit})')
+
+        if journal_errors:
+            errors.append(f"Jurnal #{index}: {', '.join(journal_errors)}")
+            continue
+
+        prepared.append({
+            'transaction_number': transaction_number,
+            'date': date,
+            'description': description,
+            'journal_type': journal_type,
+            'lines': lines
+        })
+
+    # Nomor transaksi tidak boleh bentrok dengan jurnal yang sudah ada
+    if seen_numbers:
+        existing_numbers = {
+            number for (number,) in db.session.query(JournalEntry.transaction_number).filter(
+                JournalEntry.transaction_number.in_(seen_numbers)
+            ).all()
+        }
+        for number in sorted(existing_numbers):
+            errors.append(f'Nomor transaksi {number} sudah ada')
+
+    return prepared, errors
+
+def post_prepared_journals(prepared):
+    """Posting jurnal hasil validate_bulk_journals dalam SATU transaksi.
+
+    Jurnal dan detail di-insert massal, lalu saldo tiap akun diperbarui dengan
+    satu UPDATE per akun dari total delta batch.
+    """
+    try:
+        inserted = db.session.execute(
+            insert(JournalEntry).returning(JournalEntry.id, JournalEntry.transaction_number),
+            [{
+                'transaction_number': journal['transaction_number'],
+                'date': journal['date'],
+                'description': journal['description'],
+                'journal_type': journal['journal_type']
+            } for journal in prepared]
+        ).all()
+        journal_ids = {transaction_number: journal_id for journal_id, transaction_number in inserted}
+
+        detail_rows = []
+        snapshot_lines = []
+        balance_deltas = {}
+        for journal in prepared:
+            journal_id = journal_ids[journal['transaction_number']]
+            for account, debit, credit, description in journal['lines']:
+                detail_rows.append({
+                    'journal_id': journal_id,
+                    'account_id': account.id,
+                    'debit': debit,
+                    'credit': credit,
+                    'description': description
+                })
+                snapshot_lines.append((account.id, journal['date'], journal['journal_type'], debit, credit))
+                balance_deltas[account.id] = balance_deltas.get(account.id, 0) + get_balance_effect(account.category, debit, credit)
+
+        db.session.execute(insert(JournalDetail), detail_rows)
+
+        # Satu UPDATE per akun dengan total delta batch
+        for account_id, delta in balance_deltas.items():
+            if delta:
+                db.session.execute(
+                    update(Account).where(Account.id == account_id).values(balance=Account.balance + delta)
+                )
+
+        record_balance_snapshots(snapshot_lines)
+        bump_ledger_version()
+
+        db.session.commit()
+        print(f"✅ Bulk posting: {len(prepared)} jurnal, {len(detail_rows)} detail, {len(balance_deltas)} akun")
+        return [journal['transaction_number'] for journal in prepared]
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Error bulk posting journals: {e}")
+        import traceback
+        traceback.print_exc()
+        raise e
+
+def post_journals_bulk(journals):
+    """Validasi lalu posting banyak jurnal sekaligus - semua atau tidak sama sekali"""
+    prepared, errors = validate_bulk_journals(journals)
+    if errors:
+        raise ValueError('; '.join(errors))
+    return post_prepared_journals(prepared)
+
 def create_journal_from_template(template_key, date, amounts, inputs=None):
     """Membuat jurnal dari template dengan amount yang diberikan dan update kartu persediaan - DIPERBAIKI"""
     try:
         template = TRANSACTION_TEMPLATES[template_key]
-        accounts_map = {}
 
-        # Build accounts mapping
-        for account in Account.query.all():
-            accounts_map[account.type] = account.id
+        # Mapping type -> account_id dari cache akun
+        accounts_map = get_account_type_map()
 
         entries = []
         amount_index = 0
@@ -1155,42 +2279,29 @@ def update_inventory_from_journal(journal, template, inputs, quantity):
         product_type = inventory_effect['type']  # 'bibit' atau 'ikan_konsumsi'
         action = inventory_effect['action']      # 'in' atau 'out'
 
-        # Tentukan produk berdasarkan jenis
-        if product_type == 'bibit':
-            product_name = "Bibit Ikan Mas"
-            category = 'bibit'
-            unit_cost = inputs.get('unit_cost', 1000)
-        elif product_type == 'ikan_konsumsi':
-            product_name = "Ikan Mas Konsumsi"
-            category = 'konsumsi'
-            unit_cost = inputs.get('unit_cost', 13500)
-        else:
+        # Tentukan produk berdasarkan peran persediaan (bibit/konsumsi)
+        if resolve_product_role(product_type) is None:
             return
 
-        # Cari produk berdasarkan nama dan kategori
-        product = Product.query.filter_by(name=product_name, category=category).first()
+        product = get_role_product(product_type)
         if not product:
-            print(f"❌ Produk {product_name} tidak ditemukan")
+            print(f"❌ Produk untuk peran {product_type} belum ditentukan")
             return
 
-        print(f"📦 Processing inventory update: {product_name}, Quantity: {quantity}, Action: {action}")
+        print(f"📦 Processing inventory update: {product.name}, Quantity: {quantity}, Action: {action}")
 
         if action == 'out':
             # Update stok produk - KELUAR (kerugian)
             if product.stock >= quantity:
-                product.stock -= quantity
-                print(f"✅ Stok {product.name} berkurang {quantity} menjadi {product.stock}")
-
-                # Buat transaksi inventory
-                create_inventory_transaction(
-                    product_id=product.id,
+                record_stock_movement(
+                    product.id,
+                    'penyesuaian',
+                    quantity_out=quantity,
                     date=journal.date,
                     description=f"{journal.description}",
-                    transaction_type='penyesuaian',
-                    quantity_in=0,
-                    quantity_out=quantity,
-                    unit_price=unit_cost
+                    reference=journal.transaction_number
                 )
+                print(f"✅ Stok {product.name} berkurang {quantity} menjadi {product.stock}")
             else:
                 print(f"⚠️ Stok tidak mencukupi untuk {product.name}. Stok: {product.stock}, Butuh: {quantity}")
 
@@ -1216,8 +2327,8 @@ def update_hpp_automatically(order):
                 description = f"Harga Pokok Produksi untuk penjualan {product.name}" - Order #{order.order_number}"
 
                 # Get accounts
-                hpp_account = Account.query.filter_by(type='hpp').first()
-                persediaan_account = Account.query.filter_by(type='persediaan').first()
+                hpp_account = get_account_by_type('hpp')
+                persediaan_account = get_account_by_type('persediaan')
 
                 if hpp_account and persediaan_account:
                     entries = [
@@ -1248,99 +2359,708 @@ def update_hpp_automatically(order):
     except Exception as e:
         print(f"Error updating HPP automatically: {e}")
 
-# ===== FUNGSI CREATE INVENTORY TRANSACTION =====
-def update_inventory_card(product_id, transaction_type, transaction_number, quantity, unit_cost, date=None):
-    """Update kartu persediaan untuk produk tertentu dengan harga cost yang sesuai"""
+# ===== LEDGER MUTASI STOK =====
+INVENTORY_COST_METHODS = {
+    'average': 'Rata-rata Tertimbang',
+    'fifo': 'FIFO (Masuk Pertama Keluar Pertama)'
+}
+INVENTORY_COST_METHOD = os.environ.get('INVENTORY_COST_METHOD', 'average').lower()
+if INVENTORY_COST_METHOD not in INVENTORY_COST_METHODS:
+    print(f"⚠️ INVENTORY_COST_METHOD '{INVENTORY_COST_METHOD}' tidak dikenal, memakai 'average'")
+    INVENTORY_COST_METHOD = 'average'
+COST_LAYER_BATCH_SIZE = 20
+
+def iter_open_cost_layers(product_id, lock=False):
+    """Lapisan biaya terbuka urut FIFO (tanggal, id), diambil per batch kecil dengan keyset"""
+    last_date, last_id = None, 0
+    while True:
+        query = CostLayer.query.filter(CostLayer.product_id == product_id, CostLayer.is_open.is_(True))
+        if last_date is not None:
+            query = query.filter(db.or_(
+                CostLayer.date > last_date,
+                db.and_(CostLayer.date == last_date, CostLayer.id > last_id)
+            ))
+        query = query.order_by(CostLayer.date, CostLayer.id).limit(COST_LAYER_BATCH_SIZE)
+        if lock:
+            query = query.with_for_update()
+
+        layers = query.all()
+        for layer in layers:
+            yield layer
+        if len(layers) < COST_LAYER_BATCH_SIZE:
+            return
+        last_date, last_id = layers[-1].date, layers[-1].id
+
+def consume_cost_layers(product_id, quantity, first_layer=None):
+    """Kurangi lapisan biaya tertua sebanyak quantity (first_layer dipakai lebih dulu bila masih terbuka).
+
+    Mengembalikan (jumlah terpakai, nilai biaya, [(layer, jumlah)]).
+    """
+    consumed, cost, usages = 0, 0, []
+    layers = iter_open_cost_layers(product_id, lock=True)
+    if first_layer is not None and first_layer.is_open:
+        layers = itertools.chain([first_layer], (layer for layer in layers if layer.id != first_layer.id))
+
+    for layer in layers:
+        if consumed >= quantity:
+            break
+        take = min(quantity - consumed, layer.remaining_quantity)
+        layer.remaining_quantity -= take
+        layer.is_open = layer.remaining_quantity > 0
+        consumed += take
+        cost += take * layer.unit_price
+        usages.append((layer, take))
+    return consumed, cost, usages
+
+def restore_cost_layers(movement):
+    """Kembalikan lapisan biaya yang dipakai mutasi keluar `movement`. Mengembalikan jumlah yang dipulihkan."""
+    restored = 0
+    for usage in CostLayerUsage.query.filter_by(movement_id=movement.id).all():
+        layer = db.session.get(CostLayer, usage.layer_id)
+        if layer is None:
+            continue
+        layer.remaining_quantity += usage.quantity
+        layer.is_open = True
+        restored += usage.quantity
+    return restored
+
+def calculate_hpp(product_id, quantity_sold, method=None):
+    """Hitung HPP untuk quantity_sold tanpa mengubah persediaan (FIFO atau rata-rata)"""
     try:
-        print(f"🔄 [INVENTORY CARD] Memulai update inventory: Product {product_id}, Type: {transaction_type}, Qty: {quantity}")
+        method = method or INVENTORY_COST_METHOD
+        head = get_stock_head(product_id)
+        average_price = head.balance_unit_price if head else 0
 
-        if date is None:
-            date = datetime.now()
+        if method != 'fifo':
+            return to_rupiah(quantity_sold * average_price)
 
-        # Dapatkan produk untuk mengetahui harga cost
-        product = Product.query.get(product_id)
-        if not product:
-            print(f"❌ Product tidak ditemukan: {product_id}")
-            return None
+        hpp_value = 0
+        remaining_quantity = quantity_sold
+        for layer in iter_open_cost_layers(product_id):
+            if remaining_quantity <= 0:
+                break
+            quantity_to_use = min(remaining_quantity, layer.remaining_quantity)
+            hpp_value += quantity_to_use * layer.unit_price
+            remaining_quantity -= quantity_to_use
+
+        # Kekurangan lapisan (stok minus) dinilai dengan harga rata-rata
+        hpp_value += max(remaining_quantity, 0) * average_price
+        return to_rupiah(hpp_value)
 
-        COST_PRICE = product.cost_price
+    except Exception as e:
+        print(f"Error calculating HPP: {e}")
+        return 0
 
-        # Dapatkan balance terakhir
-        last_entry = InventoryCard.query.filter_by(product_id=product_id).order_by(InventoryCard.date.desc()).first()
+def order_stock_reference(order):
+    """Referensi mutasi stok penjualan sebuah order - sama di checkout dan saat order selesai"""
+    return f"ORDER-{order.order_number}"
+
+def record_order_stock_movements(order, order_items=None):
+    """Mutasi stok penjualan semua item order - dilewati per produk jika sudah dicatat saat checkout.
+
+    Tidak melakukan commit - ikut transaksi pemanggil.
+    """
+    for item in order_items or OrderItem.query.filter_by(order_id=order.id).all():
+        record_stock_movement(
+            item.product_id,
+            'penjualan',
+            quantity_out=item.quantity,
+            date=order.completed_date or datetime.now(),
+            description=f"Penjualan - Order #{order.order_number}",
+            reference=order_stock_reference(order)
+        )
 
-        if last_entry:
-            balance_quantity = last_entry.balance_quantity
-            balance_value = last_entry.balance_value
-            print(f"📊 [INVENTORY CARD] Last balance: Qty={balance_quantity}, Value={balance_value}")
+def reserve_stock(quantities):
+    """Kunci StockHead {product_id: qty} dengan satu UPDATE bersyarat (balance_quantity >= qty) per produk.
+
+    Stok tidak dikurangi di sini - pengurangan tetap lewat record_stock_movement di transaksi yang
+    sama, jadi StockHead satu-satunya pemilik saldo dan Product.stock hanya cerminannya.
+    Berjalan di transaksi pemanggil; produk diproses urut id agar kunci baris tidak saling tunggu.
+    Mengembalikan daftar product_id yang stoknya tidak cukup - pemanggil wajib rollback bila tidak kosong.
+    """
+    failed = []
+    for product_id in sorted(quantities):
+        quantity = quantities[product_id]
+        result = db.session.execute(
+            update(StockHead)
+            .where(StockHead.product_id == product_id, StockHead.balance_quantity >= quantity)
+            .values(updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            failed.append(product_id)
+    return failed
+
+def record_stock_movement(product_id, transaction_type, quantity_in=0, quantity_out=0,
+                          unit_price=None, date=None, description='', reference=None, reverses=None):
+    """Catat satu mutasi stok (append-only) dan perbarui StockHead produk.
+
+    unit_price dipakai untuk barang masuk dan membuka lapisan biaya baru; barang keluar
+    mengonsumsi lapisan tertua dan dinilai sesuai INVENTORY_COST_METHOD (FIFO atau rata-rata).
+    reverses = mutasi yang dibatalkan: pembatalan barang masuk mengeluarkan lapisan mutasi itu
+    sendiri pada harga belinya, pembatalan barang keluar memulihkan lapisan yang dipakainya.
+    Mutasi dengan reference yang sama untuk produk yang sama hanya dicatat sekali.
+
+    Mutasi mundur tanggal (date lebih lama dari mutasi terakhir) dinilai dari saldo TERKINI
+    (StockHead dan lapisan terbuka), bukan saldo pada tanggal itu; saldo berjalan sesudahnya
+    dihitung ulang, tetapi nilai barang keluar sesudahnya tidak dinilai ulang (HPP-nya sudah
+    terposting di jurnal). Tidak melakukan commit - ikut transaksi pemanggil.
+    """
+    if reference:
+        existing = StockMovement.query.filter_by(product_id=product_id, reference=reference).first()
+        if existing:
+            print(f"ℹ️ [STOK] Mutasi {reference} untuk produk {product_id} sudah tercatat")
+            return existing
+
+    product = db.session.get(Product, product_id)
+    if not product:
+        raise ValueError(f'Produk {product_id} tidak ditemukan')
+
+    date = date or datetime.now()
+    head = StockHead.query.filter_by(product_id=product_id).with_for_update().first()
+    if not head:
+        head = StockHead(product_id=product_id, balance_quantity=0,
+                         balance_unit_price=product.cost_price or 0, balance_total=0)
+        db.session.add(head)
+
+    balance_quantity = head.balance_quantity + quantity_in - quantity_out
+
+    usages = []
+    if quantity_in > 0:
+        if reverses is not None and reverses.quantity_out:
+            # Pembatalan barang keluar: nilai persis sama dengan mutasi aslinya
+            unit_price, total_amount = reverses.unit_price, reverses.total_amount
         else:
-            balance_quantity = 0
-            balance_value = 0
-            print(f"📊 [INVENTORY CARD] No previous entries, starting from zero")
-
-        # Hitung quantity dan value baru
-        if transaction_type == 'penjualan':
-            quantity_in = 0
-            quantity_out = quantity
-            balance_quantity -= quantity
-
-            # Hitung HPP dengan average cost
-            hpp_value = quantity * COST_PRICE
-            balance_value -= hpp_value
-
-            print(f"📉 [INVENTORY CARD] Penjualan: -{quantity} units, HPP: {hpp_value}, new balance: {balance_quantity}")
-
-        elif transaction_type == 'pembelian':
-            quantity_in = quantity
-            quantity_out = 0
-            balance_quantity += quantity
-
-            # Hitung average cost baru
-            total_value = balance_value + (quantity * unit_cost)
-            balance_value = total_value
-
-            print(f"📈 [INVENTORY CARD] Pembelian: +{quantity} units, new balance: {balance_quantity}")
-        else:  # penyesuaian
-            quantity_in = quantity if quantity > 0 else 0
-            quantity_out = abs(quantity) if quantity < 0 else 0
-            balance_quantity += quantity
-            balance_value += quantity * COST_PRICE
-
-        total_cost = quantity * unit_cost
-
-        # Buat entry baru
-        inventory_entry = InventoryCard(
-            product_id=product_id,
-            date=date,
-            transaction_type=transaction_type,
-            transaction_number=transaction_number,
-            quantity_in=quantity_in,
-            quantity_out=quantity_out,
-            unit_cost=unit_cost,
-            total_cost=total_cost,
-            balance_quantity=balance_quantity,
-            balance_value=balance_value
+            unit_price = product.cost_price if unit_price is None else unit_price
+            total_amount = to_rupiah(quantity_in * unit_price)
+        balance_total = head.balance_total + total_amount
+        balance_unit_price = balance_total / balance_quantity if balance_quantity > 0 else unit_price
+    else:
+        average_price = head.balance_unit_price or product.cost_price or 0
+        own_layer = (CostLayer.query.filter_by(movement_id=reverses.id).with_for_update().first()
+                     if reverses is not None else None)
+        consumed, layer_cost, usages = (
+            consume_cost_layers(product_id, quantity_out, own_layer) if quantity_out > 0 else (0, 0, [])
         )
 
-        db.session.add(inventory_entry)
+        if 0 < head.balance_quantity <= quantity_out:
+            total_amount = head.balance_total  # stok habis - nilai ikut habis tanpa sisa pembulatan
+        elif INVENTORY_COST_METHOD == 'fifo' or own_layer is not None:
+            # Kekurangan lapisan (stok minus) dinilai dengan harga rata-rata
+            total_amount = to_rupiah(layer_cost + (quantity_out - consumed) * average_price)
+        else:
+            total_amount = to_rupiah(quantity_out * average_price)
 
-        # Update stock produk
-        if product:
-            product.stock = balance_quantity
-            # Update harga cost dengan average cost
-            if balance_quantity > 0:
-                product.cost_price = balance_value / balance_quantity
-            print(f"📦 [INVENTORY CARD] Stock produk diupdate: {product.name} = {balance_quantity}, Cost: {product.cost_price}")
+        unit_price = total_amount / quantity_out if quantity_out > 0 else average_price
+        balance_total = head.balance_total - total_amount
+        if INVENTORY_COST_METHOD == 'fifo' and balance_quantity > 0:
+            balance_unit_price = balance_total / balance_quantity
+        else:
+            balance_unit_price = average_price
+
+    movement = StockMovement(
+        product_id=product_id,
+        date=date,
+        reference=reference,
+        description=description,
+        transaction_type=transaction_type,
+        quantity_in=quantity_in,
+        quantity_out=quantity_out,
+        unit_price=unit_price,
+        total_amount=total_amount,
+        balance_quantity=balance_quantity,
+        balance_unit_price=balance_unit_price,
+        balance_total=balance_total
+    )
+    db.session.add(movement)
+    db.session.flush()
 
-        db.session.commit()
+    if quantity_in > 0:
+        restored = restore_cost_layers(reverses) if reverses is not None and reverses.quantity_out else 0
+        if quantity_in > restored:
+            db.session.add(CostLayer(
+                product_id=product_id,
+                movement_id=movement.id,
+                date=movement.date,
+                unit_price=unit_price,
+                quantity=quantity_in - restored,
+                remaining_quantity=quantity_in - restored
+            ))
+    for layer, quantity in usages:
+        db.session.add(CostLayerUsage(movement_id=movement.id, layer_id=layer.id, quantity=quantity))
+
+    head.balance_quantity = balance_quantity
+    head.balance_unit_price = balance_unit_price
+    head.balance_total = balance_total
+    head.last_movement_id = movement.id
+    head.updated_at = datetime.utcnow()
+
+    # Stok & harga pokok produk mengikuti saldo ledger
+    product.stock = balance_quantity
+    product.cost_price = balance_unit_price
+
+    # Mutasi mundur tanggal: saldo berjalan baris sesudahnya harus dihitung ulang
+    later_movement = db.session.query(StockMovement.id).filter(
+        StockMovement.product_id == product_id,
+        StockMovement.date > date
+    ).first()
+    if later_movement:
+        rebalance_stock_movements(product_id, start=movement)
+    else:
+        record_stock_snapshots(product_id, [(date, head.balance_quantity, head.balance_unit_price, head.balance_total)])
+
+    print(f"📦 [STOK] {product.name}: {transaction_type} +{quantity_in}/-{quantity_out} -> {product.stock} unit, Rp {head.balance_total:,.0f}")
+    return movement
+
+def rebalance_stock_movements(product_id, start=None):
+    """Hitung ulang saldo berjalan mutasi produk dari mutasi `start` (urut tanggal, id) ke depan.
+
+    start=None menghitung ulang seluruh riwayat. Nilai tiap mutasi (unit_price, total_amount) tidak
+    diubah, hanya kolom saldo - barang keluar sesudah mutasi mundur tanggal tetap bernilai seperti
+    saat dicatat. Semua baris ditulis dengan satu UPDATE batch lalu StockHead dan produk disamakan
+    dengan baris terakhir.
+    Tidak melakukan commit. Mengembalikan jumlah baris yang dihitung ulang.
+    """
+    query = db.session.query(
+        StockMovement.id, StockMovement.date, StockMovement.quantity_in, StockMovement.quantity_out,
+        StockMovement.unit_price, StockMovement.total_amount
+    ).filter(StockMovement.product_id == product_id)
+
+    balance_quantity, balance_total, balance_unit_price = 0, 0, None
+    if start is not None:
+        previous = StockMovement.query.filter(
+            StockMovement.product_id == product_id,
+            db.or_(
+                StockMovement.date < start.date,
+                db.and_(StockMovement.date == start.date, StockMovement.id < start.id)
+            )
+        ).order_by(StockMovement.date.desc(), StockMovement.id.desc()).first()
+        if previous:
+            balance_quantity = previous.balance_quantity
+            balance_total = previous.balance_total
+            balance_unit_price = previous.balance_unit_price
+        query = query.filter(db.or_(
+            StockMovement.date > start.date,
+            db.and_(StockMovement.date == start.date, StockMovement.id >= start.id)
+        ))
+
+    rows = query.order_by(StockMovement.date, StockMovement.id).all()
+    if not rows:
+        return 0
 
-        print(f"✅ [INVENTORY CARD] Kartu persediaan updated: {transaction_type} {quantity} units for product {product_id}")
-        return inventory_entry
+    params = []
+    for row in rows:
+        balance_quantity += (row.quantity_in or 0) - (row.quantity_out or 0)
+        balance_total += (row.total_amount or 0) if row.quantity_in else -(row.total_amount or 0)
+        if balance_quantity > 0:
+            balance_unit_price = balance_total / balance_quantity
+        elif balance_unit_price is None:
+            balance_unit_price = row.unit_price or 0
+        params.append({
+            'id': row.id,
+            'balance_quantity': balance_quantity,
+            'balance_unit_price': balance_unit_price,
+            'balance_total': balance_total
+        })
 
+    db.session.execute(update(StockMovement), params)
+    if start is not None:
+        db.session.expire(start, ['balance_quantity', 'balance_unit_price', 'balance_total'])
+    record_stock_snapshots(product_id, [
+        (row.date, param['balance_quantity'], param['balance_unit_price'], param['balance_total'])
+        for row, param in zip(rows, params)
+    ])
+
+    head = db.session.get(StockHead, product_id)
+    if head is None:
+        head = StockHead(product_id=product_id)
+        db.session.add(head)
+    head.balance_quantity = balance_quantity
+    head.balance_unit_price = balance_unit_price
+    head.balance_total = balance_total
+    head.last_movement_id = rows[-1].id
+    head.updated_at = datetime.utcnow()
+
+    product = db.session.get(Product, product_id)
+    product.stock = balance_quantity
+    product.cost_price = balance_unit_price
+
+    print(f"🔁 [STOK] Saldo berjalan {product.name} dihitung ulang: {len(rows)} mutasi")
+    return len(rows)
+
+def rebuild_stock_ledger(product_ids=None):
+    """Perbaikan: hitung ulang seluruh saldo berjalan produk tertentu (atau semua produk) lalu commit"""
+    if product_ids is None:
+        product_ids = [product_id for (product_id,) in db.session.query(StockMovement.product_id).distinct()]
+
+    rebuilt = {}
+    for product_id in product_ids:
+        rebuilt[product_id] = rebalance_stock_movements(product_id)
+    bump_ledger_version()  # kartu persediaan di cache fragmen ikut berubah
+    db.session.commit()
+    return rebuilt
+
+# ===== SNAPSHOT PERSEDIAAN HARIAN =====
+def record_stock_snapshots(product_id, rows):
+    """Simpan saldo akhir hari dari rows (date, quantity, unit_price, total) yang urut waktu.
+
+    Baris terakhir tiap hari menjadi saldo penutup hari itu. Tidak melakukan commit.
+    """
+    closing = {}
+    for date, quantity, unit_price, total in rows:
+        closing[date.date() if isinstance(date, datetime) else date] = (quantity, unit_price, total)
+    if not closing:
+        return
+
+    existing = {
+        snapshot.day: snapshot
+        for snapshot in InventoryDailySnapshot.query.filter(
+            InventoryDailySnapshot.product_id == product_id,
+            InventoryDailySnapshot.day.in_(list(closing))
+        ).all()
+    }
+    for day, (quantity, unit_price, total) in closing.items():
+        snapshot = existing.get(day)
+        if snapshot is None:
+            snapshot = InventoryDailySnapshot(product_id=product_id, day=day)
+            db.session.add(snapshot)
+        snapshot.closing_quantity = quantity
+        snapshot.average_cost = unit_price or 0
+        snapshot.closing_value = total
+
+def rebuild_stock_snapshots(product_ids=None):
+    """Bangun ulang snapshot harian dari ledger mutasi stok (semua produk bila product_ids kosong)"""
+    try:
+        delete_query = InventoryDailySnapshot.query
+        rows_query = db.session.query(
+            StockMovement.product_id, StockMovement.date, StockMovement.balance_quantity,
+            StockMovement.balance_unit_price, StockMovement.balance_total
+        )
+        if product_ids:
+            delete_query = delete_query.filter(InventoryDailySnapshot.product_id.in_(product_ids))
+            rows_query = rows_query.filter(StockMovement.product_id.in_(product_ids))
+        delete_query.delete(synchronize_session=False)
+
+        rows_by_product = {}
+        for product_id, *row in rows_query.order_by(
+            StockMovement.product_id, StockMovement.date, StockMovement.id
+        ).all():
+            rows_by_product.setdefault(product_id, []).append(row)
+
+        for product_id, rows in rows_by_product.items():
+            record_stock_snapshots(product_id, rows)
+        db.session.commit()
+        print(f"✅ Snapshot persediaan harian dibangun ulang untuk {len(rows_by_product)} produk")
+        return len(rows_by_product)
     except Exception as e:
-        print(f"❌ [INVENTORY CARD] Error updating inventory card: {e}")
         db.session.rollback()
+        print(f"❌ Error rebuilding inventory snapshots: {e}")
+        return 0
+
+def get_stock_as_of(as_of, product_ids=None):
+    """Saldo persediaan per akhir hari as_of: {product_id: InventoryDailySnapshot}
+
+    Satu lookup snapshot terakhir (day <= as_of) per produk lewat index (product_id, day).
+    """
+    latest = db.session.query(
+        InventoryDailySnapshot.product_id,
+        db.func.max(InventoryDailySnapshot.day).label('day')
+    ).filter(InventoryDailySnapshot.day <= as_of)
+    if product_ids is not None:
+        latest = latest.filter(InventoryDailySnapshot.product_id.in_(product_ids))
+    latest = latest.group_by(InventoryDailySnapshot.product_id).subquery()
+
+    snapshots = InventoryDailySnapshot.query.join(
+        latest,
+        db.and_(
+            InventoryDailySnapshot.product_id == latest.c.product_id,
+            InventoryDailySnapshot.day == latest.c.day
+        )
+    ).all()
+    return {snapshot.product_id: snapshot for snapshot in snapshots}
+
+def get_stock_version():
+    """Id mutasi stok terakhir - berubah setiap ada mutasi baru"""
+    return db.session.query(db.func.max(StockMovement.id)).scalar() or 0
+
+def get_stock_history(product_id, start, end):
+    """Saldo harian produk dari start s/d end (diisi maju dari snapshot): list (day, quantity, value)"""
+    opening = InventoryDailySnapshot.query.filter(
+        InventoryDailySnapshot.product_id == product_id,
+        InventoryDailySnapshot.day < start
+    ).order_by(InventoryDailySnapshot.day.desc()).first()
+    snapshots = {
+        snapshot.day: snapshot
+        for snapshot in InventoryDailySnapshot.query.filter(
+            InventoryDailySnapshot.product_id == product_id,
+            InventoryDailySnapshot.day >= start,
+            InventoryDailySnapshot.day <= end
+        ).all()
+    }
+
+    quantity = opening.closing_quantity if opening else 0
+    value = opening.closing_value if opening else 0
+    history = []
+    day = start
+    while day <= end:
+        if day in snapshots:
+            quantity, value = snapshots[day].closing_quantity, snapshots[day].closing_value
+        history.append((day, quantity, value))
+        day += timedelta(days=1)
+    return history
+
+# ===== REKONSILIASI STOK =====
+StockDrift = namedtuple('StockDrift', [
+    'product_id', 'name', 'movement_count',
+    'ledger_quantity', 'ledger_value', 'expected_cost',
+    'product_stock', 'cost_price', 'head_quantity', 'head_value'
+])
+COST_DRIFT_TOLERANCE = 1  # selisih harga pokok per unit (Rp) yang masih dianggap pembulatan
+
+def get_stock_drift():
+    """Bandingkan saldo ledger mutasi stok (SATU query agregat) dengan Product dan StockHead.
+
+    Mengembalikan daftar StockDrift untuk produk yang stok, nilai, atau harga pokoknya menyimpang.
+    """
+    ledger = db.session.query(
+        StockMovement.product_id.label('product_id'),
+        db.func.count(StockMovement.id).label('movement_count'),
+        db.func.sum(StockMovement.quantity_in - StockMovement.quantity_out).label('quantity'),
+        db.func.sum(db.case(
+            (StockMovement.quantity_in > 0, StockMovement.total_amount),
+            else_=-StockMovement.total_amount
+        )).label('value')
+    ).group_by(StockMovement.product_id).subquery()
+
+    rows = db.session.query(
+        Product.id, Product.name, Product.stock, Product.cost_price,
+        StockHead.balance_quantity, StockHead.balance_total,
+        ledger.c.movement_count, ledger.c.quantity, ledger.c.value
+    ).outerjoin(
+        ledger, ledger.c.product_id == Product.id
+    ).outerjoin(
+        StockHead, StockHead.product_id == Product.id
+    ).order_by(Product.id).all()
+
+    drifts = []
+    for (product_id, name, stock, cost_price, head_quantity, head_value,
+         movement_count, ledger_quantity, ledger_value) in rows:
+        ledger_quantity = ledger_quantity or 0
+        ledger_value = ledger_value or 0
+        expected_cost = ledger_value / ledger_quantity if ledger_quantity > 0 else cost_price
+
+        drifted = (
+            (stock or 0) != ledger_quantity
+            or (movement_count and (head_quantity != ledger_quantity or head_value != ledger_value))
+            or abs((cost_price or 0) - (expected_cost or 0)) >= COST_DRIFT_TOLERANCE
+        )
+        if drifted:
+            drifts.append(StockDrift(
+                product_id, name, movement_count or 0,
+                ledger_quantity, ledger_value, expected_cost,
+                stock, cost_price, head_quantity, head_value
+            ))
+    return drifts
+
+def repair_stock_drift(drifts):
+    """Samakan Product, StockHead, saldo berjalan mutasi dan snapshot harian dengan ledger, lalu commit.
+
+    Produk bermutasi dihitung ulang lewat rebalance_stock_movements (seluruh riwayat); produk tanpa
+    mutasi sama sekali tidak dinolkan - stoknya dicatat sebagai saldo awal ledger.
+    """
+    for drift in drifts:
+        if drift.movement_count:
+            rebalance_stock_movements(drift.product_id)
+        elif drift.product_stock:
+            opening_stock = drift.product_stock
+            db.session.get(Product, drift.product_id).stock = 0
+            record_stock_movement(
+                drift.product_id,
+                'saldo_awal',
+                quantity_in=max(opening_stock, 0),
+                quantity_out=max(-opening_stock, 0),
+                unit_price=drift.cost_price,
+                description='SALDO AWAL - Rekonsiliasi stok',
+                reference='SALDO_AWAL'
+            )
+
+    bump_ledger_version()
+    db.session.commit()
+    return len(drifts)
+
+def reconcile_stock(repair=False):
+    """Laporan rekonsiliasi stok (opsional sekaligus perbaikan): dict siap jsonify"""
+    drifts = get_stock_drift()
+    report = {
+        'drift_count': len(drifts),
+        'repaired': False,
+        'drifts': [drift._asdict() for drift in drifts]
+    }
+    if repair and drifts:
+        repair_stock_drift(drifts)
+        report['repaired'] = True
+        print(f"🔧 [STOK] {len(drifts)} produk direkonsiliasi dengan ledger")
+    return report
+
+def reverse_stock_movements(reference, description=''):
+    """Batalkan mutasi dengan reference tertentu dengan mutasi kebalikan (ledger tetap append-only).
+
+    Mutasi kebalikan bertanggal sama dengan mutasi aslinya, jadi saldo berjalan dan snapshot
+    harian sejak tanggal itu ikut diperbaiki. Lapisan biaya ikut dibatalkan: lapisan barang
+    masuk itu sendiri ditutup/dikurangi, lapisan yang dipakai barang keluar dipulihkan.
+    """
+    reversed_count = 0
+    for movement in StockMovement.query.filter_by(reference=reference).order_by(StockMovement.id).all():
+        record_stock_movement(
+            movement.product_id,
+            'penyesuaian',
+            quantity_in=movement.quantity_out,
+            quantity_out=movement.quantity_in,
+            unit_price=movement.unit_price,
+            description=description or f"Pembatalan {movement.description}",
+            date=movement.date,
+            reference=f"BATAL-{reference}",
+            reverses=movement
+        )
+        reversed_count += 1
+    return reversed_count
+
+def revalue_stock(product_id, unit_price, date=None):
+    """Revaluasi harga pokok: seluruh saldo keluar pada nilai lama lalu masuk lagi pada unit_price.
+
+    Lapisan biaya lama ditutup dan diganti satu lapisan baru. Tidak melakukan commit.
+    Mengembalikan mutasi masuk, atau None bila tidak ada stok.
+    """
+    head = get_stock_head(product_id)
+    if not head or head.balance_quantity <= 0:
         return None
 
+    quantity = head.balance_quantity
+    record_stock_movement(
+        product_id, 'penyesuaian', quantity_out=quantity, date=date,
+        description='Revaluasi harga pokok - saldo lama'
+    )
+    return record_stock_movement(
+        product_id, 'penyesuaian', quantity_in=quantity, unit_price=unit_price, date=date,
+        description='Revaluasi harga pokok - saldo baru'
+    )
+
+def get_stock_head(product_id):
+    """Saldo stok terakhir produk (lookup primary key), atau None"""
+    return db.session.get(StockHead, product_id)
+
+def backfill_stock_ledger():
+    """Sekali jalan: salin kartu persediaan lama (InventoryTransaction) ke ledger mutasi stok"""
+    if StockMovement.query.first() is not None:
+        return
+
+    try:
+        order_pattern = re.compile(r'Penjualan - Order #(\S+)')
+        legacy_rows = InventoryTransaction.query.order_by(
+            InventoryTransaction.date, InventoryTransaction.id
+        ).all()
+
+        heads = {}
+        for row in legacy_rows:
+            match = order_pattern.search(row.description or '')
+            movement = StockMovement(
+                product_id=row.product_id,
+                date=datetime.combine(row.date, datetime.min.time()),
+                reference=f"ORDER-{match.group(1)}" if match else None,
+                description=row.description,
+                transaction_type=row.transaction_type,
+                quantity_in=row.quantity_in or 0,
+                quantity_out=row.quantity_out or 0,
+                unit_price=row.unit_price,
+                total_amount=row.total_amount,
+                balance_quantity=row.balance_quantity,
+                balance_unit_price=row.balance_unit_price,
+                balance_total=row.balance_total
+            )
+            db.session.add(movement)
+            heads[row.product_id] = movement
+
+        db.session.flush()
+        for product_id, movement in heads.items():
+            db.session.merge(StockHead(
+                product_id=product_id,
+                balance_quantity=movement.balance_quantity,
+                balance_unit_price=movement.balance_unit_price,
+                balance_total=movement.balance_total,
+                last_movement_id=movement.id
+            ))
+
+        # Produk tanpa riwayat persediaan: stok sekarang jadi saldo awal
+        for product in Product.query.filter(Product.stock != 0, ~Product.id.in_(list(heads))).all():
+            opening_stock, product.stock = product.stock, 0
+            record_stock_movement(
+                product.id,
+                'saldo_awal',
+                quantity_in=max(opening_stock, 0),
+                quantity_out=max(-opening_stock, 0),
+                unit_price=product.cost_price,
+                description='SALDO AWAL - Persediaan awal periode',
+                reference='SALDO_AWAL'
+            )
+
+        db.session.commit()
+        if legacy_rows:
+            print(f"✅ {len(legacy_rows)} transaksi persediaan lama disalin ke ledger stok")
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Gagal menyalin kartu persediaan lama: {e}")
+
+def backfill_cost_layers():
+    """Sekali jalan: buka satu lapisan biaya dari saldo StockHead untuk produk yang belum punya lapisan"""
+    try:
+        heads = StockHead.query.filter(
+            StockHead.balance_quantity > 0,
+            ~StockHead.product_id.in_(db.session.query(CostLayer.product_id))
+        ).all()
+        for head in heads:
+            last_movement = db.session.get(StockMovement, head.last_movement_id) if head.last_movement_id else None
+            db.session.add(CostLayer(
+                product_id=head.product_id,
+                movement_id=head.last_movement_id,
+                date=last_movement.date if last_movement else datetime.now(),
+                unit_price=head.balance_unit_price,
+                quantity=head.balance_quantity,
+                remaining_quantity=head.balance_quantity
+            ))
+        if heads:
+            db.session.commit()
+            print(f"✅ {len(heads)} lapisan biaya persediaan dibuat dari saldo stok")
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Gagal membuat lapisan biaya persediaan: {e}")
+
+JOURNAL_ORDER_MIGRATION_KEY = 'journal_entry_order_id'
+SALES_JOURNAL_DESCRIPTION = re.compile(r'^Penjualan (?:COD )?Order #(\S+)$')
+
+def backfill_journal_order_ids():
+    """Sekali jalan: isi JournalEntry.order_id jurnal penjualan order yang dibuat sebelum kolom ada"""
+    if AppSetting.query.filter_by(key=JOURNAL_ORDER_MIGRATION_KEY).first():
+        return
+
+    try:
+        order_ids = dict(db.session.query(Order.order_number, Order.id).all())
+        filled = 0
+        for journal in JournalEntry.query.filter(
+            JournalEntry.journal_type == 'sales', JournalEntry.order_id.is_(None)
+        ).all():
+            match = SALES_JOURNAL_DESCRIPTION.match(journal.description or '')
+            if match and match.group(1) in order_ids:
+                journal.order_id = order_ids[match.group(1)]
+                filled += 1
+
+        db.session.add(AppSetting(key=JOURNAL_ORDER_MIGRATION_KEY, value=datetime.utcnow().isoformat()))
+        db.session.commit()
+        if filled:
+            print(f"✅ {filled} jurnal penjualan dihubungkan ke order")
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Gagal mengisi order_id jurnal penjualan: {e}")
+
 # ===== PERBAIKAN FUNGSI JURNAL PENJUALAN =====
 def create_sales_journal(order):
     """Buat jurnal penjualan otomatis saat order completed - LENGKAP dengan HPP"""
@@ -1365,10 +3085,10 @@ def create_sales_journal(order):
         description = f"Penjualan Order #{order.order_number}"
 
         # Get accounts
-        kas_account = Account.query.filter_by(type='kas').first()
-        pendapatan_account = Account.query.filter_by(type='pendapatan').first()
-        hpp_account = Account.query.filter_by(type='hpp').first()
-        persediaan_account = Account.query.filter_by(type='persediaan').first()
+        kas_account = get_account_by_type('kas')
+        pendapatan_account = get_account_by_type('pendapatan')
+        hpp_account = get_account_by_type('hpp')
+        persediaan_account = get_account_by_type('persediaan')
 
         if not kas_account:
             print("❌ [DEBUG] Akun Kas tidak ditemukan")
@@ -1417,12 +3137,14 @@ def create_sales_journal(order):
 
         print(f"📝 [DEBUG] Membuat jurnal dengan {len(entries)} entries")
 
+        # Jurnal dan mutasi stok satu transaksi - gagal salah satu, keduanya batal
         journal = create_journal_entry(
             transaction_number,
             order.completed_date or datetime.now(),
             description,
             'sales',
-            entries
+            entries,
+            commit=False
         )
 
         if journal:
@@ -1434,37 +3156,14 @@ def create_sales_journal(order):
             print("❌ [DEBUG] Gagal membuat jurnal penjualan")
             return None
 
-        # Update kartu persediaan untuk setiap produk yang dijual
-        for item in order_items:
-            product = Product.query.get(item.product_id)
-            if product:
-                print(f"📊 [DEBUG] Update kartu persediaan untuk {product.name}: {item.quantity} units")
-
-                # DEBUG: Cek stok sebelum update
-                print(f"📦 [DEBUG] Stok sebelum: {product.stock}")
-
-                # Panggil fungsi update inventory
-                result = update_inventory_card(
-                    product_id=product.id,
-                    transaction_type='penjualan',
-                    transaction_number=transaction_number,
-                    quantity=item.quantity,
-                    unit_cost=product.cost_price,
-                    date=order.completed_date or datetime.now()
-                )
-
-                if result:
-                    print(f"✅ [DEBUG] Kartu persediaan berhasil diupdate")
-                else:
-                    print(f"❌ [DEBUG] Gagal update kartu persediaan")
-
-                # DEBUG: Cek stok setelah update
-                db.session.refresh(product)
-                print(f"📦 [DEBUG] Stok setelah: {product.stock}")
+        journal.order_id = order.id
+        record_order_stock_movements(order, order_items)
+        db.session.commit()
 
         return journal
 
     except Exception as e:
+        db.session.rollback()
         print(f"❌ [DEBUG] Error creating sales journal: {e}")
         import traceback
         traceback.print_exc()
@@ -1484,8 +3183,8 @@ def create_purchase_journal(order):
         description = f"Pembelian Persediaan Order #{order.order_number}"
 
         # Get accounts
-        kas_account = Account.query.filter_by(type='kas').first()
-        persediaan_account = Account.query.filter_by(type='persediaan').first()
+        kas_account = get_account_by_type('kas')
+        persediaan_account = get_account_by_type('persediaan')
 
         if kas_account and persediaan_account:
             entries = [
@@ -1513,19 +3212,18 @@ def create_purchase_journal(order):
 
             print(f"✅ Jurnal pembelian dibuat untuk order #{order.order_number}: Rp {total_cost:,.0f}")
 
-            # Update kartu persediaan untuk setiap produk
+            # Mutasi stok pembelian untuk setiap produk
             for item in OrderItem.query.filter_by(order_id=order.id).all():
-                product = Product.query.get(item.product_id)
-                if product:
-                    update_inventory_card(
-                        product_id=product.id,
-                        transaction_type='pembelian',
-                        transaction_number=transaction_number,
-                        quantity=item.quantity,
-                        unit_cost=item.cost_price,
-                        date=order.completed_date or datetime.now()
-                    )
-                    print(f"✅ Kartu persediaan updated untuk {product.name}: {item.quantity} units")
+                record_stock_movement(
+                    item.product_id,
+                    'pembelian',
+                    quantity_in=item.quantity,
+                    unit_price=item.cost_price,
+                    date=order.completed_date or datetime.now(),
+                    description=description,
+                    reference=journal.transaction_number
+                )
+            db.session.commit()
 
             return journal
 
@@ -1534,55 +3232,69 @@ def create_purchase_journal(order):
     return None
 
 # ===== FUNGSI BUKU BESAR =====
-def get_ledger_data():
-    """Ambil data untuk buku besar - MENGGUNAKAN SALDO AWAL DARI DATABASE"""
-    try:
-        # Dapatkan semua akun
-        all_accounts = Account.query.order_by(Account.code).all()
-
-        if not all_accounts:
-            return '<div class="card"><p>Belum ada akun yang dibuat.</p></div>'
-
-        ledger_html = ""
-
-        for account in all_accounts:
-            try:
-                # Hitung saldo awal dengan cara yang benar
-                opening_balance = account.balance  # Mulai dari saldo database
-                
-                # KURANGI efek dari semua jurnal yang sudah ada
-                semua_jurnal = JournalDetail.query.filter_by(account_id=account.id).all()
-                
-                for detail in semua_jurnal:
-                    if account.category in ['asset', 'expense']:
-                        # Asset/Expense: Debit (+), Credit (-)
-                        opening_balance -= (detail.debit - detail.credit)
-                    else:
-                        # Liability/Equity/Revenue: Credit (+), Debit (-)
-                        opening_balance -= (detail.credit - detail.debit)
-                
-                # Debug info
-                print(f"📊 [LEDGER] {account.code} - {account.name}:")
-                print(f"   Saldo database: {account.balance:,.0f}")
-                print(f"   Saldo awal murni: {opening_balance:,.0f}")
-                print(f"   Jumlah jurnal: {len(semua_jurnal)}")
-
-                # Hanya tampilkan akun yang punya saldo atau transaksi
-                journal_details = JournalDetail.query.join(JournalEntry).filter(
-                    JournalDetail.account_id == account.id,
-                    JournalEntry.journal_type.in_(['general', 'sales', 'purchase', 'hpp', 'adjustment'])
-                ).order_by(JournalEntry.date, JournalDetail.id).all()
-
-                if abs(opening_balance) > 0.01 or journal_details:
-                    account_html = f'''
+LEDGER_JOURNAL_TYPES = ['general', 'sales', 'purchase', 'hpp', 'adjustment']
+
+def iter_ledger_html(batch_size=1000):
+    """Engine buku besar satu kali jalan - yield potongan HTML per akun.
+
+    Semua detail jurnal diambil dalam SATU query terurut (kode akun, tanggal, id)
+    lalu dikelompokkan per akun sambil menghitung saldo berjalan, sehingga jumlah
+    query tetap (akun, snapshot saldo, detail) berapa pun banyaknya jurnal.
+    """
+    all_accounts = Account.query.order_by(Account.code).all()
+
+    if not all_accounts:
+        yield '<div class="card"><p>Belum ada akun yang dibuat.</p></div>'
+        return
+
+    # Total efek semua jurnal per akun dari snapshot (satu query agregat)
+    snapshot_totals = get_snapshot_totals()
+
+    detail_rows = db.session.query(
+        JournalDetail.account_id,
+        JournalEntry.date,
+        JournalEntry.description,
+        JournalDetail.debit,
+        JournalDetail.credit
+    ).join(
+        JournalEntry, JournalDetail.journal_id == JournalEntry.id
+    ).join(
+        Account, JournalDetail.account_id == Account.id
+    ).filter(
+        JournalEntry.journal_type.in_(LEDGER_JOURNAL_TYPES)
+    ).order_by(
+        Account.code, JournalEntry.date, JournalDetail.id
+    ).execution_options(yield_per=batch_size)
+
+    rows = iter(detail_rows)
+    pending = next(rows, None)
+    has_output = False
+    total_details = 0
+
+    for account in all_accounts:
+        # Saldo awal = saldo database - efek semua jurnal yang sudah ada
+        opening_balance = account.balance - get_snapshot_effect(account, snapshot_totals)
+
+        # Ambil baris detail milik akun ini dari aliran yang sudah terurut
+        account_rows = []
+        while pending is not None and pending.account_id == account.id:
+            account_rows.append(pending)
+            pending = next(rows, None)
+        total_details += len(account_rows)
+
+        # Hanya tampilkan akun yang punya saldo atau transaksi
+        if opening_balance == 0 and not account_rows:
+            continue
+
+        parts = [f'''
                     <div class="card" style="margin-bottom: 2rem;">
                         <h4 style="color: var(--primary); margin-bottom: 1rem;">
                             {account.code} - {account.name}
                         </h4>
-                    '''
+                    ''']
 
-                    if journal_details:
-                        account_html += '''
+        if account_rows:
+            parts.append('''
                         <div style="overflow-x: auto;">
                             <table class="table">
                                 <thead>
@@ -1595,12 +3307,12 @@ def get_ledger_data():
                                     </tr>
                                 </thead>
                                 <tbody>
-                        '''
+                        ''')
 
-                        running_balance = opening_balance
+            running_balance = opening_balance
 
-                        # Tambahkan baris saldo awal
-                        account_html += f'''
+            # Tambahkan baris saldo awal
+            parts.append(f'''
                         <tr style="background: rgba(49, 130, 206, 0.05);">
                             <td>Saldo Awal</td>
                             <td><strong>Saldo Awal Periode</strong></td>
@@ -1608,50 +3320,48 @@ def get_ledger_data():
                             <td></td>
                             <td class="{'debit' if running_balance >= 0 else 'credit'}">Rp {abs(running_balance):,.0f}</td>
                         </tr>
-                        '''
+                        ''')
 
-                        for detail in journal_details:
-                            journal = detail.journal
+            for row in account_rows:
+                # Update running balance sesuai kategori akun
+                running_balance += get_balance_effect(account.category, row.debit, row.credit)
 
-                            # Update running balance sesuai kategori akun
-                            if account.category in ['asset', 'expense']:
-                                running_balance += detail.debit - detail.credit
-                            else:
-                                running_balance += detail.credit - detail.debit
-
-                            account_html += f'''
+                parts.append(f'''
                             <tr>
-                                <td>{journal.date.strftime('%d/%m/%Y')}</td>
-                                <td>{journal.description}</td>
-                                <td class="debit">{"Rp {0:,.0f}".format(detail.debit) if detail.debit > 0 else ""}</td>
-                                <td class="credit">{"Rp {0:,.0f}".format(detail.credit) if detail.credit > 0 else ""}</td>
+                                <td>{row.date.strftime('%d/%m/%Y')}</td>
+                                <td>{row.description}</td>
+                                <td class="debit">{"Rp {0:,.0f}".format(row.debit) if row.debit > 0 else ""}</td>
+                                <td class="credit">{"Rp {0:,.0f}".format(row.credit) if row.credit > 0 else ""}</td>
                                 <td class="{'debit' if running_balance >= 0 else 'credit'}">Rp {abs(running_balance):,.0f}</td>
                             </tr>
-                            '''
+                            ''')
 
-                        account_html += '''
+            parts.append('''
                                 </tbody>
                             </table>
                         </div>
-                        '''
-                    else:
-                        # Jika tidak ada transaksi, tampilkan saldo awal saja
-                        if abs(opening_balance) > 0.01:
-                            account_html += f'''
+                        ''')
+        else:
+            # Jika tidak ada transaksi, tampilkan saldo awal saja
+            parts.append(f'''
                             <p>Saldo Awal: <span class="{'debit' if opening_balance >= 0 else 'credit'}">
                                 Rp {abs(opening_balance):,.0f}
                             </span></p>
-                            '''
+                            ''')
 
-                    account_html += '</div>'
-                    ledger_html += account_html
+        parts.append('</div>')
+        has_output = True
+        yield ''.join(parts)
 
-            except Exception as e:
-                print(f"❌ Error processing account {account.code}: {e}")
-                continue
+    print(f"📊 [LEDGER] {len(all_accounts)} akun, {total_details} detail jurnal diproses")
 
-        return ledger_html if ledger_html else '<div class="card"><p>Belum ada transaksi untuk ditampilkan di buku besar.</p></div>'
+    if not has_output:
+        yield '<div class="card"><p>Belum ada transaksi untuk ditampilkan di buku besar.</p></div>'
 
+def get_ledger_data():
+    """Ambil data untuk buku besar - MENGGUNAKAN SALDO AWAL DARI DATABASE"""
+    try:
+        return ''.join(iter_ledger_html())
     except Exception as e:
         print(f"❌ Error generating ledger data: {e}")
         import traceback
@@ -1659,9 +3369,203 @@ def get_ledger_data():
         return '<div class="card"><p style="color: var(--error);">Error loading ledger data: ' + str(e) + '</p></div>'
 
 # ===== FUNGSI KARTU PERSEDIAAN BARU =====
-def get_inventory_card_html(product_id=None):
-    """Generate HTML untuk kartu persediaan dengan format seperti screenshot"""
+# ===== KARTU PERSEDIAAN (KEYSET PAGINATION) =====
+INVENTORY_CARD_PAGE_SIZE = 50
+INVENTORY_EXPORT_BATCH_SIZE = 500
+
+def get_inventory_card_filters(product_id, args):
+    """Filter produk dan rentang tanggal mutasi stok dari parameter request"""
+    filters = [StockMovement.product_id == product_id]
+
+    date_from = parse_as_of_date(args.get('date_from'))
+    if date_from:
+        filters.append(StockMovement.date >= datetime(date_from.year, date_from.month, date_from.day))
+
+    date_to = parse_as_of_date(args.get('date_to'))
+    if date_to:
+        filters.append(StockMovement.date < datetime(date_to.year, date_to.month, date_to.day) + timedelta(days=1))
+
+    return filters
+
+def get_inventory_card_page(product_id, args, page_size=INVENTORY_CARD_PAGE_SIZE):
+    """Satu halaman mutasi stok (terlama dulu) dengan keyset (date, id). Return (movements, next_cursor)."""
+    query = StockMovement.query.filter(*get_inventory_card_filters(product_id, args))
+
+    # Format cursor sama dengan daftar jurnal: 'ISO-tanggal_id'
+    cursor = decode_journal_cursor(args.get('cursor'))
+    if cursor:
+        cursor_date, cursor_id = cursor
+        query = query.filter(db.or_(
+            StockMovement.date > cursor_date,
+            db.and_(StockMovement.date == cursor_date, StockMovement.id > cursor_id)
+        ))
+
+    movements = query.order_by(StockMovement.date, StockMovement.id).limit(page_size + 1).all()
+
+    next_cursor = None
+    if len(movements) > page_size:
+        movements = movements[:page_size]
+        next_cursor = encode_journal_cursor(movements[-1])
+
+    return movements, next_cursor
+
+def get_inventory_opening_balance(movement):
+    """Saldo pindahan sebelum sebuah mutasi: saldo baris sebelumnya (quantity, harga, jumlah) atau None"""
+    previous = StockMovement.query.filter(
+        StockMovement.product_id == movement.product_id,
+        db.or_(
+            StockMovement.date < movement.date,
+            db.and_(StockMovement.date == movement.date, StockMovement.id < movement.id)
+        )
+    ).order_by(StockMovement.date.desc(), StockMovement.id.desc()).first()
+
+    if not previous:
+        return None
+    return previous.balance_quantity, previous.balance_unit_price, previous.balance_total
+
+def split_stock_movement(movement):
+    """Kolom IN dan OUT satu mutasi: (in_qty, in_price, in_total, out_qty, out_price, out_total)"""
+    if movement.quantity_in:
+        return movement.quantity_in, movement.unit_price, movement.total_amount, 0, 0, 0
+    return 0, 0, 0, movement.quantity_out, movement.unit_price, movement.total_amount
+
+def format_stock_number(num, empty='-'):
+    return f"{num:,.0f}" if num else empty
+
+def format_stock_currency(num, empty='-'):
+    return f"Rp {num:,.0f}" if num else empty
+
+def render_inventory_card_row(date_label, description, columns, balance, style=''):
+    """Baris kartu persediaan format IN/OUT/BALANCE berdampingan"""
+    in_qty, in_price, in_total, out_qty, out_price, out_total = columns
+    balance_quantity, balance_unit_price, balance_total = balance
+    style_attr = f' style="{style}"' if style else ''
+    cell = 'padding: 10px; text-align: right; border: 1px solid #ddd;'
+
+    return f'''
+            <tr{style_attr}>
+                <!-- Tanggal & Deskripsi -->
+                <td style="padding: 10px; text-align: center; border: 1px solid #ddd; font-weight: 500;">{date_label}</td>
+                <td style="padding: 10px; border: 1px solid #ddd;">{description}</td>
+
+                <!-- IN Columns -->
+                <td style="{cell} background: rgba(56, 161, 105, 0.05);">{format_stock_number(in_qty)}</td>
+                <td style="{cell} background: rgba(56, 161, 105, 0.05);">{format_stock_currency(in_price)}</td>
+                <td style="{cell} background: rgba(56, 161, 105, 0.05);">{format_stock_currency(in_total)}</td>
+
+                <!-- OUT Columns -->
+                <td style="{cell} background: rgba(229, 62, 62, 0.05);">{format_stock_number(out_qty)}</td>
+                <td style="{cell} background: rgba(229, 62, 62, 0.05);">{format_stock_currency(out_price)}</td>
+                <td style="{cell} background: rgba(229, 62, 62, 0.05);">{format_stock_currency(out_total)}</td>
+
+                <!-- BALANCE Columns -->
+                <td style="{cell} background: rgba(49, 130, 206, 0.05); font-weight: bold;">{format_stock_number(balance_quantity)}</td>
+                <td style="{cell} background: rgba(49, 130, 206, 0.05); font-weight: bold;">{format_stock_currency(balance_unit_price)}</td>
+                <td style="{cell} background: rgba(49, 130, 206, 0.05); font-weight: bold;">{format_stock_currency(balance_total)}</td>
+            </tr>
+    '''
+
+def render_automatic_inventory_row(date_label, description, columns, balance, style=''):
+    """Baris kartu persediaan otomatis format QUANTITY/HARGA/JUMLAH"""
+    in_qty, in_price, in_total, out_qty, out_price, out_total = columns
+    balance_quantity, balance_unit_price, balance_total = balance
+    style_attr = f' style="{style}"' if style else ''
+
+    return f'''
+        <tr{style_attr}>
+            <td>{date_label}</td>
+            <td>{description}</td>
+            <!-- QUANTITY Columns -->
+            <td style="text-align: right; background: rgba(56, 161, 105, 0.05);">{format_stock_number(in_qty, '')}</td>
+            <td style="text-align: right; background: rgba(229, 62, 62, 0.05);">{format_stock_number(out_qty, '')}</td>
+            <td style="text-align: right; background: rgba(49, 130, 206, 0.05); font-weight: bold;">{format_stock_number(balance_quantity, '')}</td>
+            <!-- HARGA PER UNIT Columns -->
+            <td style="text-align: right; background: rgba(56, 161, 105, 0.05);">{format_stock_currency(in_price, '')}</td>
+            <td style="text-align: right; background: rgba(229, 62, 62, 0.05);">{format_stock_currency(out_price, '')}</td>
+            <td style="text-align: right; background: rgba(49, 130, 206, 0.05); font-weight: bold;">{format_stock_currency(balance_unit_price, '')}</td>
+            <!-- JUMLAH Columns -->
+            <td style="text-align: right; background: rgba(56, 161, 105, 0.05);">{format_stock_currency(in_total, '')}</td>
+            <td style="text-align: right; background: rgba(229, 62, 62, 0.05);">{format_stock_currency(out_total, '')}</td>
+            <td style="text-align: right; background: rgba(49, 130, 206, 0.05); font-weight: bold;">{format_stock_currency(balance_total, '')}</td>
+        </tr>
+    '''
+
+# layout kartu -> fungsi render baris
+INVENTORY_CARD_LAYOUTS = {
+    'card': render_inventory_card_row,
+    'auto': render_automatic_inventory_row,
+}
+
+def render_inventory_card_rows(movements, layout='card', with_opening=False):
+    """Baris tabel satu halaman mutasi; with_opening menambah baris saldo pindahan di awal halaman"""
+    render_row = INVENTORY_CARD_LAYOUTS[layout]
+    parts = []
+
+    if with_opening and movements:
+        opening = get_inventory_opening_balance(movements[0])
+        if opening:
+            parts.append(render_row(
+                movements[0].date.strftime('%d/%m/%Y'),
+                '<em>Saldo pindahan</em>',
+                (0, 0, 0, 0, 0, 0),
+                opening,
+                style='background: rgba(49, 130, 206, 0.08); font-style: italic;'
+            ))
+
+    for movement in movements:
+        parts.append(render_row(
+            movement.date.strftime('%d/%m/%Y'),
+            movement.description,
+            split_stock_movement(movement),
+            (movement.balance_quantity, movement.balance_unit_price, movement.balance_total)
+        ))
+
+    return ''.join(parts)
+
+def render_inventory_more_button(product_id, layout, args, next_cursor):
+    """Tombol 'Muat lebih banyak' untuk halaman mutasi stok berikutnya"""
+    if not next_cursor:
+        return ''
+
+    params = {key: value for key, value in args.items() if key in ['date_from', 'date_to'] and value}
+    params.update(layout=layout, cursor=next_cursor)
+    return f'''
+            <div style="text-align: center; margin-top: 1rem;">
+                <button type="button" class="btn btn-info" onclick="loadMoreJournals(this)"
+                        data-src="/seller/inventory-card/{product_id}/movements?{urlencode(params)}">
+                    <i class="fas fa-chevron-down"></i> Muat lebih banyak
+                </button>
+            </div>
+    '''
+
+def render_inventory_card_toolbar(product_id, page_url, args):
+    """Filter rentang tanggal dan tombol ekspor CSV kartu persediaan"""
+    params = {key: value for key, value in args.items() if key in ['date_from', 'date_to'] and value}
+    export_query = f"?{urlencode(params)}" if params else ''
+
+    return f'''
+            <form method="GET" action="{page_url}" style="display: flex; gap: 1rem; align-items: flex-end; flex-wrap: wrap; margin-bottom: 1rem;">
+                <input type="hidden" name="product_id" value="{product_id}">
+                <div>
+                    <label class="form-label">Dari Tanggal</label>
+                    <input type="date" name="date_from" class="form-control" value="{format_date_arg(args.get('date_from'))}">
+                </div>
+                <div>
+                    <label class="form-label">Sampai Tanggal</label>
+                    <input type="date" name="date_to" class="form-control" value="{format_date_arg(args.get('date_to'))}">
+                </div>
+                <button type="submit" class="btn btn-primary"><i class="fas fa-filter"></i> Filter</button>
+                <a href="/seller/inventory-card/{product_id}/export.csv{export_query}" class="btn btn-success">
+                    <i class="fas fa-file-csv"></i> Ekspor CSV
+                </a>
+            </form>
+    '''
+
+def get_inventory_card_html(product_id=None, args=None):
+    """Kartu persediaan satu produk: halaman pertama mutasi (keyset) + saldo pindahan di batas halaman"""
     try:
+        args = {key: value for key, value in (args or {}).items() if key != 'cursor'}
+
         # Jika product_id tidak diberikan, ambil produk pertama
         if not product_id:
             product = Product.query.filter_by(seller_id=current_user.id).first()
@@ -1682,16 +3586,14 @@ def get_inventory_card_html(product_id=None):
         if not product:
             return '<div class="card"><p>Produk tidak ditemukan</p></div>'
 
-        # Dapatkan semua transaksi inventory untuk produk ini
-        transactions = InventoryTransaction.query.filter_by(
-            product_id=product_id
-        ).order_by(InventoryTransaction.date, InventoryTransaction.id).all()
+        movements, next_cursor = get_inventory_card_page(product_id, args)
 
-        if not transactions:
+        if not movements:
+            has_filter = args.get('date_from') or args.get('date_to')
             return f'''
             <div class="card">
                 <h4 style="color: var(--primary);">Kartu Persediaan - {product.name}</h4>
-                <p>Belum ada transaksi untuk produk ini.</p>
+                <p>{"Tidak ada mutasi pada rentang tanggal ini." if has_filter else "Belum ada transaksi untuk produk ini."}</p>
             </div>
             '''
 
@@ -1732,72 +3634,14 @@ def get_inventory_card_html(product_id=None):
                     <tbody>
         '''
 
-        # Harga cost tetap Rp 1,000
-        COST_PRICE = 1000
-
-        for transaction in transactions:
-            # Tentukan data untuk kolom IN dan OUT berdasarkan jenis transaksi
-            if transaction.transaction_type == 'pembelian':
-                in_qty = transaction.quantity_in
-                in_price = transaction.unit_price
-                in_total = transaction.total_amount
-                out_qty = 0
-                out_price = 0
-                out_total = 0
-            elif transaction.transaction_type == 'penjualan':
-                in_qty = 0
-                in_price = 0
-                in_total = 0
-                out_qty = transaction.quantity_out
-                out_price = transaction.unit_price  # Harga cost (bukan harga jual)
-                out_total = transaction.total_amount
-            else:  # saldo_awal, penyesuaian, dll
-                in_qty = transaction.quantity_in
-                in_price = transaction.unit_price
-                in_total = transaction.total_amount
-                out_qty = transaction.quantity_out
-                out_price = transaction.unit_price
-                out_total = transaction.total_amount
-
-            # Hitung balance
-            balance_quantity = transaction.balance_quantity
-            balance_unit_price = COST_PRICE  # SELALU Rp 1,000
-            balance_total = balance_quantity * COST_PRICE  # Hitung ulang dengan harga cost
-
-            # Format numbers dengan separator
-            def format_number(num):
-                return f"{num:,.0f}" if num != 0 else "-"
-
-            def format_currency(num):
-                return f"Rp {num:,.0f}" if num != 0 else "-"
-
-            table_html += f'''
-            <tr>
-                <!-- Tanggal & Deskripsi -->
-                <td style="padding: 10px; text-align: center; border: 1px solid #ddd; font-weight: 500;">{transaction.date.strftime('%d/%m/%Y')}</td>
-                <td style="padding: 10px; border: 1px solid #ddd;">{transaction.description}</td>
-
-                <!-- IN Columns -->
-                <td style="padding: 10px; text-align: right; border: 1px solid #ddd; background: rgba(56, 161, 105, 0.05);">{format_number(in_qty)}</td>
-                <td style="padding: 10px; text-align: right; border: 1px solid #ddd; background: rgba(56, 161, 105, 0.05);">{format_currency(in_price)}</td>
-                <td style="padding: 10px; text-align: right; border: 1px solid #ddd; background: rgba(56, 161, 105, 0.05);">{format_currency(in_total)}</td>
-
-                <!-- OUT Columns -->
-                <td style="padding: 10px; text-align: right; border: 1px solid #ddd; background: rgba(229, 62, 62, 0.05);">{format_number(out_qty)}</td>
-                <td style="padding: 10px; text-align: right; border: 1px solid #ddd; background: rgba(229, 62, 62, 0.05);">{format_currency(out_price)}</td>
-                <td style="padding: 10px; text-align: right; border: 1px solid #ddd; background: rgba(229, 62, 62, 0.05);">{format_currency(out_total)}</td>
-
-                <!-- BALANCE Columns -->
-                <td style="padding: 10px; text-align: right; border: 1px solid #ddd; background: rgba(49, 130, 206, 0.05); font-weight: bold;">{format_number(balance_quantity)}</td>
-                <td style="padding: 10px; text-align: right; border: 1px solid #ddd; background: rgba(49, 130, 206, 0.05); font-weight: bold;">{format_currency(balance_unit_price)}</td>
-                <td style="padding: 10px; text-align: right; border: 1px solid #ddd; background: rgba(49, 130, 206, 0.05); font-weight: bold;">{format_currency(balance_total)}</td>
-            </tr>
-            '''
+        table_html += render_inventory_card_rows(movements, 'card', with_opening=True)
 
-        table_html += '''
+        table_html += f'''
                     </tbody>
                 </table>
             </div>
+            {render_inventory_more_button(product_id, 'card', args, next_cursor)}
+        </div>
         '''
 
         return table_html
@@ -1806,225 +3650,40 @@ def get_inventory_card_html(product_id=None):
         print(f"Error generating inventory card: {e}")
         return f'<div class="card"><p>Error loading inventory card: {str(e)}</p></div>'
 
-# ===== FUNGSI CREATE INVENTORY TRANSACTION =====
-def create_inventory_transaction(product_id, date, description, transaction_type,
-                               quantity_in, quantity_out, unit_price):
-    """Membuat transaksi persediaan dan menghitung balance dengan harga cost yang sesuai"""
-    try:
-        # Dapatkan produk untuk mengetahui harga cost
-        product = Product.query.get(product_id)
-        if not product:
-            print(f"❌ Product tidak ditemukan: {product_id}")
-            return None
-
-        # Gunakan harga cost dari produk
-        COST_PRICE = product.cost_price
-
-        print(f"🔄 [INVENTORY] Product: {product.name}, Cost Price: {COST_PRICE}")
-
-        # Dapatkan transaksi terakhir untuk produk ini
-        last_transaction = InventoryTransaction.query.filter_by(
-            product_id=product_id
-        ).order_by(InventoryTransaction.date.desc(), InventoryTransaction.id.desc()).first()
-
-        # Hitung balance baru
-        if last_transaction:
-            balance_quantity = last_transaction.balance_quantity + quantity_in - quantity_out
-            # Untuk balance value, gunakan metode average cost
-            if balance_quantity > 0:
-                if quantity_in > 0:
-                    # Pembelian: hitung average cost baru
-                    total_value = last_transaction.balance_total + (quantity_in * unit_price)
-                    balance_unit_price = total_value / balance_quantity
-                else:
-                    # Penjualan: gunakan average cost dari transaksi terakhir
-                    balance_unit_price = last_transaction.balance_unit_price
-            else:
-                balance_unit_price = COST_PRICE
-        else:
-            # Transaksi pertama
-            balance_quantity = quantity_in - quantity_out
-            if quantity_in > 0:
-                balance_unit_price = unit_price
-            else:
-                balance_unit_price = COST_PRICE
-
-        balance_total = balance_quantity * balance_unit_price
-
-        # Hitung total amount dengan benar
-        if quantity_in > 0:
-            # Untuk pembelian: total = quantity_in * unit_price (harga beli)
-            total_amount = quantity_in * unit_price
-        elif quantity_out > 0:
-            # Untuk penjualan: total = quantity_out * balance_unit_price (HPP)
-            total_amount = quantity_out * balance_unit_price
-        else:
-            total_amount = 0
-
-        # Untuk penjualan, gunakan average cost sebagai unit_price
-        if transaction_type == 'penjualan':
-            unit_price = balance_unit_price
-
-        # Buat transaksi baru
-        transaction = InventoryTransaction(
-            product_id=product_id,
-            date=date,
-            description=description,
-            transaction_type=transaction_type,
-            quantity_in=quantity_in,
-            quantity_out=quantity_out,
-            unit_price=unit_price,
-            total_amount=total_amount,
-            balance_quantity=balance_quantity,
-            balance_unit_price=balance_unit_price,
-            balance_total=balance_total
-        )
-
-        db.session.add(transaction)
-
-        # Update stock produk
-        if product:
-            product.stock = balance_quantity
-            # Update harga cost produk dengan average cost terbaru
-            product.cost_price = balance_unit_price
-            print(f"✅ Stock produk diupdate: {product.name} = {balance_quantity}, Cost Price: {balance_unit_price}")
-
-        db.session.commit()
-
-        print(f"✅ Inventory transaction created: {transaction_type} {quantity_in} in, {quantity_out} out, total: {total_amount}")
-        print(f"📊 Balance: Qty={balance_quantity}, Unit Price={balance_unit_price}, Total={balance_total}")
-        return transaction
-
-    except Exception as e:
-        print(f"❌ Error creating inventory transaction: {e}")
-        db.session.rollback()
-        return None
-
-def update_inventory_card(product_id, transaction_type, transaction_number, quantity, unit_cost, date=None):
-    """Update kartu persediaan untuk produk tertentu dengan harga cost yang sesuai"""
-    try:
-        print(f"🔄 [INVENTORY CARD] Memulai update inventory: Product {product_id}, Type: {transaction_type}, Qty: {quantity}")
-
-        if date is None:
-            date = datetime.now()
-
-        # Dapatkan produk untuk mengetahui harga cost
-        product = Product.query.get(product_id)
-        if not product:
-            print(f"❌ Product tidak ditemukan: {product_id}")
-            return None
-
-        COST_PRICE = product.cost_price
-
-        # Dapatkan balance terakhir
-        last_entry = InventoryCard.query.filter_by(product_id=product_id).order_by(InventoryCard.date.desc()).first()
-
-        if last_entry:
-            balance_quantity = last_entry.balance_quantity
-            balance_value = last_entry.balance_value
-            print(f"📊 [INVENTORY CARD] Last balance: Qty={balance_quantity}, Value={balance_value}")
-        else:
-            balance_quantity = 0
-            balance_value = 0
-            print(f"📊 [INVENTORY CARD] No previous entries, starting from zero")
-
-        # Hitung quantity dan value baru
-        if transaction_type == 'penjualan':
-            quantity_in = 0
-            quantity_out = quantity
-            balance_quantity -= quantity
-
-            # Hitung HPP dengan average cost
-            hpp_value = quantity * COST_PRICE
-            balance_value -= hpp_value
-
-            print(f"📉 [INVENTORY CARD] Penjualan: -{quantity} units, HPP: {hpp_value}, new balance: {balance_quantity}")
-
-        elif transaction_type == 'pembelian':
-            quantity_in = quantity
-            quantity_out = 0
-            balance_quantity += quantity
-
-            # Hitung average cost baru
-            total_value = balance_value + (quantity * unit_cost)
-            balance_value = total_value
-
-            print(f"📈 [INVENTORY CARD] Pembelian: +{quantity} units, new balance: {balance_quantity}")
-        else:  # penyesuaian
-            quantity_in = quantity if quantity > 0 else 0
-            quantity_out = abs(quantity) if quantity < 0 else 0
-            balance_quantity += quantity
-            balance_value += quantity * COST_PRICE
-
-        total_cost = quantity * unit_cost
-
-        # Buat entry baru
-        inventory_entry = InventoryCard(
-            product_id=product_id,
-            date=date,
-            transaction_type=transaction_type,
-            transaction_number=transaction_number,
-            quantity_in=quantity_in,
-            quantity_out=quantity_out,
-            unit_cost=unit_cost,
-            total_cost=total_cost,
-            balance_quantity=balance_quantity,
-            balance_value=balance_value
-        )
-
-        db.session.add(inventory_entry)
-
-        # Update stock produk
-        if product:
-            product.stock = balance_quantity
-            # Update harga cost dengan average cost
-            if balance_quantity > 0:
-                product.cost_price = balance_value / balance_quantity
-            print(f"📦 [INVENTORY CARD] Stock produk diupdate: {product.name} = {balance_quantity}, Cost: {product.cost_price}")
-
-        db.session.commit()
-
-        print(f"✅ [INVENTORY CARD] Kartu persediaan updated: {transaction_type} {quantity} units for product {product_id}")
-        return inventory_entry
-
-    except Exception as e:
-        print(f"❌ [INVENTORY CARD] Error updating inventory card: {e}")
-        db.session.rollback()
-        return None
-
-def get_balance_sheet():
+def get_balance_sheet(as_of=None):
     """Generate balance sheet HTML yang seimbang dengan akumulasi penyusutan sebagai pengurang aset"""
     try:
+        accounts = get_report_accounts(as_of)
+
         # Get asset accounts
-        asset_accounts = Account.query.filter_by(category='asset').order_by(Account.code).all()
+        asset_accounts = [acc for acc in accounts if acc.category == 'asset']
         
         # Get akumulasi penyusutan (kode 106) - PERBAIKAN: ini SALDO NEGATIF di database karena mengurangi aset
-        akumulasi_penyusutan_account = Account.query.filter_by(code='106', type='akumulasi_penyusutan').first()
+        akumulasi_penyusutan_account = next(
+            (acc for acc in accounts if acc.code == '106' and acc.type == 'akumulasi_penyusutan'), None
+        )
         
         # PERBAIKAN PENTING: Akumulasi penyusutan di database HARUS NEGATIF karena mengurangi aset
         # Tapi di tampilan kita ambil nilai absolutnya untuk ditampilkan sebagai pengurang
         akumulasi_penyusutan_saldo = akumulasi_penyusutan_account.balance if akumulasi_penyusutan_account else 0
         
         # Get liability accounts
-        liability_accounts = Account.query.filter_by(category='liability').filter(Account.balance > 0).all()
+        liability_accounts = [acc for acc in accounts if acc.category == 'liability' and acc.balance > 0]
         total_liabilities = sum(acc.balance for acc in liability_accounts)
 
         # Get equity accounts
-        equity_accounts = Account.query.filter_by(category='equity').all()
+        equity_accounts = [acc for acc in accounts if acc.category == 'equity']
 
         # Calculate net income/loss
-        revenue_accounts = Account.query.filter_by(category='revenue').all()
-        expense_accounts = Account.query.filter_by(category='expense').all()
-        total_revenue = sum(acc.balance for acc in revenue_accounts)
-        total_expenses = sum(acc.balance for acc in expense_accounts)
-        net_income = total_revenue - total_expenses
+        category_totals = get_category_totals(as_of)
+        net_income = category_totals.get('revenue', 0) - category_totals.get('expense', 0)
 
         # Calculate total equity (modal + laba/rugi)
-        total_equity = sum(acc.balance for acc in equity_accounts) + net_income
+        total_equity = category_totals.get('equity', 0) + net_income
         
         # ===== PERBAIKAN UTAMA: Hitung total aset dengan benar =====
         # 1. Jumlahkan SEMUA akun aset (termasuk akumulasi penyusutan yang saldonya NEGATIF)
-        total_aset_bersih = sum(acc.balance for acc in asset_accounts)
+        total_aset_bersih = category_totals.get('asset', 0)
         
         # 2. Hitung aset kotor (tanpa akumulasi penyusutan) untuk display
         total_aset_kotor = 0
@@ -2035,6 +3694,12 @@ def get_balance_sheet():
         # 3. Nilai akumulasi penyusutan untuk display (nilai absolut dari saldo negatif)
         akumulasi_penyusutan_display = abs(akumulasi_penyusutan_saldo) if akumulasi_penyusutan_saldo < 0 else 0
 
+        # Rincian persediaan per produk dari snapshot harian
+        stock_snapshots = get_stock_as_of(as_of or datetime.now().date())
+        product_names = dict(
+            db.session.query(Product.id, Product.name).filter(Product.id.in_(list(stock_snapshots))).all()
+        ) if stock_snapshots else {}
+
         # Generate HTML untuk aset dengan format yang benar
         assets_html = ""
         aset_tanpa_penyusutan = []
@@ -2052,6 +3717,16 @@ def get_balance_sheet():
                 <td class="debit">Rp {acc.balance:,.0f}</td>
             </tr>
             '''
+            if acc.type == 'persediaan':
+                for product_id, snapshot in stock_snapshots.items():
+                    assets_html += f'''
+            <tr>
+                <td style="padding-left: 2rem; font-style: italic; color: #666;">
+                    {product_names.get(product_id, 'Produk')}: {snapshot.closing_quantity:,} unit × Rp {snapshot.average_cost:,.0f}
+                </td>
+                <td style="font-style: italic; color: #666;">Rp {snapshot.closing_value:,.0f}</td>
+            </tr>
+            '''
         
         # Tambahkan baris akumulasi penyusutan dengan indentasi HANYA JIKA ADA NILAI
         if akumulasi_penyusutan_display > 0:
@@ -2104,7 +3779,7 @@ def get_balance_sheet():
         print(f"   Total Ekuitas: Rp {total_equity:,.0f}")
         print(f"   Kewajiban + Ekuitas: Rp {total_liabilities + total_equity:,.0f}")
 
-        is_balanced = abs(total_aset_bersih - (total_liabilities + total_equity)) < 1  # Toleransi 1 rupiah
+        is_balanced = total_aset_bersih == total_liabilities + total_equity
 
         return f'''
         <div class="grid grid-2">
@@ -2177,6 +3852,7 @@ def get_saldo_awal_html():
         saldo_html = ""
         total_debit = 0
         total_credit = 0
+        snapshot_totals = get_snapshot_totals()
 
         for account in accounts:
             # ===== PERBAIKAN UTAMA =====
@@ -2186,17 +3862,8 @@ def get_saldo_awal_html():
             # 1. Ambil saldo dari database (sudah termasuk semua efek transaksi)
             saldo_database = account.balance
             
-            # 2. Hitung total efek dari SEMUA jurnal (umum + penyesuaian)
-            semua_detail = JournalDetail.query.filter_by(account_id=account.id).all()
-            
-            total_efek_jurnal = 0
-            for detail in semua_detail:
-                if account.category in ['asset', 'expense']:
-                    # Asset/Expense: Debit (+), Credit (-)
-                    total_efek_jurnal += detail.debit - detail.credit
-                else:
-                    # Liability/Equity/Revenue: Credit (+), Debit (-)
-                    total_efek_jurnal += detail.credit - detail.debit
+            # 2. Total efek dari SEMUA jurnal (umum + penyesuaian) dari snapshot saldo
+            total_efek_jurnal = get_snapshot_effect(account, snapshot_totals)
             
             # 3. Saldo awal murni = Saldo database - efek semua jurnal
             # Karena saldo database sudah termasuk efek jurnal, kita KURANGI efeknya
@@ -2209,7 +3876,7 @@ def get_saldo_awal_html():
             print(f"   Saldo awal murni: {saldo_awal_murni:,.0f}")
             
             # Skip akun yang saldo 0
-            if abs(saldo_awal_murni) < 0.01:
+            if saldo_awal_murni == 0:
                 continue
 
             # Tentukan debit/credit berdasarkan kategori akun
@@ -2242,7 +3909,7 @@ def get_saldo_awal_html():
             </tr>
             '''
 
-        is_balanced = abs(total_debit - total_credit) < 0.01
+        is_balanced = total_debit == total_credit
 
         saldo_html += f'''
         <tr style="font-weight: bold; border-top: 2px solid var(--primary); background: rgba(56, 161, 105, 0.1);">
@@ -2271,24 +3938,17 @@ def get_saldo_awal_html():
         traceback.print_exc()
         return '<tr><td colspan="4">Error loading saldo awal murni</td></tr>'
 
-def get_equity_change_statement():
-    """Generate Laporan Perubahan Ekuitas HTML"""
+def get_equity_change_statement(as_of=None):
+    """Generate Laporan Perubahan Ekuitas HTML (opsional per tanggal as_of)"""
     try:
-        # Get equity accounts
-        equity_accounts = Account.query.filter_by(category='equity').all()
-        modal_account = Account.query.filter_by(type='modal').first()
-
-        # Get revenue and expense accounts for net income calculation
-        revenue_accounts = Account.query.filter_by(category='revenue').all()
-        expense_accounts = Account.query.filter_by(category='expense').all()
+        # Total ekuitas, pendapatan dan beban dari SUM per kategori
+        category_totals = get_category_totals(as_of)
 
         # Calculate net income/loss
-        total_revenue = sum(acc.balance for acc in revenue_accounts)
-        total_expenses = sum(acc.balance for acc in expense_accounts)
-        net_income = total_revenue - total_expenses
+        net_income = category_totals.get('revenue', 0) - category_totals.get('expense', 0)
 
         # Calculate beginning equity (modal awal)
-        beginning_equity = sum(acc.balance for acc in equity_accounts)
+        beginning_equity = category_totals.get('equity', 0)
 
         # Calculate ending equity (modal akhir = modal awal + laba/rugi)
         ending_equity = beginning_equity + net_income
@@ -2338,22 +3998,9 @@ def get_account_balance_before_adjustment(account_type):
         if not account:
             return 0
 
-        # ✅ PERBAIKAN: Mulai dari saldo database
-        saldo_buku_besar = account.balance  # Ambil dari database
-
-        # KURANGI efek dari jurnal penyesuaian
-        adjustment_details = JournalDetail.query.join(JournalEntry).filter(
-            JournalDetail.account_id == account.id,
-            JournalEntry.journal_type == 'adjustment'
-        ).all()
-
-        for detail in adjustment_details:
-            if account.category in ['asset', 'expense']:
-                # Asset/Expense: Debit menambah, Credit mengurangi
-                saldo_buku_besar -= (detail.debit - detail.credit)
-            else:
-                # Liability/Equity/Revenue: Credit menambah, Debit mengurangi
-                saldo_buku_besar -= (detail.credit - detail.debit)
+        # ✅ PERBAIKAN: Mulai dari saldo database, KURANGI efek jurnal penyesuaian
+        adjustment_totals = get_snapshot_totals(['adjustment'])
+        saldo_buku_besar = account.balance - get_snapshot_effect(account, adjustment_totals)
 
         return saldo_buku_besar
 
@@ -2465,119 +4112,9 @@ def create_adjustment_journal(template_key, date, inputs):
         print(f"Error creating adjustment journal: {e}")
         raise e
 
-# ==== TAMBAH FUNGSI KARTU PERSEDIAAN DI SINI ====
-def update_inventory_card(product_id, transaction_type, transaction_number, quantity, unit_cost, date=None):
-    """Update kartu persediaan untuk produk tertentu dengan harga cost tetap"""
-    try:
-        print(f"🔄 [INVENTORY] Memulai update inventory: Product {product_id}, Type: {transaction_type}, Qty: {quantity}")
-
-        if date is None:
-            date = datetime.now()
-
-        # Harga cost tetap Rp 1,000
-        COST_PRICE = 1000
-
-        # Dapatkan balance terakhir
-        last_entry = InventoryCard.query.filter_by(product_id=product_id).order_by(InventoryCard.date.desc()).first()
-
-        if last_entry:
-            balance_quantity = last_entry.balance_quantity
-            balance_value = last_entry.balance_value
-            print(f"📊 [INVENTORY] Last balance: Qty={balance_quantity}, Value={balance_value}")
-        else:
-            balance_quantity = 0
-            balance_value = 0
-            print(f"📊 [INVENTORY] No previous entries, starting from zero")
-
-        # Hitung quantity dan value baru
-        if transaction_type == 'penjualan':
-            quantity_in = 0
-            quantity_out = quantity
-            balance_quantity -= quantity
-
-            # Hitung HPP dengan harga cost tetap
-            hpp_value = quantity * COST_PRICE
-            balance_value -= hpp_value
-
-            print(f"📉 [INVENTORY] Penjualan: -{quantity} units, HPP: {hpp_value}, new balance: {balance_quantity}")
-
-        elif transaction_type == 'pembelian':
-            quantity_in = quantity
-            quantity_out = 0
-            balance_quantity += quantity
-            balance_value += quantity * COST_PRICE
-            print(f"📈 [INVENTORY] Pembelian: +{quantity} units, new balance: {balance_quantity}")
-        else:  # penyesuaian
-            quantity_in = quantity if quantity > 0 else 0
-            quantity_out = abs(quantity) if quantity < 0 else 0
-            balance_quantity += quantity
-            balance_value += quantity * COST_PRICE
-
-        total_cost = quantity * COST_PRICE
-
-        # Buat entry baru
-        inventory_entry = InventoryCard(
-            product_id=product_id,
-            date=date,
-            transaction_type=transaction_type,
-            transaction_number=transaction_number,
-            quantity_in=quantity_in,
-            quantity_out=quantity_out,
-            unit_cost=COST_PRICE,
-            total_cost=total_cost,
-            balance_quantity=balance_quantity,
-            balance_value=balance_value
-        )
-
-        db.session.add(inventory_entry)
-
-        # Update stock produk
-        product = Product.query.get(product_id)
-        if product:
-            product.stock = balance_quantity
-            print(f"📦 [INVENTORY] Stock produk diupdate: {product.name} = {balance_quantity}")
-
-        db.session.commit()
-
-        print(f"✅ [INVENTORY] Kartu persediaan updated: {transaction_type} {quantity} units for product {product_id}")
-        return inventory_entry
-
-    except Exception as e:
-        print(f"❌ [INVENTORY] Error updating inventory card: {e}")
-        db.session.rollback()
-        return None
-
-def calculate_hpp(product_id, quantity_sold):
-    """Hitung HPP dengan metode FIFO"""
-    try:
-        # Dapatkan semua pembelian yang masih ada stok
-        purchases = InventoryCard.query.filter_by(
-            product_id=product_id,
-            transaction_type='pembelian'
-        ).filter(InventoryCard.balance_quantity > 0).order_by(InventoryCard.date).all()
-
-        hpp_value = 0
-        remaining_quantity = quantity_sold
-
-        for purchase in purchases:
-            if remaining_quantity <= 0:
-                break
-
-            available_quantity = purchase.balance_quantity
-            quantity_to_use = min(remaining_quantity, available_quantity)
-
-            hpp_value += quantity_to_use * purchase.unit_cost
-            remaining_quantity -= quantity_to_use
-
-        return hpp_value
-
-    except Exception as e:
-        print(f"Error calculating HPP: {e}")
-        return 0
-
-# ==== TAMBAH FUNGSI JURNAL PENUTUP DI SINI ====
-def create_closing_entries():
-    """Buat jurnal penutup yang benar sesuai prinsip akuntansi"""
+# ==== TAMBAH FUNGSI JURNAL PENUTUP DI SINI ====
+def create_closing_entries():
+    """Buat jurnal penutup yang benar sesuai prinsip akuntansi"""
     try:
         print("🔄 Membuat jurnal penutup yang benar...")
         
@@ -2612,6 +4149,7 @@ def create_closing_entries():
             )
             db.session.add(ikhtisar_account)
             db.session.flush()
+            invalidate_account_lookup()
             print("✅ Akun Ikhtisar Laba Rugi dibuat")
         
         # Buat jurnal penutup
@@ -2658,6 +4196,8 @@ def create_closing_entries():
                     
                     print(f"   ✅ Pendapatan {revenue_acc.name}: Rp {revenue_acc.balance:,.0f} ditutup")
             
+            record_journal_snapshots(entry1)
+            bump_ledger_version()
             db.session.commit()
             print("✅ Semua akun pendapatan ditutup")
         
@@ -2703,6 +4243,8 @@ def create_closing_entries():
                 elif expense_acc.type == 'hpp' and expense_acc.balance > 0:
                     print(f"   ⚠️ HPP {expense_acc.name}: Rp {expense_acc.balance:,.0f} TIDAK ditutup (sudah 0 dari penyesuaian)")
             
+            record_journal_snapshots(entry2)
+            bump_ledger_version()
             db.session.commit()
             print("✅ Semua akun beban (tanpa HPP) ditutup")
         
@@ -2728,6 +4270,7 @@ def create_closing_entries():
             )
             db.session.add(modal_account)
             db.session.flush()
+            invalidate_account_lookup()
             print("✅ Akun Modal dibuat")
         
         entry3 = JournalEntry(
@@ -2832,6 +4375,10 @@ def create_closing_entries():
                     print(f"   ✅ Prive {prive_acc.name}: Rp {prive_acc.balance:,.0f} ditutup")
         
         # ===== COMMIT SEMUA PERUBAHAN =====
+        record_journal_snapshots(entry3)
+        if prive_accounts:
+            record_journal_snapshots(entry4)
+        bump_ledger_version()
         db.session.commit()
         
         print("✅ JURNAL PENUTUP SELESAI DIBUAT")
@@ -2863,6 +4410,7 @@ def create_closing_entries():
                     )
                     db.session.add(closing_detail)
         
+        bump_ledger_version()
         db.session.commit()
         
         return closing_entry
@@ -2975,6 +4523,7 @@ def verify_closing_entries():
             )
             db.session.add(modal_account)
             db.session.flush()
+            invalidate_account_lookup()
             print("✅ Akun Modal dibuat")
         
         entry3 = JournalEntry(
@@ -3244,7 +4793,7 @@ def get_post_closing_trial_balance():
             '''
         
         # Hitung apakah seimbang
-        is_balanced = abs(total_debit - total_credit) < 0.01
+        is_balanced = total_debit == total_credit
         
         table_html += f'''
                     </tbody>
@@ -3413,12 +4962,174 @@ def get_adjustment_account_balances():
         'kendaraan': get_account_balance_before_adjustment('kendaraan')
     }
 
+# ===== ASET STATIS BER-FINGERPRINT =====
+# CSS/JS layout disajikan sebagai file statis dengan hash isi di nama file (mis. css/app.3f9c1a2b7d4e.css).
+# Hash dihitung saat startup tanpa build step: isi berubah -> URL berubah -> cache browser otomatis basi.
+STATIC_ASSET_FILES = ('css/app.css', 'js/app.js')
+STATIC_ASSET_MAX_AGE = 365 * 24 * 60 * 60
+STATIC_ASSETS = {}  # 'css/app.css' -> 'css/app.<hash>.css'
+STATIC_ASSET_SOURCES = {}  # kebalikan STATIC_ASSETS
+
+def fingerprint_static_assets():
+    """Hitung hash isi tiap aset statis dan daftarkan nama file ber-hash-nya"""
+    for path in STATIC_ASSET_FILES:
+        with open(os.path.join(app.static_folder, path), 'rb') as asset_file:
+            digest = hashlib.sha256(asset_file.read()).hexdigest()[:12]
+        base, extension = os.path.splitext(path)
+        fingerprinted = f'{base}.{digest}{extension}'
+        STATIC_ASSETS[path] = fingerprinted
+        STATIC_ASSET_SOURCES[fingerprinted] = path
+
+def asset_url(path):
+    """URL aset ber-fingerprint untuk dipakai di layout"""
+    return f'/assets/{STATIC_ASSETS.get(path, path)}'
+
+@app.route('/assets/<path:filename>')
+def static_asset(filename):
+    """Sajikan aset ber-fingerprint dengan cache jangka panjang (immutable)"""
+    source = STATIC_ASSET_SOURCES.get(filename)
+    if source is None:
+        # HTML lama (sebelum deploy) masih merujuk hash lama -> arahkan ke versi sekarang
+        base, extension = os.path.splitext(filename)
+        current = f'{os.path.splitext(base)[0]}{extension}'
+        if current in STATIC_ASSETS:
+            return redirect(asset_url(current))
+        abort(404)
+
+    response = send_from_directory(app.static_folder, source, max_age=STATIC_ASSET_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+fingerprint_static_assets()
+
+# ===== KOMPRESI & CONDITIONAL GET =====
+# Semua response GET 200 berbasis teks mendapat ETag kuat per representasi (akhiran -gzip/-br bila
+# dikompres); klien yang mengirim If-None-Match yang cocok menerima 304 tanpa body. Body >= COMPRESS_MIN_SIZE dikompres brotli (bila terpasang) atau gzip.
+# Response streaming (ekspor CSV, buku besar) dan file passthrough dilewati apa adanya.
+try:
+    import brotli
+except ImportError:  # Brotli opsional - tanpa modul ini hanya gzip
+    brotli = None
+
+COMPRESS_MIN_SIZE = 1024
+COMPRESS_GZIP_LEVEL = 6
+COMPRESS_BROTLI_QUALITY = 5  # kualitas 11 (default) terlalu lambat untuk HTML dinamis
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/css', 'text/javascript', 'application/javascript',
+    'application/json', 'text/plain', 'text/csv', 'image/svg+xml',
+}
+# Body aset immutable (nama file ber-hash) cukup dikompres sekali per proses
+COMPRESSED_ASSET_CACHE = {}
+
+def choose_content_encoding(size):
+    """Pilih content-coding dari Accept-Encoding klien (None = kirim apa adanya)"""
+    if size < COMPRESS_MIN_SIZE:
+        return None
+    if brotli is not None and request.accept_encodings['br']:
+        return 'br'
+    if request.accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+def compress_body(data, encoding):
+    """Kompres body dengan content-coding yang dipilih"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=COMPRESS_BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=COMPRESS_GZIP_LEVEL, mtime=0)
+
+def representation_etag(etag, encoding):
+    """ETag representasi: ETag dasar + akhiran content-coding bila body dikompres"""
+    return f'{etag}-{encoding}' if encoding else etag
+
+def etag_matches(etag):
+    """Cek If-None-Match (perbandingan lemah) terhadap ETag representasi"""
+    return request.if_none_match.contains_weak(etag)
+
+def version_etag(version_func):
+    """Decorator: ETag dari versi data (murah) - 304 dijawab sebelum body dibangun"""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            version = (request.full_path, current_user.get_id(), version_func(*args, **kwargs))
+            etag = hashlib.sha1(repr(version).encode()).hexdigest()
+
+            # Ukuran body belum diketahui: representasi terkompres sesuai Accept-Encoding
+            # atau body kecil yang dikirim apa adanya - 304 membawa ETag yang sama dengan 200-nya
+            encoding = choose_content_encoding(COMPRESS_MIN_SIZE)
+            for candidate in dict.fromkeys([representation_etag(etag, encoding), etag]):
+                if etag_matches(candidate):
+                    response = Response(status=304)
+                    response.set_etag(candidate)
+                    response.cache_control.private = True
+                    response.cache_control.no_cache = True
+                    response.vary.add('Accept-Encoding')
+                    return response
+
+            response = app.make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag)
+            return response
+        return decorated_function
+    return decorator
+
+@app.after_request
+def compress_and_validate_response(response):
+    """ETag kuat + 304 untuk If-None-Match, lalu kompres body yang memenuhi syarat"""
+    if request.method not in ('GET', 'HEAD') or response.status_code != 200:
+        return response
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES or 'Content-Encoding' in response.headers:
+        return response
+
+    immutable = bool(response.cache_control.immutable)
+    if response.direct_passthrough and immutable:
+        # Aset ber-fingerprint: baca file kecilnya agar bisa dikompres
+        response.direct_passthrough = False
+    elif response.direct_passthrough or response.is_streamed:
+        return response
+
+    data = response.get_data()
+    etag, _ = response.get_etag()
+    if not etag:
+        etag = hashlib.sha1(data).hexdigest()
+
+    if 'Cache-Control' not in response.headers:
+        # Halaman per pengguna: boleh disimpan browser, tapi selalu divalidasi ulang
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+    response.vary.add('Accept-Encoding')
+
+    encoding = choose_content_encoding(len(data))
+    response.set_etag(representation_etag(etag, encoding))
+
+    if etag_matches(representation_etag(etag, encoding)):
+        response.status_code = 304
+        return response
+
+    if encoding:
+        if immutable:
+            cache_key = (etag, encoding)
+            compressed = COMPRESSED_ASSET_CACHE.get(cache_key)
+            if compressed is None:
+                compressed = COMPRESSED_ASSET_CACHE[cache_key] = compress_body(data, encoding)
+        else:
+            compressed = compress_body(data, encoding)
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+    return response
+
 # ===== DEEP OCEAN HTML TEMPLATES =====
-def base_html(title, content, additional_css="", additional_js=""):
-    settings = {s.key: s.value for s in AppSetting.query.all()}
+def base_html(title, content, additional_css="", additional_js="", late_bound=False):
+    settings = get_app_settings()
     app_name = settings.get('app_name', 'Kang-Mas Shop')
     app_logo = settings.get('app_logo', '/static/uploads/logos/logo.png')
 
+    if late_bound:
+        # Halaman untuk cache storefront: bagian per user diisi saat disajikan
+        navigation, flash_messages = storefront_slot('navigation'), storefront_slot('flash')
+    else:
+        navigation, flash_messages = get_navigation(), get_flash_messages()
+
     floating_cart = ''
     if current_user.is_authenticated and current_user.user_type == 'customer':
         floating_cart = '''
@@ -3438,6 +5149,7 @@ def base_html(title, content, additional_css="", additional_js=""):
     <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&family=Poppins:wght@300;400;500;600;700;800&display=swap" rel="stylesheet">
     <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css">
     <link rel="icon" href="{app_logo}" type="image/x-icon">
+    <link rel="stylesheet" href="{asset_url('css/app.css')}">
     <style>
         :root {{
             --primary: {COLORS['primary']};
@@ -3463,757 +5175,6 @@ def base_html(title, content, additional_css="", additional_js=""):
             --border-radius-xl: 20px;
         }}
 
-        * {{
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }}
-
-        body {{
-            font-family: 'Inter', sans-serif;
-            background: linear-gradient(135deg, #f0f9ff 0%, #e6f3ff 100%);
-            color: var(--dark);
-            min-height: 100vh;
-            line-height: 1.6;
-        }}
-
-        /* Ocean Navbar */
-        .navbar {{
-            background: linear-gradient(135deg, var(--primary) 0%, var(--ocean-deep) 100%);
-            padding: 1rem 2rem;
-            position: sticky;
-            top: 0;
-            z-index: 1000;
-            box-shadow: var(--shadow-lg);
-        }}
-
-        .nav-container {{
-            max-width: 1400px;
-            margin: 0 auto;
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-        }}
-
-        .nav-brand {{
-            font-family: 'Poppins', sans-serif;
-            font-size: 1.8rem;
-            font-weight: 800;
-            color: var(--white);
-            text-decoration: none;
-            display: flex;
-            align-items: center;
-            gap: 0.75rem;
-        }}
-
-        .nav-links {{
-            display: flex;
-            align-items: center;
-            gap: 1rem;
-        }}
-
-        .nav-link {{
-            color: var(--white);
-            text-decoration: none;
-            padding: 0.75rem 1.5rem;
-            border-radius: var(--border-radius);
-            transition: all 0.3s ease;
-            font-weight: 500;
-        }}
-
-        .nav-link:hover {{
-            background: rgba(255, 255, 255, 0.2);
-            transform: translateY(-2px);
-        }}
-
-        .user-menu {{
-            display: flex;
-            align-items: center;
-            gap: 1rem;
-            background: rgba(255, 255, 255, 0.2);
-            padding: 0.75rem 1.5rem;
-            border-radius: var(--border-radius);
-            backdrop-filter: blur(10px);
-        }}
-
-        .avatar {{
-            width: 45px;
-            height: 45px;
-            border-radius: 50%;
-            background: var(--ocean-medium);
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            font-size: 1.3rem;
-            color: var(--white);
-            box-shadow: var(--shadow-md);
-        }}
-
-        .badge {{
-            padding: 0.4rem 1rem;
-            border-radius: 25px;
-            font-size: 0.75rem;
-            font-weight: 600;
-            text-transform: uppercase;
-            background: var(--ocean-medium);
-            color: var(--white);
-            box-shadow: var(--shadow-sm);
-        }}
-
-        .container {{
-            max-width: 1400px;
-            margin: 0 auto;
-            padding: 2rem;
-        }}
-
-        /* Ocean Cards */
-        .card {{
-            background: rgba(255, 255, 255, 0.9);
-            backdrop-filter: blur(10px);
-            border-radius: var(--border-radius-lg);
-            padding: 2rem;
-            box-shadow: var(--shadow-lg);
-            margin-bottom: 2rem;
-            border: 1px solid rgba(255, 255, 255, 0.3);
-            transition: all 0.3s ease;
-            position: relative;
-            overflow: hidden;
-        }}
-
-        .card::before {{
-            content: '';
-            position: absolute;
-            top: 0;
-            left: 0;
-            right: 0;
-            height: 4px;
-            background: linear-gradient(135deg, var(--primary) 0%, var(--ocean-deep) 100%);
-        }}
-
-        .card:hover {{
-            transform: translateY(-5px);
-            box-shadow: var(--shadow-xl);
-        }}
-
-        /* Ocean Buttons */
-        .btn {{
-            padding: 0.875rem 2rem;
-            border: none;
-            border-radius: var(--border-radius);
-            text-decoration: none;
-            display: inline-flex;
-            align-items: center;
-            gap: 0.75rem;
-            cursor: pointer;
-            transition: all 0.3s ease;
-            font-weight: 600;
-            font-size: 0.95rem;
-        }}
-
-        .btn-primary {{
-            background: linear-gradient(135deg, var(--primary) 0%, var(--ocean-deep) 100%);
-            color: var(--white);
-            box-shadow: var(--shadow-md);
-        }}
-
-        .btn-primary:hover {{
-            transform: translateY(-2px);
-            box-shadow: var(--shadow-lg);
-        }}
-
-        .btn-success {{
-            background: linear-gradient(135deg, var(--success) 0%, var(--teal) 100%);
-            color: var(--white);
-            box-shadow: var(--shadow-md);
-        }}
-
-        .btn-warning {{
-            background: linear-gradient(135deg, var(--warning) 0%, #b7791f 100%);
-            color: var(--white);
-            box-shadow: var(--shadow-md);
-        }}
-
-        .btn-danger {{
-            background: linear-gradient(135deg, var(--error) 0%, #c53030 100%);
-            color: var(--white);
-            box-shadow: var(--shadow-md);
-        }}
-
-        .btn-info {{
-            background: linear-gradient(135deg, var(--ocean-medium) 0%, var(--teal) 100%);
-            color: var(--white);
-            box-shadow: var(--shadow-md);
-        }}
-
-        .grid {{
-            display: grid;
-            gap: 2rem;
-        }}
-
-        .grid-2 {{ grid-template-columns: repeat(auto-fit, minmax(400px, 1fr)); }}
-        .grid-3 {{ grid-template-columns: repeat(auto-fit, minmax(300px, 1fr)); }}
-        .grid-4 {{ grid-template-columns: repeat(auto-fit, minmax(250px, 1fr)); }}
-
-        /* Ocean Hero Section */
-        .hero {{
-            text-align: center;
-            padding: 5rem 2rem;
-            background: linear-gradient(135deg, var(--primary) 0%, var(--ocean-deep) 100%);
-            border-radius: var(--border-radius-xl);
-            margin-bottom: 3rem;
-            color: var(--white);
-            position: relative;
-            overflow: hidden;
-        }}
-
-        .hero::before {{
-            content: '';
-            position: absolute;
-            top: 0;
-            left: 0;
-            right: 0;
-            bottom: 0;
-            background: url('data:image/svg+xml,<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 1000 1000"><polygon fill="rgba(255,255,255,0.05)" points="0,1000 1000,0 1000,1000"/></svg>');
-        }}
-
-        .hero h1 {{
-            font-size: 3.5rem;
-            margin-bottom: 1.5rem;
-            font-family: 'Poppins', sans-serif;
-            font-weight: 800;
-        }}
-
-        .hero p {{
-            font-size: 1.25rem;
-            margin-bottom: 2rem;
-            opacity: 0.9;
-        }}
-
-        /* Ocean Stats */
-        .stats {{
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
-            gap: 1.5rem;
-            margin: 3rem 0;
-        }}
-
-        .stat-card {{
-            background: linear-gradient(135deg, var(--white) 0%, var(--ocean-light) 100%);
-            padding: 2.5rem 2rem;
-            border-radius: var(--border-radius-lg);
-            text-align: center;
-            box-shadow: var(--shadow-lg);
-            border: 1px solid rgba(255, 255, 255, 0.5);
-            transition: all 0.3s ease;
-            position: relative;
-            overflow: hidden;
-        }}
-
-        .stat-card::before {{
-            content: '';
-            position: absolute;
-            top: 0;
-            left: 0;
-            right: 0;
-            height: 4px;
-            background: linear-gradient(135deg, var(--primary) 0%, var(--ocean-deep) 100%);
-        }}
-
-        .stat-card:hover {{
-            transform: translateY(-5px);
-            box-shadow: var(--shadow-xl);
-        }}
-
-        .stat-number {{
-            font-family: 'Poppins', sans-serif;
-            font-size: 2.5rem;
-            font-weight: 800;
-            color: var(--primary);
-            margin-bottom: 0.5rem;
-        }}
-
-        .price {{
-            font-family: 'Poppins', sans-serif;
-            font-size: 2rem;
-            font-weight: 700;
-            color: var(--primary);
-        }}
-
-        /* Ocean Tables */
-        .table {{
-            width: 100%;
-            border-collapse: collapse;
-            background: var(--white);
-            border-radius: var(--border-radius);
-            overflow: hidden;
-            box-shadow: var(--shadow-lg);
-        }}
-
-        .table th, .table td {{
-            padding: 1.25rem;
-            text-align: left;
-            border-bottom: 1px solid rgba(0,0,0,0.05);
-        }}
-
-        .table th {{
-            background: linear-gradient(135deg, var(--primary) 0%, var(--ocean-deep) 100%);
-            color: var(--white);
-            font-weight: 600;
-            font-size: 0.9rem;
-            text-transform: uppercase;
-            letter-spacing: 0.5px;
-        }}
-
-        .table tr:hover {{
-            background: rgba(49, 130, 206, 0.05);
-        }}
-
-        /* Ocean Forms */
-        .form-group {{
-            margin-bottom: 1.75rem;
-        }}
-
-        .form-label {{
-            display: block;
-            margin-bottom: 0.75rem;
-            font-weight: 600;
-            color: var(--dark);
-            font-size: 0.95rem;
-        }}
-
-        .form-control {{
-            width: 100%;
-            padding: 1rem 1.25rem;
-            border: 2px solid rgba(0,0,0,0.1);
-            border-radius: var(--border-radius);
-            font-size: 1rem;
-            transition: all 0.3s ease;
-            background: rgba(255, 255, 255, 0.8);
-            font-family: 'Inter', sans-serif;
-        }}
-
-        .form-control:focus {{
-            outline: none;
-            border-color: var(--ocean-medium);
-            box-shadow: 0 0 0 3px rgba(49, 130, 206, 0.1);
-            background: var(--white);
-        }}
-
-        /* Fix untuk input number - biarkan normal */
-        input[type="number"] {{
-            text-align: right;
-            font-family: 'Inter', sans-serif;
-        }}
-
-        /* Remove number input arrows di browser tertentu */
-        input[type="number"]::-webkit-outer-spin-button,
-        input[type="number"]::-webkit-inner-spin-button {{
-            -webkit-appearance: none;
-            margin: 0;
-        }}
-
-        input[type="number"] {{
-            -moz-appearance: textfield;
-        }}
-
-        /* Ocean Tabs */
-        .accounting-tabs {{
-            display: flex;
-            gap: 0.5rem;
-            margin-bottom: 2rem;
-            background: rgba(255, 255, 255, 0.6);
-            padding: 0.5rem;
-            border-radius: var(--border-radius);
-            backdrop-filter: blur(10px);
-        }}
-
-        .tab {{
-            padding: 1rem 2rem;
-            background: transparent;
-            border: none;
-            border-radius: var(--border-radius);
-            cursor: pointer;
-            font-weight: 600;
-            color: var(--dark);
-            transition: all 0.3s ease;
-            position: relative;
-        }}
-
-        .tab.active {{
-            background: linear-gradient(135deg, var(--primary) 0%, var(--ocean-deep) 100%);
-            color: var(--white);
-            box-shadow: var(--shadow-md);
-        }}
-
-        .tab-content {{
-            display: none;
-        }}
-
-        .tab-content.active {{
-            display: block;
-            animation: fadeIn 0.5s ease;
-        }}
-
-        @keyframes fadeIn {{
-            from {{ opacity: 0; transform: translateY(10px); }}
-            to {{ opacity: 1; transform: translateY(0); }}
-        }}
-
-        .debit {{
-            color: var(--success);
-            font-weight: 600;
-            background: rgba(56, 161, 105, 0.1);
-            padding: 0.5rem 1rem;
-            border-radius: var(--border-radius);
-        }}
-
-        .credit {{
-            color: var(--error);
-            font-weight: 600;
-            background: rgba(229, 62, 62, 0.1);
-            padding: 0.5rem 1rem;
-            border-radius: var(--border-radius);
-        }}
-
-        /* Product Cards */
-        .product-image {{
-            width: 100%;
-            height: 300px; /* Fixed height untuk ratio 1:1 */
-            object-fit: cover; /* Pastikan gambar tidak terdistorsi */
-            border-radius: var(--border-radius);
-            margin-bottom: 1.5rem;
-            transition: transform 0.3s ease;
-            box-shadow: var(--shadow-md);
-        }}
-
-        .product-card:hover .product-image {{
-            transform: scale(1.05);
-        }}
-
-        /* Untuk gambar di form produk */
-        .form-product-image {{
-            width: 200px;
-            height: 200px;
-            object-fit: cover;
-            border-radius: var(--border-radius);
-            margin: 1rem 0;
-        }}
-
-        /* Tracking Steps */
-        .tracking-steps {{
-            display: flex;
-            justify-content: space-between;
-            margin: 2rem 0;
-            position: relative;
-        }}
-
-        .tracking-steps::before {{
-            content: '';
-            position: absolute;
-            top: 25px;
-            left: 0;
-            right: 0;
-            height: 3px;
-            background: linear-gradient(135deg, var(--primary) 0%, var(--ocean-deep) 100%);
-            z-index: 1;
-            border-radius: 10px;
-        }}
-
-        .tracking-step {{
-            text-align: center;
-            position: relative;
-            z-index: 2;
-            flex: 1;
-        }}
-
-        .step-icon {{
-            width: 50px;
-            height: 50px;
-            border-radius: 50%;
-            background: var(--ocean-light);
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            margin: 0 auto 0.75rem;
-            transition: all 0.3s ease;
-            font-size: 1.25rem;
-            box-shadow: var(--shadow-md);
-            border: 3px solid var(--white);
-        }}
-
-        .step-active {{
-            background: linear-gradient(135deg, var(--primary) 0%, var(--ocean-deep) 100%);
-            color: var(--white);
-            transform: scale(1.1);
-        }}
-
-        .step-completed {{
-            background: linear-gradient(135deg, var(--success) 0%, var(--teal) 100%);
-            color: var(--white);
-        }}
-
-        /* Google Button */
-        .google-btn {{
-            background: #4285F4;
-            color: white;
-            width: 100%;
-            justify-content: center;
-            margin-top: 1rem;
-            box-shadow: var(--shadow-md);
-        }}
-
-        .google-btn:hover {{
-            background: #357ae8;
-            transform: translateY(-2px);
-            box-shadow: var(--shadow-lg);
-        }}
-
-        /* Divider */
-        .divider {{
-            text-align: center;
-            margin: 1.5rem 0;
-            position: relative;
-        }}
-
-        .divider::before {{
-            content: '';
-            position: absolute;
-            top: 50%;
-            left: 0;
-            right: 0;
-            height: 1px;
-            background: linear-gradient(135deg, var(--primary) 0%, var(--ocean-deep) 100%);
-        }}
-
-        .divider span {{
-            background: var(--white);
-            padding: 0 1.5rem;
-            position: relative;
-            color: var(--dark);
-            font-weight: 500;
-        }}
-
-        /* Flash Messages */
-        .flash-messages {{
-            position: fixed;
-            top: 100px;
-            right: 20px;
-            z-index: 10000;
-        }}
-
-        .flash-message {{
-            padding: 1.25rem 1.75rem;
-            border-radius: var(--border-radius);
-            margin-bottom: 0.75rem;
-            font-weight: 500;
-            box-shadow: var(--shadow-xl);
-            backdrop-filter: blur(20px);
-            border: 1px solid rgba(255, 255, 255, 0.2);
-            animation: slideInRight 0.5s ease;
-        }}
-
-        @keyframes slideInRight {{
-            from {{ transform: translateX(100%); opacity: 0; }}
-            to {{ transform: translateX(0); opacity: 1; }}
-        }}
-
-        .flash-success {{
-            background: linear-gradient(135deg, var(--success) 0%, var(--teal) 100%);
-            color: white;
-        }}
-
-        .flash-error {{
-            background: linear-gradient(135deg, var(--error) 0%, #c53030 100%);
-            color: white;
-        }}
-
-        .flash-warning {{
-            background: linear-gradient(135deg, var(--warning) 0%, #b7791f 100%);
-            color: white;
-        }}
-
-        /* Logo Styling */
-        .navbar-logo {{
-            width: 140px !important; 
-            height: 140px !important; 
-            max-width: 140px;
-            max-height: 140px;
-            border-radius: 0 !important;
-            box-shadow: none !important;
-            object-fit: contain; 
-            margin-right: 30px;
-            box-shadow: 0 4px 12px rgba(0, 0, 0, 0.15);
-            border: none !important;
-            display: block;
-            float: left;
-            background: transparent !important;
-            padding: 0;
-        }}
-
-        /* Ocean Modal Styles */
-        .modal {{
-            display: none;
-            position: fixed;
-            z-index: 10000;
-            left: 0;
-            top: 0;
-            width: 100%;
-            height: 100%;
-            background-color: rgba(0,0,0,0.5);
-            backdrop-filter: blur(10px);
-        }}
-
-        .modal-content {{
-            background: rgba(255, 255, 255, 0.95);
-            backdrop-filter: blur(20px);
-            margin: 10% auto;
-            padding: 2.5rem;
-            border-radius: var(--border-radius-xl);
-            width: 90%;
-            max-width: 500px;
-            box-shadow: var(--shadow-xl);
-            border: 1px solid rgba(255, 255, 255, 0.3);
-            position: relative;
-            animation: modalSlideIn 0.3s ease;
-        }}
-
-        @keyframes modalSlideIn {{
-            from {{ transform: translateY(-50px); opacity: 0; }}
-            to {{ transform: translateY(0); opacity: 1; }}
-        }}
-
-        .close {{
-            color: #aaa;
-            float: right;
-            font-size: 28px;
-            font-weight: bold;
-            cursor: pointer;
-            position: absolute;
-            right: 1.5rem;
-            top: 1.5rem;
-            transition: color 0.3s ease;
-        }}
-
-        .close:hover {{
-            color: var(--error);
-        }}
-
-        .modal-buttons {{
-            display: flex;
-            gap: 1rem;
-            margin-top: 2rem;
-        }}
-
-        .modal-buttons .btn {{
-            flex: 1;
-        }}
-
-        /* Status Badges */
-        .status-text {{
-            padding: 0.5rem 1rem;
-            border-radius: 25px;
-            font-weight: 600;
-            display: inline-block;
-            font-size: 0.85rem;
-            text-transform: uppercase;
-            letter-spacing: 0.5px;
-            box-shadow: var(--shadow-sm);
-        }}
-
-        .status-pending {{
-            background: linear-gradient(135deg, var(--warning) 0%, #b7791f 100%);
-            color: white;
-        }}
-
-        .status-processing {{
-            background: linear-gradient(135deg, var(--ocean-medium) 0%, var(--ocean-deep) 100%);
-            color: white;
-        }}
-
-        .status-completed {{
-            background: linear-gradient(135deg, var(--success) 0%, var(--teal) 100%);
-            color: white;
-        }}
-
-        .status-cancelled {{
-            background: linear-gradient(135deg, var(--error) 0%, #c53030 100%);
-            color: white;
-        }}
-
-        .status-paid {{
-            background: linear-gradient(135deg, var(--success) 0%, var(--teal) 100%);
-            color: white;
-        }}
-
-        .status-unpaid {{
-            background: linear-gradient(135deg, var(--error) 0%, #c53030 100%);
-            color: white;
-        }}
-
-        /* Floating Action Button */
-        .fab {{
-            position: fixed;
-            bottom: 2rem;
-            right: 2rem;
-            width: 60px;
-            height: 60px;
-            border-radius: 50%;
-            background: linear-gradient(135deg, var(--primary) 0%, var(--ocean-deep) 100%);
-            color: white;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            font-size: 1.5rem;
-            box-shadow: var(--shadow-xl);
-            cursor: pointer;
-            z-index: 1000;
-            transition: all 0.3s ease;
-            text-decoration: none;
-        }}
-
-        .fab:hover {{
-            transform: scale(1.1);
-        }}
-
-        /* Loading Animation */
-        .loading {{
-            display: inline-block;
-            width: 20px;
-            height: 20px;
-            border: 3px solid rgba(255,255,255,.3);
-            border-radius: 50%;
-            border-top-color: #fff;
-            animation: spin 1s ease-in-out infinite;
-        }}
-
-        @keyframes spin {{
-            to {{ transform: rotate(360deg); }}
-        }}
-
-        /* Responsive Design */
-        @media (max-width: 768px) {{
-            .nav-links {{
-                flex-direction: column;
-                gap: 0.5rem;
-            }}
-
-            .hero h1 {{
-                font-size: 2.5rem;
-            }}
-
-            .grid-2, .grid-3, .grid-4 {{
-                grid-template-columns: 1fr;
-            }}
-
-            .container {{
-                padding: 1rem;
-            }}
-
-            .stats {{
-                grid-template-columns: 1fr;
-            }}
-        }}
-
         {additional_css}
     </style>
 </head>
@@ -4231,13 +5192,13 @@ def base_html(title, content, additional_css="", additional_js=""):
             </a>
 
             <div class="nav-links">
-                {get_navigation()}
+                {navigation}
             </div>
         </div>
     </nav>
 
     <div class="flash-messages">
-        {get_flash_messages()}
+        {flash_messages}
     </div>
 
     <div class="container">
@@ -4274,1387 +5235,26 @@ def base_html(title, content, additional_css="", additional_js=""):
         <!-- Content akan diisi oleh JavaScript -->
     </div>
 
-    <script>
-        // Ocean JavaScript Functions
-        function addToCart(productId) {{
-            console.log('🛒 Adding product to cart:', productId);
-
-            if (!productId) {{
-                showNotification('Product ID tidak valid', 'error');
-                return;
-            }}
+    <script src="{asset_url('js/app.js')}"></script>
+</body>
+</html>
+'''
 
-            const button = event.target;
-            const originalText = button.innerHTML;
-
-            // Show loading state
-            button.innerHTML = '<div class="loading"></div> Menambahkan...';
-            button.disabled = true;
-
-            const cartData = {{
-                product_id: parseInt(productId),
-                quantity: 1
-            }};
-
-            fetch('/api/cart/add', {{
-                method: 'POST',
-                headers: {{
-                    'Content-Type': 'application/json',
-                    'Accept': 'application/json'
-                }},
-                body: JSON.stringify(cartData)
-            }})
-            .then(response => {{
-                if (!response.ok) {{
-                    return response.json().then(errorData => {{
-                        throw new Error(errorData.message || `HTTP error! status: ${{response.status}}`);
-                    }});
-                }}
-                return response.json();
-            }})
-            .then(data => {{
-                if (data.success) {{
-                    showNotification('✅ ' + data.message, 'success');
-                    updateCartCount();
-                }} else {{
-                    showNotification('❌ ' + data.message, 'error');
-                }}
-            }})
-            .catch(error => {{
-                console.error('Fetch error:', error);
-                let errorMessage = 'Gagal menambahkan ke keranjang';
-
-                if (error.message.includes('HTTP error! status: 403')) {{
-                    errorMessage = 'Hanya customer yang bisa menambah ke keranjang';
-                }} else if (error.message.includes('HTTP error! status: 404')) {{
-                    errorMessage = 'Produk tidak ditemukan';
-                }} else if (error.message.includes('HTTP error! status: 400')) {{
-                    errorMessage = 'Stock tidak mencukupi';
-                }}
+def get_navigation():
+    if current_user.is_authenticated:
+        user_badge = f"""
+            <div class="user-menu">
+                <div class="avatar">{current_user.avatar}</div>
+                <div>
+                    <div style="font-weight: 600; font-size: 0.95rem;">{current_user.full_name}</div>
+                    <div class="badge">
+                        {current_user.user_type.upper()}
+                    </div>
+                </div>
+            </div>
+        """
 
-                showNotification('❌ ' + errorMessage, 'error');
-            }})
-            .finally(() => {{
-                setTimeout(() => {{
-                    button.innerHTML = originalText;
-                    button.disabled = false;
-                }}, 1000);
-            }});
-        }}
-
-        function showTab(tabName, element) {{
-            document.querySelectorAll('.tab-content').forEach(tab => {{
-                tab.classList.remove('active');
-            }});
-            document.querySelectorAll('.tab').forEach(tab => {{
-                tab.classList.remove('active');
-            }});
-            document.getElementById(tabName).classList.add('active');
-            element.classList.add('active');
-        }}
-
-        function showNotification(message, type) {{
-            const notification = document.createElement('div');
-            notification.className = `flash-message flash-${{type}}`;
-            notification.innerHTML = `
-                <div style="display: flex; align-items: center; gap: 0.75rem;">
-                    <i class="fas fa-${{type === 'success' ? 'check-circle' : 'exclamation-circle'}}"></i>
-                    <span>${{message}}</span>
-                </div>
-            `;
-
-            const flashContainer = document.querySelector('.flash-messages');
-            flashContainer.appendChild(notification);
-
-            setTimeout(() => {{
-                notification.style.animation = 'slideInRight 0.5s ease reverse';
-                setTimeout(() => {{
-                    flashContainer.removeChild(notification);
-                }}, 500);
-            }}, 4000);
-        }}
-
-        function checkout() {{
-            window.location.href = '/checkout';
-        }}
-
-        // ===== FUNGSI CHECKOUT BARU UNTUK COD =====
-        function processCheckout() {{
-            const shippingAddress = document.getElementById('shipping_address').value;
-            const shippingMethod = document.getElementById('shipping_method').value;
-            const paymentMethod = document.getElementById('payment_method').value;
-
-            if (!shippingAddress) {{
-                showNotification('Harap isi alamat pengiriman!', 'error');
-                return;
-            }}
-
-            if (!shippingMethod) {{
-                showNotification('Harap pilih metode pengiriman!', 'error');
-                return;
-            }}
-
-            if (!paymentMethod) {{
-                showNotification('Harap pilih metode pembayaran!', 'error');
-                return;
-            }}
-
-            const formData = new FormData();
-            formData.append('shipping_address', shippingAddress);
-            formData.append('shipping_method', shippingMethod);
-            formData.append('payment_method', paymentMethod);
-
-            fetch('/process_checkout', {{
-                method: 'POST',
-                body: formData
-            }})
-            .then(response => response.json())
-            .then(data => {{
-                if (data.success) {{
-                    if (data.is_cod) {{
-                        // Untuk COD, langsung tampilkan sukses
-                        showSuccessModalCOD(data.order_number, data.total_amount);
-                    }} else {{
-                        // Untuk non-COD, tampilkan instruksi pembayaran
-                        showPaymentModal(data.order_number, data.payment_method, data.total_amount);
-                    }}
-                }} else {{
-                    showNotification('❌ ' + data.message, 'error');
-                }}
-            }});
-        }}
-
-        function resetBalances() {{
-            if (!confirm('Apakah Anda yakin ingin mereset saldo awal? Tindakan ini akan mengembalikan saldo ke nilai default.')) {{
-                return;
-            }}
-
-            const button = event.target;
-            const originalText = button.innerHTML;
-
-            button.innerHTML = '<div class="loading"></div> Resetting...';
-            button.disabled = true;
-
-            fetch('/seller/reset_balances', {{
-                method: 'POST'
-            }})
-            .then(response => response.json())
-            .then(data => {{
-                if (data.success) {{
-                    showNotification('✅ ' + data.message, 'success');
-                    setTimeout(() => location.reload(), 2000);
-                }} else {{
-                    showNotification('❌ ' + data.message, 'error');
-                }}
-            }})
-            .catch(error => {{
-                showNotification('❌ Terjadi error saat reset saldo', 'error');
-            }})
-            .finally(() => {{
-                setTimeout(() => {{
-                    button.innerHTML = originalText;
-                    button.disabled = false;
-                }}, 2000);
-            }});
-        }}
-
-        // ===== 🆕 FUNGSI BARU UNTUK FORM PENJUALAN SEDERHANA =====
-        // Data harga default
-        const defaultPrices = {{
-            'bibit': {{
-                selling_price: 2000,
-                cost_price: 1000,
-                name: 'Bibit Ikan Mas'
-            }},
-            'konsumsi': {{
-                selling_price: 20000,
-                cost_price: 13500,
-                name: 'Ikan Mas Konsumsi'
-            }}
-        }};
-
-        // Fungsi untuk mengisi harga default
-        function fillDefaultPrices() {{
-            const productType = document.getElementById('product_type')?.value;
-
-            if (productType && defaultPrices[productType]) {{
-                const product = defaultPrices[productType];
-
-                // Isi harga default
-                const sellingPriceInput = document.getElementById('selling_price');
-                const costPriceInput = document.getElementById('cost_price');
-                const descriptionInput = document.getElementById('description');
-
-                if (sellingPriceInput) sellingPriceInput.value = product.selling_price;
-                if (costPriceInput) costPriceInput.value = product.cost_price;
-                if (descriptionInput) descriptionInput.value = 'Penjualan ' + product.name;
-
-                // Hitung ulang total
-                calculateTotals();
-            }} else if (productType === 'lainnya') {{
-                // Kosongkan untuk produk lainnya
-                const sellingPriceInput = document.getElementById('selling_price');
-                const costPriceInput = document.getElementById('cost_price');
-                const descriptionInput = document.getElementById('description');
-
-                if (sellingPriceInput) sellingPriceInput.value = '';
-                if (costPriceInput) costPriceInput.value = '';
-                if (descriptionInput) descriptionInput.value = 'Penjualan produk lainnya';
-
-                calculateTotals();
-            }}
-        }}
-
-                // Fungsi untuk menghitung total
-        function calculateTotals() {{
-            const quantity = parseInt(document.getElementById('quantity')?.value) || 0;
-            const sellingPrice = parseInt(document.getElementById('selling_price')?.value) || 0;
-            const costPrice = parseInt(document.getElementById('cost_price')?.value) || 0;
-
-            const totalSales = sellingPrice * quantity;
-            const totalHpp = costPrice * quantity;
-
-            const totalSalesInput = document.getElementById('total_sales');
-            const totalHppInput = document.getElementById('total_hpp');
-
-            if (totalSalesInput) totalSalesInput.value = totalSales;
-            if (totalHppInput) totalHppInput.value = totalHpp;
-        }}
-
-        // ⬇️⬇️⬇️ TARUH DI SINI ⬇️⬇️⬇️
-        // Fungsi untuk submit form penjualan sederhana
-        function submitSalesForm() {{
-            console.log("🔄 Submit Sales Form dipanggil");
-
-            const productType = document.getElementById('product_type')?.value;
-            const paymentMethod = document.getElementById('payment_method')?.value;
-            const quantity = parseInt(document.getElementById('quantity')?.value) || 0;
-            const sellingPrice = parseInt(document.getElementById('selling_price')?.value) || 0;
-            const costPrice = parseInt(document.getElementById('cost_price')?.value) || 0;
-            const description = document.getElementById('description')?.value;
-            const dateInput = document.querySelector('input[name="date"]');
-            const date = dateInput ? dateInput.value : new Date().toISOString().split('T')[0];
-            const totalSales = parseInt(document.getElementById('total_sales')?.value) || 0;
-            const totalHpp = parseInt(document.getElementById('total_hpp')?.value) || 0;
-
-            console.log("📊 Data yang akan dikirim:", {{
-                productType, paymentMethod, quantity, sellingPrice, costPrice, description, date
-            }});
-
-            // Validasi input
-            if (!productType) {{
-                alert('❌ Harap pilih jenis produk!');
-                return;
-            }}
-
-            if (!paymentMethod) {{
-                alert('❌ Harap pilih metode pembayaran!');
-                return;
-            }}
-
-            if (!quantity || quantity <= 0) {{
-                alert('❌ Harap isi quantity dengan angka lebih dari 0!');
-                return;
-            }}
-
-            if (!sellingPrice || sellingPrice <= 0) {{
-                alert('❌ Harap isi harga jual dengan angka lebih dari 0!');
-                return;
-            }}
-
-            if (!costPrice || costPrice <= 0) {{
-                alert('❌ Harap isi harga beli (HPP) dengan angka lebih dari 0!');
-                return;
-            }}
-
-            // Data untuk dikirim
-            const data = {{
-                date: date,
-                product_type: productType,
-                payment_method: paymentMethod,
-                quantity: quantity,
-                selling_price: sellingPrice,
-                cost_price: costPrice,
-                description: description || 'Penjualan produk'
-            }};
-
-            // Tampilkan konfirmasi
-            const productName = defaultPrices[productType] ? defaultPrices[productType].name : 'Produk';
-
-            const confirmMessage = 'Konfirmasi Penjualan:\\n\\n' +
-                                'Produk: ' + productName + '\\n' +
-                                'Quantity: ' + quantity + ' unit\\n' +
-                                'Harga Jual: Rp ' + sellingPrice.toLocaleString() + ' per unit\\n' +
-                                'Harga Pokok Produksi: Rp ' + costPrice.toLocaleString() + ' per unit\\n' +
-                                'Metode: ' + (paymentMethod === 'tunai' ? 'Tunai' : 'Kredit') + '\\n\\n' +
-                                'Total Penjualan: Rp ' + totalSales.toLocaleString() + '\\n' +
-                                'Total Harga Pokok Produksi: Rp ' + totalHpp.toLocaleString() + '\\n\\n' +
-                                'Buat jurnal penjualan?';
-
-            if (!confirm(confirmMessage)) {{
-                return;
-            }}
-
-            // Tampilkan loading
-            const button = event.target;
-            const originalText = button.innerHTML;
-            button.innerHTML = '<div class="loading"></div> Memproses...';
-            button.disabled = true;
-
-            // Kirim data ke server
-            fetch('/seller/add_sales_journal', {{
-                method: 'POST',
-                headers: {{
-                    'Content-Type': 'application/json',
-                }},
-                body: JSON.stringify(data)
-            }})
-            .then(response => response.json())
-            .then(result => {{
-                console.log("✅ Response dari server:", result);
-                if (result.success) {{
-                    alert('✅ ' + result.message);
-                    setTimeout(() => location.reload(), 1500);
-                }} else {{
-                    alert('❌ ' + result.message);
-                    button.innerHTML = originalText;
-                    button.disabled = false;
-                }}
-            }})
-            .catch(error => {{
-                console.error("❌ Error:", error);
-                alert('❌ Terjadi error: ' + error);
-                button.innerHTML = originalText;
-                button.disabled = false;
-            }});
-        }}
-
-        // ===== FUNGSI UNTUK FORM PEMBELIAN SEDERHANA =====
-        // Data harga default untuk pembelian
-        const purchaseDefaultPrices = {{
-            'bibit': {{
-                purchase_price: 1000,
-                selling_price: 2000,
-                name: 'Bibit Ikan Mas'
-            }},
-            'konsumsi': {{
-                purchase_price: 13500,
-                selling_price: 20000,
-                name: 'Ikan Mas Konsumsi'
-            }},
-            'perlengkapan': {{
-                purchase_price: 50000,
-                selling_price: 0,
-                name: 'Perlengkapan Budidaya'
-            }},
-            'peralatan': {{
-                purchase_price: 100000,
-                selling_price: 0,
-                name: 'Peralatan Budidaya'
-            }}
-        }};
-
-        // Fungsi untuk mengisi harga default pembelian
-        function fillPurchaseDefaultPrices() {{
-            const productType = document.getElementById('purchase_product_type')?.value;
-
-            if (productType && purchaseDefaultPrices[productType]) {{
-                const product = purchaseDefaultPrices[productType];
-
-                const purchasePriceInput = document.getElementById('purchase_price');
-                const sellingPriceInput = document.getElementById('selling_price');
-                const descriptionInput = document.getElementById('purchase_description');
-
-                if (purchasePriceInput) purchasePriceInput.value = product.purchase_price;
-                if (sellingPriceInput) sellingPriceInput.value = product.selling_price;
-                if (descriptionInput) descriptionInput.value = 'Pembelian ' + product.name;
-
-                calculatePurchaseTotals();
-            }}
-        }}
-
-        // Fungsi untuk menghitung total pembelian
-        function calculatePurchaseTotals() {{
-            const quantity = parseInt(document.getElementById('purchase_quantity')?.value) || 0;
-            const purchasePrice = parseInt(document.getElementById('purchase_price')?.value) || 0;
-
-            const totalPurchase = purchasePrice * quantity;
-
-            const totalPurchaseInput = document.getElementById('purchase_total');
-            if (totalPurchaseInput) totalPurchaseInput.value = totalPurchase;
-        }}
-
-        // Fungsi untuk submit form pembelian
-        function submitPurchaseForm() {{
-            console.log("🔄 Submit Purchase Form dipanggil");
-
-            const productType = document.getElementById('purchase_product_type')?.value;
-            const paymentMethod = document.getElementById('purchase_payment_method')?.value;
-            const quantity = parseInt(document.getElementById('purchase_quantity')?.value) || 0;
-            const purchasePrice = parseInt(document.getElementById('purchase_price')?.value) || 0;
-            const sellingPrice = parseInt(document.getElementById('selling_price')?.value) || 0;
-            const description = document.getElementById('purchase_description')?.value;
-            const dateInput = document.querySelector('#purchaseJournalForm input[name="date"]');
-            const date = dateInput ? dateInput.value : new Date().toISOString().split('T')[0];
-            const totalPurchase = parseInt(document.getElementById('purchase_total')?.value) || 0;
-
-            console.log("📊 Data pembelian yang akan dikirim:", {{
-                productType, paymentMethod, quantity, purchasePrice, sellingPrice, description, date
-            }});
-
-            // Validasi input
-            if (!productType) {{
-                alert('❌ Harap pilih jenis produk!');
-                return;
-            }}
-
-            if (!paymentMethod) {{
-                alert('❌ Harap pilih metode pembayaran!');
-                return;
-            }}
-
-            if (!quantity || quantity <= 0) {{
-                alert('❌ Harap isi quantity dengan angka lebih dari 0!');
-                return;
-            }}
-
-            if (!purchasePrice || purchasePrice <= 0) {{
-                alert('❌ Harap isi harga beli dengan angka lebih dari 0!');
-                return;
-            }}
-
-            // Data untuk dikirim
-            const data = {{
-                date: date,
-                product_type: productType,
-                payment_method: paymentMethod,
-                quantity: quantity,
-                purchase_price: purchasePrice,
-                selling_price: sellingPrice,
-                description: description || 'Pembelian produk'
-            }};
-
-            // Tampilkan konfirmasi
-            const productName = purchaseDefaultPrices[productType] ? purchaseDefaultPrices[productType].name : 'Produk';
-
-            const confirmMessage = 'Konfirmasi Pembelian:\\n\\n' +
-                                'Produk: ' + productName + '\\n' +
-                                'Quantity: ' + quantity + ' unit\\n' +
-                                'Harga Beli: Rp ' + purchasePrice.toLocaleString() + ' per unit\\n' +
-                                'Metode: ' + (paymentMethod === 'tunai' ? 'Tunai' : 'Kredit') + '\\n\\n' +
-                                'Total Pembelian: Rp ' + totalPurchase.toLocaleString() + '\\n\\n' +
-                                'Buat jurnal pembelian?';
-
-            if (!confirm(confirmMessage)) {{
-                return;
-            }}
-
-            // Tampilkan loading
-            const button = event.target;
-            const originalText = button.innerHTML;
-            button.innerHTML = '<div class="loading"></div> Memproses...';
-            button.disabled = true;
-
-            // Kirim data ke server
-            fetch('/seller/add_purchase_journal', {{
-                method: 'POST',
-                headers: {{
-                    'Content-Type': 'application/json',
-                }},
-                body: JSON.stringify(data)
-            }})
-            .then(response => response.json())
-            .then(result => {{
-                console.log("✅ Response dari server:", result);
-                if (result.success) {{
-                    alert('✅ ' + result.message);
-                    setTimeout(() => location.reload(), 1500);
-                }} else {{
-                    alert('❌ ' + result.message);
-                    button.innerHTML = originalText;
-                    button.disabled = false;
-                }}
-            }})
-            .catch(error => {{
-                console.error("❌ Error:", error);
-                alert('❌ Terjadi error: ' + error);
-                button.innerHTML = originalText;
-                button.disabled = false;
-            }});
-        }}
-
-        // Event delegation untuk form penjualan sederhana
-        document.addEventListener('change', function(e) {{
-            // Handle product type change
-            if (e.target && e.target.id === 'product_type') {{
-                fillDefaultPrices();
-            }}
-        }});
-
-        document.addEventListener('input', function(e) {{
-            // Handle quantity and price changes
-            if (e.target && (e.target.id === 'quantity' || e.target.id === 'selling_price' || e.target.id === 'cost_price')) {{
-                calculateTotals();
-            }}
-        }});
-
-        function showSuccessModalCOD(orderNumber, totalAmount) {{
-            const modalContent = `
-                <div class="modal-content">
-                    <span class="close" onclick="closeModal('successModal')">&times;</span>
-                    <div style="text-align: center;">
-                        <div style="width: 80px; height: 80px; background: linear-gradient(135deg, var(--success) 0%, var(--teal) 100%); border-radius: 50%; display: flex; align-items: center; justify-content: center; margin: 0 auto 1.5rem;">
-                            <i class="fas fa-check" style="color: white; font-size: 2rem;"></i>
-                        </div>
-                        <h2 style="margin-bottom: 1rem; color: var(--success);">Pesanan COD Berhasil!</h2>
-                        <p style="margin-bottom: 1rem; color: var(--dark);">
-                            Pesanan COD Anda telah berhasil dibuat dan sedang diproses.
-                        </p>
-                        <p style="color: var(--dark); opacity: 0.7; font-size: 0.9rem; margin-bottom: 2rem;">
-                            Order #: <strong>${{orderNumber}}</strong><br>
-                            Total: <strong>Rp ${{totalAmount.toLocaleString()}}</strong><br>
-                            Bayar ketika pesanan diterima
-                        </p>
-                    </div>
-
-                    <div class="modal-buttons">
-                        <button class="btn btn-success" onclick="closeModal('successModal'); window.location.href='/orders';" style="width: 100%;">
-                            <i class="fas fa-list"></i>
-                            Lihat Pesanan Saya
-                        </button>
-                        <button class="btn btn-primary" onclick="contactSellerCOD('${{orderNumber}}', ${{totalAmount}})" style="width: 100%;">
-                            <i class="fab fa-whatsapp"></i>
-                            Konfirmasi ke Penjual
-                        </button>
-                    </div>
-                </div>
-            `;
-
-            // Create or update modal
-            let modal = document.getElementById('successModal');
-            if (!modal) {{
-                modal = document.createElement('div');
-                modal.id = 'successModal';
-                modal.className = 'modal';
-                document.body.appendChild(modal);
-            }}
-            modal.innerHTML = modalContent;
-            modal.style.display = 'block';
-        }}
-
-        function contactSellerCOD() {{
-            const orderNumber = window.currentOrderNumber;
-            const totalAmount = window.currentTotalAmount;
-
-            const message = "Hai kak 👋, saya sudah melakukan pemesanan COD ya.\\n\\n" +
-                            "🧾 Detail Pesanan:\\n" +
-                            "• Order ID: #" + orderNumber + "\\n" +
-                            "• Total Pembayaran: Rp " + totalAmount.toLocaleString() + "\\n" +
-                            "• Metode: Cash on Delivery (COD)\\n\\n" +
-                            "Mohon dipersiapkan pesanannya ya kak 🙏😊\\n" +
-                            "Terima kasih!";
-
-            const phone = '+6285876127696';
-            const url = 'https://wa.me/' + phone + '?text=' + encodeURIComponent(message);
-            window.open(url, '_blank');
-        }}
-
-
-        function showPaymentModal(orderNumber, paymentMethod, totalAmount) {{
-            const paymentInstructions = {{
-                'qris': `
-                    <h4 style="margin-bottom: 1rem; color: var(--primary); text-align: center;">
-                        <i class="fas fa-qrcode"></i> PEMBAYARAN QRIS
-                    </h4>
-                    <div style="text-align: center; margin: 1rem 0;">
-                        <img src="/static/uploads/assets/qris_code.jpg"
-                             alt="QRIS Code Kang-Mas Shop"
-                             style="max-width: 300px; width: 100%; height: auto; border-radius: var(--border-radius); border: 3px solid var(--primary); box-shadow: var(--shadow-lg);">
-                    </div>
-
-                    <div style="background: rgba(56, 161, 105, 0.1); padding: 1.5rem; border-radius: var(--border-radius); margin: 1.5rem 0; text-align: center;">
-                        <h5 style="color: var(--success); margin-bottom: 0.5rem;">TOTAL PEMBAYARAN</h5>
-                        <div style="font-size: 1.5rem; font-weight: bold; color: var(--success);">
-                            Rp ${{totalAmount.toLocaleString()}}
-                        </div>
-                    </div>
-                `,
-                'bri': `
-                    <h4 style="margin-bottom: 1rem; color: var(--primary); text-align: center;">
-                        <i class="fas fa-university"></i> TRANSFER BANK BRI
-                    </h4>
-                    <div style="background: white; padding: 1.5rem; border-radius: var(--border-radius); border-left: 4px solid var(--primary); text-align: center;">
-                        <p style="margin: 0.75rem 0; font-size: 1.1rem;">
-                            <strong>No. Rekening:</strong><br>
-                            <span style="color: var(--primary); font-weight: bold; font-size: 1.3rem;">1234 5678 9012</span>
-                        </p>
-                        <p style="margin: 0.75rem 0; font-size: 1.1rem;">
-                            <strong>Atas Nama:</strong><br>
-                            <span style="color: var(--dark); font-weight: bold;">KANG-MAS SHOP</span>
-                        </p>
-                        <div style="margin: 1.5rem 0; padding: 1rem; background: rgba(56, 161, 105, 0.1); border-radius: var(--border-radius);">
-                            <p style="margin: 0; color: var(--success); font-weight: bold; font-size: 1.2rem;">
-                                TOTAL: Rp ${{totalAmount.toLocaleString()}}
-                            </p>
-                        </div>
-                    </div>
-                `,
-                'bca': `
-                    <h4 style="margin-bottom: 1rem; color: var(--primary); text-align: center;">
-                        <i class="fas fa-university"></i> TRANSFER BANK BCA
-                    </h4>
-                    <div style="background: white; padding: 1.5rem; border-radius: var(--border-radius); border-left: 4px solid var(--primary); text-align: center;">
-                        <p style="margin: 0.75rem 0; font-size: 1.1rem;">
-                            <strong>No. Rekening:</strong><br>
-                            <span style="color: var(--primary); font-weight: bold; font-size: 1.3rem;">9876 5432 1098</span>
-                        </p>
-                        <p style="margin: 0.75rem 0; font-size: 1.1rem;">
-                            <strong>Atas Nama:</strong><br>
-                            <span style="color: var(--dark); font-weight: bold;">KANG-MAS SHOP</span>
-                        </p>
-                        <div style="margin: 1.5rem 0; padding: 1rem; background: rgba(56, 161, 105, 0.1); border-radius: var(--border-radius);">
-                            <p style="margin: 0; color: var(--success); font-weight: bold; font-size: 1.2rem;">
-                                TOTAL: Rp ${{totalAmount.toLocaleString()}}
-                            </p>
-                        </div>
-                    </div>
-                `,
-                'mandiri': `
-                    <h4 style="margin-bottom: 1rem; color: var(--primary); text-align: center;">
-                        <i class="fas fa-university"></i> TRANSFER BANK MANDIRI
-                    </h4>
-                    <div style="background: white; padding: 1.5rem; border-radius: var(--border-radius); border-left: 4px solid var(--primary); text-align: center;">
-                        <p style="margin: 0.75rem 0; font-size: 1.1rem;">
-                            <strong>No. Rekening:</strong><br>
-                            <span style="color: var(--primary); font-weight: bold; font-size: 1.3rem;">1122 3344 5566</span>
-                        </p>
-                        <p style="margin: 0.75rem 0; font-size: 1.1rem;">
-                            <strong>Atas Nama:</strong><br>
-                            <span style="color: var(--dark); font-weight: bold;">KANG-MAS SHOP</span>
-                        </p>
-                        <div style="margin: 1.5rem 0; padding: 1rem; background: rgba(56, 161, 105, 0.1); border-radius: var(--border-radius);">
-                            <p style="margin: 0; color: var(--success); font-weight: bold; font-size: 1.2rem;">
-                                TOTAL: Rp ${{totalAmount.toLocaleString()}}
-                            </p>
-                        </div>
-                    </div>
-                `,
-                'gopay': `
-                    <h4 style="margin-bottom: 1rem; color: var(--primary); text-align: center;">
-                        <i class="fas fa-mobile-alt"></i> GOPAY
-                    </h4>
-                    <div style="background: white; padding: 1.5rem; border-radius: var(--border-radius); border-left: 4px solid #00AA13; text-align: center;">
-                        <p style="margin: 0.75rem 0; font-size: 1.1rem;">
-                            <strong>No. Telepon:</strong><br>
-                            <span style="color: var(--primary); font-weight: bold; font-size: 1.3rem;">+62 896-5473-3875</span>
-                        </p>
-                        <p style="margin: 0.75rem 0; font-size: 1.1rem;">
-                            <strong>Atas Nama:</strong><br>
-                            <span style="color: var(--dark); font-weight: bold;">KANG-MAS SHOP</span>
-                        </p>
-                        <div style="margin: 1.5rem 0; padding: 1rem; background: rgba(56, 161, 105, 0.1); border-radius: var(--border-radius);">
-                            <p style="margin: 0; color: var(--success); font-weight: bold; font-size: 1.2rem;">
-                                TOTAL: Rp ${{totalAmount.toLocaleString()}}
-                            </p>
-                        </div>
-                    </div>
-                `,
-                'dana': `
-                    <h4 style="margin-bottom: 1rem; color: var(--primary); text-align: center;">
-                        <i class="fas fa-wallet"></i> DANA
-                    </h4>
-                    <div style="background: white; padding: 1.5rem; border-radius: var(--border-radius); border-left: 4px solid #00B2FF; text-align: center;">
-                        <p style="margin: 0.75rem 0; font-size: 1.1rem;">
-                            <strong>No. Telepon:</strong><br>
-                            <span style="color: var(--primary); font-weight: bold; font-size: 1.3rem;">+62 896-5473-3875</span>
-                        </p>
-                        <p style="margin: 0.75rem 0; font-size: 1.1rem;">
-                            <strong>Atas Nama:</strong><br>
-                            <span style="color: var(--dark); font-weight: bold;">KANG-MAS SHOP</span>
-                        </p>
-                        <div style="margin: 1.5rem 0; padding: 1rem; background: rgba(56, 161, 105, 0.1); border-radius: var(--border-radius);">
-                            <p style="margin: 0; color: var(--success); font-weight: bold; font-size: 1.2rem;">
-                                TOTAL: Rp ${{totalAmount.toLocaleString()}}
-                            </p>
-                        </div>
-                    </div>
-                `
-            }};
-
-            // Tampilkan instruksi pembayaran
-            document.getElementById('paymentInstructions').innerHTML = paymentInstructions[paymentMethod] || `
-                <div style="text-align: center; padding: 2rem;">
-                    <i class="fas fa-credit-card" style="font-size: 3rem; color: var(--primary); margin-bottom: 1rem;"></i>
-                    <p>Silakan selesaikan pembayaran dengan metode <strong>${{paymentMethod.toUpperCase()}}</strong></p>
-                    <p style="color: var(--success); font-weight: bold; font-size: 1.2rem;">Total: Rp ${{totalAmount.toLocaleString()}}</p>
-                </div>
-            `;
-
-            document.getElementById('paymentModal').style.display = 'block';
-            window.currentOrderNumber = orderNumber;
-            window.currentPaymentMethod = paymentMethod;
-            window.currentTotalAmount = totalAmount;
-        }}
-
-        function showSuccessModal() {{
-            closeModal('paymentModal');
-
-            const modalContent = `
-                <div class="modal-content">
-                    <span class="close" onclick="closeModal('successModal')">&times;</span>
-                    <div style="text-align: center;">
-                        <div style="width: 80px; height: 80px; background: linear-gradient(135deg, var(--success) 0%, var(--teal) 100%); border-radius: 50%; display: flex; align-items: center; justify-content: center; margin: 0 auto 1.5rem;">
-                            <i class="fas fa-check" style="color: white; font-size: 2rem;"></i>
-                        </div>
-                        <h2 style="margin-bottom: 1rem; color: var(--success);">Sukses!</h2>
-                        <p style="margin-bottom: 1rem; color: var(--dark);">Pembayaran berhasil dikonfirmasi</p>
-                        <p style="color: var(--dark); opacity: 0.7; font-size: 0.9rem; margin-bottom: 2rem;">
-                            Pesanan Anda sedang diproses dan akan segera dikirim
-                        </p>
-                    </div>
-
-                    <div class="modal-buttons">
-                        <button class="btn btn-success" onclick="closeModal('successModal'); window.location.href='/orders';" style="width: 100%;">
-                            <i class="fas fa-list"></i>
-                            Lihat Pesanan Saya
-                        </button>
-                        <button class="btn btn-primary" onclick="contactSeller()" style="width: 100%;">
-                            <i class="fab fa-whatsapp"></i>
-                            Hubungi Penjual
-                        </button>
-                    </div>
-                </div>
-            `;
-
-            let modal = document.getElementById('successModal');
-            if (!modal) {{
-                modal = document.createElement('div');
-                modal.id = 'successModal';
-                modal.className = 'modal';
-                document.body.appendChild(modal);
-            }}
-            modal.innerHTML = modalContent;
-            modal.style.display = 'block';
-
-            confirmPayment();
-        }}
-
-        function closeModal(modalId) {{
-            document.getElementById(modalId).style.display = 'none';
-        }}
-
-        function contactSeller() {{
-            // Pilih template chat sesuai metode pembayaran
-            if (window.currentPaymentMethod === 'cod') {{
-                contactSellerCOD();
-            }} else {{
-                contactSellerNonCOD();
-            }}
-        }}
-
-        function contactSellerNonCOD() {{
-            const orderNumber = window.currentOrderNumber;
-            const totalAmount = window.currentTotalAmount;
-
-            const message = "Hai kak 👋, saya sudah melakukan pembayaran untuk pesanan saya.\\n\\n" +
-                            "🧾 Detail Pesanan:\\n" +
-                            "• Order ID: #" + orderNumber + "\\n" +
-                            "• Total Pembayaran: Rp " + totalAmount.toLocaleString() + "\\n" +
-                            "• Metode Pembayaran: Non-COD\\n\\n" +
-                            "Mohon bantu konfirmasi pembayarannya ya kak 🙏😊\\n" +
-                            "Terima kasih!";
-
-            const phone = '+6285876127696';
-            const url = 'https://wa.me/' + phone + '?text=' + encodeURIComponent(message);
-            window.open(url, '_blank');
-        }}
-
-        function confirmPayment() {{
-            fetch('/confirm_payment/' + window.currentOrderNumber, {{
-                method: 'POST'
-            }})
-            .then(response => response.json())
-            .then(data => {{
-                if (data.success) {{
-                    console.log('Payment confirmed successfully');
-                }}
-            }});
-        }}
-
-        function updateCartCount() {{
-            fetch('/api/cart/count')
-                .then(response => response.json())
-                .then(data => {{
-                    const cartBadge = document.getElementById('cart-count');
-                    const cartFab = document.getElementById('cart-count-fab');
-
-                    if (cartBadge) {{
-                        cartBadge.textContent = data.count;
-                        cartBadge.style.display = data.count > 0 ? 'flex' : 'none';
-                    }}
-
-                    if (cartFab) {{
-                        cartFab.textContent = data.count;
-                        cartFab.style.display = data.count > 0 ? 'flex' : 'none';
-                    }}
-                }});
-        }}
-
-        function resetBalances() {{
-            const confirmMessage = '⚠️ PERINGATAN: RESET SALDO AWAL\\n\\n' +
-                                 'Tindakan ini akan:\\n' +
-                                 '1. Mengembalikan SEMUA saldo akun ke nilai default\\n' +
-                                 '2. Mengatur ulang stok produk ke nilai awal\\n' +
-                                 '3. TIDAK menghapus transaksi jurnal yang sudah ada\\n' +
-                                 '4. Membutuhkan penyesuaian manual setelah reset\\n\\n' +
-                                 'Apakah Anda yakin ingin mereset semua saldo ke default?';
-            
-            if (!confirm(confirmMessage)) {{
-                return;
-            }}
-            
-            // Tampilkan konfirmasi kedua
-            const secondConfirm = '🔄 KONFIRMASI AKHIR\\n\\n' +
-                                'Reset saldo akan:\\n\\n' +
-                                'Lanjutkan reset?';
-            
-            if (!confirm(secondConfirm)) {{
-                return;
-            }}
-            
-            const button = event.target;
-            const originalText = button.innerHTML;
-
-            button.innerHTML = '<div class="loading"></div> Resetting...';
-            button.disabled = true;
-
-            fetch('/seller/reset_balances', {{
-                method: 'POST',
-                headers: {{
-                    'Content-Type': 'application/json',
-                }},
-                body: JSON.stringify({{ confirm: true }})
-            }})
-            .then(response => response.json())
-            .then(data => {{
-                if (data.success) {{
-                    showNotification('✅ ' + data.message, 'success');
-                    setTimeout(() => location.reload(), 2000);
-                }} else if (data.requires_confirm) {{
-                    // Jika butuh konfirmasi, tampilkan modal konfirmasi
-                    showResetConfirmationModal();
-                }} else {{
-                    showNotification('❌ ' + data.message, 'error');
-                }}
-            }})
-            .catch(error => {{
-                showNotification('❌ Terjadi error saat reset saldo', 'error');
-            }})
-            .finally(() => {{
-                setTimeout(() => {{
-                    button.innerHTML = originalText;
-                    button.disabled = false;
-                }}, 2000);
-            }});
-        }}
-
-        // Fungsi untuk menampilkan modal konfirmasi reset
-        function showResetConfirmationModal() {{
-            const modalContent = `
-                <div class="modal-content">
-                    <span class="close" onclick="closeModal('resetConfirmModal')">&times;</span>
-                    <div style="text-align: center;">
-                        <div style="width: 80px; height: 80px; background: linear-gradient(135deg, var(--warning) 0%, #b7791f 100%); border-radius: 50%; display: flex; align-items: center; justify-content: center; margin: 0 auto 1.5rem;">
-                            <i class="fas fa-exclamation-triangle" style="color: white; font-size: 2rem;"></i>
-                        </div>
-                        <h2 style="margin-bottom: 1rem; color: var(--warning);">Konfirmasi Reset</h2>
-                        <p style="margin-bottom: 1rem; color: var(--dark);">
-                            Reset saldo akan mengembalikan semua nilai ke default sistem.
-                        </p>
-                        <div style="text-align: left; background: rgba(229, 62, 62, 0.1); padding: 1rem; border-radius: var(--border-radius); margin: 1rem 0;">
-                            <p style="margin: 0.5rem 0; font-weight: bold; color: var(--error);">
-                                <i class="fas fa-bomb"></i> PERINGATAN:
-                            </p>
-                            <ul style="margin: 0.5rem 0; padding-left: 1.2rem; color: var(--error); font-size: 0.9rem;">
-                                <li>Semua saldo akun akan diubah</li>
-                                <li>Stok produk akan disesuaikan</li>
-                                <li>Transaksi yang sudah ada TIDAK akan dihapus</li>
-                                <li>Pastikan sudah backup data penting</li>
-                            </ul>
-                        </div>
-                        <p style="color: var(--dark); opacity: 0.7; font-size: 0.9rem; margin-bottom: 2rem;">
-                            Masukkan kata "RESET" untuk mengkonfirmasi:
-                        </p>
-                        <input type="text" id="resetConfirmInput" class="form-control" 
-                               placeholder="Ketik RESET di sini" style="margin-bottom: 1rem;">
-                    </div>
-
-                    <div class="modal-buttons">
-                        <button class="btn btn-danger" onclick="confirmReset()" 
-                                style="width: 100%;" id="confirmResetBtn" disabled>
-                            <i class="fas fa-bomb"></i>
-                            Konfirmasi Reset
-                        </button>
-                    </div>
-                </div>
-            `;
-
-            // Create modal
-            let modal = document.createElement('div');
-            modal.id = 'resetConfirmModal';
-            modal.className = 'modal';
-            modal.innerHTML = modalContent;
-            document.body.appendChild(modal);
-            modal.style.display = 'block';
-
-            // Add input validation
-            document.getElementById('resetConfirmInput').addEventListener('input', function() {{
-                const confirmBtn = document.getElementById('confirmResetBtn');
-                confirmBtn.disabled = this.value.toUpperCase() !== 'RESET';
-            }});
-        }}
-
-        function confirmReset() {{
-            const button = document.getElementById('confirmResetBtn');
-            const originalText = button.innerHTML;
-
-            button.innerHTML = '<div class="loading"></div> Resetting...';
-            button.disabled = true;
-
-            fetch('/seller/reset_balances', {{
-                method: 'POST',
-                headers: {{
-                    'Content-Type': 'application/json',
-                }},
-                body: JSON.stringify({{ confirm: true }})
-            }})
-            .then(response => response.json())
-            .then(data => {{
-                if (data.success) {{
-                    closeModal('resetConfirmModal');
-                    showNotification('✅ ' + data.message, 'success');
-                    setTimeout(() => location.reload(), 1500);
-                }} else {{
-                    showNotification('❌ ' + data.message, 'error');
-                    button.innerHTML = originalText;
-                    button.disabled = false;
-                }}
-            }})
-            .catch(error => {{
-                showNotification('❌ Terjadi error saat reset saldo', 'error');
-                button.innerHTML = originalText;
-                button.disabled = false;
-            }});
-        }}
-
-        function updateTracking(orderId, status) {{
-            fetch('/update_tracking/' + orderId, {{
-                method: 'POST',
-                headers: {{
-                    'Content-Type': 'application/json',
-                }},
-                body: JSON.stringify({{
-                    status: status,
-                    tracking_info: document.getElementById('tracking-info-' + orderId).value
-                }})
-            }})
-            .then(response => response.json())
-            .then(data => {{
-                if (data.success) {{
-                    showNotification('✅ Status pengiriman diperbarui!', 'success');
-                    setTimeout(() => location.reload(), 1000);
-                }} else {{
-                    showNotification('❌ ' + data.message, 'error');
-                }}
-            }});
-        }}
-
-        function loadTransactionTemplate() {{
-            const templateKey = document.getElementById('transaction_template').value;
-            if (!templateKey) return;
-
-            // === PENJUALAN SEDERHANA ===
-            if (templateKey === 'penjualan_sederhana') {{
-                fetch('/api/get_sales_form')
-                    .then(response => response.json())
-                    .then(data => {{
-                        if (data.success) {{
-                            const formContainer = document.getElementById('templateFormContainer');
-                            formContainer.innerHTML = data.form_html;
-                        }} else {{
-                            showNotification('❌ ' + data.message, 'error');
-                        }}
-                    }});
-                return;
-            }}
-
-            // === PEMBELIAN SEDERHANA ===
-            if (templateKey === 'pembelian_sederhana') {{
-                fetch('/api/get_purchase_form')
-                    .then(response => response.json())
-                    .then(data => {{
-                        if (data.success) {{
-                            const formContainer = document.getElementById('templateFormContainer');
-                            formContainer.innerHTML = data.form_html;
-                        }} else {{
-                            showNotification('❌ ' + data.message, 'error');
-                        }}
-                    }});
-                return;
-            }}
-
-            // === TEMPLATE LAINNYA ===
-            fetch('/api/get_transaction_template/' + templateKey)
-                .then(response => response.json())
-                .then(data => {{
-                    if (data.success) {{
-                        const formContainer = document.getElementById('templateFormContainer');
-                        formContainer.innerHTML = data.form_html;
-
-                        // Nonaktifkan formatting untuk input number
-                        document.querySelectorAll('#templateFormContainer input[type="number"]').forEach(input => {{
-                            // Biarkan input number bekerja normal
-                            input.addEventListener('input', function() {{
-                                // Hanya izinkan angka
-                                this.value = this.value.replace(/[^\\d]/g, '');
-                            }});
-                        }});
-                    }} else {{
-                        showNotification('❌ ' + data.message, 'error');
-                    }}
-                }});
-        }}
-
-        function submitTemplateJournal() {{
-            const formData = new FormData(document.getElementById('templateJournalForm'));
-            const data = {{
-                template_key: formData.get('template_key'),
-                date: formData.get('date'),
-                amounts: {{}},
-                inputs: {{}}  // Tambah inputs
-            }};
-
-            // Collect amounts from form
-            document.querySelectorAll('[id^=\"amount_\"]').forEach(input => {{
-                const accountType = input.id.replace('amount_', '');
-                data.amounts[accountType] = parseInt(input.value) || 0;
-            }});
-
-            // Collect inputs (quantity, unit_cost, dll)
-            document.querySelectorAll('[id^=\"input_\"]').forEach(input => {{
-                const inputName = input.id.replace('input_', '');
-                data.inputs[inputName] = parseInt(input.value) || 0;
-            }});
-
-            // Validasi untuk template kerugian
-            const templateKey = data.template_key;
-            if (templateKey.includes('kerugian') || templateKey.includes('hibah')) {{
-                if (!data.inputs.quantity || data.inputs.quantity <= 0) {{
-                    showNotification('❌ Harap isi jumlah bibit yang mati/diberikan!', 'error');
-                    return;
-                }}
-                if (!data.inputs.unit_cost || data.inputs.unit_cost <= 0) {{
-                    showNotification('❌ Harap isi harga cost per unit!', 'error');
-                    return;
-                }}
-            }}
-
-            fetch('/seller/add_template_journal', {{
-                method: 'POST',
-                headers: {{
-                    'Content-Type': 'application/json',
-                }},
-                body: JSON.stringify(data)
-            }})
-            .then(response => response.json())
-            .then(data => {{
-                if (data.success) {{
-                    showNotification('✅ ' + data.message, 'success');
-                    setTimeout(() => location.reload(), 1000);
-                }} else {{
-                    showNotification('❌ ' + data.message, 'error');
-                }}
-            }});
-        }}
-
-        function deleteJournal(journalId) {{
-            if (!confirm('Yakin ingin menghapus jurnal ini?')) {{
-                return;
-            }}
-
-            const buttons = document.querySelectorAll('button[onclick="deleteJournal(' + journalId + ')"]');
-            let button = null;
-            let originalHtml = '';
-
-            if (buttons.length > 0) {{
-                button = buttons[0];
-                originalHtml = button.innerHTML;
-                button.innerHTML = '<div class="loading"></div>';
-                button.disabled = true;
-            }}
-
-            // 🔴 TADI: '/seller/delete_journal/' + journalId
-            // ✅ SEKARANG: pake route yang bener di Flask
-            fetch('/accounting/journal/' + journalId + '/delete', {{
-                method: 'POST',
-                headers: {{
-                    'X-Requested-With': 'XMLHttpRequest'
-                }}
-            }})
-            .then(response => response.json())
-            .then(data => {{
-                if (data.success || data.status === 'success') {{
-                    showNotification('✅ Jurnal berhasil dihapus', 'success');
-                    setTimeout(() => location.reload(), 800);
-                }} else {{
-                    showNotification('❌ ' + (data.message || 'Gagal menghapus jurnal'), 'error');
-                    if (button) {{
-                        button.innerHTML = originalHtml;
-                        button.disabled = false;
-                    }}
-                }}
-            }})
-            .catch(err => {{
-                console.error(err);
-                showNotification('❌ Terjadi error saat menghapus jurnal', 'error');
-                if (button) {{
-                    button.innerHTML = originalHtml;
-                    button.disabled = false;
-                }}
-            }});
-        }}
-
-        // Jurnal Penyesuaian Functions
-        function loadAdjustmentTemplate() {{
-            const templateKey = document.getElementById('adjustment_template').value;
-            if (!templateKey) return;
-
-            fetch('/api/get_adjustment_template/' + templateKey)
-                .then(response => response.json())
-                .then(data => {{
-                    if (data.success) {{
-                        const formContainer = document.getElementById('adjustmentFormContainer');
-                        formContainer.innerHTML = data.form_html;
-
-                        // Add auto-format untuk input number
-                        document.querySelectorAll('#adjustmentFormContainer input[type=\"number\"]').forEach(input => {{
-                            input.addEventListener('input', function() {{
-                                formatNumberInput(this);
-                            }});
-
-                            input.addEventListener('blur', function() {{
-                                formatNumberInput(this);
-                            }});
-
-                            input.addEventListener('focus', function() {{
-                                this.value = this.value.replace(/[^\\d]/g, '');
-                            }});
-                        }});
-                    }} else {{
-                        showNotification('❌ ' + data.message, 'error');
-                    }}
-                }});
-        }}
-
-        function submitAdjustmentJournal() {{
-            const formData = new FormData(document.getElementById('adjustmentJournalForm'));
-            const data = {{
-                template_key: formData.get('template_key'),
-                date: formData.get('date'),
-                inputs: {{}}
-            }};
-
-            // Collect inputs from form dengan format number
-            document.querySelectorAll('[id^=\"input_\"]').forEach(input => {{
-                const inputName = input.id.replace('input_', '');
-                data.inputs[inputName] = parseFormattedNumber(input.value);
-            }});
-
-            fetch('/seller/add_adjustment_journal', {{
-                method: 'POST',
-                headers: {{
-                    'Content-Type': 'application/json',
-                }},
-                body: JSON.stringify(data)
-            }})
-            .then(response => response.json())
-            .then(data => {{
-                if (data.success) {{
-                    showNotification('✅ ' + data.message, 'success');
-                    setTimeout(() => location.reload(), 1000);
-                }} else {{
-                    showNotification('❌ ' + data.message, 'error');
-                }}
-            }});
-        }}
-
-        // Jurnal Penutup Functions
-        function createClosingEntries() {{
-            // Tampilkan konfirmasi detail
-            const confirmMessage = 'APAKAH ANDA YAKIN INGIN MEMBUAT JURNAL PENUTUP?\\n\\n' +
-                                'Jurnal penutup akan:\\n' +
-                                '1. Menutup semua akun pendapatan ke 0\\n' +
-                                '2. Menutup semua akun beban ke 0\\n' +
-                                '3. Menghitung laba/rugi bersih\\n' +
-                                '4. Memindahkan laba/rugi ke akun Modal\\n' +
-                                '5. Menutup akun Prive (jika ada)\\n\\n' +
-                                'Proses ini TIDAK DAPAT DIBATALKAN!\\n\\n' +
-                                'Lanjutkan membuat jurnal penutup?';
-
-            if (!confirm(confirmMessage)) {{
-                return;
-            }}
-
-            const button = event.target;
-            const originalText = button.innerHTML;
-
-            button.innerHTML = '<div class=\"loading\"></div> Membuat Jurnal Penutup...';
-            button.disabled = true;
-
-            fetch('/seller/create_closing_entries', {{
-                method: 'POST'
-            }})
-            .then(response => response.json())
-            .then(data => {{
-                if (data.success) {{
-                    showNotification('✅ ' + data.message, 'success');
-                    
-                    // 🔄 TAMPILKAN TAB JURNAL PENUTUP SETELAH BERHASIL
-                    setTimeout(() => {{
-                        // Aktifkan tab Jurnal Penutup
-                        const closingTab = document.querySelector('[onclick*=\"jurnal-penutup\"]');
-                        if (closingTab) {{
-                            closingTab.click();
-                        }}
-                        
-                        // Refresh konten tab Jurnal Penutup
-                        refreshClosingTabContent();
-                        
-                        button.innerHTML = originalText;
-                        button.disabled = false;
-                    }}, 1500);
-                }} else {{
-                    showNotification('❌ ' + data.message, 'error');
-                    button.innerHTML = originalText;
-                    button.disabled = false;
-                }}
-            }})
-            .catch(error => {{
-                showNotification('❌ Terjadi error saat membuat jurnal penutup', 'error');
-                button.innerHTML = originalText;
-                button.disabled = false;
-            }});
-        }}
-
-        // Fungsi untuk refresh konten tab Jurnal Penutup
-        function refreshClosingTabContent() {{
-            // Ambil tab content untuk Jurnal Penutup
-            const closingTabContent = document.getElementById('jurnal-penutup');
-            if (!closingTabContent) return;
-
-            // Tampilkan loading
-            closingTabContent.innerHTML = '<div style=\"text-align: center; padding: 2rem;\"><div class=\"loading\"></div> Memuat ulang data jurnal penutup...</div>';
-
-            // Ambil data terbaru dari server
-            fetch('/api/get_closing_entries_html')
-            .then(response => response.text())
-            .then(html => {{
-                // Ganti konten tab dengan data terbaru
-                closingTabContent.innerHTML = html;
-                console.log('✅ Tab Jurnal Penutup di-refresh');
-            }})
-            .catch(error => {{
-                console.error('Error refreshing closing tab:', error);
-                closingTabContent.innerHTML = '<div class=\"card\"><p>Error loading closing entries</p></div>';
-            }});
-        }}
-
-        // Number Formatting Functions - DISABLED untuk input number
-        function formatNumberInput(input) {{
-            // NONAKTIFKAN FORMATTING - biarkan input number seperti biasa
-            // Hanya hapus karakter non-digit
-            let value = input.value.replace(/[^\\d]/g, '');
-            input.value = value; // Simpan nilai tanpa formatting
-        }}
-
-        function parseFormattedNumber(formattedValue) {{
-            return parseInt(formattedValue.replace(/[^\\d]/g, '')) || 0;
-        }}
-
-        // Initialize when DOM is loaded
-        document.addEventListener('DOMContentLoaded', function() {{
-            updateCartCount();
-
-            // Activate first tab by default
-            const firstTab = document.querySelector('.tab');
-            const firstTabContent = document.querySelector('.tab-content');
-            if (firstTab && firstTabContent) {{
-                firstTab.classList.add('active');
-                firstTabContent.classList.add('active');
-            }}
-
-            // FIX: Remove auto-format untuk input number di form produk
-            // Biarkan input number seperti biasa tanpa formatting
-            document.querySelectorAll('input[type=\"number\"]').forEach(input => {{
-                // Hapus event listener yang mengganggu
-                input.removeEventListener('input', formatNumberInput);
-                input.removeEventListener('blur', formatNumberInput);
-                input.removeEventListener('focus', formatNumberInput);
-
-                // Set nilai asli dari value attribute
-                if (input.value) {{
-                    input.value = input.value.replace(/\\./g, ''); // Hapus titik yang ada
-                }}
-            }});
-
-            // Auto-hide flash messages after 5 seconds
-            setTimeout(() => {{
-                const flashMessages = document.querySelector('.flash-messages');
-                if (flashMessages) {{
-                    flashMessages.style.display = 'none';
-                }}
-            }}, 5000);
-
-            // Close modal when clicking outside
-            window.onclick = function(event) {{
-                const modals = document.getElementsByClassName('modal');
-                for (let modal of modals) {{
-                    if (event.target == modal) {{
-                        modal.style.display = 'none';
-                    }}
-                }}
-            }}
-
-            // Add smooth scrolling
-            document.querySelectorAll('a[href^=\"#\"]').forEach(anchor => {{
-                anchor.addEventListener('click', function (e) {{
-                    e.preventDefault();
-                    document.querySelector(this.getAttribute('href')).scrollIntoView({{
-                        behavior: 'smooth'
-                    }});
-                }});
-            }});
-        }});
-    </script>
-</body>
-</html>
-'''
-
-def get_navigation():
-    if current_user.is_authenticated:
-        user_badge = f"""
-            <div class="user-menu">
-                <div class="avatar">{current_user.avatar}</div>
-                <div>
-                    <div style="font-weight: 600; font-size: 0.95rem;">{current_user.full_name}</div>
-                    <div class="badge">
-                        {current_user.user_type.upper()}
-                    </div>
-                </div>
-            </div>
-        """
-
-        nav_links = []
+        nav_links = []
 
         if current_user.user_type == 'seller':
             nav_links.extend([
@@ -5694,77 +5294,119 @@ def get_account_options():
         options += f'<option value="{account.id}">{account.code} - {account.name}</option>'
     return options
 
-def get_trial_balance_before_adjustment():
-    """Neraca saldo sebelum penyesuaian - MENGGUNAKAN SALDO AWAL REAL dari database"""
-    try:
-        accounts = Account.query.order_by(Account.code).all()
-        trial_balance_html = ""
-        total_debit = total_credit = 0
-
-        for account in accounts:
-            # ✅✅✅ PERBAIKAN: HITUNG SALDO SEBELUM PENYESUAIAN DARI DATABASE
-            
-            # Langkah 1: Mulai dari saldo awal di database
-            saldo_awal_murni = account.balance  # Saldo awal dari form edit
-            
-            # Langkah 2: KURANGI efek dari jurnal penyesuaian (karena ini "sebelum" penyesuaian)
-            adjustment_details = JournalDetail.query.join(JournalEntry).filter(
-                JournalDetail.account_id == account.id,
-                JournalEntry.journal_type == 'adjustment'
-            ).all()
-            
-            efek_penyesuaian = 0
-            for detail in adjustment_details:
-                if account.category in ['asset', 'expense']:
-                    # Asset/Expense: Debit menambah, Credit mengurangi
-                    efek_penyesuaian += detail.debit - detail.credit
-                else:
-                    # Liability/Equity/Revenue: Credit menambah, Debit mengurangi
-                    efek_penyesuaian += detail.credit - detail.debit
-            
-            # Saldo sebelum penyesuaian = Saldo sekarang - efek penyesuaian
-            saldo_sebelum_penyesuaian = saldo_awal_murni - efek_penyesuaian
-            
-            # Skip akun yang saldo 0
-            if abs(saldo_sebelum_penyesuaian) < 0.01:  # Toleransi kecil
+# ===== ENGINE NERACA SALDO =====
+def split_trial_balance_amount(category, amount):
+    """Posisi saldo akun di neraca saldo: (debit, kredit)"""
+    if category in ['asset', 'expense']:
+        return (amount, 0) if amount >= 0 else (0, abs(amount))
+    return (0, amount) if amount >= 0 else (abs(amount), 0)
+
+def compute_trial_balance(as_of=None):
+    """Hitung neraca saldo sebelum penyesuaian, penyesuaian dan setelah penyesuaian.
+
+    Semua akun dihitung dari SATU query GROUP BY account_id, journal_type atas
+    snapshot saldo. Return dict {'rows': [...], 'totals': {...}} yang dipakai
+    oleh semua tampilan neraca saldo. Jika as_of diisi, jurnal setelah tanggal
+    tersebut dikeluarkan dari semua kolom.
+    """
+    grouped = db.session.query(
+        Account,
+        AccountBalanceSnapshot.journal_type,
+        db.func.sum(AccountBalanceSnapshot.debit_total),
+        db.func.sum(AccountBalanceSnapshot.credit_total)
+    ).outerjoin(
+        AccountBalanceSnapshot, AccountBalanceSnapshot.account_id == Account.id
+    ).group_by(
+        Account.id, AccountBalanceSnapshot.journal_type
+    ).order_by(Account.code).all()
+
+    rows = []
+    rows_by_account = {}
+    for account, journal_type, debit, credit in grouped:
+        row = rows_by_account.get(account.id)
+        if row is None:
+            row = {'account': account, 'adjustment_debit': 0, 'adjustment_credit': 0}
+            rows_by_account[account.id] = row
+            rows.append(row)
+        if journal_type == 'adjustment':
+            row['adjustment_debit'] += debit or 0
+            row['adjustment_credit'] += credit or 0
+
+    # Jurnal setelah tanggal as_of (jika ada) tidak ikut dihitung
+    effects_after = {}
+    if as_of:
+        for (account_id, journal_type), (debit, credit) in get_journal_totals_after(as_of).items():
+            row = rows_by_account.get(account_id)
+            if row is None:
                 continue
-
-            # Tentukan posisi di neraca saldo
-            if account.category in ['asset', 'expense']:
-                if saldo_sebelum_penyesuaian >= 0:
-                    debit = saldo_sebelum_penyesuaian
-                    credit = 0
-                else:
-                    debit = 0
-                    credit = abs(saldo_sebelum_penyesuaian)
-            else:
-                if saldo_sebelum_penyesuaian >= 0:
-                    debit = 0
-                    credit = saldo_sebelum_penyesuaian
-                else:
-                    debit = abs(saldo_sebelum_penyesuaian)
-                    credit = 0
-
-            total_debit += debit
-            total_credit += credit
-
-            trial_balance_html += f'''
+            effects_after[account_id] = effects_after.get(account_id, 0) + get_balance_effect(row['account'].category, debit, credit)
+            if journal_type == 'adjustment':
+                row['adjustment_debit'] -= debit
+                row['adjustment_credit'] -= credit
+
+    totals = {key: 0 for key in [
+        'unadjusted_debit', 'unadjusted_credit',
+        'adjustment_debit', 'adjustment_credit',
+        'adjusted_debit', 'adjusted_credit'
+    ]}
+
+    for row in rows:
+        account = row['account']
+        adjustment_effect = get_balance_effect(account.category, row['adjustment_debit'], row['adjustment_credit'])
+
+        # Saldo setelah penyesuaian = saldo database (sudah termasuk semua jurnal)
+        row['adjusted'] = account.balance - effects_after.get(account.id, 0)
+        row['unadjusted'] = row['adjusted'] - adjustment_effect
+        row['unadjusted_debit'], row['unadjusted_credit'] = split_trial_balance_amount(account.category, row['unadjusted'])
+        row['adjusted_debit'], row['adjusted_credit'] = split_trial_balance_amount(account.category, row['adjusted'])
+
+        for key in totals:
+            totals[key] += row[key]
+
+    return {'rows': rows, 'totals': totals}
+
+def render_trial_balance_rows(rows, column):
+    """Render baris <tr> neraca saldo untuk kolom 'unadjusted' atau 'adjusted'"""
+    parts = []
+    total_debit = total_credit = 0
+
+    for row in rows:
+        debit = row[f'{column}_debit']
+        credit = row[f'{column}_credit']
+        total_debit += debit
+        total_credit += credit
+
+        parts.append(f'''
             <tr>
-                <td>{account.code}</td>
-                <td>{account.name}</td>
+                <td>{row['account'].code}</td>
+                <td>{row['account'].name}</td>
                 <td class="debit">{"Rp {0:,.0f}".format(debit) if debit > 0 else ""}</td>
                 <td class="credit">{"Rp {0:,.0f}".format(credit) if credit > 0 else ""}</td>
             </tr>
-            '''
+            ''')
 
-        is_balanced = abs(total_debit - total_credit) < 0.01  # Toleransi kecil
-
-        trial_balance_html += f'''
+    parts.append(f'''
         <tr style="font-weight: bold; border-top: 2px solid var(--primary); background: rgba(56, 161, 105, 0.1);">
             <td colspan="2">TOTAL</td>
             <td class="debit">Rp {total_debit:,.0f}</td>
             <td class="credit">Rp {total_credit:,.0f}</td>
         </tr>
+        ''')
+
+    return ''.join(parts), total_debit, total_credit
+
+def get_trial_balance_before_adjustment(as_of=None):
+    """Neraca saldo sebelum penyesuaian - MENGGUNAKAN SALDO AWAL REAL dari database"""
+    try:
+        trial_balance = compute_trial_balance(as_of)
+
+        # Skip akun yang saldo 0
+        rows = [row for row in trial_balance['rows'] if row['unadjusted'] != 0]
+        trial_balance_html, total_debit, total_credit = render_trial_balance_rows(rows, 'unadjusted')
+
+        is_balanced = total_debit == total_credit
+
+        trial_balance_html += f'''
         <tr style="background: rgba(56, 161, 105, 0.2);">
             <td colspan="4" style="text-align: center; color: {'var(--success)' if is_balanced else 'var(--error)'}; font-weight: bold;">
                 {'✅ NERACA SALDO SEBELUM PENYESUAIAN SEIMBANG' if is_balanced else '❌ NERACA SALDO SEBELUM PENYESUAIAN TIDAK SEIMBANG'}
@@ -5780,54 +5422,18 @@ def get_trial_balance_before_adjustment():
         traceback.print_exc()
         return '<tr><td colspan="4">Error loading trial balance</td></tr>'
 
-def get_trial_balance_after_adjustment():
+def get_trial_balance_after_adjustment(as_of=None):
     """Neraca saldo setelah penyesuaian = Saldo dari database (sudah termasuk semua jurnal)"""
     try:
-        accounts = Account.query.order_by(Account.code).all()
-        adjusted_trial_balance_html = ""
-        total_debit = total_credit = 0
-
-        # Gunakan saldo terkini dari database (sudah termasuk semua jurnal)
-        for account in accounts:
-            # Skip akun yang saldo 0
-            if account.balance == 0:
-                continue
-
-            if account.category in ['asset', 'expense']:
-                if account.balance >= 0:
-                    debit = account.balance
-                    credit = 0
-                else:
-                    debit = 0
-                    credit = abs(account.balance)
-            else:
-                if account.balance >= 0:
-                    debit = 0
-                    credit = account.balance
-                else:
-                    debit = abs(account.balance)
-                    credit = 0
-
-            total_debit += debit
-            total_credit += credit
+        trial_balance = compute_trial_balance(as_of)
 
-            adjusted_trial_balance_html += f'''
-            <tr>
-                <td>{account.code}</td>
-                <td>{account.name}</td>
-                <td class="debit">{"Rp {0:,.0f}".format(debit) if debit > 0 else ""}</td>
-                <td class="credit">{"Rp {0:,.0f}".format(credit) if credit > 0 else ""}</td>
-            </tr>
-            '''
+        # Skip akun yang saldo 0
+        rows = [row for row in trial_balance['rows'] if row['adjusted'] != 0]
+        adjusted_trial_balance_html, total_debit, total_credit = render_trial_balance_rows(rows, 'adjusted')
 
         is_balanced = total_debit == total_credit
 
         adjusted_trial_balance_html += f'''
-        <tr style="font-weight: bold; border-top: 2px solid var(--primary); background: rgba(56, 161, 105, 0.1);">
-            <td colspan="2">TOTAL</td>
-            <td class="debit">Rp {total_debit:,.0f}</td>
-            <td class="credit">Rp {total_credit:,.0f}</td>
-        </tr>
         <tr style="background: rgba(56, 161, 105, 0.2);">
             <td colspan="4" style="text-align: center; color: {'var(--success)' if is_balanced else 'var(--error)'}; font-weight: bold;">
                 {'✅ NERACA SALDO SETELAH PENYESUAIAN SEIMBANG' if is_balanced else '❌ NERACA SALDO SETELAH PENYESUAIAN TIDAK SEIMBANG'}
@@ -5841,55 +5447,14 @@ def get_trial_balance_after_adjustment():
         print(f"Error generating adjusted trial balance: {e}")
         return '<tr><td colspan="4">Error loading adjusted trial balance</td></tr>'
 
-def get_adjusted_trial_balance():
+def get_adjusted_trial_balance(as_of=None):
     """Generate neraca saldo setelah penyesuaian"""
     try:
-        accounts = Account.query.order_by(Account.code).all()
-        adjusted_trial_balance_html = ""
-        total_debit = total_credit = 0
-
-        # Ambil saldo terkini dari database (setelah penyesuaian)
-        for account in accounts:
-            # Skip akun yang saldo 0
-            if account.balance == 0:
-                continue
-
-            if account.category in ['asset', 'expense']:
-                if account.balance >= 0:
-                    debit = account.balance
-                    credit = 0
-                else:
-                    debit = 0
-                    credit = abs(account.balance)
-            else:
-                if account.balance >= 0:
-                    debit = 0
-                    credit = account.balance
-                else:
-                    debit = abs(account.balance)
-                    credit = 0
-
-            total_debit += debit
-            total_credit += credit
-
-            adjusted_trial_balance_html += f'''
-            <tr>
-                <td>{account.code}</td>
-                <td>{account.name}</td>
-                <td class="debit">{"Rp {0:,.0f}".format(debit) if debit > 0 else ""}</td>
-                <td class="credit">{"Rp {0:,.0f}".format(credit) if credit > 0 else ""}</td>
-            </tr>
-            '''
+        trial_balance = compute_trial_balance(as_of)
 
-        is_balanced = total_debit == total_credit
-
-        adjusted_trial_balance_html += f'''
-        <tr style="font-weight: bold; border-top: 2px solid var(--primary); background: rgba(56, 161, 105, 0.1);">
-            <td colspan="2">TOTAL</td>
-            <td class="debit">Rp {total_debit:,.0f}</td>
-            <td class="credit">Rp {total_credit:,.0f}</td>
-        </tr>
-        '''
+        # Skip akun yang saldo 0
+        rows = [row for row in trial_balance['rows'] if row['adjusted'] != 0]
+        adjusted_trial_balance_html, total_debit, total_credit = render_trial_balance_rows(rows, 'adjusted')
 
         return adjusted_trial_balance_html
 
@@ -5897,92 +5462,134 @@ def get_adjusted_trial_balance():
         print(f"Error generating adjusted trial balance: {e}")
         return '<tr><td colspan="4">Error loading adjusted trial balance</td></tr>'
 
-def get_general_journal_entries():
-    """Tampilkan jurnal umum dengan format baru - DESKRIPSI DI HEADER"""
-    try:
-        journal_entries = JournalEntry.query.filter(
-            JournalEntry.journal_type.in_(['general', 'sales', 'purchase', 'hpp'])
-        ).order_by(JournalEntry.date.desc(), JournalEntry.id.desc()).all()
-
-        if not journal_entries:
-            return '''
-            <div class="card">
-                <h4 style="color: var(--primary);">Belum Ada Jurnal Umum</h4>
-                <p>Belum ada transaksi jurnal yang tercatat.</p>
-            </div>
-            '''
-
-        # HITUNG TOTAL KESELURUHAN
-        total_all_debit = 0
-        total_all_credit = 0
-        
-        for journal in journal_entries:
-            total_all_debit += sum(d.debit for d in journal.journal_details)
-            total_all_credit += sum(d.credit for d in journal.journal_details)
+# ===== DAFTAR JURNAL (KEYSET PAGINATION) =====
+JOURNAL_PAGE_SIZE = 50
+
+JOURNAL_LISTINGS = {
+    'umum': {
+        'journal_types': ['general', 'sales', 'purchase', 'hpp'],
+        'tab_id': 'jurnal-umum',
+        'title': 'Daftar Jurnal Umum',
+        'icon': 'fa-list',
+        'unit': 'transaksi',
+        'total_title': 'TOTAL KESELURUHAN JURNAL UMUM',
+        'total_icon': 'fa-calculator',
+        'total_subtitle': 'Seluruh transaksi jurnal umum yang tercatat',
+        'balance_label': '',
+        'gradient': 'var(--primary) 0%, var(--ocean-deep) 100%',
+        'color': 'var(--primary)',
+        'row_color': '49, 130, 206',
+        'empty_title': 'Belum Ada Jurnal Umum',
+        'empty_text': 'Belum ada transaksi jurnal yang tercatat.',
+    },
+    'penyesuaian': {
+        'journal_types': ['adjustment'],
+        'tab_id': 'jurnal-penyesuaian',
+        'title': 'Daftar Jurnal Penyesuaian',
+        'icon': 'fa-calculator',
+        'unit': 'penyesuaian',
+        'total_title': 'TOTAL KESELURUHAN JURNAL PENYESUAIAN',
+        'total_icon': 'fa-balance-scale',
+        'total_subtitle': 'Seluruh nilai penyesuaian akuntansi',
+        'balance_label': 'Balance: ',
+        'gradient': 'var(--success) 0%, var(--teal) 100%',
+        'color': 'var(--success)',
+        'row_color': '56, 161, 105',
+        'empty_title': 'Belum Ada Jurnal Penyesuaian',
+        'empty_text': 'Gunakan form Jurnal Penyesuaian di atas untuk menambahkan jurnal penyesuaian pertama.',
+    },
+}
 
-        table_html = f'''
-        <div class="card">
-            <h4 style="color: var(--primary); margin-bottom: 1.5rem;">
-                <i class="fas fa-list"></i> Daftar Jurnal Umum
-                <span style="font-size: 0.9rem; color: #6B7280; font-weight: normal; margin-left: 1rem;">
-                    ({len(journal_entries)} transaksi)
-                </span>
-            </h4>
-            
-            <!-- TOTAL KESELURUHAN CARD -->
-            <div style="background: linear-gradient(135deg, var(--primary) 0%, var(--ocean-deep) 100%); color: white; padding: 1.5rem; border-radius: var(--border-radius); margin-bottom: 1.5rem;">
-                <div style="display: flex; justify-content: space-between; align-items: center;">
-                    <div>
-                        <h5 style="margin: 0; color: white;">
-                            <i class="fas fa-calculator"></i> TOTAL KESELURUHAN JURNAL UMUM
-                        </h5>
-                        <p style="margin: 0.5rem 0 0 0; opacity: 0.9; font-size: 0.9rem;">
-                            Seluruh transaksi jurnal umum yang tercatat
-                        </p>
-                    </div>
-                    <div style="text-align: right;">
-                        <div style="display: flex; gap: 2rem;">
-                            <div>
-                                <div style="font-size: 0.9rem; opacity: 0.9;">TOTAL DEBIT</div>
-                                <div style="font-size: 1.5rem; font-weight: bold; color: #A7F3D0;">Rp {total_all_debit:,.0f}</div>
-                            </div>
-                            <div>
-                                <div style="font-size: 0.9rem; opacity: 0.9;">TOTAL KREDIT</div>
-                                <div style="font-size: 1.5rem; font-weight: bold; color: #FECACA;">Rp {total_all_credit:,.0f}</div>
-                            </div>
-                        </div>
-                        <div style="margin-top: 0.5rem; padding: 0.5rem 1rem; background: rgba(255, 255, 255, 0.2); border-radius: var(--border-radius); font-size: 0.9rem;">
-                            {"✅ SELARAS" if total_all_debit == total_all_credit else "⚠️ TIDAK SELARAS"}
-                        </div>
-                    </div>
-                </div>
-            </div>
+JOURNAL_TYPE_LABELS = {
+    'general': 'Umum',
+    'sales': 'Penjualan',
+    'purchase': 'Pembelian',
+    'hpp': 'HPP',
+    'adjustment': 'Penyesuaian',
+}
 
-            <div style="overflow-x: auto;">
-                <table class="table">
-                    <thead>
-                        <tr>
-                            <th>Tanggal</th>
-                            <th>No. Transaksi</th>
-                            <th>Akun</th>
-                            <th>Ref</th>
-                            <th>Debit</th>
-                            <th>Kredit</th>
-                        </tr>
-                    </thead>
-                    <tbody>
-        '''
+def encode_journal_cursor(journal):
+    """Cursor keyset dari jurnal terakhir di halaman: 'ISO-tanggal_id'"""
+    return f"{journal.date.isoformat()}_{journal.id}"
 
-        current_date = None
+def decode_journal_cursor(cursor):
+    """Kebalikan encode_journal_cursor - None jika tidak valid"""
+    try:
+        date_value, journal_id = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(date_value), int(journal_id)
+    except (AttributeError, ValueError):
+        return None
 
-        # LOOP JURNAL
-        for journal in journal_entries:
-            # HEADER PER JURNAL (DI SINI DITAMBAH TOMBOL HAPUS)
-            table_html += f'''
-            <tr style="background: rgba(49, 130, 206, 0.1); font-weight: bold;">
+def get_journal_filters(listing, args):
+    """Filter tanggal/jenis jurnal dari parameter request"""
+    journal_types = listing['journal_types']
+    if args.get('type') in journal_types:
+        journal_types = [args['type']]
+
+    filters = [JournalEntry.journal_type.in_(journal_types)]
+
+    date_from = parse_as_of_date(args.get('date_from'))
+    if date_from:
+        filters.append(JournalEntry.date >= datetime(date_from.year, date_from.month, date_from.day))
+
+    date_to = parse_as_of_date(args.get('date_to'))
+    if date_to:
+        filters.append(JournalEntry.date < datetime(date_to.year, date_to.month, date_to.day) + timedelta(days=1))
+
+    return filters
+
+def get_journal_page(listing, args, page_size=JOURNAL_PAGE_SIZE):
+    """Satu halaman jurnal (terbaru dulu) dengan keyset (date, id) - detail & akun di-load batch.
+
+    Return (journals, next_cursor).
+    """
+    query = JournalEntry.query.filter(*get_journal_filters(listing, args))
+
+    cursor = decode_journal_cursor(args.get('cursor'))
+    if cursor:
+        cursor_date, cursor_id = cursor
+        query = query.filter(db.or_(
+            JournalEntry.date < cursor_date,
+            db.and_(JournalEntry.date == cursor_date, JournalEntry.id < cursor_id)
+        ))
+
+    journals = query.options(
+        selectinload(JournalEntry.journal_details).joinedload(JournalDetail.account)
+    ).order_by(
+        JournalEntry.date.desc(), JournalEntry.id.desc()
+    ).limit(page_size + 1).all()
+
+    next_cursor = None
+    if len(journals) > page_size:
+        journals = journals[:page_size]
+        next_cursor = encode_journal_cursor(journals[-1])
+
+    return journals, next_cursor
+
+def get_journal_totals(listing, args):
+    """Jumlah jurnal dan total debit/kredit dari SATU query agregat"""
+    journal_count, total_debit, total_credit = db.session.query(
+        db.func.count(db.distinct(JournalEntry.id)),
+        db.func.sum(JournalDetail.debit),
+        db.func.sum(JournalDetail.credit)
+    ).select_from(JournalEntry).outerjoin(
+        JournalDetail, JournalDetail.journal_id == JournalEntry.id
+    ).filter(*get_journal_filters(listing, args)).one()
+
+    return journal_count or 0, total_debit or 0, total_credit or 0
+
+def render_journal_rows(listing, journals):
+    """Baris tabel untuk satu halaman jurnal"""
+    row_color = listing['row_color']
+    parts = []
+
+    for journal in journals:
+        # HEADER PER JURNAL (DI SINI DITAMBAH TOMBOL HAPUS)
+        parts.append(f'''
+            <tr style="background: rgba({row_color}, 0.1); font-weight: bold;">
                 <td>{journal.date.strftime('%d/%m/%Y %H:%M')}</td>
                 <td>{journal.transaction_number}</td>
-                <td colspan="3" style="color: var(--primary);">
+                <td colspan="3" style="color: {listing['color']};">
                     {journal.description}
                 </td>
                 <td style="text-align: right;">
@@ -5995,37 +5602,27 @@ def get_general_journal_entries():
                         <i class="fas fa-trash"></i>
                     </button>
                 </td>
-            </tr>
-            '''
-
-            # DETAIL AKUN - TANPA DESKRIPSI LAGI
-            for detail in journal.journal_details:
-                # Tentukan nominal dan kelas
-                if detail.debit > 0:
-                    debit_amount = detail.debit
-                    credit_amount = ""
-                    amount_class = "debit"
-                else:
-                    debit_amount = ""
-                    credit_amount = detail.credit
-                    amount_class = "credit"
-                
-                table_html += f'''
+            </tr>
+            ''')
+
+        # DETAIL AKUN - TANPA DESKRIPSI LAGI
+        total_debit = total_credit = 0
+        for detail in journal.journal_details:
+            total_debit += detail.debit
+            total_credit += detail.credit
+            parts.append(f'''
                 <tr>
-                    <td style="border-left: 3px solid rgba(49, 130, 206, 0.3);"></td>
+                    <td style="border-left: 3px solid rgba({row_color}, 0.3);"></td>
                     <td></td>
                     <td>{detail.account.name}</td>
                     <td>{detail.account.code}</td>
                     <td class="debit">{"Rp {0:,.0f}".format(detail.debit) if detail.debit > 0 else ""}</td>
                     <td class="credit">{"Rp {0:,.0f}".format(detail.credit) if detail.credit > 0 else ""}</td>
                 </tr>
-                '''
+                ''')
 
-            # TOTAL PER JURNAL
-            total_debit = sum(d.debit for d in journal.journal_details)
-            total_credit = sum(d.credit for d in journal.journal_details)
-            
-            table_html += f'''
+        # TOTAL PER JURNAL
+        parts.append(f'''
             <tr style="background: rgba(0,0,0,0.02);">
                 <td colspan="4" style="text-align: right; font-weight: bold; padding: 0.5rem 1rem; border-top: 1px solid rgba(0,0,0,0.1);">
                     Total Jurnal:
@@ -6034,65 +5631,98 @@ def get_general_journal_entries():
                 <td class="credit" style="font-weight: bold; border-top: 1px solid rgba(0,0,0,0.1);">Rp {total_credit:,.0f}</td>
             </tr>
             <tr><td colspan="6" style="height: 1rem; background: transparent;"></td></tr>
-            '''
+            ''')
 
-        table_html += '''
-                    </tbody>
-                </table>
+    return ''.join(parts)
+
+def render_journal_filter_form(kind, listing, args):
+    """Form filter tanggal & jenis jurnal (memuat ulang fragmen tab)"""
+    type_select = ''
+    if len(listing['journal_types']) > 1:
+        options = ''.join(
+            f'<option value="{journal_type}"{" selected" if args.get("type") == journal_type else ""}>{JOURNAL_TYPE_LABELS.get(journal_type, journal_type)}</option>'
+            for journal_type in listing['journal_types']
+        )
+        type_select = f'''
+                <div class="form-group" style="margin: 0;">
+                    <label class="form-label">Jenis</label>
+                    <select name="type" class="form-control">
+                        <option value="">Semua</option>
+                        {options}
+                    </select>
+                </div>'''
+
+    return f'''
+            <form onsubmit="loadTabWithForm('{listing['tab_id']}', this); return false;"
+                  style="display: flex; gap: 0.75rem; align-items: flex-end; flex-wrap: wrap; margin-bottom: 1.5rem;">
+                <div class="form-group" style="margin: 0;">
+                    <label class="form-label">Dari Tanggal</label>
+                    <input type="date" name="date_from" class="form-control" value="{format_date_arg(args.get('date_from'))}">
+                </div>
+                <div class="form-group" style="margin: 0;">
+                    <label class="form-label">Sampai Tanggal</label>
+                    <input type="date" name="date_to" class="form-control" value="{format_date_arg(args.get('date_to'))}">
+                </div>
+                {type_select}
+                <button type="submit" class="btn btn-primary"><i class="fas fa-filter"></i> Filter</button>
+            </form>
+    '''
+
+def render_load_more_button(kind, args, next_cursor):
+    """Tombol 'Muat lebih banyak' untuk halaman berikutnya"""
+    if not next_cursor:
+        return ''
+
+    params = {key: value for key, value in args.items() if key in ['date_from', 'date_to', 'type'] and value}
+    params['cursor'] = next_cursor
+    return f'''
+            <div style="text-align: center; margin-top: 1rem;">
+                <button type="button" class="btn btn-info" onclick="loadMoreJournals(this)"
+                        data-src="/seller/accounting/journals/{kind}?{urlencode(params)}">
+                    <i class="fas fa-chevron-down"></i> Muat lebih banyak
+                </button>
             </div>
-        </div>
-        '''
-        
-        return table_html
-        
-    except Exception as e:
-        print(f"Error generating general journal entries: {e}")
-        return '<div class="card"><p>Error loading journal entries</p></div>'
+    '''
 
-def get_adjustment_journal_entries():
-    """Tampilkan jurnal penyesuaian dengan format baru - DESKRIPSI DI HEADER"""
-    try:
-        journal_entries = JournalEntry.query.filter_by(
-            journal_type='adjustment'
-        ).order_by(
-            JournalEntry.date.desc(),
-            JournalEntry.id.desc()
-        ).all()
+def render_journal_listing(kind, args=None):
+    """Daftar jurnal halaman pertama + total keseluruhan untuk tab jurnal umum/penyesuaian"""
+    listing = JOURNAL_LISTINGS[kind]
+    args = {key: value for key, value in (args or {}).items() if key != 'cursor'}
+    has_filter = any(args.get(key) for key in ['date_from', 'date_to', 'type'])
 
-        if not journal_entries:
-            return '''
+    journal_count, total_all_debit, total_all_credit = get_journal_totals(listing, args)
+
+    if not journal_count:
+        empty_html = f'''
             <div class="card">
-                <h4 style="color: var(--primary);">Belum Ada Jurnal Penyesuaian</h4>
-                <p>Gunakan form Jurnal Penyesuaian di atas untuk menambahkan jurnal penyesuaian pertama.</p>
+                <h4 style="color: var(--primary);">{listing['empty_title'] if not has_filter else 'Tidak Ada Jurnal'}</h4>
+                <p>{listing['empty_text'] if not has_filter else 'Tidak ada jurnal yang sesuai dengan filter.'}</p>
             </div>
             '''
+        return render_journal_filter_form(kind, listing, args) + empty_html if has_filter else empty_html
 
-        # HITUNG TOTAL KESELURUHAN
-        total_all_debit = 0
-        total_all_credit = 0
-        
-        for journal in journal_entries:
-            total_all_debit += sum(d.debit for d in journal.journal_details)
-            total_all_credit += sum(d.credit for d in journal.journal_details)
+    journals, next_cursor = get_journal_page(listing, args)
 
-        table_html = f'''
+    return f'''
         <div class="card">
             <h4 style="color: var(--primary); margin-bottom: 1.5rem;">
-                <i class="fas fa-calculator"></i> Daftar Jurnal Penyesuaian
+                <i class="fas {listing['icon']}"></i> {listing['title']}
                 <span style="font-size: 0.9rem; color: #6B7280; font-weight: normal; margin-left: 1rem;">
-                    ({len(journal_entries)} penyesuaian)
+                    ({journal_count} {listing['unit']})
                 </span>
             </h4>
+
+            {render_journal_filter_form(kind, listing, args)}
             
             <!-- TOTAL KESELURUHAN CARD -->
-            <div style="background: linear-gradient(135deg, var(--success) 0%, var(--teal) 100%); color: white; padding: 1.5rem; border-radius: var(--border-radius); margin-bottom: 1.5rem;">
+            <div style="background: linear-gradient(135deg, {listing['gradient']}); color: white; padding: 1.5rem; border-radius: var(--border-radius); margin-bottom: 1.5rem;">
                 <div style="display: flex; justify-content: space-between; align-items: center;">
                     <div>
                         <h5 style="margin: 0; color: white;">
-                            <i class="fas fa-balance-scale"></i> TOTAL KESELURUHAN JURNAL PENYESUAIAN
+                            <i class="fas {listing['total_icon']}"></i> {listing['total_title']}
                         </h5>
                         <p style="margin: 0.5rem 0 0 0; opacity: 0.9; font-size: 0.9rem;">
-                            Seluruh nilai penyesuaian akuntansi
+                            {listing['total_subtitle']}
                         </p>
                     </div>
                     <div style="text-align: right;">
@@ -6107,7 +5737,7 @@ def get_adjustment_journal_entries():
                             </div>
                         </div>
                         <div style="margin-top: 0.5rem; padding: 0.5rem 1rem; background: rgba(255, 255, 255, 0.2); border-radius: var(--border-radius); font-size: 0.9rem;">
-                            Balance: {"✅ SELARAS" if total_all_debit == total_all_credit else "⚠️ TIDAK SELARAS"}
+                            {listing['balance_label']}{"✅ SELARAS" if total_all_debit == total_all_credit else "⚠️ TIDAK SELARAS"}
                         </div>
                     </div>
                 </div>
@@ -6126,67 +5756,26 @@ def get_adjustment_journal_entries():
                         </tr>
                     </thead>
                     <tbody>
-        '''
-        
-        for journal in journal_entries:
-            # HEADER TRANSAKSI - TANGGAL, NO TRANSAKSI, DESKRIPSI + TOMBOL HAPUS
-            table_html += f'''
-            <tr style="background: rgba(56, 161, 105, 0.1); font-weight: bold;">
-                <td>{journal.date.strftime('%d/%m/%Y %H:%M')}</td>
-                <td>{journal.transaction_number}</td>
-                <td colspan="3" style="color: var(--success);">
-                    {journal.description}
-                </td>
-                <td style="text-align: right;">
-                    <button 
-                        type="button"
-                        class="btn btn-danger btn-sm"
-                        style="border:none; background: none; color: #DC2626; cursor: pointer;"
-                        title="Hapus jurnal ini"
-                        onclick="deleteJournal({journal.id})">
-                        <i class="fas fa-trash"></i>
-                    </button>
-                </td>
-            </tr>
-            '''
-
-            # DETAIL AKUN - TANPA DESKRIPSI LAGI
-            for detail in journal.journal_details:
-                table_html += f'''
-                <tr>
-                    <td style="border-left: 3px solid rgba(56, 161, 105, 0.3);"></td>
-                    <td></td>
-                    <td>{detail.account.name}</td>
-                    <td>{detail.account.code}</td>
-                    <td class="debit">{"Rp {:,.0f}".format(detail.debit) if detail.debit > 0 else ""}</td>
-                    <td class="credit">{"Rp {:,.0f}".format(detail.credit) if detail.credit > 0 else ""}</td>
-                </tr>
-                '''
-
-            # TOTAL PER JURNAL
-            total_debit = sum(d.debit for d in journal.journal_details)
-            total_credit = sum(d.credit for d in journal.journal_details)
-            
-            table_html += f'''
-            <tr style="background: rgba(0,0,0,0.02);">
-                <td colspan="4" style="text-align: right; font-weight: bold; padding: 0.5rem 1rem; border-top: 1px solid rgba(0,0,0,0.1);">
-                    Total Jurnal:
-                </td>
-                <td class="debit" style="font-weight: bold; border-top: 1px solid rgba(0,0,0,0.1);">Rp {total_debit:,.0f}</td>
-                <td class="credit" style="font-weight: bold; border-top: 1px solid rgba(0,0,0,0.1);">Rp {total_credit:,.0f}</td>
-            </tr>
-            <tr><td colspan="6" style="height: 1rem; background: transparent;"></td></tr>
-            '''
-
-        table_html += '''
+                        {render_journal_rows(listing, journals)}
                     </tbody>
                 </table>
             </div>
+            {render_load_more_button(kind, args, next_cursor)}
         </div>
         '''
-        
-        return table_html
-        
+
+def get_general_journal_entries(args=None):
+    """Tampilkan jurnal umum dengan format baru - DESKRIPSI DI HEADER"""
+    try:
+        return render_journal_listing('umum', args)
+    except Exception as e:
+        print(f"Error generating general journal entries: {e}")
+        return '<div class="card"><p>Error loading journal entries</p></div>'
+
+def get_adjustment_journal_entries(args=None):
+    """Tampilkan jurnal penyesuaian dengan format baru - DESKRIPSI DI HEADER"""
+    try:
+        return render_journal_listing('penyesuaian', args)
     except Exception as e:
         print(f"Error generating adjustment journal entries: {e}")
         import traceback
@@ -6207,19 +5796,19 @@ def verify_nominal_accounts_closed():
         
         # Cek pendapatan
         for acc in revenue_accounts:
-            if abs(acc.balance) > 0.01:
+            if acc.balance != 0:
                 all_closed = False
                 issues.append(f"Pendapatan '{acc.name}' belum 0: Rp {acc.balance:,.0f}")
         
         # Cek beban
         for acc in expense_accounts:
-            if abs(acc.balance) > 0.01:
+            if acc.balance != 0:
                 all_closed = False
                 issues.append(f"Beban '{acc.name}' belum 0: Rp {acc.balance:,.0f}")
         
         # Cek prive
         for acc in prive_accounts:
-            if abs(acc.balance) > 0.01:
+            if acc.balance != 0:
                 all_closed = False
                 issues.append(f"Prive '{acc.name}' belum 0: Rp {acc.balance:,.0f}")
         
@@ -6234,16 +5823,19 @@ def verify_nominal_accounts_closed():
 
 # ... di sini fungsi get_income_statement() dimulai ...
 
-def get_income_statement():
-    """Generate income statement HTML"""
+def get_income_statement(as_of=None):
+    """Generate income statement HTML (opsional per tanggal as_of)"""
     try:
+        accounts = get_report_accounts(as_of)
+        category_totals = get_category_totals(as_of)
+
         # Get revenue accounts
-        revenue_accounts = Account.query.filter_by(category='revenue').all()
-        total_revenue = sum(acc.balance for acc in revenue_accounts)
+        revenue_accounts = [acc for acc in accounts if acc.category == 'revenue']
+        total_revenue = category_totals.get('revenue', 0)
 
         # Get expense accounts
-        expense_accounts = Account.query.filter_by(category='expense').all()
-        total_expenses = sum(acc.balance for acc in expense_accounts)
+        expense_accounts = [acc for acc in accounts if acc.category == 'expense']
+        total_expenses = category_totals.get('expense', 0)
 
         net_income = total_revenue - total_expenses
 
@@ -6312,39 +5904,32 @@ def get_income_statement():
         return '<p>Error loading income statement</p>'
 
 # Dalam fungsi get_simplified_accounting_content(), cari bagian saldo awal dan perbaiki:
-def get_simplified_accounting_content():
-    """Konten akuntansi yang disederhanakan - OTOMATIS dari database"""
-    
-    # Get template options
-    template_options = ""
-    for key, template in TRANSACTION_TEMPLATES.items():
-        template_options += f'<option value="{key}">{template["name"]}</option>'
-
-    adjustment_options = ""
-    for key, template in ADJUSTMENT_TEMPLATES.items():
-        adjustment_options += f'<option value="{key}">{template["name"]}</option>'
-
-    content = f'''
-    <h1 style="color: var(--primary);"><i class="fas fa-chart-bar"></i> Sistem Akuntansi</h1>
-
-    <div class="accounting-tabs">
-        <button class="tab active" onclick="showTab(\'chart-of-accounts\', this)">Chart of Accounts</button>
-        <button class="tab" onclick="showTab(\'saldo-awal\', this)">Saldo Awal</button>
-        <button class="tab" onclick="showTab(\'jurnal-umum\', this)">Jurnal Umum</button>
-        <button class="tab" onclick="showTab(\'buku-besar\', this)">Buku Besar</button>
-        <button class="tab" onclick="showTab(\'neraca-saldo\', this)">Neraca Saldo</button>
-        <button class="tab" onclick="showTab(\'jurnal-penyesuaian\', this)">Jurnal Penyesuaian</button>
-        <button class="tab" onclick="showTab(\'neraca-saldo-setelah\', this)">Neraca Setelah Penyesuaian</button>
-        <button class="tab" onclick="showTab(\'laporan-keuangan\', this)">Laporan Keuangan</button>
-        <button class="tab" onclick="showTab(\'jurnal-penutup\', this)">Jurnal Penutup</button>
-        <button class="tab" onclick="showTab(\'neraca-saldo-penutupan\', this)">Neraca Saldo Setelah Penutupan</button>
-    </div>
+# ===== TAB AKUNTANSI (DIMUAT PER TAB) =====
+def render_as_of_picker(tab_id, as_of):
+    """Pilihan tanggal laporan (as-of) untuk tab yang mendukung saldo per tanggal"""
+    input_id = f'as-of-{tab_id}'
+    reset_button = ''
+    if as_of:
+        reset_button = f'''<button class="btn btn-info" onclick="document.getElementById('{input_id}').value = ''; loadTabAsOf('{tab_id}', '{input_id}')">Saldo Terkini</button>'''
 
-    <div id="chart-of-accounts" class="tab-content active">
-        {get_chart_of_accounts_content()}
-    </div>
+    return f'''
+            <div style="display: flex; gap: 0.75rem; align-items: flex-end; flex-wrap: wrap; margin-bottom: 1.5rem;">
+                <div class="form-group" style="margin: 0;">
+                    <label class="form-label" for="{input_id}">Per Tanggal</label>
+                    <input type="date" id="{input_id}" class="form-control" value="{as_of.strftime('%Y-%m-%d') if as_of else ''}">
+                </div>
+                <button class="btn btn-primary" onclick="loadTabAsOf('{tab_id}', '{input_id}')">
+                    <i class="fas fa-calendar-check"></i> Tampilkan
+                </button>
+                {reset_button}
+            </div>
+            <p style="margin-bottom: 1rem; color: #6B7280;">
+                <i class="fas fa-calendar"></i> {f"Saldo per {as_of.strftime('%d/%m/%Y')}" if as_of else "Saldo terkini"}
+            </p>
+    '''
 
-    <div id="saldo-awal" class="tab-content">
+def render_saldo_awal_tab(args):
+    return f'''
         <div class="card">
             <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 1.5rem;">
                 <h3 style="color: var(--primary); margin: 0;"><i class="fas fa-file-invoice-dollar"></i> Saldo Awal</h3>
@@ -6372,9 +5957,15 @@ def get_simplified_accounting_content():
                 </tbody>
             </table>
         </div>
-    </div>
+    '''
+
+def render_jurnal_umum_tab(args):
+    template_options = ''.join(
+        f'<option value="{key}">{template["name"]}</option>'
+        for key, template in TRANSACTION_TEMPLATES.items()
+    )
 
-    <div id="jurnal-umum" class="tab-content">
+    return f'''
         <div class="card">
             <!-- BAGIAN BARU: Form untuk membuat jurnal baru -->
             <div style="margin-bottom: 2rem;">
@@ -6402,11 +5993,12 @@ def get_simplified_accounting_content():
             </div>
             
             <!-- Daftar jurnal yang sudah ada -->
-            {get_general_journal_entries()}
+            {get_general_journal_entries(args)}
         </div>
-    </div>
+    '''
 
-    <div id="buku-besar" class="tab-content">
+def render_buku_besar_tab(args):
+    return f'''
         <div class="card">
             <h3 style="color: var(--primary);"><i class="fas fa-book"></i> Buku Besar</h3>
             <p style="margin-bottom: 1rem; color: #6B7280;">
@@ -6414,14 +6006,17 @@ def get_simplified_accounting_content():
             </p>
             {get_ledger_data()}
         </div>
-    </div>
+    '''
 
-    <div id="neraca-saldo" class="tab-content">
+def render_neraca_saldo_tab(args):
+    as_of = parse_as_of_date(args.get('as_of'))
+    return f'''
         <div class="card">
             <h3 style="color: var(--primary);"><i class="fas fa-balance-scale"></i> Neraca Saldo Sebelum Penyesuaian</h3>
             <p style="margin-bottom: 1rem; color: #6B7280;">
                 <i class="fas fa-info-circle"></i> Neraca saldo dihitung otomatis dari saldo awal + jurnal umum.
             </p>
+            {render_as_of_picker('neraca-saldo', as_of)}
             <table class="table">
                 <thead>
                     <tr>
@@ -6432,13 +6027,19 @@ def get_simplified_accounting_content():
                     </tr>
                 </thead>
                 <tbody>
-                    {get_trial_balance_before_adjustment()}
+                    {get_trial_balance_before_adjustment(as_of)}
                 </tbody>
             </table>
         </div>
-    </div>
+    '''
+
+def render_jurnal_penyesuaian_tab(args):
+    adjustment_options = ''.join(
+        f'<option value="{key}">{template["name"]}</option>'
+        for key, template in ADJUSTMENT_TEMPLATES.items()
+    )
 
-    <div id="jurnal-penyesuaian" class="tab-content">
+    return f'''
         <div class="card">
             <h3 style="color: var(--primary);"><i class="fas fa-calculator"></i> Jurnal Penyesuaian</h3>
 
@@ -6458,13 +6059,16 @@ def get_simplified_accounting_content():
                 </div>
             </div>
 
-            {get_adjustment_journal_entries()}
+            {get_adjustment_journal_entries(args)}
         </div>
-    </div>
+    '''
 
-    <div id="neraca-saldo-setelah" class="tab-content">
+def render_neraca_saldo_setelah_tab(args):
+    as_of = parse_as_of_date(args.get('as_of'))
+    return f'''
         <div class="card">
             <h3 style="color: var(--primary);"><i class="fas fa-balance-scale"></i> Neraca Saldo Setelah Penyesuaian</h3>
+            {render_as_of_picker('neraca-saldo-setelah', as_of)}
             <table class="table">
                 <thead>
                     <tr>
@@ -6475,43 +6079,47 @@ def get_simplified_accounting_content():
                     </tr>
                 </thead>
                 <tbody>
-                    {get_adjusted_trial_balance()}
+                    {get_adjusted_trial_balance(as_of)}
                 </tbody>
             </table>
         </div>
-    </div>
+    '''
+
+def render_laporan_keuangan_tab(args):
+    as_of = parse_as_of_date(args.get('as_of'))
+    return f'''
+        <div class="card">
+            {render_as_of_picker('laporan-keuangan', as_of)}
+        </div>
 
-    <div id="laporan-keuangan" class="tab-content">
         <div class="card">
             <h3 style="color: var(--primary);"><i class="fas fa-chart-line"></i> Laporan Laba Rugi</h3>
-            {get_income_statement()}
+            {get_income_statement(as_of)}
         </div>
 
         <div class="card">
             <h3 style="color: var(--primary);"><i class="fas fa-balance-scale-left"></i> Laporan Posisi Keuangan (Neraca)</h3>
-            {get_balance_sheet()}
+            {get_balance_sheet(as_of)}
         </div>
 
         <div class="card">
             <h3 style="color: var(--primary);"><i class="fas fa-chart-line"></i> Laporan Perubahan Ekuitas</h3>
-            {get_equity_change_statement()}
+            {get_equity_change_statement(as_of)}
         </div>
-    </div>
+    '''
 
-    <div id="jurnal-penutup" class="tab-content">
+def render_jurnal_penutup_tab(args):
+    return f'''
         <div class="card">
             <h3 style="color: var(--primary);"><i class="fas fa-door-closed"></i> Jurnal Penutup</h3>
-            
-            <!-- Konten akan dimuat via JavaScript -->
             <div id="closing-tab-content">
-                <div style="text-align: center; padding: 2rem;">
-                    <div class="loading"></div> Memuat data jurnal penutup...
-                </div>
+                {build_closing_tab_html()}
             </div>
         </div>
-    </div>
+    '''
 
-    <div id="neraca-saldo-penutupan" class="tab-content">
+def render_neraca_saldo_penutupan_tab(args):
+    return f'''
         <div class="card">
             <h3 style="color: var(--primary);"><i class="fas fa-balance-scale"></i> Neraca Saldo Setelah Penutupan</h3>
             <p style="margin-bottom: 1rem; color: #6B7280;">
@@ -6519,57 +6127,82 @@ def get_simplified_accounting_content():
             </p>
             {get_post_closing_trial_balance()}
         </div>
-    </div>
+    '''
 
-    <script>
-    // Load closing entries saat tab dibuka
-    document.addEventListener('DOMContentLoaded', function() {{
-        // Add event listener untuk tab Jurnal Penutup
-        const closingTab = document.querySelector('[onclick*="jurnal-penutup"]');
-        if (closingTab) {{
-            closingTab.addEventListener('click', function() {{
-                loadClosingTabContent();
-            }});
-        }}
-        
-        // Add event listener untuk tab Neraca Saldo Setelah Penutupan
-        const postClosingTab = document.querySelector('[onclick*="neraca-saldo-penutupan"]');
-        if (postClosingTab) {{
-            postClosingTab.addEventListener('click', function() {{
-                // Jika perlu refresh data, bisa tambahkan di sini
-                console.log("Tab Neraca Saldo Setelah Penutupan dibuka");
-            }});
-        }}
-    }});
-
-    function loadClosingTabContent() {{
-        const container = document.getElementById('closing-tab-content');
-        if (!container) return;
-        
-        fetch('/api/get_closing_entries_html')
-        .then(response => response.text())
-        .then(html => {{
-            container.innerHTML = html;
-        }})
-        .catch(error => {{
-            console.error('Error loading closing tab:', error);
-            container.innerHTML = '<div class="card"><p>Error loading closing entries</p></div>';
-        }});
-    }}
+# id tab -> (label, fungsi render fragmen)
+ACCOUNTING_TABS = {
+    'chart-of-accounts': ('Chart of Accounts', lambda args: get_chart_of_accounts_content()),
+    'saldo-awal': ('Saldo Awal', render_saldo_awal_tab),
+    'jurnal-umum': ('Jurnal Umum', render_jurnal_umum_tab),
+    'buku-besar': ('Buku Besar', render_buku_besar_tab),
+    'neraca-saldo': ('Neraca Saldo', render_neraca_saldo_tab),
+    'jurnal-penyesuaian': ('Jurnal Penyesuaian', render_jurnal_penyesuaian_tab),
+    'neraca-saldo-setelah': ('Neraca Setelah Penyesuaian', render_neraca_saldo_setelah_tab),
+    'laporan-keuangan': ('Laporan Keuangan', render_laporan_keuangan_tab),
+    'jurnal-penutup': ('Jurnal Penutup', render_jurnal_penutup_tab),
+    'neraca-saldo-penutupan': ('Neraca Saldo Setelah Penutupan', render_neraca_saldo_penutupan_tab),
+}
 
-    // Load saat pertama kali halaman dibuka jika tab jurnal-penutup aktif
-    if (document.getElementById('jurnal-penutup').classList.contains('active')) {{
-        loadClosingTabContent();
-    }}
-    
-    // Load saat pertama kali halaman dibuka jika tab neraca-saldo-penutupan aktif
-    if (document.getElementById('neraca-saldo-penutupan').classList.contains('active')) {{
-        console.log("Tab Neraca Saldo Setelah Penutupan aktif saat halaman dimuat");
-    }}
-    </script>
-    '''
+# Cache fragmen per (tab, versi buku, parameter) - per proses worker
+ACCOUNTING_FRAGMENT_CACHE = {}
+ACCOUNTING_FRAGMENT_CACHE_LIMIT = 200
+
+def render_accounting_fragment(tab_id, args=None):
+    """Render satu tab akuntansi, memakai cache selama versi buku belum berubah"""
+    args = args or {}
+    # Rincian persediaan di laporan ikut berubah saat ada mutasi stok tanpa jurnal (mis. checkout)
+    version = (get_ledger_version(), get_stock_version())
+    cache_key = (tab_id, version, tuple(sorted(args.items())))
+
+    html = ACCOUNTING_FRAGMENT_CACHE.get(cache_key)
+    if html is not None:
+        return html
+
+    html = ACCOUNTING_TABS[tab_id][1](args)
+
+    # Buang fragmen dari versi lama sebelum menyimpan yang baru
+    stale_keys = [key for key in list(ACCOUNTING_FRAGMENT_CACHE) if key[1] != version]
+    for key in stale_keys:
+        ACCOUNTING_FRAGMENT_CACHE.pop(key, None)
+    if len(ACCOUNTING_FRAGMENT_CACHE) >= ACCOUNTING_FRAGMENT_CACHE_LIMIT:
+        ACCOUNTING_FRAGMENT_CACHE.clear()
+
+    ACCOUNTING_FRAGMENT_CACHE[cache_key] = html
+    return html
+
+def get_simplified_accounting_content():
+    """Kerangka halaman akuntansi - isi tiap tab dimuat saat tab dibuka"""
+    first_tab = next(iter(ACCOUNTING_TABS))
+
+    tab_buttons = ''.join(
+        f'<button class="tab{" active" if tab_id == first_tab else ""}" onclick="showTab(\'{tab_id}\', this)">{label}</button>'
+        for tab_id, (label, _) in ACCOUNTING_TABS.items()
+    )
+
+    tab_panels = []
+    for tab_id in ACCOUNTING_TABS:
+        if tab_id == first_tab:
+            # Tab pertama langsung dirender (dari cache bila ada)
+            tab_panels.append(f'''
+    <div id="{tab_id}" class="tab-content active" data-loaded="1">
+        {render_accounting_fragment(tab_id)}
+    </div>''')
+        else:
+            tab_panels.append(f'''
+    <div id="{tab_id}" class="tab-content" data-tab-src="/seller/accounting/tab/{tab_id}">
+        <div style="text-align: center; padding: 2rem;">
+            <div class="loading"></div> Memuat data...
+        </div>
+    </div>''')
+
+    return f'''
+    <h1 style="color: var(--primary);"><i class="fas fa-chart-bar"></i> Sistem Akuntansi</h1>
 
-    return content
+    <div class="accounting-tabs">
+        {tab_buttons}
+    </div>
+    {''.join(tab_panels)}
+    '''
 
 def get_chart_of_accounts_content():
     """Generate content untuk Chart of Accounts tab"""
@@ -6805,6 +6438,85 @@ def get_chart_of_accounts_content():
         print(f"Error generating chart of accounts content: {e}")
         return '<div class="card"><p>Error loading Chart of Accounts</p></div>'
 
+# ===== CACHE HALAMAN STOREFRONT =====
+# Halaman storefront (beranda, katalog) dirender sekali per tipe user lalu disimpan di memori proses.
+# Bagian per user (navigasi, flash, nama) berupa slot yang diisi saat disajikan; jumlah keranjang
+# sudah dimuat belakangan oleh updateCartCount(). Versi cache = stempel file penanda (inode + mtime)
+# yang diganti setiap commit yang mengubah Product/AppSetting, sehingga semua proses worker ikut basi
+# tanpa query database.
+STOREFRONT_CACHE = {}
+STOREFRONT_CACHE_LIMIT = 200
+STOREFRONT_SLOT = '<!--storefront:{}-->'
+STOREFRONT_VERSION_FILE = os.getenv('STOREFRONT_VERSION_FILE', os.path.join(app.instance_path, 'storefront.version'))
+STOREFRONT_MODELS = (Product, AppSetting)
+STOREFRONT_LOCAL_VERSION = [0]  # cadangan bila file penanda gagal ditulis
+
+def storefront_slot(name):
+    """Penanda bagian per user di halaman storefront yang di-cache"""
+    return STOREFRONT_SLOT.format(name)
+
+def get_storefront_version():
+    """Versi storefront saat ini - cukup satu stat() file penanda"""
+    return (STOREFRONT_LOCAL_VERSION[0], *read_stamp_file(STOREFRONT_VERSION_FILE))
+
+def invalidate_storefront_cache(session=None):
+    """Tandai storefront basi - file versi diganti setelah transaksi pemanggil commit"""
+    (session or db.session).info['storefront_dirty'] = True
+
+def track_storefront_changes(session, objects):
+    """Perubahan ORM pada Product/AppSetting (produk, stok, pengaturan) membuat storefront basi"""
+    invalidate_storefront_cache(session)
+
+for storefront_model in STOREFRONT_MODELS:
+    track_model_changes(storefront_model, on_flush=track_storefront_changes)
+# UPDATE massal ke Product (reserve_stock, rekonsiliasi, varian gambar)
+track_model_changes(Product, on_statement=invalidate_storefront_cache)
+
+@event.listens_for(db.session, 'after_commit')
+def publish_storefront_version(session):
+    """Storefront basi baru diumumkan setelah data benar-benar commit"""
+    if session.info.pop('storefront_dirty', False):
+        STOREFRONT_LOCAL_VERSION[0] += 1
+        replace_stamp_file(STOREFRONT_VERSION_FILE)
+
+@event.listens_for(db.session, 'after_rollback')
+def discard_storefront_changes(session):
+    """Rollback: tidak ada perubahan yang perlu diumumkan"""
+    session.info.pop('storefront_dirty', None)
+
+def fill_storefront_slots(html):
+    """Isi slot per user pada halaman storefront dari cache"""
+    slots = {
+        'navigation': get_navigation(),
+        'flash': get_flash_messages(),
+        'full_name': current_user.full_name if current_user.is_authenticated else '',
+    }
+    for name, value in slots.items():
+        html = html.replace(storefront_slot(name), value)
+    return html
+
+def render_storefront_page(page_key, render):
+    """Sajikan halaman storefront dari cache per (halaman, tipe user); render ulang bila versi berubah"""
+    user_type = current_user.user_type if current_user.is_authenticated else 'anonymous'
+    cache_key = (page_key, user_type)
+    version = get_storefront_version()
+
+    cached = STOREFRONT_CACHE.get(cache_key)
+    if cached is not None and cached[0] == version:
+        return fill_storefront_slots(cached[1])
+
+    html = render()
+
+    # Buang halaman dari versi lama sebelum menyimpan yang baru
+    stale_keys = [key for key, (key_version, _) in list(STOREFRONT_CACHE.items()) if key_version != version]
+    for key in stale_keys:
+        STOREFRONT_CACHE.pop(key, None)
+    if len(STOREFRONT_CACHE) >= STOREFRONT_CACHE_LIMIT:
+        STOREFRONT_CACHE.clear()
+
+    STOREFRONT_CACHE[cache_key] = (version, html)
+    return fill_storefront_slots(html)
+
 # ===== ROUTES UTAMA =====
 @app.route('/')
 def index():
@@ -6812,336 +6524,338 @@ def index():
         return redirect('/login')
 
     try:
-        settings = {s.key: s.value for s in AppSetting.query.all()}
-        featured_products = Product.query.filter_by(is_featured=True).limit(4).all()
-
-        # Featured Products HTML
-        featured_html = ""
-        for product in featured_products:
-            weight_info = f"{product.weight_kg}kg" if product.weight_kg else f"{product.size_cm}cm"
-            add_to_cart_btn = ''
-            if current_user.user_type == 'customer':
-                add_to_cart_btn = f'''
-                <button class="btn btn-primary" onclick="addToCart({product.id})" style="margin-top: 1rem;">
-                    <i class="fas fa-cart-plus"></i> Tambah ke Keranjang
-                </button>
-                '''
+        return render_storefront_page(('index',), render_index_page)
+    except Exception as e:
+        print(f"Error in index route: {e}")
+        return base_html('Home', '''
+        <div class="card" style="text-align: center; padding: 4rem;">
+            <i class="fas fa-fish" style="font-size: 4rem; color: var(--primary); margin-bottom: 2rem;"></i>
+            <h2 style="color: var(--primary);">Welcome to Kang-Mas Shop</h2>
+            <p>Error loading content. Please try again.</p>
+            <a href="/" class="btn btn-primary" style="margin-top: 1rem;">Refresh Page</a>
+        </div>
+        ''')
 
-            featured_html += f'''
-            <div class="card product-card" style="text-align: center; padding: 1.5rem;">
-                <div style="position: relative;">
-                    <img src="{product.image_url}" alt="{product.name}" class="product-image" 
-                         style="height: 200px; object-fit: cover; border-radius: 12px;"
-                         onerror="this.src='https://via.placeholder.com/300x200/4F46E5/ffffff?text=Kang+Mas+Shop'">
-                    {product.is_featured and '<span style="position: absolute; top: 10px; right: 10px; background: var(--error); color: white; padding: 0.25rem 0.75rem; border-radius: 20px; font-size: 0.8rem;">🔥 Unggulan</span>' or ''}
-                </div>
-                <h3 style="margin: 1rem 0 0.5rem 0; color: var(--dark); font-size: 1.2rem;">{product.name}</h3>
-                <p style="color: #6B7280; font-size: 0.9rem; margin-bottom: 1rem; min-height: 40px;">{product.description[:60]}...</p>
-                <div class="price" style="color: var(--primary); font-weight: bold; font-size: 1.3rem; margin-bottom: 0.5rem;">Rp {product.price:,.0f}</div>
-                <div style="display: flex; justify-content: center; gap: 1rem; margin-bottom: 1rem;">
-                    <span style="background: var(--ocean-light); padding: 0.25rem 0.75rem; border-radius: 15px; font-size: 0.8rem;">
-                        <i class="fas fa-box"></i> Stock: {product.stock}
-                    </span>
-                    <span style="background: var(--ocean-light); padding: 0.25rem 0.75rem; border-radius: 15px; font-size: 0.8rem;">
-                        <i class="fas fa-weight"></i> {weight_info}
-                    </span>
-                </div>
-                {add_to_cart_btn}
-            </div>
-            '''
+def render_index_page():
+    """Halaman beranda untuk tipe user saat ini - nama user diisi lewat slot saat disajikan"""
+    settings = get_app_settings()
+    featured_products = Product.query.filter_by(is_featured=True).limit(4).all()
 
-        # Determine user button based on user type
+    # Featured Products HTML
+    featured_html = ""
+    for product in featured_products:
+        weight_info = f"{product.weight_kg}kg" if product.weight_kg else f"{product.size_cm}cm"
+        add_to_cart_btn = ''
         if current_user.user_type == 'customer':
-            user_button = '''
-                <a href="/products" class="btn btn-primary" style="padding: 1rem 2rem; font-size: 1.1rem; margin-top: 1rem;">
-                    <i class="fas fa-store"></i> Lihat Semua Produk
-                </a>
-                <a href="/cart" class="btn btn-success" style="padding: 1rem 2rem; font-size: 1.1rem; margin-top: 1rem; margin-left: 1rem;">
-                    <i class="fas fa-shopping-cart"></i> Keranjang Saya
-                </a>
-            '''
-        else:
-            user_button = '''
-                <a href="/seller/dashboard" class="btn btn-primary" style="padding: 1rem 2rem; font-size: 1.1rem; margin-top: 1rem;">
-                    <i class="fas fa-chart-line"></i> Seller Dashboard
-                </a>
-                <a href="/seller/accounting" class="btn btn-success" style="padding: 1rem 2rem; font-size: 1.1rem; margin-top: 1rem; margin-left: 1rem;">
-                    <i class="fas fa-chart-bar"></i> Sistem Akuntansi
-                </a>
+            add_to_cart_btn = f'''
+            <button class="btn btn-primary" onclick="addToCart({product.id})" style="margin-top: 1rem;">
+                <i class="fas fa-cart-plus"></i> Tambah ke Keranjang
+            </button>
             '''
 
-        content = f'''
-        <!-- Hero Section -->
-        <div class="hero" style="position: relative; overflow: hidden;">
-            <div style="position: absolute; top: 0; left: 0; right: 0; bottom: 0; background: linear-gradient(135deg, rgba(181, 81, 35, 0.9) 0%, rgba(228, 122, 36, 0.9) 100%); z-index: 1;"></div>
-            <div style="position: absolute; top: 0; left: 0; right: 0; bottom: 0; background: url('https://images.unsplash.com/photo-1516466723877-e4ec1d736c8a?q=80&w=2070&auto=format&fit=crop') center/cover; opacity: 0.3; z-index: 0;"></div>
-            
-            <div style="position: relative; z-index: 2; text-align: center; padding: 4rem 2rem;">
-                <h1 style="font-size: 3.5rem; margin-bottom: 1.5rem; font-family: 'Poppins', sans-serif; font-weight: 800; text-shadow: 2px 2px 4px rgba(0,0,0,0.3);">
-                    {settings.get('app_name', 'Kang-Mas Shop')}
-                </h1>
-                <p style="font-size: 1.25rem; margin-bottom: 1rem; opacity: 0.9; max-width: 600px; margin-left: auto; margin-right: auto;">
-                    {settings.get('app_description', 'Sejak 2017 - Melayani dengan Kualitas Terbaik')}
-                </p>
-                <p style="font-size: 1.1rem; margin-bottom: 2rem; font-style: italic; opacity: 0.9;">
-                    <i class="fas fa-fish"></i> Ikan mas segar langsung dari kolam Magelang
-                </p>
+        featured_html += f'''
+        <div class="card product-card" style="text-align: center; padding: 1.5rem;">
+            <div style="position: relative;">
+                {product_image_html(product, style='height: 200px; object-fit: cover; border-radius: 12px;', onerror="this.src='https://via.placeholder.com/300x200/4F46E5/ffffff?text=Kang+Mas+Shop'")}
+                {product.is_featured and '<span style="position: absolute; top: 10px; right: 10px; background: var(--error); color: white; padding: 0.25rem 0.75rem; border-radius: 20px; font-size: 0.8rem;">🔥 Unggulan</span>' or ''}
+            </div>
+            <h3 style="margin: 1rem 0 0.5rem 0; color: var(--dark); font-size: 1.2rem;">{product.name}</h3>
+            <p style="color: #6B7280; font-size: 0.9rem; margin-bottom: 1rem; min-height: 40px;">{product.description[:60]}...</p>
+            <div class="price" style="color: var(--primary); font-weight: bold; font-size: 1.3rem; margin-bottom: 0.5rem;">Rp {product.price:,.0f}</div>
+            <div style="display: flex; justify-content: center; gap: 1rem; margin-bottom: 1rem;">
+                <span style="background: var(--ocean-light); padding: 0.25rem 0.75rem; border-radius: 15px; font-size: 0.8rem;">
+                    <i class="fas fa-box"></i> Stock: {product.stock}
+                </span>
+                <span style="background: var(--ocean-light); padding: 0.25rem 0.75rem; border-radius: 15px; font-size: 0.8rem;">
+                    <i class="fas fa-weight"></i> {weight_info}
+                </span>
+            </div>
+            {add_to_cart_btn}
+        </div>
+        '''
 
-                <div style="margin-top: 2rem; background: rgba(255,255,255,0.2); padding: 1.5rem; border-radius: var(--border-radius); backdrop-filter: blur(10px); max-width: 500px; margin-left: auto; margin-right: auto;">
-                    <p style="font-size: 1.2rem; margin-bottom: 1rem;">
-                        Selamat datang kembali, <strong style="color: var(--white);">{current_user.full_name}</strong>!
-                    </p>
-                    <div style="display: flex; gap: 1rem; justify-content: center; flex-wrap: wrap;">
-                        {user_button}
-                    </div>
+    # Determine user button based on user type
+    if current_user.user_type == 'customer':
+        user_button = '''
+            <a href="/products" class="btn btn-primary" style="padding: 1rem 2rem; font-size: 1.1rem; margin-top: 1rem;">
+                <i class="fas fa-store"></i> Lihat Semua Produk
+            </a>
+            <a href="/cart" class="btn btn-success" style="padding: 1rem 2rem; font-size: 1.1rem; margin-top: 1rem; margin-left: 1rem;">
+                <i class="fas fa-shopping-cart"></i> Keranjang Saya
+            </a>
+        '''
+    else:
+        user_button = '''
+            <a href="/seller/dashboard" class="btn btn-primary" style="padding: 1rem 2rem; font-size: 1.1rem; margin-top: 1rem;">
+                <i class="fas fa-chart-line"></i> Seller Dashboard
+            </a>
+            <a href="/seller/accounting" class="btn btn-success" style="padding: 1rem 2rem; font-size: 1.1rem; margin-top: 1rem; margin-left: 1rem;">
+                <i class="fas fa-chart-bar"></i> Sistem Akuntansi
+            </a>
+        '''
+
+    content = f'''
+    <!-- Hero Section -->
+    <div class="hero" style="position: relative; overflow: hidden;">
+        <div style="position: absolute; top: 0; left: 0; right: 0; bottom: 0; background: linear-gradient(135deg, rgba(181, 81, 35, 0.9) 0%, rgba(228, 122, 36, 0.9) 100%); z-index: 1;"></div>
+        <div style="position: absolute; top: 0; left: 0; right: 0; bottom: 0; background: url('https://images.unsplash.com/photo-1516466723877-e4ec1d736c8a?q=80&w=2070&auto=format&fit=crop') center/cover; opacity: 0.3; z-index: 0;"></div>
+        
+        <div style="position: relative; z-index: 2; text-align: center; padding: 4rem 2rem;">
+            <h1 style="font-size: 3.5rem; margin-bottom: 1.5rem; font-family: 'Poppins', sans-serif; font-weight: 800; text-shadow: 2px 2px 4px rgba(0,0,0,0.3);">
+                {settings.get('app_name', 'Kang-Mas Shop')}
+            </h1>
+            <p style="font-size: 1.25rem; margin-bottom: 1rem; opacity: 0.9; max-width: 600px; margin-left: auto; margin-right: auto;">
+                {settings.get('app_description', 'Sejak 2017 - Melayani dengan Kualitas Terbaik')}
+            </p>
+            <p style="font-size: 1.1rem; margin-bottom: 2rem; font-style: italic; opacity: 0.9;">
+                <i class="fas fa-fish"></i> Ikan mas segar langsung dari kolam Magelang
+            </p>
+
+            <div style="margin-top: 2rem; background: rgba(255,255,255,0.2); padding: 1.5rem; border-radius: var(--border-radius); backdrop-filter: blur(10px); max-width: 500px; margin-left: auto; margin-right: auto;">
+                <p style="font-size: 1.2rem; margin-bottom: 1rem;">
+                    Selamat datang kembali, <strong style="color: var(--white);">{storefront_slot('full_name')}</strong>!
+                </p>
+                <div style="display: flex; gap: 1rem; justify-content: center; flex-wrap: wrap;">
+                    {user_button}
                 </div>
             </div>
         </div>
+    </div>
 
-        <!-- Features Section -->
-        <div style="margin: 4rem 0;">
-            <h2 style="text-align: center; color: var(--primary); margin-bottom: 3rem; font-size: 2.5rem;">
-                <i class="fas fa-star"></i> Mengapa Memilih Kami?
-            </h2>
-            
-            <div class="grid grid-4">
-                <div class="card" style="text-align: center; padding: 2rem;">
-                    <div style="width: 70px; height: 70px; background: linear-gradient(135deg, var(--primary) 0%, var(--ocean-deep) 100%); border-radius: 50%; display: flex; align-items: center; justify-content: center; margin: 0 auto 1.5rem;">
-                        <i class="fas fa-award" style="color: white; font-size: 1.8rem;"></i>
-                    </div>
-                    <h3 style="margin-bottom: 1rem; color: var(--dark);">Kualitas Terbaik</h3>
-                    <p style="color: #6B7280;">Ikan segar langsung dari kolam dengan kualitas premium</p>
-                </div>
-                
-                <div class="card" style="text-align: center; padding: 2rem;">
-                    <div style="width: 70px; height: 70px; background: linear-gradient(135deg, var(--success) 0%, var(--teal) 100%); border-radius: 50%; display: flex; align-items: center; justify-content: center; margin: 0 auto 1.5rem;">
-                        <i class="fas fa-shipping-fast" style="color: white; font-size: 1.8rem;"></i>
-                    </div>
-                    <h3 style="margin-bottom: 1rem; color: var(--dark);">Pengiriman Cepat</h3>
-                    <p style="color: #6B7280;">Dikirim langsung setelah panen, tetap segar sampai tujuan</p>
-                </div>
-                
-                <div class="card" style="text-align: center; padding: 2rem;">
-                    <div style="width: 70px; height: 70px; background: linear-gradient(135deg, var(--warning) 0%, #b7791f 100%); border-radius: 50%; display: flex; align-items: center; justify-content: center; margin: 0 auto 1.5rem;">
-                        <i class="fas fa-headset" style="color: white; font-size: 1.8rem;"></i>
-                    </div>
-                    <h3 style="margin-bottom: 1rem; color: var(--dark);">Customer Service</h3>
-                    <p style="color: #6B7280;">Tim kami siap membantu 24/7 via WhatsApp</p>
-                </div>
-                
-                <div class="card" style="text-align: center; padding: 2rem;">
-                    <div style="width: 70px; height: 70px; background: linear-gradient(135deg, var(--error) 0%, #c53030 100%); border-radius: 50%; display: flex; align-items: center; justify-content: center; margin: 0 auto 1.5rem;">
-                        <i class="fas fa-shield-alt" style="color: white; font-size: 1.8rem;"></i>
-                    </div>
-                    <h3 style="margin-bottom: 1rem; color: var(--dark);">Garansi Kepuasan</h3>
-                    <p style="color: #6B7280;">Garansi 100% uang kembali jika tidak puas</p>
+    <!-- Features Section -->
+    <div style="margin: 4rem 0;">
+        <h2 style="text-align: center; color: var(--primary); margin-bottom: 3rem; font-size: 2.5rem;">
+            <i class="fas fa-star"></i> Mengapa Memilih Kami?
+        </h2>
+        
+        <div class="grid grid-4">
+            <div class="card" style="text-align: center; padding: 2rem;">
+                <div style="width: 70px; height: 70px; background: linear-gradient(135deg, var(--primary) 0%, var(--ocean-deep) 100%); border-radius: 50%; display: flex; align-items: center; justify-content: center; margin: 0 auto 1.5rem;">
+                    <i class="fas fa-award" style="color: white; font-size: 1.8rem;"></i>
                 </div>
+                <h3 style="margin-bottom: 1rem; color: var(--dark);">Kualitas Terbaik</h3>
+                <p style="color: #6B7280;">Ikan segar langsung dari kolam dengan kualitas premium</p>
             </div>
-        </div>
-
-        <!-- Featured Products -->
-        <div style="margin: 4rem 0;">
-            <div style="text-align: center; margin-bottom: 2rem;">
-                <h2 style="color: var(--primary); font-size: 2.5rem; margin-bottom: 1rem;">
-                    <i class="fas fa-fire"></i> Produk Unggulan
-                </h2>
-                <p style="color: #6B7280; font-size: 1.1rem; max-width: 600px; margin: 0 auto;">
-                    Produk terbaik pilihan pelanggan kami dengan kualitas premium
-                </p>
+            
+            <div class="card" style="text-align: center; padding: 2rem;">
+                <div style="width: 70px; height: 70px; background: linear-gradient(135deg, var(--success) 0%, var(--teal) 100%); border-radius: 50%; display: flex; align-items: center; justify-content: center; margin: 0 auto 1.5rem;">
+                    <i class="fas fa-shipping-fast" style="color: white; font-size: 1.8rem;"></i>
+                </div>
+                <h3 style="margin-bottom: 1rem; color: var(--dark);">Pengiriman Cepat</h3>
+                <p style="color: #6B7280;">Dikirim langsung setelah panen, tetap segar sampai tujuan</p>
             </div>
             
-            <div class="grid grid-4">
-                {featured_html or '''
-                <div class="card" style="text-align: center; padding: 3rem; grid-column: span 4;">
-                    <i class="fas fa-box-open" style="font-size: 3rem; color: #6B7280; margin-bottom: 1rem;"></i>
-                    <h3>Belum Ada Produk Unggulan</h3>
-                    <p>Silakan tambahkan produk dengan menandai sebagai "unggulan"</p>
+            <div class="card" style="text-align: center; padding: 2rem;">
+                <div style="width: 70px; height: 70px; background: linear-gradient(135deg, var(--warning) 0%, #b7791f 100%); border-radius: 50%; display: flex; align-items: center; justify-content: center; margin: 0 auto 1.5rem;">
+                    <i class="fas fa-headset" style="color: white; font-size: 1.8rem;"></i>
                 </div>
-                '''}
+                <h3 style="margin-bottom: 1rem; color: var(--dark);">Customer Service</h3>
+                <p style="color: #6B7280;">Tim kami siap membantu 24/7 via WhatsApp</p>
             </div>
             
-            {featured_products and '''
-            <div style="text-align: center; margin-top: 3rem;">
-                <a href="/products" class="btn btn-primary" style="padding: 1rem 3rem; font-size: 1.1rem;">
-                    <i class="fas fa-store"></i> Lihat Semua Produk
-                </a>
+            <div class="card" style="text-align: center; padding: 2rem;">
+                <div style="width: 70px; height: 70px; background: linear-gradient(135deg, var(--error) 0%, #c53030 100%); border-radius: 50%; display: flex; align-items: center; justify-content: center; margin: 0 auto 1.5rem;">
+                    <i class="fas fa-shield-alt" style="color: white; font-size: 1.8rem;"></i>
+                </div>
+                <h3 style="margin-bottom: 1rem; color: var(--dark);">Garansi Kepuasan</h3>
+                <p style="color: #6B7280;">Garansi 100% uang kembali jika tidak puas</p>
             </div>
-            ''' or ''}
         </div>
+    </div>
 
-        <!-- Stats Section -->
-        <div style="margin: 4rem 0;">
-            <div class="stats">
-                <div class="stat-card" style="text-align: center;">
-                    <div class="stat-number">7+</div>
-                    <div class="stat-label">Tahun Pengalaman</div>
-                    <p style="color: #6B7280; font-size: 0.9rem; margin-top: 0.5rem;">Sejak 2017</p>
-                </div>
-                <div class="stat-card" style="text-align: center;">
-                    <div class="stat-number">1000+</div>
-                    <div class="stat-label">Pelanggan Puas</div>
-                    <p style="color: #6B7280; font-size: 0.9rem; margin-top: 0.5rem;">Seluruh Indonesia</p>
-                </div>
-                <div class="stat-card" style="text-align: center;">
-                    <div class="stat-number">100%</div>
-                    <div class="stat-label">Ikan Segar</div>
-                    <p style="color: #6B7280; font-size: 0.9rem; margin-top: 0.5rem;">Garansi kesegaran</p>
-                </div>
-                <div class="stat-card" style="text-align: center;">
-                    <div class="stat-number">24/7</div>
-                    <div class="stat-label">Layanan</div>
-                    <p style="color: #6B7280; font-size: 0.9rem; margin-top: 0.5rem;">Support WhatsApp</p>
-                </div>
+    <!-- Featured Products -->
+    <div style="margin: 4rem 0;">
+        <div style="text-align: center; margin-bottom: 2rem;">
+            <h2 style="color: var(--primary); font-size: 2.5rem; margin-bottom: 1rem;">
+                <i class="fas fa-fire"></i> Produk Unggulan
+            </h2>
+            <p style="color: #6B7280; font-size: 1.1rem; max-width: 600px; margin: 0 auto;">
+                Produk terbaik pilihan pelanggan kami dengan kualitas premium
+            </p>
+        </div>
+        
+        <div class="grid grid-4">
+            {featured_html or '''
+            <div class="card" style="text-align: center; padding: 3rem; grid-column: span 4;">
+                <i class="fas fa-box-open" style="font-size: 3rem; color: #6B7280; margin-bottom: 1rem;"></i>
+                <h3>Belum Ada Produk Unggulan</h3>
+                <p>Silakan tambahkan produk dengan menandai sebagai "unggulan"</p>
             </div>
+            '''}
+        </div>
+        
+        {featured_products and '''
+        <div style="text-align: center; margin-top: 3rem;">
+            <a href="/products" class="btn btn-primary" style="padding: 1rem 3rem; font-size: 1.1rem;">
+                <i class="fas fa-store"></i> Lihat Semua Produk
+            </a>
         </div>
+        ''' or ''}
+    </div>
 
-        <!-- Testimonials Section -->
-        <div style="margin: 4rem 0;">
-            <h2 style="text-align: center; color: var(--primary); margin-bottom: 3rem; font-size: 2.5rem;">
-                <i class="fas fa-comment-dots"></i> Testimoni Pelanggan
-            </h2>
-            
-            <div class="grid grid-3">
-                <div class="card" style="padding: 2rem;">
-                    <div style="display: flex; align-items: center; margin-bottom: 1.5rem;">
-                        <div style="width: 50px; height: 50px; border-radius: 50%; background: var(--primary); color: white; display: flex; align-items: center; justify-content: center; margin-right: 1rem;">
-                            <i class="fas fa-user"></i>
-                        </div>
-                        <div>
-                            <h4 style="margin: 0; color: var(--dark);">Budi Santoso</h4>
-                            <p style="margin: 0; color: #6B7280; font-size: 0.9rem;">Restoran Sari Rasa</p>
-                        </div>
+    <!-- Stats Section -->
+    <div style="margin: 4rem 0;">
+        <div class="stats">
+            <div class="stat-card" style="text-align: center;">
+                <div class="stat-number">7+</div>
+                <div class="stat-label">Tahun Pengalaman</div>
+                <p style="color: #6B7280; font-size: 0.9rem; margin-top: 0.5rem;">Sejak 2017</p>
+            </div>
+            <div class="stat-card" style="text-align: center;">
+                <div class="stat-number">1000+</div>
+                <div class="stat-label">Pelanggan Puas</div>
+                <p style="color: #6B7280; font-size: 0.9rem; margin-top: 0.5rem;">Seluruh Indonesia</p>
+            </div>
+            <div class="stat-card" style="text-align: center;">
+                <div class="stat-number">100%</div>
+                <div class="stat-label">Ikan Segar</div>
+                <p style="color: #6B7280; font-size: 0.9rem; margin-top: 0.5rem;">Garansi kesegaran</p>
+            </div>
+            <div class="stat-card" style="text-align: center;">
+                <div class="stat-number">24/7</div>
+                <div class="stat-label">Layanan</div>
+                <p style="color: #6B7280; font-size: 0.9rem; margin-top: 0.5rem;">Support WhatsApp</p>
+            </div>
+        </div>
+    </div>
+
+    <!-- Testimonials Section -->
+    <div style="margin: 4rem 0;">
+        <h2 style="text-align: center; color: var(--primary); margin-bottom: 3rem; font-size: 2.5rem;">
+            <i class="fas fa-comment-dots"></i> Testimoni Pelanggan
+        </h2>
+        
+        <div class="grid grid-3">
+            <div class="card" style="padding: 2rem;">
+                <div style="display: flex; align-items: center; margin-bottom: 1.5rem;">
+                    <div style="width: 50px; height: 50px; border-radius: 50%; background: var(--primary); color: white; display: flex; align-items: center; justify-content: center; margin-right: 1rem;">
+                        <i class="fas fa-user"></i>
                     </div>
-                    <p style="color: #6B7280; font-style: italic;">"Ikan masnya selalu segar, cocok untuk menu andalan restoran saya. Pengirimannya cepat dan tepat waktu!"</p>
-                    <div style="color: var(--warning); margin-top: 1rem;">
-                        <i class="fas fa-star"></i>
-                        <i class="fas fa-star"></i>
-                        <i class="fas fa-star"></i>
-                        <i class="fas fa-star"></i>
-                        <i class="fas fa-star"></i>
+                    <div>
+                        <h4 style="margin: 0; color: var(--dark);">Budi Santoso</h4>
+                        <p style="margin: 0; color: #6B7280; font-size: 0.9rem;">Restoran Sari Rasa</p>
                     </div>
                 </div>
-                
-                <div class="card" style="padding: 2rem;">
-                    <div style="display: flex; align-items: center; margin-bottom: 1.5rem;">
-                        <div style="width: 50px; height: 50px; border-radius: 50%; background: var(--success); color: white; display: flex; align-items: center; justify-content: center; margin-right: 1rem;">
-                            <i class="fas fa-user"></i>
-                        </div>
-                        <div>
-                            <h4 style="margin: 0; color: var(--dark);">Siti Aminah</h4>
-                            <p style="margin: 0; color: #6B7280; font-size: 0.9rem;">Pemilik Kolam Ikan</p>
-                        </div>
-                    </div>
-                    <p style="color: #6B7280; font-style: italic;">"Bibit ikan mas dari Kang-Mas Shop pertumbuhannya cepat dan sehat. Sudah 3 tahun langganan, tidak pernah mengecewakan."</p>
-                    <div style="color: var(--warning); margin-top: 1rem;">
-                        <i class="fas fa-star"></i>
-                        <i class="fas fa-star"></i>
-                        <i class="fas fa-star"></i>
-                        <i class="fas fa-star"></i>
-                        <i class="fas fa-star-half-alt"></i>
-                    </div>
+                <p style="color: #6B7280; font-style: italic;">"Ikan masnya selalu segar, cocok untuk menu andalan restoran saya. Pengirimannya cepat dan tepat waktu!"</p>
+                <div style="color: var(--warning); margin-top: 1rem;">
+                    <i class="fas fa-star"></i>
+                    <i class="fas fa-star"></i>
+                    <i class="fas fa-star"></i>
+                    <i class="fas fa-star"></i>
+                    <i class="fas fa-star"></i>
                 </div>
-                
-                <div class="card" style="padding: 2rem;">
-                    <div style="display: flex; align-items: center; margin-bottom: 1.5rem;">
-                        <div style="width: 50px; height: 50px; border-radius: 50%; background: var(--error); color: white; display: flex; align-items: center; justify-content: center; margin-right: 1rem;">
-                            <i class="fas fa-user"></i>
-                        </div>
-                        <div>
-                            <h4 style="margin: 0; color: var(--dark);">Rudi Hartono</h4>
-                            <p style="margin: 0; color: #6B7280; font-size: 0.9rem;">Pengusaha Ikan</p>
-                        </div>
+            </div>
+            
+            <div class="card" style="padding: 2rem;">
+                <div style="display: flex; align-items: center; margin-bottom: 1.5rem;">
+                    <div style="width: 50px; height: 50px; border-radius: 50%; background: var(--success); color: white; display: flex; align-items: center; justify-content: center; margin-right: 1rem;">
+                        <i class="fas fa-user"></i>
                     </div>
-                    <p style="color: #6B7280; font-style: italic;">"Sistem akuntansinya sangat membantu mengelola keuangan usaha. Sekarang lebih mudah menghitung laba rugi."</p>
-                    <div style="color: var(--warning); margin-top: 1rem;">
-                        <i class="fas fa-star"></i>
-                        <i class="fas fa-star"></i>
-                        <i class="fas fa-star"></i>
-                        <i class="fas fa-star"></i>
-                        <i class="fas fa-star"></i>
+                    <div>
+                        <h4 style="margin: 0; color: var(--dark);">Siti Aminah</h4>
+                        <p style="margin: 0; color: #6B7280; font-size: 0.9rem;">Pemilik Kolam Ikan</p>
                     </div>
                 </div>
+                <p style="color: #6B7280; font-style: italic;">"Bibit ikan mas dari Kang-Mas Shop pertumbuhannya cepat dan sehat. Sudah 3 tahun langganan, tidak pernah mengecewakan."</p>
+                <div style="color: var(--warning); margin-top: 1rem;">
+                    <i class="fas fa-star"></i>
+                    <i class="fas fa-star"></i>
+                    <i class="fas fa-star"></i>
+                    <i class="fas fa-star"></i>
+                    <i class="fas fa-star-half-alt"></i>
+                </div>
             </div>
-        </div>
-
-        <!-- About Section -->
-        <div class="card" style="background: linear-gradient(135deg, var(--primary) 0%, var(--ocean-deep) 100%); color: white; margin: 4rem 0; padding: 3rem;">
-            <div class="grid grid-2">
-                <div>
-                    <h2 style="color: white; margin-bottom: 1.5rem; font-size: 2.5rem;">Tentang Kami</h2>
-                    <p style="margin-bottom: 1.5rem; opacity: 0.9; font-size: 1.1rem;">
-                        Kang-Mas Shop berdiri sejak 2017 dengan komitmen memberikan ikan mas berkualitas terbaik langsung dari kolam di Magelang. 
-                        Kami mengutamakan kesegaran dan kepuasan pelanggan dalam setiap transaksi.
-                    </p>
-                    <p style="margin-bottom: 1.5rem; opacity: 0.9; font-size: 1.1rem;">
-                        Selain menjual ikan mas segar, kami juga menyediakan sistem akuntansi terintegrasi untuk membantu pengusaha ikan mengelola keuangan dengan lebih baik.
-                    </p>
-                    <div style="display: flex; gap: 1rem; margin-top: 2rem;">
-                        <a href="https://wa.me/6289654733875" target="_blank" class="btn" style="background: white; color: var(--primary);">
-                            <i class="fab fa-whatsapp"></i> WhatsApp Kami
-                        </a>
-                        <a href="/products" class="btn" style="background: rgba(255,255,255,0.2); color: white; border: 1px solid white;">
-                            <i class="fas fa-store"></i> Belanja Sekarang
-                        </a>
+            
+            <div class="card" style="padding: 2rem;">
+                <div style="display: flex; align-items: center; margin-bottom: 1.5rem;">
+                    <div style="width: 50px; height: 50px; border-radius: 50%; background: var(--error); color: white; display: flex; align-items: center; justify-content: center; margin-right: 1rem;">
+                        <i class="fas fa-user"></i>
                     </div>
-                </div>
-                <div style="display: flex; justify-content: center; align-items: center;">
-                    <div style="background: rgba(255,255,255,0.1); padding: 2rem; border-radius: var(--border-radius); backdrop-filter: blur(10px);">
-                        <h3 style="color: white; margin-bottom: 1rem;"><i class="fas fa-clock"></i> Jam Operasional</h3>
-                        <ul style="list-style: none; padding: 0; margin: 0;">
-                            <li style="margin-bottom: 0.5rem; padding: 0.5rem 0; border-bottom: 1px solid rgba(255,255,255,0.1);">Senin - Jumat: 08:00 - 17:00</li>
-                            <li style="margin-bottom: 0.5rem; padding: 0.5rem 0; border-bottom: 1px solid rgba(255,255,255,0.1);">Sabtu: 08:00 - 15:00</li>
-                            <li style="padding: 0.5rem 0;">Minggu: Tutup</li>
-                        </ul>
-                        <div style="margin-top: 1.5rem; padding-top: 1.5rem; border-top: 1px solid rgba(255,255,255,0.1);">
-                            <p style="margin: 0; opacity: 0.9;"><i class="fas fa-phone"></i> +62 896-5473-3875</p>
-                            <p style="margin: 0; opacity: 0.9;"><i class="fas fa-map-marker-alt"></i> Magelang, Jawa Tengah</p>
-                        </div>
+                    <div>
+                        <h4 style="margin: 0; color: var(--dark);">Rudi Hartono</h4>
+                        <p style="margin: 0; color: #6B7280; font-size: 0.9rem;">Pengusaha Ikan</p>
                     </div>
                 </div>
+                <p style="color: #6B7280; font-style: italic;">"Sistem akuntansinya sangat membantu mengelola keuangan usaha. Sekarang lebih mudah menghitung laba rugi."</p>
+                <div style="color: var(--warning); margin-top: 1rem;">
+                    <i class="fas fa-star"></i>
+                    <i class="fas fa-star"></i>
+                    <i class="fas fa-star"></i>
+                    <i class="fas fa-star"></i>
+                    <i class="fas fa-star"></i>
+                </div>
             </div>
         </div>
+    </div>
 
-        <!-- CTA Section -->
-        <div style="text-align: center; margin: 4rem 0;">
-            <div class="card" style="background: var(--ocean-light); padding: 4rem 2rem;">
-                <h2 style="color: var(--primary); margin-bottom: 1.5rem; font-size: 2.5rem;">Siap Membeli Ikan Segar?</h2>
-                <p style="color: #6B7280; font-size: 1.1rem; max-width: 600px; margin: 0 auto 2rem;">
-                    Bergabunglah dengan ribuan pelanggan puas kami dan dapatkan ikan mas berkualitas terbaik dengan harga kompetitif.
+    <!-- About Section -->
+    <div class="card" style="background: linear-gradient(135deg, var(--primary) 0%, var(--ocean-deep) 100%); color: white; margin: 4rem 0; padding: 3rem;">
+        <div class="grid grid-2">
+            <div>
+                <h2 style="color: white; margin-bottom: 1.5rem; font-size: 2.5rem;">Tentang Kami</h2>
+                <p style="margin-bottom: 1.5rem; opacity: 0.9; font-size: 1.1rem;">
+                    Kang-Mas Shop berdiri sejak 2017 dengan komitmen memberikan ikan mas berkualitas terbaik langsung dari kolam di Magelang. 
+                    Kami mengutamakan kesegaran dan kepuasan pelanggan dalam setiap transaksi.
                 </p>
-                <div style="display: flex; gap: 1rem; justify-content: center; flex-wrap: wrap;">
-                    {current_user.user_type == 'customer' and '''
-                    <a href="/products" class="btn btn-primary" style="padding: 1rem 3rem; font-size: 1.1rem;">
-                        <i class="fas fa-shopping-cart"></i> Belanja Sekarang
-                    </a>
-                    <a href="/cart" class="btn btn-success" style="padding: 1rem 3rem; font-size: 1.1rem;">
-                        <i class="fas fa-cart-arrow-down"></i> Lihat Keranjang
-                    </a>
-                    ''' or '''
-                    <a href="/seller/dashboard" class="btn btn-primary" style="padding: 1rem 3rem; font-size: 1.1rem;">
-                        <i class="fas fa-chart-line"></i> Dashboard Seller
+                <p style="margin-bottom: 1.5rem; opacity: 0.9; font-size: 1.1rem;">
+                    Selain menjual ikan mas segar, kami juga menyediakan sistem akuntansi terintegrasi untuk membantu pengusaha ikan mengelola keuangan dengan lebih baik.
+                </p>
+                <div style="display: flex; gap: 1rem; margin-top: 2rem;">
+                    <a href="https://wa.me/6289654733875" target="_blank" class="btn" style="background: white; color: var(--primary);">
+                        <i class="fab fa-whatsapp"></i> WhatsApp Kami
                     </a>
-                    <a href="/seller/accounting" class="btn btn-success" style="padding: 1rem 3rem; font-size: 1.1rem;">
-                        <i class="fas fa-calculator"></i> Sistem Akuntansi
+                    <a href="/products" class="btn" style="background: rgba(255,255,255,0.2); color: white; border: 1px solid white;">
+                        <i class="fas fa-store"></i> Belanja Sekarang
                     </a>
-                    '''}
+                </div>
+            </div>
+            <div style="display: flex; justify-content: center; align-items: center;">
+                <div style="background: rgba(255,255,255,0.1); padding: 2rem; border-radius: var(--border-radius); backdrop-filter: blur(10px);">
+                    <h3 style="color: white; margin-bottom: 1rem;"><i class="fas fa-clock"></i> Jam Operasional</h3>
+                    <ul style="list-style: none; padding: 0; margin: 0;">
+                        <li style="margin-bottom: 0.5rem; padding: 0.5rem 0; border-bottom: 1px solid rgba(255,255,255,0.1);">Senin - Jumat: 08:00 - 17:00</li>
+                        <li style="margin-bottom: 0.5rem; padding: 0.5rem 0; border-bottom: 1px solid rgba(255,255,255,0.1);">Sabtu: 08:00 - 15:00</li>
+                        <li style="padding: 0.5rem 0;">Minggu: Tutup</li>
+                    </ul>
+                    <div style="margin-top: 1.5rem; padding-top: 1.5rem; border-top: 1px solid rgba(255,255,255,0.1);">
+                        <p style="margin: 0; opacity: 0.9;"><i class="fas fa-phone"></i> +62 896-5473-3875</p>
+                        <p style="margin: 0; opacity: 0.9;"><i class="fas fa-map-marker-alt"></i> Magelang, Jawa Tengah</p>
+                    </div>
                 </div>
             </div>
         </div>
-        '''
-        
-        return base_html('Home', content)
-    except Exception as e:
-        print(f"Error in index route: {e}")
-        return base_html('Home', '''
-        <div class="card" style="text-align: center; padding: 4rem;">
-            <i class="fas fa-fish" style="font-size: 4rem; color: var(--primary); margin-bottom: 2rem;"></i>
-            <h2 style="color: var(--primary);">Welcome to Kang-Mas Shop</h2>
-            <p>Error loading content. Please try again.</p>
-            <a href="/" class="btn btn-primary" style="margin-top: 1rem;">Refresh Page</a>
+    </div>
+
+    <!-- CTA Section -->
+    <div style="text-align: center; margin: 4rem 0;">
+        <div class="card" style="background: var(--ocean-light); padding: 4rem 2rem;">
+            <h2 style="color: var(--primary); margin-bottom: 1.5rem; font-size: 2.5rem;">Siap Membeli Ikan Segar?</h2>
+            <p style="color: #6B7280; font-size: 1.1rem; max-width: 600px; margin: 0 auto 2rem;">
+                Bergabunglah dengan ribuan pelanggan puas kami dan dapatkan ikan mas berkualitas terbaik dengan harga kompetitif.
+            </p>
+            <div style="display: flex; gap: 1rem; justify-content: center; flex-wrap: wrap;">
+                {current_user.user_type == 'customer' and '''
+                <a href="/products" class="btn btn-primary" style="padding: 1rem 3rem; font-size: 1.1rem;">
+                    <i class="fas fa-shopping-cart"></i> Belanja Sekarang
+                </a>
+                <a href="/cart" class="btn btn-success" style="padding: 1rem 3rem; font-size: 1.1rem;">
+                    <i class="fas fa-cart-arrow-down"></i> Lihat Keranjang
+                </a>
+                ''' or '''
+                <a href="/seller/dashboard" class="btn btn-primary" style="padding: 1rem 3rem; font-size: 1.1rem;">
+                    <i class="fas fa-chart-line"></i> Dashboard Seller
+                </a>
+                <a href="/seller/accounting" class="btn btn-success" style="padding: 1rem 3rem; font-size: 1.1rem;">
+                    <i class="fas fa-calculator"></i> Sistem Akuntansi
+                </a>
+                '''}
+            </div>
         </div>
-        ''')
+    </div>
+    '''
     
+    return base_html('Home', content, late_bound=True)
+
 # ===== ROUTES AUTH =====
 @app.route('/register', methods=['GET', 'POST'])
 def register():
@@ -7259,7 +6973,7 @@ def login():
         else:
             flash('Email atau password salah!', 'error')
 
-    settings = {s.key: s.value for s in AppSetting.query.all()}
+    settings = get_app_settings()
     app_logo = settings.get('app_logo', '/static/uploads/logos/logo.png')
 
     content = f'''
@@ -7416,46 +7130,335 @@ def profile():
         flash('Terjadi error saat memuat profile.', 'error')
         return redirect('/')
 
-@app.route('/products')
-@login_required
-def products():
+# ===== KATALOG PRODUK =====
+CATALOG_PAGE_SIZE = 12
+CATALOG_SORTS = {
+    'terbaru': ('Terbaru', lambda: (Product.created_at.desc(), Product.id.desc())),
+    'harga_terendah': ('Harga Terendah', lambda: (Product.price.asc(), Product.id.asc())),
+    'harga_tertinggi': ('Harga Tertinggi', lambda: (Product.price.desc(), Product.id.desc())),
+    'nama': ('Nama A-Z', lambda: (Product.name.asc(), Product.id.asc())),
+}
+CATALOG_CATEGORY_LABELS = {'bibit': 'Bibit', 'konsumsi': 'Konsumsi', 'ikan_mas': 'Ikan Mas'}
+
+# Index pencarian: 'fts5' (SQLite), 'tsvector' (PostgreSQL) atau 'like' bila tidak tersedia
+PRODUCT_SEARCH_BACKEND = 'like'
+PRODUCT_SEARCH_TSVECTOR = "to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(description, ''))"
+
+def ensure_product_search_index():
+    """Siapkan index full-text produk sesuai database (FTS5 + trigger / GIN tsvector)"""
+    global PRODUCT_SEARCH_BACKEND
     try:
-        products_list = Product.query.filter_by(is_active=True).all()
+        if db.engine.dialect.name == 'postgresql':
+            db.session.execute(db.text(
+                f'CREATE INDEX IF NOT EXISTS ix_product_search ON product USING GIN ({PRODUCT_SEARCH_TSVECTOR})'
+            ))
+            db.session.commit()
+            PRODUCT_SEARCH_BACKEND = 'tsvector'
+        elif db.engine.dialect.name == 'sqlite':
+            exists = db.session.execute(db.text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'product_fts'"
+            )).first()
+            statements = [
+                "CREATE VIRTUAL TABLE IF NOT EXISTS product_fts USING fts5("
+                "name, description, content='product', content_rowid='id')",
+                "CREATE TRIGGER IF NOT EXISTS product_fts_ai AFTER INSERT ON product BEGIN "
+                "INSERT INTO product_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+                "CREATE TRIGGER IF NOT EXISTS product_fts_ad AFTER DELETE ON product BEGIN "
+                "INSERT INTO product_fts(product_fts, rowid, name, description) "
+                "VALUES ('delete', old.id, old.name, old.description); END",
+                # Hanya saat nama/deskripsi berubah - update stok tidak menyentuh index
+                "CREATE TRIGGER IF NOT EXISTS product_fts_au AFTER UPDATE OF name, description ON product BEGIN "
+                "INSERT INTO product_fts(product_fts, rowid, name, description) "
+                "VALUES ('delete', old.id, old.name, old.description); "
+                "INSERT INTO product_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+            ]
+            for statement in statements:
+                db.session.execute(db.text(statement))
+            if not exists:
+                db.session.execute(db.text("INSERT INTO product_fts(product_fts) VALUES ('rebuild')"))
+            db.session.commit()
+            PRODUCT_SEARCH_BACKEND = 'fts5'
+        print(f"✅ Pencarian produk memakai {PRODUCT_SEARCH_BACKEND}")
+    except Exception as e:
+        db.session.rollback()
+        PRODUCT_SEARCH_BACKEND = 'like'
+        print(f"⚠️ Index full-text produk tidak tersedia, memakai LIKE: {e}")
 
-        products_html = ""
-        for product in products_list:
-            weight_info = f"{product.weight_kg}kg" if product.weight_kg else f"{product.size_cm}cm"
-            add_to_cart_btn = ''
-            if current_user.user_type == 'customer':
-                add_to_cart_btn = f'''
+def get_product_search_filter(query_text):
+    """Filter pencarian nama/deskripsi produk untuk backend yang aktif, atau None jika kosong"""
+    terms = re.findall(r'\w+', query_text or '')[:8]
+    if not terms:
+        return None
+
+    if PRODUCT_SEARCH_BACKEND == 'fts5':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        return Product.id.in_(
+            db.select(db.literal_column('rowid')).select_from(db.text('product_fts'))
+            .where(db.text('product_fts MATCH :match').bindparams(match=match))
+        )
+
+    if PRODUCT_SEARCH_BACKEND == 'tsvector':
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        return db.text(f"{PRODUCT_SEARCH_TSVECTOR} @@ to_tsquery('simple', :tsquery)").bindparams(tsquery=tsquery)
+
+    return db.and_(*[
+        db.or_(Product.name.ilike(f'%{term}%'), Product.description.ilike(f'%{term}%'))
+        for term in terms
+    ])
+
+def parse_catalog_params(args):
+    """Normalisasi parameter katalog (q, category, min_price, max_price, in_stock, featured, sort, page)"""
+    def parse_price(value):
+        try:
+            return float(value) if value not in (None, '') else None
+        except ValueError:
+            return None
+
+    try:
+        page = max(int(args.get('page', 1)), 1)
+    except (TypeError, ValueError):
+        page = 1
+
+    return {
+        'q': (args.get('q') or '').strip(),
+        'category': args.get('category') or '',
+        'min_price': parse_price(args.get('min_price')),
+        'max_price': parse_price(args.get('max_price')),
+        'in_stock': args.get('in_stock') in ('1', 'true', 'on'),
+        'featured': args.get('featured') in ('1', 'true', 'on'),
+        'sort': args.get('sort') if args.get('sort') in CATALOG_SORTS else 'terbaru',
+        'page': page,
+    }
+
+def get_catalog_page(params, page_size=CATALOG_PAGE_SIZE):
+    """Satu halaman katalog produk aktif sesuai filter. Return (products, has_more).
+
+    Tanpa COUNT: ambil page_size + 1 baris untuk tahu masih ada halaman berikutnya.
+    """
+    query = Product.query.filter(Product.is_active.is_(True))
+
+    if params['category']:
+        query = query.filter(Product.category == params['category'])
+    if params['min_price'] is not None:
+        query = query.filter(Product.price >= params['min_price'])
+    if params['max_price'] is not None:
+        query = query.filter(Product.price <= params['max_price'])
+    if params['in_stock']:
+        query = query.filter(Product.stock > 0)
+    if params['featured']:
+        query = query.filter(Product.is_featured.is_(True))
+
+    search_filter = get_product_search_filter(params['q'])
+    if search_filter is not None:
+        query = query.filter(search_filter)
+
+    products = query.order_by(*CATALOG_SORTS[params['sort']][1]()).offset(
+        (params['page'] - 1) * page_size
+    ).limit(page_size + 1).all()
+
+    has_more = len(products) > page_size
+    return products[:page_size], has_more
+
+def catalog_query_string(params, **overrides):
+    """Query string katalog dari parameter yang terisi (untuk link/fetch halaman berikutnya)"""
+    values = {**params, **overrides}
+    query = {}
+    for key, value in values.items():
+        if value in (None, '', False) or (key == 'sort' and value == 'terbaru') or (key == 'page' and value == 1):
+            continue
+        query[key] = '1' if value is True else value
+    return urlencode(query)
+
+def render_product_cards(products):
+    """Kartu produk untuk grid katalog"""
+    parts = []
+    for product in products:
+        weight_info = f"{product.weight_kg}kg" if product.weight_kg else f"{product.size_cm}cm"
+        add_to_cart_btn = ''
+        if current_user.user_type == 'customer':
+            add_to_cart_btn = f'''
                 <button class="btn btn-primary" onclick="addToCart({product.id})" style="margin-top: 1rem;">
                     <i class="fas fa-cart-plus"></i> Tambah ke Keranjang
                 </button>
                 '''
 
-            products_html += f'''
+        parts.append(f'''
             <div class="card">
-                <img src="{product.image_url}" alt="{product.name}" class="product-image" onerror="this.style.display='none'">
+                {product_image_html(product)}
                 <h3>{product.name}</h3>
                 <p>{product.description}</p>
                 <div class="price">Rp {product.price:,.0f}</div>
                 <p>Stock: {product.stock} | {weight_info}</p>
                 {add_to_cart_btn}
             </div>
-            '''
+            ''')
+    return ''.join(parts)
+
+def render_catalog_filter_form(params):
+    """Form pencarian, filter, dan urutan katalog"""
+    categories = [category for (category,) in db.session.query(Product.category).filter(
+        Product.is_active.is_(True), Product.category.isnot(None)
+    ).distinct().order_by(Product.category).all()]
+    category_options = ''.join(
+        f'<option value="{category}" {"selected" if params["category"] == category else ""}>'
+        f'{CATALOG_CATEGORY_LABELS.get(category, category)}</option>'
+        for category in categories
+    )
+    sort_options = ''.join(
+        f'<option value="{key}" {"selected" if params["sort"] == key else ""}>{label}</option>'
+        for key, (label, _) in CATALOG_SORTS.items()
+    )
+    min_price = '' if params['min_price'] is None else f"{params['min_price']:.0f}"
+    max_price = '' if params['max_price'] is None else f"{params['max_price']:.0f}"
 
-        content = f'''
-        <h1 style="color: var(--primary);"><i class="fas fa-store"></i> Semua Produk</h1>
-        <div class="grid grid-3">
-            {products_html}
+    return f'''
+        <form method="GET" action="/products" class="card" style="display: flex; gap: 1rem; align-items: flex-end; flex-wrap: wrap;">
+            <div style="flex: 2; min-width: 200px;">
+                <label class="form-label">Cari</label>
+                <input type="search" name="q" class="form-control" value="{escape_html(params['q'], quote=True)}" placeholder="Nama atau deskripsi produk">
+            </div>
+            <div>
+                <label class="form-label">Kategori</label>
+                <select name="category" class="form-control">
+                    <option value="">Semua</option>
+                    {category_options}
+                </select>
+            </div>
+            <div>
+                <label class="form-label">Harga Min</label>
+                <input type="number" name="min_price" class="form-control" min="0" value="{min_price}" style="width: 120px;">
+            </div>
+            <div>
+                <label class="form-label">Harga Maks</label>
+                <input type="number" name="max_price" class="form-control" min="0" value="{max_price}" style="width: 120px;">
+            </div>
+            <div>
+                <label class="form-label">Urutkan</label>
+                <select name="sort" class="form-control">{sort_options}</select>
+            </div>
+            <label><input type="checkbox" name="in_stock" value="1" {'checked' if params['in_stock'] else ''}> Ada stok</label>
+            <label><input type="checkbox" name="featured" value="1" {'checked' if params['featured'] else ''}> Unggulan</label>
+            <button type="submit" class="btn btn-primary"><i class="fas fa-search"></i> Cari</button>
+        </form>
+    '''
+
+def render_catalog_more_link(params, has_more):
+    """Penanda halaman berikutnya: dipakai infinite scroll, tetap bisa diklik tanpa JavaScript"""
+    if not has_more:
+        return ''
+    next_page = params['page'] + 1
+    return f'''
+        <div id="catalogMore" style="text-align: center; margin: 1.5rem 0;"
+             data-src="/api/products?{catalog_query_string(params, page=next_page)}">
+            <a href="/products?{catalog_query_string(params, page=next_page)}" class="btn btn-info">
+                <i class="fas fa-chevron-down"></i> Muat lebih banyak
+            </a>
         </div>
-        '''
-        return base_html('Produk', content)
+    '''
+
+@app.route('/products')
+@login_required
+def products():
+    try:
+        params = parse_catalog_params(request.args)
+        return render_storefront_page(
+            ('products', tuple(sorted(params.items()))),
+            lambda: render_products_page(params)
+        )
     except Exception as e:
         print(f"Error in products route: {e}")
         flash('Terjadi error saat memuat produk.', 'error')
         return redirect('/')
 
+def render_products_page(params):
+    """Halaman katalog (halaman pertama + filter) untuk tipe user saat ini"""
+    products_list, has_more = get_catalog_page(params)
+
+    products_html = render_product_cards(products_list)
+    if not products_html:
+        products_html = '''
+        <div class="card" style="grid-column: 1 / -1; text-align: center;">
+            <p>Tidak ada produk yang cocok dengan pencarian.</p>
+        </div>
+        '''
+
+    content = f'''
+    <h1 style="color: var(--primary);"><i class="fas fa-store"></i> Semua Produk</h1>
+    {render_catalog_filter_form(params)}
+    <div class="grid grid-3" id="catalogGrid">
+        {products_html}
+    </div>
+    {render_catalog_more_link(params, has_more)}
+
+    <script>
+    // Infinite scroll: muat halaman berikutnya saat penanda terlihat
+    (function() {{
+        let loading = false;
+
+        function loadMoreProducts() {{
+            const marker = document.getElementById('catalogMore');
+            if (!marker || loading) return;
+            loading = true;
+
+            fetch(marker.dataset.src)
+            .then(response => response.json())
+            .then(data => {{
+                if (!data.success) throw new Error(data.message);
+                document.getElementById('catalogGrid').insertAdjacentHTML('beforeend', data.html);
+                marker.outerHTML = data.more_html;
+                loading = false;
+                observeMarker();
+            }})
+            .catch(error => {{
+                console.error('Error loading products:', error);
+            }});
+        }}
+
+        function observeMarker() {{
+            const marker = document.getElementById('catalogMore');
+            if (!marker || !('IntersectionObserver' in window)) return;
+            const observer = new IntersectionObserver(entries => {{
+                if (entries.some(entry => entry.isIntersecting)) {{
+                    observer.disconnect();
+                    loadMoreProducts();
+                }}
+            }}, {{ rootMargin: '400px' }});
+            observer.observe(marker);
+        }}
+
+        observeMarker();
+    }})();
+    </script>
+    '''
+    return base_html('Produk', content, late_bound=True)
+
+@app.route('/api/products')
+@login_required
+def api_products():
+    """Halaman katalog dalam JSON untuk infinite scroll"""
+    try:
+        params = parse_catalog_params(request.args)
+        products_list, has_more = get_catalog_page(params)
+
+        return jsonify({
+            'success': True,
+            'page': params['page'],
+            'has_more': has_more,
+            'products': [{
+                'id': product.id,
+                'name': product.name,
+                'price': product.price,
+                'stock': product.stock,
+                'category': product.category,
+                **product_image_data(product)
+            } for product in products_list],
+            'html': render_product_cards(products_list),
+            'more_html': render_catalog_more_link(params, has_more)
+        })
+    except Exception as e:
+        print(f"❌ Error in products API: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
 @app.route('/cart')
 @login_required
 def cart():
@@ -7465,7 +7468,7 @@ def cart():
             flash('Hanya customer yang bisa mengakses keranjang belanja.', 'error')
             return redirect('/')
 
-        cart_items = CartItem.query.filter_by(user_id=current_user.id).all()
+        cart_items, products_by_id = get_cart_lines(current_user.id)
 
         if not cart_items:
             content = '''
@@ -7480,20 +7483,20 @@ def cart():
             total = 0
 
             for item in cart_items:
-                product = Product.query.get(item.product_id)
+                product = products_by_id.get(item.product_id)
                 if product:  # Pastikan product exists
                     subtotal = product.price * item.quantity
                     total += subtotal
 
                     cart_html += f'''
-                    <div class="card" style="display: flex; justify-content: space-between; align-items: center; padding: 1rem 1.5rem; margin-bottom: 1rem; gap: 1.5rem;">
+                    <div class="card cart-line" data-product-id="{product.id}" data-price="{product.price}" style="display: flex; justify-content: space-between; align-items: center; padding: 1rem 1.5rem; margin-bottom: 1rem; gap: 1.5rem;">
                         <div style="flex: 1;">
                             <h4 style="margin: 0 0 0.25rem 0;">{product.name}</h4>
                             <p style="margin: 0;">Harga: Rp {product.price:,.0f}</p>
-                            <p style="margin: 0.15rem 0 0 0; font-weight: 500;">Subtotal: Rp {subtotal:,.0f}</p>
+                            <p style="margin: 0.15rem 0 0 0; font-weight: 500;">Subtotal: Rp <span class="cart-subtotal">{subtotal:,.0f}</span></p>
                         </div>
                         <div style="display: flex; align-items: center; gap: 1rem;">
-                            <form action="/update_cart_item/{item.id}" method="POST" style="display: flex; align-items: center; gap: 0.5rem; margin: 0;">
+                            <form action="/update_cart_item/{item.id}" method="POST" class="cart-qty-form" style="display: flex; align-items: center; gap: 0.5rem; margin: 0;">
                                 <button type="button"
                                         class="qty-btn"
                                         data-target="qty-{item.id}"
@@ -7503,6 +7506,7 @@ def cart():
                                 </button>
                                 <input
                                     id="qty-{item.id}"
+                                    class="cart-qty"
                                     type="number"
                                     name="quantity"
                                     value="{item.quantity}"
@@ -7517,11 +7521,11 @@ def cart():
                                     +
                                 </button>
                                 <span style="margin-left: 0.5rem; font-size: 0.9rem; color: #555;">
-                                    Stok: {getattr(product, 'stock', 0)}
+                                    Stok: <span class="cart-stock">{getattr(product, 'stock', 0)}</span>
                                 </span>
                                 <button type="submit" style="display: none;"></button>
                             </form>
-                            <form action="/remove_from_cart/{item.id}" method="POST" style="margin: 0;">
+                            <form action="/remove_from_cart/{item.id}" method="POST" class="cart-remove-form" style="margin: 0;">
                                 <button type="submit"
                                         class="btn btn-danger"
                                         style="padding: 0.5rem 1.4rem; border-radius: 999px; font-weight: 600; box-shadow: 0 2px 4px rgba(0,0,0,0.15);">
@@ -7533,26 +7537,126 @@ def cart():
                     '''
             cart_html += '''
             <script>
-                document.querySelectorAll('.qty-btn').forEach(function(btn) {
-                    btn.addEventListener('click', function() {
-                        var targetId = this.getAttribute('data-target');
-                        var action = this.getAttribute('data-action');
-                        var input = document.getElementById(targetId);
-                        if (!input) return;
-
-                        var current = parseInt(input.value) || 1;
-                        if (action === 'minus') {
-                            if (current > 1) current -= 1;
-                        } else if (action === 'plus') {
-                            current += 1;
-                        }
-                        input.value = current;
+                // Sesi edit keranjang: perubahan jumlah/hapus dikumpulkan lalu dikirim sekaligus
+                // lewat /api/cart/batch (satu request untuk seluruh perubahan, bukan submit per klik)
+                (function() {
+                    const pending = {};
+                    let timer = null;
+
+                    function formatRupiah(value) {
+                        return Number(value).toLocaleString('en-US', {maximumFractionDigits: 0});
+                    }
+
+                    function updateTotals() {
+                        let total = 0;
+                        document.querySelectorAll('.cart-line').forEach(function(row) {
+                            const quantity = pending[row.dataset.productId] === 0 ? 0 : parseInt(row.querySelector('.cart-qty').value) || 0;
+                            const subtotal = parseFloat(row.dataset.price) * quantity;
+                            row.querySelector('.cart-subtotal').textContent = formatRupiah(subtotal);
+                            total += subtotal;
+                        });
+                        document.getElementById('cartTotal').textContent = formatRupiah(total);
+                    }
+
+                    function takePending() {
+                        const operations = Object.keys(pending).map(function(productId) {
+                            return {
+                                op: pending[productId] > 0 ? 'set' : 'remove',
+                                product_id: parseInt(productId),
+                                quantity: pending[productId]
+                            };
+                        });
+                        Object.keys(pending).forEach(function(productId) { delete pending[productId]; });
+                        return operations;
+                    }
+
+                    function render(cart) {
+                        const lines = {};
+                        cart.items.forEach(function(item) { lines[item.product_id] = item; });
+                        document.querySelectorAll('.cart-line').forEach(function(row) {
+                            const item = lines[row.dataset.productId];
+                            if (!item) {
+                                row.remove();
+                                return;
+                            }
+                            row.style.opacity = '';
+                            row.querySelector('.cart-qty').value = item.quantity;
+                            row.querySelector('.cart-stock').textContent = item.stock;
+                            row.querySelector('.cart-subtotal').textContent = formatRupiah(item.subtotal);
+                        });
+                        document.getElementById('cartTotal').textContent = formatRupiah(cart.total);
+                        if (!cart.items.length) window.location.reload();
+                    }
+
+                    function flush() {
+                        clearTimeout(timer);
+                        const operations = takePending();
+                        if (!operations.length) return Promise.resolve();
+
+                        return syncCart(operations)
+                        .then(function(data) {
+                            if (!data.success) showNotification('❌ ' + data.message, 'error');
+                            if (data.cart) render(data.cart);
+                        })
+                        .catch(function(error) {
+                            console.error('Error syncing cart:', error);
+                            showNotification('❌ Gagal memperbarui keranjang', 'error');
+                        });
+                    }
+
+                    function queue(productId, quantity) {
+                        pending[productId] = quantity;
+                        updateTotals();
+                        clearTimeout(timer);
+                        timer = setTimeout(flush, 600);
+                    }
 
-                        // auto-submit form untuk update quantity di backend
-                        var form = this.closest('form');
-                        if (form) form.submit();
+                    document.querySelectorAll('.cart-line').forEach(function(row) {
+                        const productId = row.dataset.productId;
+                        const input = row.querySelector('.cart-qty');
+
+                        row.querySelectorAll('.qty-btn').forEach(function(btn) {
+                            btn.addEventListener('click', function() {
+                                let current = parseInt(input.value) || 1;
+                                if (btn.dataset.action === 'minus' && current > 1) current -= 1;
+                                if (btn.dataset.action === 'plus') current += 1;
+                                input.value = current;
+                                queue(productId, current);
+                            });
+                        });
+
+                        input.addEventListener('change', function() {
+                            input.value = Math.max(parseInt(input.value) || 1, 1);
+                            queue(productId, parseInt(input.value));
+                        });
+
+                        row.querySelector('.cart-qty-form').addEventListener('submit', function(e) {
+                            e.preventDefault();
+                            input.dispatchEvent(new Event('change'));
+                            flush();
+                        });
+
+                        row.querySelector('.cart-remove-form').addEventListener('submit', function(e) {
+                            e.preventDefault();
+                            row.style.opacity = '0.5';
+                            queue(productId, 0);
+                        });
                     });
-                });
+
+                    // Perubahan yang belum terkirim disimpan dulu sebelum checkout / meninggalkan halaman
+                    window.checkoutCart = function() {
+                        flush().then(checkout);
+                    };
+
+                    window.addEventListener('pagehide', function() {
+                        const operations = takePending();
+                        if (operations.length) {
+                            navigator.sendBeacon('/api/cart/batch', new Blob(
+                                [JSON.stringify({operations: operations})], {type: 'application/json'}
+                            ));
+                        }
+                    });
+                })();
             </script>
             '''
 
@@ -7560,9 +7664,9 @@ def cart():
             <h1 style="color: var(--primary);"><i class="fas fa-shopping-cart"></i> Keranjang Belanja</h1>
             {cart_html}
             <div class="card">
-                <h3>Total: Rp {total:,.0f}</h3>
+                <h3>Total: Rp <span id="cartTotal">{total:,.0f}</span></h3>
                 <div style="display: flex; gap: 1rem; margin-top: 1rem;">
-                    <button class="btn btn-success" onclick="checkout()">
+                    <button class="btn btn-success" onclick="checkoutCart()">
                         <i class="fas fa-credit-card"></i> Checkout Sekarang
                     </button>
                 </div>
@@ -7873,12 +7977,31 @@ def process_checkout():
         order_number = f"ORD{datetime.now().strftime('%Y%m%d%H%M%S')}"
         total_amount = 0
 
-        # Cek stok sebelum checkout
+        quantities = {}
         for cart_item in cart_items:
-            product = Product.query.get(cart_item.product_id)
-            if not product or product.stock < cart_item.quantity:
-                product_name = product.name if product else 'Produk'
-                return jsonify({'success': False, 'message': f'Stock {product_name} tidak mencukupi'})
+            quantities[cart_item.product_id] = quantities.get(cart_item.product_id, 0) + cart_item.quantity
+        products = {product.id: product for product in Product.query.filter(Product.id.in_(list(quantities))).all()}
+
+        # Reservasi stok atomik: baris StockHead dikunci hanya bila stok cukup, tidak bisa oversell antar worker
+        failed_ids = [product_id for product_id in quantities if product_id not in products]
+        failed_ids += reserve_stock({pid: qty for pid, qty in quantities.items() if pid in products})
+        if failed_ids:
+            db.session.rollback()
+            available = dict(db.session.query(StockHead.product_id, StockHead.balance_quantity).filter(
+                StockHead.product_id.in_(failed_ids)
+            ).all())
+            failed_items = [{
+                'product_id': product_id,
+                'name': products[product_id].name if product_id in products else 'Produk',
+                'requested': quantities[product_id],
+                'available': available.get(product_id, 0)
+            } for product_id in failed_ids]
+            names = ', '.join(item['name'] for item in failed_items)
+            return jsonify({
+                'success': False,
+                'message': f'Stock {names} tidak mencukupi',
+                'failed_items': failed_items
+            })
 
         order = Order(
             order_number=order_number,
@@ -7899,54 +8022,36 @@ def process_checkout():
         db.session.add(order)
         db.session.flush()  # Untuk dapat order.id
 
-        # Kurangi stok dan buat order items
-        order_items = []
-        for cart_item in cart_items:
-            product = Product.query.get(cart_item.product_id)
-            if product:
-                product.stock -= cart_item.quantity  # Kurangi stok
-                print(f"✅ Stok {product.name} berkurang {cart_item.quantity} menjadi {product.stock}")
-
-                order_item = OrderItem(
-                    order_id=order.id,
-                    product_id=product.id,
-                    quantity=cart_item.quantity,
-                    price=product.price,
-                    cost_price=product.cost_price
-                )
-                db.session.add(order_item)
-                order_items.append(order_item)
-                total_amount += product.price * cart_item.quantity
+        # Buat order items beserta mutasi stok (referensi order - tidak dicatat ulang saat order selesai)
+        for product_id, quantity in quantities.items():
+            product = products[product_id]
+            movement = record_stock_movement(
+                product_id,
+                'penjualan',
+                quantity_out=quantity,
+                description=f"Penjualan - Order #{order.order_number}",
+                reference=order_stock_reference(order)
+            )
+            print(f"✅ Stok {product.name} berkurang {quantity} menjadi {product.stock}")
+
+            db.session.add(OrderItem(
+                order_id=order.id,
+                product_id=product_id,
+                quantity=quantity,
+                price=product.price,
+                cost_price=movement.unit_price  # HPP order mengikuti nilai keluar persediaan (FIFO / rata-rata)
+            ))
+            total_amount += product.price * quantity
 
         # Tambahkan ongkos kirim
         shipping_cost = 15000
         total_amount += shipping_cost
 
         order.total_amount = total_amount
-        db.session.commit()
-
-        # ========= 💡 TAMBAHAN UNTUK KARTU PERSEDIAAN =========
-        # Buat transaksi persediaan (penjualan) supaya muncul di Kartu Persediaan
-        from datetime import datetime as dt
-
-        for order_item in order_items:
-            try:
-                desc = f"Penjualan - Order #{order.order_number}"
-                create_inventory_transaction(
-                    product_id=order_item.product_id,
-                    date=dt.now(),
-                    description=desc,
-                    transaction_type='penjualan',
-                    quantity_in=0,
-                    quantity_out=order_item.quantity,
-                    unit_price=order_item.cost_price or 0
-                )
-            except Exception as inv_err:
-                print(f"❌ Error create inventory transaction dari order: {inv_err}")
-        # ======================================================
 
-        # Hapus cart items
-        CartItem.query.filter_by(user_id=current_user.id).delete()
+        # Hapus cart items (lewat ORM agar versi keranjang ikut naik)
+        for cart_item in cart_items:
+            db.session.delete(cart_item)
         db.session.commit()
 
         # JIKA COD, LANGSUNG KE SUKSES
@@ -8119,6 +8224,15 @@ def seller_dashboard():
         total_sales = total_sales_result if total_sales_result else 0
         total_customers = User.query.filter_by(user_type='customer').count()
 
+        # Saldo kas & pendapatan dalam satu query (id akun dari cache)
+        summary_types = {ref.id: ref.type for ref in (get_account_by_type('kas'), get_account_by_type('pendapatan')) if ref}
+        account_balances = {
+            summary_types[account_id]: balance
+            for account_id, balance in db.session.query(Account.id, Account.balance).filter(
+                Account.id.in_(summary_types)
+            ).all()
+        } if summary_types else {}
+
         # Recent orders
         recent_orders = Order.query.order_by(Order.order_date.desc()).limit(5).all()
         recent_orders_html = ""
@@ -8183,8 +8297,8 @@ def seller_dashboard():
         <div class="grid grid-2">
             <div class="card">
                 <h3 style="color: var(--primary);"><i class="fas fa-money-bill-wave"></i> Ringkasan Keuangan</h3>
-                <p><strong>Kas:</strong> Rp {Account.query.filter_by(type='kas').first().balance if Account.query.filter_by(type='kas').first() else 0:,.0f}</p>
-                <p><strong>Pendapatan:</strong> Rp {Account.query.filter_by(type='pendapatan').first().balance if Account.query.filter_by(type='pendapatan').first() else 0:,.0f}</p>
+                <p><strong>Kas:</strong> Rp {account_balances.get('kas', 0):,.0f}</p>
+                <p><strong>Pendapatan:</strong> Rp {account_balances.get('pendapatan', 0):,.0f}</p>
                 <p><strong>Laba Bersih:</strong> Rp {calculate_net_income():,.0f}</p>
             </div>
 
@@ -8222,10 +8336,16 @@ def edit_initial_balances():
             # 1. Hapus semua detail jurnal
             JournalDetail.query.delete()
             
-            # 2. Hapus semua jurnal
+            # 2. Hapus semua jurnal beserta snapshot saldonya
             JournalEntry.query.delete()
+            AccountBalanceSnapshot.query.delete()
             
-            # 3. Hapus semua transaksi inventory
+            # 3. Hapus semua mutasi stok (dan tabel persediaan lama)
+            CostLayerUsage.query.delete()
+            CostLayer.query.delete()
+            InventoryDailySnapshot.query.delete()
+            StockHead.query.delete()
+            StockMovement.query.delete()
             InventoryTransaction.query.delete()
             
             # 4. Hapus semua kartu persediaan
@@ -8283,7 +8403,7 @@ def edit_initial_balances():
                 konsumsi_value = total_persediaan * 0.4  # 40%
                 
                 # Update atau create produk bibit
-                bibit_product = Product.query.filter_by(name='Bibit Ikan Mas').first()
+                bibit_product = get_role_product('bibit')
                 if not bibit_product:
                     seller_id = User.query.filter_by(user_type='seller').first().id
                     bibit_product = Product(
@@ -8306,7 +8426,7 @@ def edit_initial_balances():
                 print(f"✅ Bibit Ikan Mas: {bibit_product.stock} units (Rp {bibit_value:,.0f})")
                 
                 # Update atau create produk konsumsi
-                konsumsi_product = Product.query.filter_by(name='Ikan Mas Konsumsi').first()
+                konsumsi_product = get_role_product('konsumsi')
                 if not konsumsi_product:
                     seller_id = User.query.filter_by(user_type='seller').first().id
                     konsumsi_product = Product(
@@ -8327,6 +8447,22 @@ def edit_initial_balances():
                 konsumsi_product.stock = max(konsumsi_stock, 0)
                 konsumsi_product.cost_price = 13500
                 print(f"✅ Ikan Mas Konsumsi: {konsumsi_product.stock} units (Rp {konsumsi_value:,.0f})")
+
+                # Saldo awal baru di ledger mutasi stok
+                db.session.flush()
+                assign_product_role('bibit', bibit_product.id)
+                assign_product_role('konsumsi', konsumsi_product.id)
+                for product in [bibit_product, konsumsi_product]:
+                    opening_stock, product.stock = product.stock, 0
+                    if opening_stock > 0:
+                        record_stock_movement(
+                            product.id,
+                            'saldo_awal',
+                            quantity_in=opening_stock,
+                            unit_price=product.cost_price,
+                            description='SALDO AWAL - Persediaan awal periode',
+                            reference='SALDO_AWAL'
+                        )
             
             # Reset order status untuk memulai dari awal
             Order.query.update({
@@ -8337,7 +8473,9 @@ def edit_initial_balances():
             # Clear cart items
             CartItem.query.delete()
             
+            bump_ledger_version()
             db.session.commit()
+            invalidate_account_lookup()
             print("✅ All balances updated successfully!")
             
             flash('✅ Saldo awal berhasil diperbarui! Sistem telah direset dengan saldo baru.', 'success')
@@ -8714,7 +8852,7 @@ def edit_initial_balances():
                         <p><strong>Total Transaksi Jurnal:</strong> {JournalEntry.query.count()}</p>
                     </div>
                     <div>
-                        <p><strong>Kartu Persediaan:</strong> {InventoryCard.query.count()} entries</p>
+                        <p><strong>Kartu Persediaan:</strong> {StockMovement.query.count()} entries</p>
                     </div>
                     <div>
                         <p><strong>Pesanan Aktif:</strong> {Order.query.filter(Order.status != 'completed').count()}</p>
@@ -8780,12 +8918,20 @@ def reset_balances():
         # Clear all transactions
         JournalEntry.query.delete()
         JournalDetail.query.delete()
+        AccountBalanceSnapshot.query.delete()
+        CostLayerUsage.query.delete()
+        CostLayer.query.delete()
+        InventoryDailySnapshot.query.delete()
+        StockHead.query.delete()
+        StockMovement.query.delete()
         InventoryTransaction.query.delete()
         InventoryCard.query.delete()
         ClosingEntry.query.delete()
         ClosingDetail.query.delete()
         
+        bump_ledger_version()
         db.session.commit()
+        invalidate_account_lookup()
 
         flash('✅ Saldo awal berhasil direset ke 0! Sistem bersih seperti baru.', 'success')
         return jsonify({
@@ -8800,13 +8946,13 @@ def reset_balances():
 
 def calculate_net_income():
     try:
-        revenue_account = Account.query.filter_by(type='pendapatan').first()
-        revenue = revenue_account.balance if revenue_account else 0
+        # Pendapatan penjualan dan total beban dalam satu query agregat
+        revenue, expenses = db.session.query(
+            db.func.sum(db.case((Account.type == 'pendapatan', Account.balance), else_=0)),
+            db.func.sum(db.case((Account.category == 'expense', Account.balance), else_=0))
+        ).one()
 
-        expense_accounts = Account.query.filter(Account.category=='expense').all()
-        expenses = sum(acc.balance for acc in expense_accounts)
-
-        return revenue - expenses
+        return (revenue or 0) - (expenses or 0)
     except Exception as e:
         print(f"Error calculating net income: {e}")
         return 0
@@ -8875,7 +9021,10 @@ def seller_orders():
             '''
 
         content = f'''
-        <h1 style="color: var(--primary);"><i class="fas fa-boxes"></i> Manajemen Pesanan</h1>
+        <div style="display: flex; justify-content: space-between; align-items: center;">
+            <h1 style="color: var(--primary);"><i class="fas fa-boxes"></i> Manajemen Pesanan</h1>
+            <a href="/seller/jobs" class="btn btn-info"><i class="fas fa-tasks"></i> Antrian Jurnal</a>
+        </div>
         <div class="stats">
             <div class="stat-card">
                 <div class="stat-number">{Order.query.filter_by(status='pending').count()}</div>
@@ -8982,6 +9131,62 @@ def get_order_actions(order):
     return status_buttons.get(order.status, '').format(order_id=order.id)
 
 # ===== ROUTE KARTU PERSEDIAAN BARU =====
+STOCK_HISTORY_DAYS = 90
+STOCK_HISTORY_MAX_DAYS = 730
+
+def render_stock_history_html(product, days=STOCK_HISTORY_DAYS):
+    """Grafik stok harian (SVG) dan saldo tiap awal bulan dari snapshot persediaan harian"""
+    end = datetime.now().date()
+    start = end - timedelta(days=days - 1)
+    history = get_stock_history(product.id, start, end)
+
+    width, height = 600, 160
+    max_quantity = max([quantity for _, quantity, _ in history] + [1])
+    step = width / max(len(history) - 1, 1)
+    points = ' '.join(
+        f"{index * step:.1f},{height - max(quantity, 0) / max_quantity * height:.1f}"
+        for index, (_, quantity, _) in enumerate(history)
+    )
+
+    month_rows = ''
+    for day, quantity, value in history:
+        if day.day == 1 or day == start:
+            month_rows += f'''
+            <tr>
+                <td>{day.strftime('%d/%m/%Y')}</td>
+                <td style="text-align: right;">{quantity:,}</td>
+                <td style="text-align: right;">Rp {value:,.0f}</td>
+            </tr>
+            '''
+
+    return f'''
+    <div class="card" style="margin-top: 1.5rem;">
+        <h4 style="color: var(--primary); margin-bottom: 1rem;">
+            <i class="fas fa-chart-line"></i> Riwayat Stok {days} Hari - {product.name}
+        </h4>
+        <svg viewBox="0 0 {width} {height}" preserveAspectRatio="none" style="width: 100%; height: 180px; background: var(--ocean-light); border-radius: var(--border-radius);">
+            <polyline points="{points}" fill="none" stroke="var(--primary)" stroke-width="2" />
+        </svg>
+        <div style="display: flex; justify-content: space-between; font-size: 0.8rem; color: #6B7280; margin-bottom: 1rem;">
+            <span>{start.strftime('%d/%m/%Y')}</span>
+            <span>Maks: {max_quantity:,} unit</span>
+            <span>{end.strftime('%d/%m/%Y')}</span>
+        </div>
+        <table class="table">
+            <thead>
+                <tr>
+                    <th>Tanggal</th>
+                    <th style="text-align: right;">Stok</th>
+                    <th style="text-align: right;">Nilai</th>
+                </tr>
+            </thead>
+            <tbody>
+                {month_rows}
+            </tbody>
+        </table>
+    </div>
+    '''
+
 @app.route('/seller/inventory-card')
 @login_required
 @seller_required
@@ -9011,7 +9216,9 @@ def seller_inventory_card():
             selected_product_id = selected_product.id if selected_product else None
 
         # Generate inventory card HTML
-        inventory_html = get_inventory_card_html(selected_product_id)
+        card_args = request.args.to_dict()
+        inventory_html = get_inventory_card_html(selected_product_id, card_args)
+        toolbar_html = render_inventory_card_toolbar(selected_product_id, '/seller/inventory-card', card_args) if selected_product_id else ''
 
         # Product selection dropdown
         product_options = ""
@@ -9020,13 +9227,17 @@ def seller_inventory_card():
             product_options += f'<option value="{product.id}" {selected}>{product.name}</option>'
 
         # Summary info
-        if selected_product:
-            current_stock = selected_product.stock
-            stock_value = current_stock * 1000  # Harga cost tetap
+        head = get_stock_head(selected_product.id) if selected_product else None
+        if head:
+            current_stock = head.balance_quantity
+            stock_value = head.balance_total
         else:
-            current_stock = 0
+            current_stock = selected_product.stock if selected_product else 0
             stock_value = 0
 
+        history_days = min(max(request.args.get('days', STOCK_HISTORY_DAYS, type=int), 1), STOCK_HISTORY_MAX_DAYS)
+        history_html = render_stock_history_html(selected_product, history_days) if selected_product else ''
+
         content = f'''
         <div class="card">
             <h2 style="color: var(--primary); margin-bottom: 1.5rem;">
@@ -9041,7 +9252,7 @@ def seller_inventory_card():
                     <div style="text-align: center; padding: 1rem; background: white; border-radius: var(--border-radius);">
                         <h5 style="color: var(--primary); margin-bottom: 0.5rem;">Stock Saat Ini</h5>
                         <div style="font-size: 1.5rem; font-weight: bold; color: var(--success);">{current_stock:,} unit</div>
-                        <div style="font-size: 1rem; color: var(--dark);">Nilai: Rp {stock_value:,}</div>
+                        <div style="font-size: 1rem; color: var(--dark);">Nilai: Rp {stock_value:,.0f}</div>
                     </div>
                 </div>
             </div>
@@ -9053,7 +9264,18 @@ def seller_inventory_card():
                 </select>
             </div>
 
+            <div style="text-align: right; margin-bottom: 1rem;">
+                <button class="btn btn-warning" onclick="rebuildInventoryCard()">
+                    <i class="fas fa-sync"></i> Hitung Ulang Saldo
+                </button>
+                <div><small>Hanya saldo berjalan yang dihitung ulang - nilai barang keluar yang sudah tercatat tidak dinilai ulang.</small></div>
+            </div>
+
+            {toolbar_html}
+
             {inventory_html}
+
+            {history_html}
         </div>
 
         <script>
@@ -9062,13 +9284,20 @@ def seller_inventory_card():
             window.location.href = '/seller/inventory-card?product_id=' + productId;
         }}
 
-        // Auto-refresh setiap 30 detik untuk update real-time
-        setTimeout(() => {{
-            const currentProduct = document.getElementById('productSelect').value;
-            if (currentProduct) {{
-                window.location.href = '/seller/inventory-card?product_id=' + currentProduct;
-            }}
-        }}, 30000);
+        function rebuildInventoryCard() {{
+            const productId = document.getElementById('productSelect').value;
+            if (!confirm('Hitung ulang saldo berjalan kartu persediaan produk ini?')) return;
+            fetch('/seller/inventory-card/' + productId + '/rebuild', {{ method: 'POST' }})
+                .then(response => response.json())
+                .then(data => {{
+                    alert(data.message);
+                    if (data.success) window.location.href = '/seller/inventory-card?product_id=' + productId;
+                }})
+                .catch(() => alert('Gagal menghitung ulang saldo'));
+        }}
+
+        // Auto-refresh setiap 30 detik untuk update real-time (filter tanggal tetap dipakai)
+        setTimeout(() => window.location.reload(), 30000);
         </script>
         '''
 
@@ -9079,6 +9308,149 @@ def seller_inventory_card():
         flash('Terjadi error saat memuat kartu persediaan.', 'error')
         return redirect('/seller/dashboard')
 
+@app.route('/seller/inventory-card/<int:product_id>/rebuild', methods=['POST'])
+@login_required
+@seller_required
+def rebuild_inventory_card(product_id):
+    """Hitung ulang saldo berjalan kartu persediaan satu produk"""
+    try:
+        product = db.session.get(Product, product_id)
+        if not product:
+            return jsonify({'success': False, 'message': 'Produk tidak ditemukan'})
+
+        rebuilt = rebuild_stock_ledger([product_id])
+        return jsonify({
+            'success': True,
+            'message': f'Saldo {product.name} dihitung ulang ({rebuilt[product_id]} mutasi). Stok: {product.stock:,} unit'
+        })
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Error rebuilding inventory card: {e}")
+        return jsonify({'success': False, 'message': f'Gagal menghitung ulang saldo: {str(e)}'})
+
+@app.route('/seller/inventory-card/<int:product_id>/movements')
+@login_required
+@seller_required
+def seller_inventory_movements(product_id):
+    """Halaman mutasi stok berikutnya (keyset cursor) untuk tombol 'Muat lebih banyak'"""
+    try:
+        args = request.args.to_dict()
+        layout = args.get('layout') if args.get('layout') in INVENTORY_CARD_LAYOUTS else 'card'
+        movements, next_cursor = get_inventory_card_page(product_id, args)
+
+        return jsonify({
+            'success': True,
+            'html': render_inventory_card_rows(movements, layout),
+            'more_html': render_inventory_more_button(product_id, layout, args, next_cursor)
+        })
+    except Exception as e:
+        print(f"❌ Error loading inventory movements: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@app.route('/seller/inventory-card/<int:product_id>/export.csv')
+@login_required
+@seller_required
+def export_inventory_card(product_id):
+    """Ekspor seluruh kartu persediaan (atau rentang tanggal) sebagai CSV yang di-stream per batch"""
+    product = db.session.get(Product, product_id)
+    if not product:
+        return jsonify({'success': False, 'message': 'Produk tidak ditemukan'}), 404
+
+    filters = get_inventory_card_filters(product_id, request.args.to_dict())
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow([
+            'Tanggal', 'Referensi', 'Deskripsi', 'Jenis',
+            'Qty Masuk', 'Qty Keluar', 'Harga Per Unit', 'Jumlah',
+            'Saldo Qty', 'Saldo Harga Per Unit', 'Saldo Jumlah'
+        ])
+
+        query = StockMovement.query.filter(*filters).order_by(StockMovement.date, StockMovement.id)
+        for index, movement in enumerate(query.yield_per(INVENTORY_EXPORT_BATCH_SIZE), 1):
+            writer.writerow([
+                movement.date.strftime('%Y-%m-%d %H:%M'),
+                movement.reference or '',
+                movement.description or '',
+                movement.transaction_type,
+                movement.quantity_in,
+                movement.quantity_out,
+                round(movement.unit_price or 0, 2),
+                movement.total_amount,
+                movement.balance_quantity,
+                round(movement.balance_unit_price or 0, 2),
+                movement.balance_total
+            ])
+            if index % INVENTORY_EXPORT_BATCH_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+
+        yield buffer.getvalue()
+
+    filename = f"kartu-persediaan-{secure_filename(product.name) or product.id}.csv"
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+@app.cli.command('rebuild-stock')
+@click.argument('product_ids', nargs=-1, type=int)
+def rebuild_stock_command(product_ids):
+    """Hitung ulang saldo berjalan ledger stok: flask rebuild-stock [PRODUCT_ID ...] (kosong = semua)"""
+    rebuilt = rebuild_stock_ledger(list(product_ids) or None)
+    for product_id, count in rebuilt.items():
+        click.echo(f"Produk {product_id}: {count} mutasi dihitung ulang")
+
+@app.route('/seller/inventory/reconcile', methods=['GET', 'POST'])
+@login_required
+@seller_required
+def seller_reconcile_stock():
+    """Rekonsiliasi Product.stock dengan ledger stok - GET melaporkan selisih, POST sekaligus memperbaiki"""
+    try:
+        report = reconcile_stock(repair=request.method == 'POST')
+        return jsonify({'success': True, **report})
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Error reconciling stock: {e}")
+        return jsonify({'success': False, 'message': f'Gagal rekonsiliasi stok: {str(e)}'})
+
+@app.cli.command('reconcile-stock')
+@click.option('--repair', is_flag=True, help='Perbaiki Product/StockHead agar sama dengan ledger')
+def reconcile_stock_command(repair):
+    """Rekonsiliasi stok produk dengan ledger mutasi stok: flask reconcile-stock [--repair]"""
+    report = reconcile_stock(repair=repair)
+    for drift in report['drifts']:
+        click.echo(
+            f"Produk {drift['product_id']} ({drift['name']}): stok {drift['product_stock']} vs ledger {drift['ledger_quantity']}, "
+            f"nilai head {drift['head_value']} vs ledger {drift['ledger_value']}"
+        )
+    click.echo(f"{report['drift_count']} produk menyimpang" + (" - sudah diperbaiki" if report['repaired'] else ""))
+
+@app.cli.command('rebuild-stock-snapshots')
+@click.argument('product_ids', nargs=-1, type=int)
+def rebuild_stock_snapshots_command(product_ids):
+    """Bangun ulang snapshot persediaan harian: flask rebuild-stock-snapshots [PRODUCT_ID ...]"""
+    count = rebuild_stock_snapshots(list(product_ids) or None)
+    click.echo(f"Snapshot harian dibangun ulang untuk {count} produk")
+
+@app.cli.command('generate-image-variants')
+@click.option('--all', 'regenerate', is_flag=True, help='Buat ulang juga produk yang sudah punya varian')
+def generate_image_variants_command(regenerate):
+    """Buat varian gambar (WebP/JPEG) untuk produk lama: flask generate-image-variants [--all]"""
+    if Image is None:
+        click.echo("Pillow belum terpasang - pip install Pillow")
+        return
+    query = Product.query.filter(Product.image_url.isnot(None))
+    if not regenerate:
+        query = query.filter(Product.image_variants.is_(None))
+    products = [(product.id, product.image_url) for product in query.all()]
+    for product_id, image_url in products:
+        variants = process_product_image(product_id, image_url)
+        click.echo(f"Produk {product_id}: {'OK' if variants else 'dilewati'}")
+
 @app.route('/debug-inventory/<int:order_id>')
 @login_required
 @seller_required
@@ -9349,6 +9721,182 @@ def chart_of_accounts():
         flash('Terjadi error saat memuat Chart of Accounts.', 'error')
         return redirect('/seller/accounting')
 
+# ===== ANTRIAN JOB AKUNTANSI =====
+ACCOUNTING_JOB_MAX_ATTEMPTS = 5
+ACCOUNTING_JOB_RETRY_DELAY = 10      # detik, dikali 2^(percobaan-1)
+ACCOUNTING_JOB_POLL_INTERVAL = 2     # detik
+ACCOUNTING_JOB_LOCK_TIMEOUT = 300    # job 'running' lebih lama dari ini dianggap macet
+ACCOUNTING_WORKER_COUNT = int(os.environ.get('ACCOUNTING_WORKERS', 1))
+
+ACCOUNTING_JOB_STATUS_LABELS = {
+    'pending': ('status-pending', 'MENUNGGU'),
+    'running': ('status-processing', 'DIPROSES'),
+    'done': ('status-completed', 'SELESAI'),
+    'failed': ('status-cancelled', 'GAGAL'),
+}
+
+ACCOUNTING_JOB_WAKEUP = threading.Event()
+ACCOUNTING_WORKERS = []
+
+def enqueue_order_accounting(order):
+    """Antrikan jurnal penjualan + kartu persediaan untuk order yang selesai.
+
+    Satu job per order (idempotency_key). Tidak melakukan commit - ikut transaksi
+    perubahan status order, jadi job hanya ada jika status benar-benar tersimpan.
+    """
+    idempotency_key = f'order_completed:{order.id}'
+    job = AccountingJob.query.filter_by(idempotency_key=idempotency_key).first()
+    if job:
+        print(f"ℹ️ Job akuntansi order #{order.order_number} sudah ada ({job.status})")
+        return job
+
+    job = AccountingJob(
+        job_type='order_completed',
+        order_id=order.id,
+        idempotency_key=idempotency_key,
+        max_attempts=ACCOUNTING_JOB_MAX_ATTEMPTS
+    )
+    db.session.add(job)
+    return job
+
+def notify_accounting_workers():
+    """Bangunkan worker di proses ini (panggil setelah commit)"""
+    ACCOUNTING_JOB_WAKEUP.set()
+
+def process_order_completed_job(job):
+    """Posting jurnal penjualan order yang selesai - return nomor transaksi jurnal"""
+    order = db.session.get(Order, job.order_id)
+    if not order:
+        raise ValueError(f'Order {job.order_id} tidak ditemukan')
+
+    # Percobaan sebelumnya mungkin sudah memposting jurnal sebelum gagal
+    existing_journal = JournalEntry.query.filter_by(order_id=order.id, journal_type='sales').first()
+    if existing_journal:
+        # Jurnal lama (sebelum posting satu transaksi) bisa tanpa mutasi stok - lengkapi
+        order_items = OrderItem.query.filter_by(order_id=order.id).all()
+        recorded = {product_id for (product_id,) in db.session.query(StockMovement.product_id).filter_by(
+            reference=order_stock_reference(order)
+        ).all()}
+        if any(item.product_id not in recorded for item in order_items):
+            record_order_stock_movements(order, order_items)
+            db.session.commit()
+            print(f"✅ Mutasi stok order #{order.order_number} dilengkapi")
+        print(f"ℹ️ Jurnal order #{order.order_number} sudah ada: {existing_journal.transaction_number}")
+        return existing_journal.transaction_number
+
+    if order.payment_method == 'cod':
+        journal = create_cod_sales_journal(order)
+    else:
+        journal = create_sales_journal(order)
+
+    if not journal:
+        raise RuntimeError(f'Gagal membuat jurnal penjualan order #{order.order_number}')
+    return journal.transaction_number
+
+ACCOUNTING_JOB_HANDLERS = {
+    'order_completed': process_order_completed_job,
+}
+
+def get_claimable_job_filter(now):
+    """Job siap jalan: pending yang sudah waktunya, atau running yang macet"""
+    return db.or_(
+        db.and_(AccountingJob.status == 'pending', AccountingJob.run_after <= now),
+        db.and_(AccountingJob.status == 'running',
+                AccountingJob.locked_at < now - timedelta(seconds=ACCOUNTING_JOB_LOCK_TIMEOUT))
+    )
+
+def claim_accounting_job():
+    """Ambil satu job dengan UPDATE bersyarat - aman untuk banyak thread/proses"""
+    now = datetime.utcnow()
+    candidate_ids = [row.id for row in db.session.query(AccountingJob.id).filter(
+        get_claimable_job_filter(now)
+    ).order_by(AccountingJob.id).limit(5).all()]
+
+    for job_id in candidate_ids:
+        claimed = db.session.execute(
+            update(AccountingJob)
+            .where(AccountingJob.id == job_id, get_claimable_job_filter(now))
+            .values(status='running', locked_at=now, attempts=AccountingJob.attempts + 1)
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            return db.session.get(AccountingJob, job_id)
+    return None
+
+def run_accounting_job(job):
+    """Jalankan satu job yang sudah di-claim, lalu catat hasil atau jadwalkan retry"""
+    job_id = job.id
+    try:
+        result = ACCOUNTING_JOB_HANDLERS[job.job_type](job)
+
+        job = db.session.get(AccountingJob, job_id)
+        job.status = 'done'
+        job.result = result
+        job.last_error = None
+        job.finished_at = datetime.utcnow()
+        print(f"✅ Job akuntansi #{job_id} selesai: {result}")
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Job akuntansi #{job_id} gagal: {e}")
+
+        job = db.session.get(AccountingJob, job_id)
+        job.last_error = str(e)
+        if job.attempts >= job.max_attempts:
+            job.status = 'failed'
+            job.finished_at = datetime.utcnow()
+        else:
+            job.status = 'pending'
+            job.run_after = datetime.utcnow() + timedelta(
+                seconds=ACCOUNTING_JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+            )
+
+    job.locked_at = None
+    db.session.commit()
+    return job
+
+def run_pending_accounting_jobs(limit=None):
+    """Proses job yang siap jalan di thread pemanggil - return jumlah job diproses"""
+    processed = 0
+    while limit is None or processed < limit:
+        job = claim_accounting_job()
+        if not job:
+            break
+        run_accounting_job(job)
+        processed += 1
+    return processed
+
+def accounting_worker_loop():
+    """Loop worker: proses semua job siap jalan, lalu tunggu sinyal/poll berikutnya"""
+    while True:
+        with app.app_context():
+            try:
+                run_pending_accounting_jobs()
+            except Exception as e:
+                print(f"❌ Error accounting worker: {e}")
+                db.session.rollback()
+            finally:
+                db.session.remove()
+
+        ACCOUNTING_JOB_WAKEUP.wait(ACCOUNTING_JOB_POLL_INTERVAL)
+        ACCOUNTING_JOB_WAKEUP.clear()
+
+def start_accounting_workers(count=ACCOUNTING_WORKER_COUNT):
+    """Jalankan thread worker job akuntansi (ACCOUNTING_WORKERS=0 untuk menonaktifkan).
+
+    Hanya dipanggil proses server (post_fork gunicorn / blok __main__), bukan saat import -
+    perintah CLI dan proses induk reloader tidak ikut mengambil job.
+    """
+    if ACCOUNTING_WORKERS:
+        return
+
+    for index in range(count):
+        worker = threading.Thread(target=accounting_worker_loop, name=f'accounting-worker-{index + 1}', daemon=True)
+        worker.start()
+        ACCOUNTING_WORKERS.append(worker)
+
+    if count:
+        print(f"✅ {count} worker job akuntansi berjalan")
+
 # ===== PERBAIKAN FUNGSI UPDATE ORDER STATUS =====
 @app.route('/seller/update_order_status/<int:order_id>', methods=['POST'])
 @login_required
@@ -9370,29 +9918,20 @@ def update_order_status(order_id):
             elif new_status == 'delivered':
                 order.tracking_info = 'Pesanan tiba di tujuan'
 
-            # BUAT JURNAL OTOMATIS SAAT ORDER COMPLETED
+            # ANTRIKAN JURNAL OTOMATIS SAAT ORDER COMPLETED (diposting worker di latar belakang)
+            job = None
             if new_status == 'completed':
                 order.completed_date = datetime.now()
 
-                # BUAT JURNAL PENJUALAN OTOMATIS
-                if order.payment_method == 'cod':
-                    # Untuk COD, buat jurnal penjualan
-                    journal = create_cod_sales_journal(order)
-                    if journal:
-                        flash('Order COD diselesaikan! Jurnal penjualan otomatis dibuat.', 'success')
-                    else:
-                        flash('Order COD diselesaikan, tapi gagal membuat jurnal.', 'warning')
-                elif order.payment_status == 'paid':
-                    # Untuk non-COD yang sudah bayar, buat jurnal penjualan
-                    journal = create_sales_journal(order)
-                    if journal:
-                        flash('Order diselesaikan! Jurnal penjualan otomatis dibuat.', 'success')
-                    else:
-                        flash('Order diselesaikan, tapi gagal membuat jurnal.', 'warning')
+                if order.payment_method == 'cod' or order.payment_status == 'paid':
+                    job = enqueue_order_accounting(order)
+                    flash('Order diselesaikan! Jurnal penjualan sedang diproses otomatis (lihat Antrian Jurnal).', 'success')
                 else:
                     flash('Order diselesaikan! (Menunggu pembayaran)', 'success')
 
             db.session.commit()
+            if job:
+                notify_accounting_workers()
 
             # Pesan status
             status_messages = {
@@ -9433,14 +9972,17 @@ def update_tracking(order_id):
             }
 
             new_status = tracking_mapping.get(order.tracking_info, order.status)
+            job = None
             if new_status != order.status:
                 order.status = new_status
                 if new_status == 'completed':
                     order.completed_date = datetime.now()
-                    # Buat jurnal penjualan otomatis
-                    create_sales_journal(order)
+                    # Jurnal penjualan diposting worker di latar belakang
+                    job = enqueue_order_accounting(order)
 
             db.session.commit()
+            if job:
+                notify_accounting_workers()
             return jsonify({'success': True, 'message': 'Status pengiriman diperbarui'})
 
         return jsonify({'success': False, 'message': 'Order tidak ditemukan atau belum dibayar'})
@@ -9448,6 +9990,111 @@ def update_tracking(order_id):
         print(f"Error updating tracking: {e}")
         return jsonify({'success': False, 'message': 'Terjadi error'})
 
+@app.route('/seller/jobs')
+@login_required
+@seller_required
+def seller_jobs():
+    """Status antrian job akuntansi (jurnal penjualan order selesai)"""
+    try:
+        status_counts = dict(db.session.query(
+            AccountingJob.status, db.func.count(AccountingJob.id)
+        ).group_by(AccountingJob.status).all())
+
+        jobs = db.session.query(AccountingJob, Order.order_number).outerjoin(
+            Order, Order.id == AccountingJob.order_id
+        ).order_by(AccountingJob.id.desc()).limit(100).all()
+
+        rows_html = ""
+        for job, order_number in jobs:
+            status_class, status_label = ACCOUNTING_JOB_STATUS_LABELS.get(job.status, ('status-pending', job.status.upper()))
+            retry_button = f'''
+                <form method="POST" action="/seller/jobs/{job.id}/retry" style="margin: 0;">
+                    <button type="submit" class="btn btn-warning btn-sm"><i class="fas fa-redo"></i> Ulangi</button>
+                </form>
+            ''' if job.status == 'failed' else ''
+
+            rows_html += f'''
+            <tr>
+                <td>#{job.id}</td>
+                <td>{'#' + order_number if order_number else '-'}</td>
+                <td><span class="status-text {status_class}">{status_label}</span></td>
+                <td>{job.attempts}/{job.max_attempts}</td>
+                <td>{job.created_at.strftime('%d/%m/%Y %H:%M:%S') if job.created_at else '-'}</td>
+                <td>{job.result or ''}</td>
+                <td style="color: var(--error); font-size: 0.85rem;">{job.last_error or ''}</td>
+                <td>{retry_button}</td>
+            </tr>
+            '''
+
+        content = f'''
+        <h1 style="color: var(--primary);"><i class="fas fa-tasks"></i> Antrian Jurnal Otomatis</h1>
+        <div class="stats">
+            <div class="stat-card">
+                <div class="stat-number">{status_counts.get('pending', 0) + status_counts.get('running', 0)}</div>
+                <div class="stat-label">Menunggu / Diproses</div>
+            </div>
+            <div class="stat-card">
+                <div class="stat-number">{status_counts.get('done', 0)}</div>
+                <div class="stat-label">Selesai</div>
+            </div>
+            <div class="stat-card">
+                <div class="stat-number">{status_counts.get('failed', 0)}</div>
+                <div class="stat-label">Gagal</div>
+            </div>
+        </div>
+
+        <div class="card">
+            <div style="overflow-x: auto;">
+                <table class="table">
+                    <thead>
+                        <tr>
+                            <th>Job</th>
+                            <th>Order</th>
+                            <th>Status</th>
+                            <th>Percobaan</th>
+                            <th>Dibuat</th>
+                            <th>Jurnal</th>
+                            <th>Error Terakhir</th>
+                            <th></th>
+                        </tr>
+                    </thead>
+                    <tbody>
+                        {rows_html or '<tr><td colspan="8" style="text-align: center; padding: 2rem;">Belum ada job</td></tr>'}
+                    </tbody>
+                </table>
+            </div>
+        </div>
+        '''
+
+        return base_html('Antrian Jurnal', content)
+    except Exception as e:
+        print(f"Error in seller jobs: {e}")
+        flash('Terjadi error saat memuat antrian jurnal.', 'error')
+        return redirect('/seller/orders')
+
+@app.route('/seller/jobs/<int:job_id>/retry', methods=['POST'])
+@login_required
+@seller_required
+def retry_accounting_job(job_id):
+    """Jadwalkan ulang job yang gagal"""
+    try:
+        job = db.session.get(AccountingJob, job_id)
+        if job and job.status == 'failed':
+            job.status = 'pending'
+            job.attempts = 0
+            job.run_after = datetime.utcnow()
+            job.finished_at = None
+            db.session.commit()
+            notify_accounting_workers()
+            flash(f'Job #{job_id} dijadwalkan ulang.', 'success')
+        else:
+            flash('Job tidak ditemukan atau tidak dalam status gagal.', 'error')
+    except Exception as e:
+        print(f"Error retrying accounting job: {e}")
+        db.session.rollback()
+        flash('Terjadi error saat menjadwalkan ulang job.', 'error')
+    return redirect('/seller/jobs')
+
 @app.route('/seller/products')
 @login_required
 @seller_required
@@ -9462,7 +10109,7 @@ def seller_products():
             <div class="card">
                 <div style="display: flex; justify-content: space-between; align-items: start;">
                     <div style="flex: 1;">
-                        <img src="{product.image_url}" alt="{product.name}" class="product-image" style="max-width: 200px;" onerror="this.style.display='none'">
+                        {product_image_html(product, variant='thumb', sizes='200px', style='max-width: 200px;')}
                         <h4>{product.name}</h4>
                         <p>{product.description}</p>
                         <div class="price">Rp {product.price:,.0f}</div>
@@ -9517,15 +10164,10 @@ def seller_inventory():
         else:
             selected_product = products[0]
 
-        # Get automatic inventory transactions
-        transactions = []
-        if selected_product:
-            transactions = InventoryTransaction.query.filter_by(
-                product_id=selected_product.id
-            ).order_by(InventoryTransaction.date, InventoryTransaction.id).all()
-
-        # Generate inventory card HTML
-        inventory_html = generate_automatic_inventory_html(selected_product, transactions)
+        # Generate inventory card HTML (halaman pertama, sisanya lewat 'Muat lebih banyak')
+        card_args = request.args.to_dict()
+        inventory_html = generate_automatic_inventory_html(selected_product, card_args)
+        toolbar_html = render_inventory_card_toolbar(selected_product.id, '/seller/inventory', card_args) if selected_product else ''
 
         # Product selection dropdown
         product_options = ""
@@ -9552,6 +10194,8 @@ def seller_inventory():
                 </select>
             </div>
 
+            {toolbar_html}
+
             {inventory_html}
         </div>
 
@@ -9614,12 +10258,15 @@ def test_auto_journal():
             'error': str(e)
         })
 
-def generate_automatic_inventory_html(product, transactions):
-    """Generate HTML untuk kartu persediaan otomatis dengan format yang benar"""
+def generate_automatic_inventory_html(product, args=None):
+    """Generate HTML untuk kartu persediaan otomatis - halaman pertama mutasi (keyset)"""
     if not product:
         return '<p>Produk tidak ditemukan</p>'
 
-    if not transactions:
+    args = {key: value for key, value in (args or {}).items() if key != 'cursor'}
+    movements, next_cursor = get_inventory_card_page(product.id, args)
+
+    if not movements:
         return f'''
         <div style="text-align: center; padding: 3rem; color: #6B7280;">
             <i class="fas fa-inbox" style="font-size: 4rem; margin-bottom: 1rem;"></i>
@@ -9662,68 +10309,13 @@ def generate_automatic_inventory_html(product, transactions):
                 <tbody>
     '''
 
-    # Harga cost tetap Rp 1,000
-    COST_PRICE = 1000
-
-    for transaction in transactions:
-        # Tentukan data untuk kolom IN dan OUT berdasarkan jenis transaksi
-        if transaction.transaction_type == 'pembelian':
-            in_qty = transaction.quantity_in
-            in_price = transaction.unit_price
-            in_total = transaction.total_amount
-            out_qty = 0
-            out_price = 0
-            out_total = 0
-        elif transaction.transaction_type == 'penjualan':
-            in_qty = 0
-            in_price = 0
-            in_total = 0
-            out_qty = transaction.quantity_out
-            out_price = transaction.unit_price  # Harga cost (bukan harga jual)
-            out_total = transaction.total_amount
-        else:  # saldo_awal, penyesuaian, dll
-            in_qty = transaction.quantity_in
-            in_price = transaction.unit_price
-            in_total = transaction.total_amount
-            out_qty = transaction.quantity_out
-            out_price = transaction.unit_price
-            out_total = transaction.total_amount
-
-        # PERBAIKAN: Selalu gunakan harga cost Rp 1,000 untuk kolom Balance
-        balance_quantity = transaction.balance_quantity
-        balance_unit_price = COST_PRICE  # SELALU Rp 1,000
-        balance_total = balance_quantity * COST_PRICE  # Hitung ulang dengan harga cost
-
-        # Format numbers dengan separator
-        def format_number(num):
-            return f"{num:,.0f}" if num != 0 else ""
-
-        def format_currency(num):
-            return f"Rp {num:,.0f}" if num != 0 else ""
-
-        table_html += f'''
-        <tr>
-            <td>{transaction.date.strftime('%d/%m/%Y')}</td>
-            <td>{transaction.description}</td>
-            <!-- QUANTITY Columns -->
-            <td style="text-align: right; background: rgba(56, 161, 105, 0.05);">{format_number(in_qty)}</td>
-            <td style="text-align: right; background: rgba(229, 62, 62, 0.05);">{format_number(out_qty)}</td>
-            <td style="text-align: right; background: rgba(49, 130, 206, 0.05); font-weight: bold;">{format_number(balance_quantity)}</td>
-            <!-- HARGA PER UNIT Columns -->
-            <td style="text-align: right; background: rgba(56, 161, 105, 0.05);">{format_currency(in_price)}</td>
-            <td style="text-align: right; background: rgba(229, 62, 62, 0.05);">{format_currency(out_price)}</td>
-            <td style="text-align: right; background: rgba(49, 130, 206, 0.05); font-weight: bold;">{format_currency(balance_unit_price)}</td>
-            <!-- JUMLAH Columns -->
-            <td style="text-align: right; background: rgba(56, 161, 105, 0.05);">{format_currency(in_total)}</td>
-            <td style="text-align: right; background: rgba(229, 62, 62, 0.05);">{format_currency(out_total)}</td>
-            <td style="text-align: right; background: rgba(49, 130, 206, 0.05); font-weight: bold;">{format_currency(balance_total)}</td>
-        </tr>
-        '''
+    table_html += render_inventory_card_rows(movements, 'auto', with_opening=True)
 
-    table_html += '''
+    table_html += f'''
                 </tbody>
             </table>
         </div>
+        {render_inventory_more_button(product.id, 'auto', args, next_cursor)}
 
         <div style="margin-top: 1rem; padding: 1rem; background: var(--ocean-light); border-radius: var(--border-radius);">
             <h5 style="color: var(--primary); margin-bottom: 0.5rem;">Keterangan:</h5>
@@ -9731,8 +10323,8 @@ def generate_automatic_inventory_html(product, transactions):
                 <li><strong style="color: var(--success);">IN (Hijau):</strong> Transaksi pembelian atau penambahan stok</li>
                 <li><strong style="color: var(--error);">OUT (Merah):</strong> Transaksi penjualan atau pengurangan stok</li>
                 <li><strong style="color: var(--primary);">BALANCE (Biru):</strong> Saldo akhir setelah transaksi</li>
-                <li><strong>Harga Cost:</strong> Rp 1,000 per unit (tetap)</li>
-                <li>Semua harga menggunakan <strong>harga cost tetap</strong> untuk perhitungan persediaan</li>
+                <li><strong>Harga BALANCE:</strong> harga rata-rata persediaan setelah transaksi</li>
+                <li><em>Saldo pindahan</em> adalah saldo sebelum baris pertama pada rentang yang ditampilkan</li>
             </ul>
         </div>
     </div>
@@ -9776,7 +10368,22 @@ def add_product():
                         product.image_url = f'/static/{filename}'
 
             db.session.add(product)
+            db.session.flush()
+
+            # Stok awal produk lewat ledger mutasi stok
+            if stock:
+                product.stock = 0
+                record_stock_movement(
+                    product.id,
+                    'saldo_awal',
+                    quantity_in=max(stock, 0),
+                    quantity_out=max(-stock, 0),
+                    unit_price=cost_price,
+                    description='SALDO AWAL - Persediaan awal produk',
+                    reference='SALDO_AWAL'
+                )
             db.session.commit()
+            queue_product_image_variants(product.id, product.image_url)
 
             # ===========================================
 
@@ -9888,25 +10495,62 @@ def edit_product(product_id):
             price_str = request.form.get('price', '0').replace('.', '').replace(',', '')
             cost_price_str = request.form.get('cost_price', '0').replace('.', '').replace(',', '')
 
+            # Perubahan stok manual dicatat sebagai mutasi penyesuaian pada harga cost dari form
+            cost_price = float(cost_price_str) if cost_price_str else 0
+            stock_difference = int(request.form.get('stock', 0)) - product.stock
+            if stock_difference:
+                record_stock_movement(
+                    product.id,
+                    'penyesuaian',
+                    quantity_in=max(stock_difference, 0),
+                    quantity_out=max(-stock_difference, 0),
+                    unit_price=cost_price,
+                    description='Penyesuaian stok manual'
+                )
+
+            # Harga cost berubah: revaluasi lewat ledger agar Product dan StockHead tetap sama
+            if abs((product.cost_price or 0) - cost_price) >= COST_DRIFT_TOLERANCE:
+                if product.stock > 0:
+                    revalue_stock(product.id, cost_price)
+                else:
+                    product.cost_price = cost_price
+
             product.price = float(price_str) if price_str else 0
-            product.cost_price = float(cost_price_str) if cost_price_str else 0
-            product.stock = int(request.form.get('stock', 0))
             product.size_cm = float(request.form.get('size_cm')) if request.form.get('size_cm') else None
             product.weight_kg = float(request.form.get('weight_kg')) if request.form.get('weight_kg') else None
             product.category = request.form.get('category')
 
+            # Peran persediaan: produk ini dipakai jurnal/template untuk peran tersebut
+            inventory_role = request.form.get('inventory_role')
+            if not inventory_role:
+                remove_product_roles(product.id)  # '- Tidak ada -'
+            elif inventory_role in PRODUCT_ROLES and inventory_role not in get_product_roles(product.id):
+                remove_product_roles(product.id)  # satu peran per produk di form ini
+                assign_product_role(inventory_role, product.id)
+
             # Handle image upload
+            new_image_url = None
             if 'image' in request.files:
                 file = request.files['image']
                 if file and file.filename != '':
                     filename = save_product_image(file, product.name)
                     if filename:
                         product.image_url = f'/static/{filename}'
+                        product.image_variants = None
+                        new_image_url = product.image_url
 
             db.session.commit()
+            if new_image_url:
+                queue_product_image_variants(product.id, new_image_url)
             flash('Produk berhasil diperbarui!', 'success')
             return redirect('/seller/products')
 
+        current_roles = get_product_roles(product.id)
+        role_options = ''.join(
+            f'<option value="{role}" {"selected" if role in current_roles else ""}>{config["label"]}</option>'
+            for role, config in PRODUCT_ROLES.items()
+        )
+
         content = f'''
         <div style="max-width: 600px; margin: 0 auto;">
             <div class="card">
@@ -9950,6 +10594,13 @@ def edit_product(product_id):
                                 <option value="ikan_mas" {'selected' if product.category == 'ikan_mas' else ''}>Ikan Mas</option>
                             </select>
                         </div>
+                        <div class="form-group">
+                            <label class="form-label">Peran Persediaan</label>
+                            <select name="inventory_role" class="form-control">
+                                <option value="">- Tidak ada -</option>
+                                {role_options}
+                            </select>
+                        </div>
                     </div>
                     <div class="grid grid-2">
                         <div class="form-group">
@@ -9966,9 +10617,7 @@ def edit_product(product_id):
 
                 <div style="margin-top: 2rem;">
                     <h4>Gambar Saat Ini:</h4>
-                    <img src="{product.image_url}" alt="{product.name}"
-                         style="max-width: 200px; height: auto; border-radius: 8px; margin-top: 1rem;"
-                         onerror="this.style.display='none'">
+                    {product_image_html(product, variant='detail', sizes='200px', css_class='', style='max-width: 200px; height: auto; border-radius: 8px; margin-top: 1rem;')}
                 </div>
             </div>
         </div>
@@ -10011,11 +10660,97 @@ def seller_accounting():
         flash('Terjadi error saat memuat data akuntansi.', 'error')
         return redirect('/seller/dashboard')
 
+@app.route('/seller/accounting/tab/<tab_id>')
+@login_required
+@seller_required
+@version_etag(lambda tab_id: (get_ledger_version(), get_stock_version()))
+def seller_accounting_tab(tab_id):
+    """Fragmen HTML satu tab akuntansi (dimuat saat tab dibuka)"""
+    if tab_id not in ACCOUNTING_TABS:
+        return '<div class="card"><p>Tab tidak ditemukan</p></div>', 404
+
+    try:
+        return render_accounting_fragment(tab_id, request.args.to_dict())
+    except Exception as e:
+        print(f"❌ Error rendering accounting tab {tab_id}: {e}")
+        import traceback
+        traceback.print_exc()
+        return f'<div class="card"><p style="color: var(--error);">Error loading tab: {e}</p></div>', 500
+
+@app.route('/seller/accounting/journals/<kind>')
+@login_required
+@seller_required
+def seller_journal_page(kind):
+    """Halaman jurnal berikutnya (keyset cursor) untuk tombol 'Muat lebih banyak'"""
+    if kind not in JOURNAL_LISTINGS:
+        return jsonify({'success': False, 'message': 'Daftar jurnal tidak ditemukan'}), 404
+
+    try:
+        args = request.args.to_dict()
+        listing = JOURNAL_LISTINGS[kind]
+        journals, next_cursor = get_journal_page(listing, args)
+
+        return jsonify({
+            'success': True,
+            'html': render_journal_rows(listing, journals),
+            'more_html': render_load_more_button(kind, args, next_cursor)
+        })
+    except Exception as e:
+        print(f"❌ Error loading journal page: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@app.route('/api/accounting/balances')
+@login_required
+@seller_required
+def api_account_balances():
+    """Saldo semua akun, terkini atau per tanggal (?as_of=YYYY-MM-DD)"""
+    try:
+        as_of_param = request.args.get('as_of')
+        as_of = parse_as_of_date(as_of_param)
+        if as_of_param and not as_of:
+            return jsonify({'success': False, 'message': 'Format tanggal harus YYYY-MM-DD'}), 400
+
+        accounts = get_report_accounts(as_of)
+        return jsonify({
+            'success': True,
+            'as_of': as_of.strftime('%Y-%m-%d') if as_of else None,
+            'accounts': [{
+                'id': account.id,
+                'code': account.code,
+                'name': account.name,
+                'type': account.type,
+                'category': account.category,
+                'balance': account.balance
+            } for account in accounts]
+        })
+    except Exception as e:
+        print(f"❌ Error getting balances as of date: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@app.route('/seller/accounting/ledger')
+@login_required
+@seller_required
+def seller_ledger_stream():
+    """Buku besar sebagai response streaming - dikirim per akun selama dihitung"""
+    def generate():
+        try:
+            yield from iter_ledger_html()
+        except Exception as e:
+            print(f"❌ Error streaming ledger: {e}")
+            yield f'<div class="card"><p style="color: var(--error);">Error loading ledger data: {e}</p></div>'
+
+    return Response(stream_with_context(generate()), mimetype='text/html')
+
 @app.route('/api/get_closing_entries_html')
 @login_required
 @seller_required
+@version_etag(lambda: get_ledger_version())
 def get_closing_entries_html():
     """Return HTML untuk tab Jurnal Penutup"""
+    return build_closing_tab_html()
+
+def build_closing_tab_html():
+    """HTML isi tab Jurnal Penutup (tombol + daftar jurnal penutup)"""
     try:
         # Ambil HTML jurnal penutup yang sudah ada
         closing_html = get_proper_closing_entries_html()
@@ -10535,13 +11270,9 @@ def add_sales_journal():
         if selling_price <= 0 or cost_price <= 0 or quantity <= 0:
             return jsonify({'success': False, 'message': 'Harga dan quantity harus lebih dari 0'})
 
-        # Nama produk berdasarkan jenis
-        product_names = {
-            'bibit': 'Bibit Ikan Mas',
-            'konsumsi': 'Ikan Mas Konsumsi'
-        }
-
-        product_name = product_names.get(product_type, 'Produk')
+        # Produk berdasarkan peran persediaan
+        product = get_role_product(product_type)
+        product_name = product.name if product else PRODUCT_ROLES.get(product_type, {}).get('label', 'Produk')
 
         # Hitung total
         total_sales = selling_price * quantity
@@ -10550,11 +11281,11 @@ def add_sales_journal():
         print(f"💰 Totals - Sales: {total_sales}, HPP: {total_hpp}")
 
         # Dapatkan account IDs
-        kas_account = Account.query.filter_by(type='kas').first()
-        piutang_account = Account.query.filter_by(type='piutang').first()
-        pendapatan_account = Account.query.filter_by(type='pendapatan').first()
-        hpp_account = Account.query.filter_by(type='hpp').first()
-        persediaan_account = Account.query.filter_by(type='persediaan').first()
+        kas_account = get_account_by_type('kas')
+        piutang_account = get_account_by_type('piutang')
+        pendapatan_account = get_account_by_type('pendapatan')
+        hpp_account = get_account_by_type('hpp')
+        persediaan_account = get_account_by_type('persediaan')
 
         if not all([kas_account, piutang_account, pendapatan_account, hpp_account, persediaan_account]):
             return jsonify({'success': False, 'message': 'Akun-akun yang diperlukan tidak ditemukan'})
@@ -10614,28 +11345,19 @@ def add_sales_journal():
             print(f"✅ Journal created: {journal.transaction_number}")
 
             # Update kartu persediaan
-            product = Product.query.filter_by(name=product_name).first()
-
             if product:
                 print(f"📦 Updating product stock: {product.name}, current: {product.stock}")
 
-                # Update stok produk
-                product.stock -= quantity
-
-                # Buat transaksi inventory
-                inventory_transaction = create_inventory_transaction(
-                    product_id=product.id,
+                # Mutasi stok penjualan (dinilai dengan harga rata-rata persediaan)
+                record_stock_movement(
+                    product.id,
+                    'penjualan',
+                    quantity_out=quantity,
                     date=date,
                     description=description,
-                    transaction_type='penjualan',
-                    quantity_in=0,
-                    quantity_out=quantity,
-                    unit_price=cost_price  # Gunakan harga cost untuk inventory
+                    reference=journal.transaction_number
                 )
 
-                if inventory_transaction:
-                    print(f"✅ Inventory transaction created for {product.name}")
-
                 db.session.commit()
                 print(f"✅ Stock updated: {product.name} = {product.stock}")
 
@@ -10678,19 +11400,15 @@ def add_purchase_journal():
         print(f"📦 Processing purchase: {product_type}, Qty: {quantity}, Price: {purchase_price}")
 
         # Validasi - hanya terima bibit dan konsumsi
-        if product_type not in ['bibit', 'konsumsi']:
+        if resolve_product_role(product_type) is None:
             return jsonify({'success': False, 'message': 'Hanya pembelian ikan (bibit/konsumsi) yang diperbolehkan'})
 
         if purchase_price <= 0 or quantity <= 0:
             return jsonify({'success': False, 'message': 'Harga dan quantity harus lebih dari 0'})
 
-        # Nama produk berdasarkan jenis
-        product_names = {
-            'bibit': 'Bibit Ikan Mas',
-            'konsumsi': 'Ikan Mas Konsumsi'
-        }
-
-        product_name = product_names.get(product_type, 'Ikan')
+        # Produk berdasarkan peran persediaan
+        product = get_role_product(product_type)
+        product_name = product.name if product else PRODUCT_ROLES.get(product_type, {}).get('label', 'Ikan')
 
         # Hitung total
         total_purchase = purchase_price * quantity
@@ -10698,9 +11416,9 @@ def add_purchase_journal():
         print(f"💰 Total Pembelian: {total_purchase}")
 
         # Dapatkan account IDs
-        kas_account = Account.query.filter_by(type='kas').first()
-        hutang_account = Account.query.filter_by(type='hutang').first()
-        persediaan_account = Account.query.filter_by(type='persediaan').first()
+        kas_account = get_account_by_type('kas')
+        hutang_account = get_account_by_type('hutang')
+        persediaan_account = get_account_by_type('persediaan')
 
         if not all([kas_account, hutang_account, persediaan_account]):
             return jsonify({'success': False, 'message': 'Akun-akun yang diperlukan tidak ditemukan'})
@@ -10746,33 +11464,23 @@ def add_purchase_journal():
             print(f"✅ Purchase journal created: {journal.transaction_number}")
 
             # Update kartu persediaan untuk ikan
-            product = Product.query.filter_by(name=product_name).first()
-
             if product:
                 print(f"📦 Updating product stock: {product.name}, current: {product.stock}")
 
-                # Update stok produk
-                product.stock += quantity
-                # Update harga cost
-                if purchase_price > 0:
-                    product.cost_price = purchase_price
                 # Update harga jual
                 if selling_price > 0:
                     product.price = selling_price
 
-                # Buat transaksi inventory
-                inventory_transaction = create_inventory_transaction(
-                    product_id=product.id,
+                # Mutasi stok pembelian - stok & harga rata-rata ikut diperbarui
+                record_stock_movement(
+                    product.id,
+                    'pembelian',
+                    quantity_in=quantity,
+                    unit_price=purchase_price,
                     date=date,
                     description=description,
-                    transaction_type='pembelian',
-                    quantity_in=quantity,
-                    quantity_out=0,
-                    unit_price=purchase_price
+                    reference=journal.transaction_number
                 )
-
-                if inventory_transaction:
-                    print(f"✅ Inventory transaction created for {product.name}")
             else:
                 # Buat produk baru jika tidak ada
                 seller_id = User.query.filter_by(user_type='seller').first().id
@@ -10781,11 +11489,24 @@ def add_purchase_journal():
                     description=f"{product_name} - Auto created from purchase",
                     price=selling_price if selling_price > 0 else purchase_price * 1.5,
                     cost_price=purchase_price,
-                    stock=quantity,
+                    stock=0,
                     seller_id=seller_id,
                     category=product_type
                 )
                 db.session.add(new_product)
+                db.session.flush()
+                assign_product_role(product_type, new_product.id)
+
+                # Stok awal produk baru lewat ledger mutasi stok
+                record_stock_movement(
+                    new_product.id,
+                    'pembelian',
+                    quantity_in=quantity,
+                    unit_price=purchase_price,
+                    date=date,
+                    description=description,
+                    reference=journal.transaction_number
+                )
                 print(f"✅ New product created: {product_name}")
 
             db.session.commit()
@@ -10871,6 +11592,38 @@ def get_adjustment_template(template_key):
         print(f"Error getting adjustment template: {e}")
         return jsonify({'success': False, 'message': str(e)})
 
+@app.route('/seller/bulk_post_journals', methods=['POST'])
+@login_required
+@seller_required
+def bulk_post_journals():
+    """Posting banyak jurnal sekaligus (impor data historis) dalam satu transaksi"""
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'success': False, 'message': 'Body harus objek JSON berisi journals'}), 400
+
+        prepared, errors = validate_bulk_journals(data.get('journals'))
+
+        if errors:
+            return jsonify({
+                'success': False,
+                'message': f'{len(errors)} jurnal tidak valid, tidak ada yang diposting',
+                'errors': errors
+            }), 400
+
+        transaction_numbers = post_prepared_journals(prepared)
+
+        return jsonify({
+            'success': True,
+            'message': f'{len(transaction_numbers)} jurnal berhasil diposting',
+            'transaction_numbers': transaction_numbers
+        })
+
+    except Exception as e:
+        print(f"❌ Error bulk posting journals: {e}")
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'Terjadi error: {str(e)}'}), 500
+
 @app.route('/seller/add_template_journal', methods=['POST'])
 @login_required
 @seller_required
@@ -10995,63 +11748,28 @@ def delete_journal(journal_id):
                     account.balance -= detail.credit
                 
                 print(f"   Sesudah: Rp {account.balance:,.0f}")
-        
-        # ===== 3. ROLLBACK INVENTORY JIKA JURNAL PENJUALAN =====
+
+        # Kurangi snapshot saldo dalam transaksi yang sama
+        record_journal_snapshots(journal, sign=-1)
+        bump_ledger_version()
+
+        # ===== 3. BATALKAN MUTASI STOK DARI JURNAL INI =====
+        # Ledger stok append-only: mutasi dibatalkan dengan mutasi kebalikan
+        stock_references = [transaction_number]
         if journal_type in ['sales', 'closing_revenue', 'closing_expense']:
-            print(f"🔄 [DELETE JOURNAL] Rollback inventory untuk jurnal penjualan")
-            
-            # Cari order yang terkait dengan jurnal ini
-            orders = Order.query.filter(
-                Order.order_number.like(f"%{transaction_number.replace('SALES', 'ORD')}%")
-            ).all()
-            
-            for order in orders:
-                print(f"   Rollback order #{order.order_number}")
-                
-                # Kembalikan stok produk
-                order_items = OrderItem.query.filter_by(order_id=order.id).all()
-                for item in order_items:
-                    product = Product.query.get(item.product_id)
-                    if product:
-                        print(f"   Kembalikan stok {product.name}: +{item.quantity}")
-                        product.stock += item.quantity
-                        
-                        # Rollback inventory transaction
-                        inventory_transactions = InventoryTransaction.query.filter_by(
-                            product_id=product.id,
-                            description=description
-                        ).all()
-                        
-                        for inv_tx in inventory_transactions:
-                            db.session.delete(inv_tx)
-                            print(f"   Hapus transaksi inventory: {inv_tx.id}")
-        
-        # ===== 4. ROLLBACK INVENTORY JIKA JURNAL PEMBELIAN =====
-        elif journal_type in ['purchase', 'general'] and 'pembelian' in description.lower():
-            print(f"🔄 [DELETE JOURNAL] Rollback inventory untuk jurnal pembelian")
-            
-            # Cari inventory transaction dengan description yang sama
-            inventory_transactions = InventoryTransaction.query.filter(
-                InventoryTransaction.description.like(f"%{description}%")
-            ).all()
-            
-            for inv_tx in inventory_transactions:
-                product = Product.query.get(inv_tx.product_id)
-                if product:
-                    print(f"   Rollback stok {product.name}: -{inv_tx.quantity_in}")
-                    product.stock -= inv_tx.quantity_in
-                
-                db.session.delete(inv_tx)
-                print(f"   Hapus transaksi inventory: {inv_tx.id}")
-        
-        # ===== 5. ROLLBACK KARTU PERSEDIAAN (InventoryCard) =====
-        inventory_cards = InventoryCard.query.filter_by(
-            transaction_number=transaction_number
-        ).all()
-        
-        for card in inventory_cards:
-            print(f"🗑️ [DELETE JOURNAL] Hapus kartu persediaan: {card.id}")
-            db.session.delete(card)
+            # Order terkait lewat journal.order_id; pencocokan nomor hanya untuk jurnal lama tanpa order_id
+            if journal.order_id:
+                orders = [db.session.get(Order, journal.order_id)]
+            else:
+                orders = Order.query.filter(
+                    Order.order_number.like(f"%{transaction_number.replace('SALES', 'ORD')}%")
+                ).all()
+            stock_references += [order_stock_reference(order) for order in orders if order]
+
+        for reference in stock_references:
+            reversed_count = reverse_stock_movements(reference, f"Pembatalan jurnal {transaction_number}")
+            if reversed_count:
+                print(f"🔄 [DELETE JOURNAL] {reversed_count} mutasi stok {reference} dibatalkan")
         
         # ===== 6. HAPUS JOURNAL DETAIL =====
         for detail in journal_details:
@@ -11179,8 +11897,32 @@ def api_cart_add():
         db.session.rollback()
         return jsonify({'success': False, 'message': f'Terjadi error sistem: {str(e)}'})
 
+# ===== VERSI KERANJANG =====
+# User.cart_version naik di transaksi yang sama dengan perubahan CartItem. User sudah dimuat
+# Flask-Login di setiap request, jadi ETag /api/cart/count tidak butuh query tambahan.
+def bump_cart_versions(session, user_ids=None):
+    """Naikkan versi keranjang user tertentu (None = semua user). Lewat Core - tidak memicu flush."""
+    statement = update(User.__table__).values(cart_version=User.__table__.c.cart_version + 1)
+    if user_ids is not None:
+        statement = statement.where(User.__table__.c.id.in_(sorted(user_ids)))
+    session.connection().execute(statement)
+
+def track_cart_changes(session, items):
+    """Tambah/ubah/hapus CartItem lewat ORM"""
+    user_ids = {item.user_id for item in items if item.user_id is not None}
+    if user_ids:
+        bump_cart_versions(session, user_ids)
+
+# DELETE/UPDATE massal ke CartItem (reset data) - user terdampak tidak diketahui, naikkan semua
+track_model_changes(CartItem, on_flush=track_cart_changes, on_statement=bump_cart_versions)
+
+def get_cart_version():
+    """Versi keranjang user yang login (sudah dimuat bersama current_user)"""
+    return current_user.cart_version
+
 @app.route('/api/cart/count')
 @login_required
+@version_etag(get_cart_version)
 def api_cart_count():
     try:
         if current_user.user_type != 'customer':
@@ -11193,6 +11935,150 @@ def api_cart_count():
         print(f"Error getting cart count: {e}")
         return jsonify({'count': 0})
 
+# ===== KERANJANG BATCH =====
+CART_BATCH_LIMIT = 50
+CART_OPERATIONS = ('add', 'set', 'remove')
+
+def get_cart_lines(user_id, extra_product_ids=()):
+    """Isi keranjang user: (cart_items, products_by_id) - produk diambil dengan SATU query IN"""
+    cart_items = CartItem.query.filter_by(user_id=user_id).order_by(CartItem.id).all()
+    product_ids = {item.product_id for item in cart_items} | set(extra_product_ids)
+    products = Product.query.filter(Product.id.in_(product_ids)).all() if product_ids else []
+    return cart_items, {product.id: product for product in products}
+
+def serialize_cart(cart_items, products_by_id):
+    """Ringkasan keranjang untuk respons JSON (baris, jumlah baris untuk badge, total)"""
+    items = []
+    total = 0
+    for item in cart_items:
+        product = products_by_id.get(item.product_id)
+        if not product:
+            continue
+        subtotal = product.price * item.quantity
+        total += subtotal
+        items.append({
+            'id': item.id,
+            'product_id': product.id,
+            'name': product.name,
+            'price': product.price,
+            'quantity': item.quantity,
+            'stock': product.stock,
+            'subtotal': subtotal
+        })
+    return {'items': items, 'count': len(items), 'total': total}
+
+def parse_cart_operations(operations):
+    """Validasi format operasi batch - return (list (op, product_id, quantity), errors)"""
+    if not isinstance(operations, list) or not operations:
+        return [], ['Daftar operasi keranjang kosong']
+    if len(operations) > CART_BATCH_LIMIT:
+        return [], [f'Maksimal {CART_BATCH_LIMIT} operasi per batch']
+
+    parsed = []
+    errors = []
+    for index, operation in enumerate(operations, start=1):
+        if not isinstance(operation, dict) or operation.get('op') not in CART_OPERATIONS:
+            errors.append(f'Operasi #{index}: jenis operasi harus add, set, atau remove')
+            continue
+        try:
+            product_id = int(operation.get('product_id'))
+            quantity = int(operation.get('quantity', 1 if operation['op'] == 'add' else 0))
+        except (TypeError, ValueError):
+            errors.append(f'Operasi #{index}: product_id atau quantity tidak valid')
+            continue
+        if quantity < 0 or (operation['op'] == 'add' and quantity < 1):
+            errors.append(f'Operasi #{index}: quantity tidak valid')
+            continue
+        parsed.append((operation['op'], product_id, quantity))
+    return parsed, errors
+
+def apply_cart_operations(user_id, operations):
+    """Terapkan operasi add/set/remove ke keranjang dalam SATU transaksi.
+
+    Stok semua produk yang terlibat divalidasi dari satu query IN; bila ada yang gagal tidak ada
+    perubahan yang disimpan. Return (cart_items, products_by_id, errors).
+    """
+    cart_items, products_by_id = get_cart_lines(user_id, {product_id for _, product_id, _ in operations})
+    items_by_product = {}
+    for item in cart_items:
+        if item.product_id in items_by_product:
+            # Baris ganda produk yang sama (data lama) digabung
+            items_by_product[item.product_id].quantity += item.quantity
+            db.session.delete(item)
+        else:
+            items_by_product[item.product_id] = item
+
+    # Jumlah akhir per produk setelah semua operasi (urut sesuai kiriman klien)
+    quantities = {product_id: item.quantity for product_id, item in items_by_product.items()}
+    touched = []
+    for op, product_id, quantity in operations:
+        if op == 'add':
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+        elif op == 'set':
+            quantities[product_id] = quantity
+        else:
+            quantities[product_id] = 0
+        if product_id not in touched:
+            touched.append(product_id)
+
+    errors = []
+    for product_id in touched:
+        quantity = quantities[product_id]
+        product = products_by_id.get(product_id)
+        if quantity == 0:
+            continue
+        if not product or not product.is_active:
+            errors.append(f'Produk #{product_id} tidak ditemukan')
+        elif quantity > product.stock:
+            errors.append(f'Stok {product.name} hanya {product.stock}')
+    if errors:
+        db.session.rollback()
+        return cart_items, products_by_id, errors
+
+    for product_id in touched:
+        quantity = quantities[product_id]
+        item = items_by_product.get(product_id)
+        if quantity == 0:
+            if item:
+                db.session.delete(item)
+        elif item:
+            item.quantity = quantity
+        else:
+            db.session.add(CartItem(user_id=user_id, product_id=product_id, quantity=quantity))
+    db.session.commit()
+
+    cart_items = CartItem.query.filter_by(user_id=user_id).order_by(CartItem.id).all()
+    return cart_items, products_by_id, []
+
+@app.route('/api/cart/batch', methods=['POST'])
+@login_required
+def api_cart_batch():
+    """Terapkan sekumpulan operasi keranjang sekaligus: {"operations": [{"op", "product_id", "quantity"}]}"""
+    try:
+        if current_user.user_type != 'customer':
+            return jsonify({'success': False, 'message': 'Hanya customer yang bisa mengubah keranjang'})
+
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'success': False, 'message': 'Body harus objek JSON berisi operations'}), 400
+
+        operations, errors = parse_cart_operations(data.get('operations'))
+        if errors:
+            return jsonify({'success': False, 'message': '; '.join(errors), 'errors': errors}), 400
+
+        cart_items, products_by_id, errors = apply_cart_operations(current_user.id, operations)
+        response = {
+            'success': not errors,
+            'message': '; '.join(errors) if errors else 'Keranjang diperbarui',
+            'errors': errors,
+            'cart': serialize_cart(cart_items, products_by_id)
+        }
+        return jsonify(response)
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Error in cart batch: {e}")
+        return jsonify({'success': False, 'message': f'Terjadi error sistem: {str(e)}'}), 500
+
 # ===== CREATE SELLER ROUTE =====
 @app.route('/create-seller')
 def create_seller():
@@ -11303,6 +12189,7 @@ def create_initial_data():
         for acc_data in accounts:
             account = Account(**acc_data)
             db.session.add(account)
+        invalidate_account_lookup()
         print("✅ Accounts created successfully with corrected balances")
 
     # Create products
@@ -11339,45 +12226,22 @@ def create_initial_data():
             product = Product(**prod_data)
             db.session.add(product)
             db.session.flush()  # Untuk dapat product.id
+            assign_product_role(product.category, product.id)
 
             # Buat entry awal di kartu persediaan dengan harga cost yang benar
-            if product.name == 'Bibit Ikan Mas':
-                unit_cost = 1000
-                total_value = 2975 * 1000  # 2,975,000
-            else:  # Ikan Mas Konsumsi
-                unit_cost = 13500
-                total_value = 150 * 13500  # 2,025,000
-
-            # Buat transaksi inventory untuk saldo awal
-            inventory_transaction = InventoryTransaction(
-                product_id=product.id,
-                date=datetime.now(),
-                description='SALDO AWAL - Persediaan awal periode',
-                transaction_type='saldo_awal',
-                quantity_in=product.stock,
-                quantity_out=0,
+            unit_cost = PRODUCT_ROLES[product.category]['default_cost']
+            total_value = product.stock * unit_cost
+
+            # Saldo awal di ledger mutasi stok
+            opening_stock, product.stock = product.stock, 0
+            record_stock_movement(
+                product.id,
+                'saldo_awal',
+                quantity_in=opening_stock,
                 unit_price=unit_cost,
-                total_amount=total_value,
-                balance_quantity=product.stock,
-                balance_unit_price=unit_cost,
-                balance_total=total_value
-            )
-            db.session.add(inventory_transaction)
-
-            # Juga buat di InventoryCard untuk kompatibilitas
-            inventory_card = InventoryCard(
-                product_id=product.id,
-                date=datetime.now(),
-                transaction_type='saldo_awal',
-                transaction_number='SALDO_AWAL',
-                quantity_in=product.stock,
-                quantity_out=0,
-                unit_cost=unit_cost,
-                total_cost=total_value,
-                balance_quantity=product.stock,
-                balance_value=total_value
+                description='SALDO AWAL - Persediaan awal periode',
+                reference='SALDO_AWAL'
             )
-            db.session.add(inventory_card)
 
             print(f"✅ Kartu persediaan saldo awal dibuat untuk {product.name}: {product.stock} unit @ Rp {unit_cost:,} = Rp {total_value:,}")
 
@@ -11399,6 +12263,7 @@ def init_database():
             # Buat semua tabel
             db.create_all()
             print("✅ Database tables created successfully!")
+            ensure_database_columns()
             
             # Cek apakah sudah ada data
             if User.query.count() == 0:
@@ -11406,7 +12271,23 @@ def init_database():
                 print("✅ Initial data created successfully!")
             else:
                 print("✅ Database already has data, skipping initial data creation")
-                
+
+            ensure_ledger_version()
+            ensure_settings_version()
+            ensure_database_indexes()
+            ensure_product_search_index()
+            migrate_money_columns()
+            backfill_journal_order_ids()
+            backfill_stock_ledger()
+            backfill_cost_layers()
+            ensure_product_roles()
+            if InventoryDailySnapshot.query.first() is None and StockMovement.query.first() is not None:
+                rebuild_stock_snapshots()
+
+            # Database lama belum punya snapshot saldo
+            if AccountBalanceSnapshot.query.first() is None and JournalDetail.query.first() is not None:
+                rebuild_balance_snapshots()
+
             print("🔐 Seller Login: kang.mas1817@gmail.com / TugasSiaKangMas")
             print("🔐 Customer Login: customer@example.com / customer123")
             
@@ -11426,4 +12307,7 @@ if __name__ == '__main__':
     debug_mode = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
     
     print(f"🚀 Server starting on port {port} (debug: {debug_mode})")
+    # Dengan reloader, hanya proses anak (WERKZEUG_RUN_MAIN) yang melayani request
+    if not debug_mode or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_accounting_workers()
     app.run(host='0.0.0.0', port=port, debug=debug_mode)
@@ -0,0 +1,6 @@
+# Konfigurasi gunicorn (dipakai Procfile)
+
+def post_fork(server, worker):
+    """Worker job akuntansi dijalankan di tiap proses worker gunicorn - thread tidak ikut ter-fork"""
+    from app import start_accounting_workers
+    start_accounting_workers()
@@ -0,0 +1,1429 @@
+// Ocean JavaScript Functions
+function addToCart(productId) {
+    console.log('🛒 Adding product to cart:', productId);
+
+    if (!productId) {
+        showNotification('Product ID tidak valid', 'error');
+        return;
+    }
+
+    const button = event.target;
+    const originalText = button.innerHTML;
+
+    // Show loading state
+    button.innerHTML = '<div class="loading"></div> Menambahkan...';
+    button.disabled = true;
+
+    syncCart([{op: 'add', product_id: parseInt(productId), quantity: 1}])
+    .then(data => {
+        if (data.success) {
+            const line = data.cart.items.find(item => item.product_id === parseInt(productId));
+            showNotification('✅ ' + (line ? line.name + ' berhasil ditambahkan ke keranjang!' : data.message), 'success');
+        } else {
+            showNotification('❌ ' + data.message, 'error');
+        }
+    })
+    .catch(error => {
+        console.error('Fetch error:', error);
+        let errorMessage = 'Gagal menambahkan ke keranjang';
+
+        if (error.message.includes('HTTP error! status: 403')) {
+            errorMessage = 'Hanya customer yang bisa menambah ke keranjang';
+        } else if (error.message.includes('HTTP error! status: 404')) {
+            errorMessage = 'Produk tidak ditemukan';
+        } else if (error.message.includes('HTTP error! status: 400')) {
+            errorMessage = 'Stock tidak mencukupi';
+        }
+
+        showNotification('❌ ' + errorMessage, 'error');
+    })
+    .finally(() => {
+        setTimeout(() => {
+            button.innerHTML = originalText;
+            button.disabled = false;
+        }, 1000);
+    });
+}
+
+function showTab(tabName, element) {
+    document.querySelectorAll('.tab-content').forEach(tab => {
+        tab.classList.remove('active');
+    });
+    document.querySelectorAll('.tab').forEach(tab => {
+        tab.classList.remove('active');
+    });
+    const tabContent = document.getElementById(tabName);
+    tabContent.classList.add('active');
+    element.classList.add('active');
+    loadTabFragment(tabContent);
+}
+
+// Muat ulang tab laporan dengan saldo per tanggal tertentu
+function loadTabAsOf(tabName, inputId) {
+    const tabContent = document.getElementById(tabName);
+    const value = document.getElementById(inputId).value;
+    const src = tabContent.dataset.tabSrc.split('?')[0];
+    tabContent.dataset.tabSrc = value ? src + '?as_of=' + encodeURIComponent(value) : src;
+    loadTabFragment(tabContent, true);
+}
+
+// Muat ulang tab dengan parameter dari form filter
+function loadTabWithForm(tabName, form) {
+    const tabContent = document.getElementById(tabName);
+    const params = new URLSearchParams();
+    new FormData(form).forEach((value, key) => {
+        if (value) params.append(key, value);
+    });
+    const src = tabContent.dataset.tabSrc.split('?')[0];
+    tabContent.dataset.tabSrc = params.toString() ? src + '?' + params.toString() : src;
+    loadTabFragment(tabContent, true);
+}
+
+// Tambahkan halaman jurnal berikutnya ke tabel yang sama
+function loadMoreJournals(button) {
+    const container = button.parentElement;
+    const tbody = container.parentElement.querySelector('table tbody');
+    button.disabled = true;
+    button.innerHTML = '<div class="loading"></div> Memuat...';
+
+    fetch(button.dataset.src)
+    .then(response => response.json())
+    .then(data => {
+        if (!data.success) throw new Error(data.message);
+        tbody.insertAdjacentHTML('beforeend', data.html);
+        container.outerHTML = data.more_html;
+    })
+    .catch(error => {
+        console.error('Error loading journals:', error);
+        button.disabled = false;
+        button.innerHTML = '<i class="fas fa-chevron-down"></i> Muat lebih banyak';
+    });
+}
+
+// Muat isi tab dari server saat pertama kali dibuka (data-tab-src)
+function loadTabFragment(tabContent, forceReload) {
+    const src = tabContent.dataset.tabSrc;
+    if (!src || (tabContent.dataset.loaded && !forceReload)) return;
+
+    tabContent.dataset.loaded = '1';
+    fetch(src)
+    .then(response => response.text())
+    .then(html => {
+        tabContent.innerHTML = html;
+    })
+    .catch(error => {
+        console.error('Error loading tab:', error);
+        delete tabContent.dataset.loaded;
+        tabContent.innerHTML = '<div class="card"><p>Gagal memuat data. Silakan buka tab ini lagi.</p></div>';
+    });
+}
+
+function showNotification(message, type) {
+    const notification = document.createElement('div');
+    notification.className = `flash-message flash-${type}`;
+    notification.innerHTML = `
+        <div style="display: flex; align-items: center; gap: 0.75rem;">
+            <i class="fas fa-${type === 'success' ? 'check-circle' : 'exclamation-circle'}"></i>
+            <span>${message}</span>
+        </div>
+    `;
+
+    const flashContainer = document.querySelector('.flash-messages');
+    flashContainer.appendChild(notification);
+
+    setTimeout(() => {
+        notification.style.animation = 'slideInRight 0.5s ease reverse';
+        setTimeout(() => {
+            flashContainer.removeChild(notification);
+        }, 500);
+    }, 4000);
+}
+
+function checkout() {
+    window.location.href = '/checkout';
+}
+
+// ===== FUNGSI CHECKOUT BARU UNTUK COD =====
+function processCheckout() {
+    const shippingAddress = document.getElementById('shipping_address').value;
+    const shippingMethod = document.getElementById('shipping_method').value;
+    const paymentMethod = document.getElementById('payment_method').value;
+
+    if (!shippingAddress) {
+        showNotification('Harap isi alamat pengiriman!', 'error');
+        return;
+    }
+
+    if (!shippingMethod) {
+        showNotification('Harap pilih metode pengiriman!', 'error');
+        return;
+    }
+
+    if (!paymentMethod) {
+        showNotification('Harap pilih metode pembayaran!', 'error');
+        return;
+    }
+
+    const formData = new FormData();
+    formData.append('shipping_address', shippingAddress);
+    formData.append('shipping_method', shippingMethod);
+    formData.append('payment_method', paymentMethod);
+
+    fetch('/process_checkout', {
+        method: 'POST',
+        body: formData
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            if (data.is_cod) {
+                // Untuk COD, langsung tampilkan sukses
+                showSuccessModalCOD(data.order_number, data.total_amount);
+            } else {
+                // Untuk non-COD, tampilkan instruksi pembayaran
+                showPaymentModal(data.order_number, data.payment_method, data.total_amount);
+            }
+        } else {
+            showNotification('❌ ' + data.message, 'error');
+        }
+    });
+}
+
+function resetBalances() {
+    if (!confirm('Apakah Anda yakin ingin mereset saldo awal? Tindakan ini akan mengembalikan saldo ke nilai default.')) {
+        return;
+    }
+
+    const button = event.target;
+    const originalText = button.innerHTML;
+
+    button.innerHTML = '<div class="loading"></div> Resetting...';
+    button.disabled = true;
+
+    fetch('/seller/reset_balances', {
+        method: 'POST'
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            showNotification('✅ ' + data.message, 'success');
+            setTimeout(() => location.reload(), 2000);
+        } else {
+            showNotification('❌ ' + data.message, 'error');
+        }
+    })
+    .catch(error => {
+        showNotification('❌ Terjadi error saat reset saldo', 'error');
+    })
+    .finally(() => {
+        setTimeout(() => {
+            button.innerHTML = originalText;
+            button.disabled = false;
+        }, 2000);
+    });
+}
+
+// ===== 🆕 FUNGSI BARU UNTUK FORM PENJUALAN SEDERHANA =====
+// Data harga default
+const defaultPrices = {
+    'bibit': {
+        selling_price: 2000,
+        cost_price: 1000,
+        name: 'Bibit Ikan Mas'
+    },
+    'konsumsi': {
+        selling_price: 20000,
+        cost_price: 13500,
+        name: 'Ikan Mas Konsumsi'
+    }
+};
+
+// Fungsi untuk mengisi harga default
+function fillDefaultPrices() {
+    const productType = document.getElementById('product_type')?.value;
+
+    if (productType && defaultPrices[productType]) {
+        const product = defaultPrices[productType];
+
+        // Isi harga default
+        const sellingPriceInput = document.getElementById('selling_price');
+        const costPriceInput = document.getElementById('cost_price');
+        const descriptionInput = document.getElementById('description');
+
+        if (sellingPriceInput) sellingPriceInput.value = product.selling_price;
+        if (costPriceInput) costPriceInput.value = product.cost_price;
+        if (descriptionInput) descriptionInput.value = 'Penjualan ' + product.name;
+
+        // Hitung ulang total
+        calculateTotals();
+    } else if (productType === 'lainnya') {
+        // Kosongkan untuk produk lainnya
+        const sellingPriceInput = document.getElementById('selling_price');
+        const costPriceInput = document.getElementById('cost_price');
+        const descriptionInput = document.getElementById('description');
+
+        if (sellingPriceInput) sellingPriceInput.value = '';
+        if (costPriceInput) costPriceInput.value = '';
+        if (descriptionInput) descriptionInput.value = 'Penjualan produk lainnya';
+
+        calculateTotals();
+    }
+}
+
+        // Fungsi untuk menghitung total
+function calculateTotals() {
+    const quantity = parseInt(document.getElementById('quantity')?.value) || 0;
+    const sellingPrice = parseInt(document.getElementById('selling_price')?.value) || 0;
+    const costPrice = parseInt(document.getElementById('cost_price')?.value) || 0;
+
+    const totalSales = sellingPrice * quantity;
+    const totalHpp = costPrice * quantity;
+
+    const totalSalesInput = document.getElementById('total_sales');
+    const totalHppInput = document.getElementById('total_hpp');
+
+    if (totalSalesInput) totalSalesInput.value = totalSales;
+    if (totalHppInput) totalHppInput.value = totalHpp;
+}
+
+// ⬇️⬇️⬇️ TARUH DI SINI ⬇️⬇️⬇️
+// Fungsi untuk submit form penjualan sederhana
+function submitSalesForm() {
+    console.log("🔄 Submit Sales Form dipanggil");
+
+    const productType = document.getElementById('product_type')?.value;
+    const paymentMethod = document.getElementById('payment_method')?.value;
+    const quantity = parseInt(document.getElementById('quantity')?.value) || 0;
+    const sellingPrice = parseInt(document.getElementById('selling_price')?.value) || 0;
+    const costPrice = parseInt(document.getElementById('cost_price')?.value) || 0;
+    const description = document.getElementById('description')?.value;
+    const dateInput = document.querySelector('input[name="date"]');
+    const date = dateInput ? dateInput.value : new Date().toISOString().split('T')[0];
+    const totalSales = parseInt(document.getElementById('total_sales')?.value) || 0;
+    const totalHpp = parseInt(document.getElementById('total_hpp')?.value) || 0;
+
+    console.log("📊 Data yang akan dikirim:", {
+        productType, paymentMethod, quantity, sellingPrice, costPrice, description, date
+    });
+
+    // Validasi input
+    if (!productType) {
+        alert('❌ Harap pilih jenis produk!');
+        return;
+    }
+
+    if (!paymentMethod) {
+        alert('❌ Harap pilih metode pembayaran!');
+        return;
+    }
+
+    if (!quantity || quantity <= 0) {
+        alert('❌ Harap isi quantity dengan angka lebih dari 0!');
+        return;
+    }
+
+    if (!sellingPrice || sellingPrice <= 0) {
+        alert('❌ Harap isi harga jual dengan angka lebih dari 0!');
+        return;
+    }
+
+    if (!costPrice || costPrice <= 0) {
+        alert('❌ Harap isi harga beli (HPP) dengan angka lebih dari 0!');
+        return;
+    }
+
+    // Data untuk dikirim
+    const data = {
+        date: date,
+        product_type: productType,
+        payment_method: paymentMethod,
+        quantity: quantity,
+        selling_price: sellingPrice,
+        cost_price: costPrice,
+        description: description || 'Penjualan produk'
+    };
+
+    // Tampilkan konfirmasi
+    const productName = defaultPrices[productType] ? defaultPrices[productType].name : 'Produk';
+
+    const confirmMessage = 'Konfirmasi Penjualan:\n\n' +
+                        'Produk: ' + productName + '\n' +
+                        'Quantity: ' + quantity + ' unit\n' +
+                        'Harga Jual: Rp ' + sellingPrice.toLocaleString() + ' per unit\n' +
+                        'Harga Pokok Produksi: Rp ' + costPrice.toLocaleString() + ' per unit\n' +
+                        'Metode: ' + (paymentMethod === 'tunai' ? 'Tunai' : 'Kredit') + '\n\n' +
+                        'Total Penjualan: Rp ' + totalSales.toLocaleString() + '\n' +
+                        'Total Harga Pokok Produksi: Rp ' + totalHpp.toLocaleString() + '\n\n' +
+                        'Buat jurnal penjualan?';
+
+    if (!confirm(confirmMessage)) {
+        return;
+    }
+
+    // Tampilkan loading
+    const button = event.target;
+    const originalText = button.innerHTML;
+    button.innerHTML = '<div class="loading"></div> Memproses...';
+    button.disabled = true;
+
+    // Kirim data ke server
+    fetch('/seller/add_sales_journal', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(data)
+    })
+    .then(response => response.json())
+    .then(result => {
+        console.log("✅ Response dari server:", result);
+        if (result.success) {
+            alert('✅ ' + result.message);
+            setTimeout(() => location.reload(), 1500);
+        } else {
+            alert('❌ ' + result.message);
+            button.innerHTML = originalText;
+            button.disabled = false;
+        }
+    })
+    .catch(error => {
+        console.error("❌ Error:", error);
+        alert('❌ Terjadi error: ' + error);
+        button.innerHTML = originalText;
+        button.disabled = false;
+    });
+}
+
+// ===== FUNGSI UNTUK FORM PEMBELIAN SEDERHANA =====
+// Data harga default untuk pembelian
+const purchaseDefaultPrices = {
+    'bibit': {
+        purchase_price: 1000,
+        selling_price: 2000,
+        name: 'Bibit Ikan Mas'
+    },
+    'konsumsi': {
+        purchase_price: 13500,
+        selling_price: 20000,
+        name: 'Ikan Mas Konsumsi'
+    },
+    'perlengkapan': {
+        purchase_price: 50000,
+        selling_price: 0,
+        name: 'Perlengkapan Budidaya'
+    },
+    'peralatan': {
+        purchase_price: 100000,
+        selling_price: 0,
+        name: 'Peralatan Budidaya'
+    }
+};
+
+// Fungsi untuk mengisi harga default pembelian
+function fillPurchaseDefaultPrices() {
+    const productType = document.getElementById('purchase_product_type')?.value;
+
+    if (productType && purchaseDefaultPrices[productType]) {
+        const product = purchaseDefaultPrices[productType];
+
+        const purchasePriceInput = document.getElementById('purchase_price');
+        const sellingPriceInput = document.getElementById('selling_price');
+        const descriptionInput = document.getElementById('purchase_description');
+
+        if (purchasePriceInput) purchasePriceInput.value = product.purchase_price;
+        if (sellingPriceInput) sellingPriceInput.value = product.selling_price;
+        if (descriptionInput) descriptionInput.value = 'Pembelian ' + product.name;
+
+        calculatePurchaseTotals();
+    }
+}
+
+// Fungsi untuk menghitung total pembelian
+function calculatePurchaseTotals() {
+    const quantity = parseInt(document.getElementById('purchase_quantity')?.value) || 0;
+    const purchasePrice = parseInt(document.getElementById('purchase_price')?.value) || 0;
+
+    const totalPurchase = purchasePrice * quantity;
+
+    const totalPurchaseInput = document.getElementById('purchase_total');
+    if (totalPurchaseInput) totalPurchaseInput.value = totalPurchase;
+}
+
+// Fungsi untuk submit form pembelian
+function submitPurchaseForm() {
+    console.log("🔄 Submit Purchase Form dipanggil");
+
+    const productType = document.getElementById('purchase_product_type')?.value;
+    const paymentMethod = document.getElementById('purchase_payment_method')?.value;
+    const quantity = parseInt(document.getElementById('purchase_quantity')?.value) || 0;
+    const purchasePrice = parseInt(document.getElementById('purchase_price')?.value) || 0;
+    const sellingPrice = parseInt(document.getElementById('selling_price')?.value) || 0;
+    const description = document.getElementById('purchase_description')?.value;
+    const dateInput = document.querySelector('#purchaseJournalForm input[name="date"]');
+    const date = dateInput ? dateInput.value : new Date().toISOString().split('T')[0];
+    const totalPurchase = parseInt(document.getElementById('purchase_total')?.value) || 0;
+
+    console.log("📊 Data pembelian yang akan dikirim:", {
+        productType, paymentMethod, quantity, purchasePrice, sellingPrice, description, date
+    });
+
+    // Validasi input
+    if (!productType) {
+        alert('❌ Harap pilih jenis produk!');
+        return;
+    }
+
+    if (!paymentMethod) {
+        alert('❌ Harap pilih metode pembayaran!');
+        return;
+    }
+
+    if (!quantity || quantity <= 0) {
+        alert('❌ Harap isi quantity dengan angka lebih dari 0!');
+        return;
+    }
+
+    if (!purchasePrice || purchasePrice <= 0) {
+        alert('❌ Harap isi harga beli dengan angka lebih dari 0!');
+        return;
+    }
+
+    // Data untuk dikirim
+    const data = {
+        date: date,
+        product_type: productType,
+        payment_method: paymentMethod,
+        quantity: quantity,
+        purchase_price: purchasePrice,
+        selling_price: sellingPrice,
+        description: description || 'Pembelian produk'
+    };
+
+    // Tampilkan konfirmasi
+    const productName = purchaseDefaultPrices[productType] ? purchaseDefaultPrices[productType].name : 'Produk';
+
+    const confirmMessage = 'Konfirmasi Pembelian:\n\n' +
+                        'Produk: ' + productName + '\n' +
+                        'Quantity: ' + quantity + ' unit\n' +
+                        'Harga Beli: Rp ' + purchasePrice.toLocaleString() + ' per unit\n' +
+                        'Metode: ' + (paymentMethod === 'tunai' ? 'Tunai' : 'Kredit') + '\n\n' +
+                        'Total Pembelian: Rp ' + totalPurchase.toLocaleString() + '\n\n' +
+                        'Buat jurnal pembelian?';
+
+    if (!confirm(confirmMessage)) {
+        return;
+    }
+
+    // Tampilkan loading
+    const button = event.target;
+    const originalText = button.innerHTML;
+    button.innerHTML = '<div class="loading"></div> Memproses...';
+    button.disabled = true;
+
+    // Kirim data ke server
+    fetch('/seller/add_purchase_journal', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(data)
+    })
+    .then(response => response.json())
+    .then(result => {
+        console.log("✅ Response dari server:", result);
+        if (result.success) {
+            alert('✅ ' + result.message);
+            setTimeout(() => location.reload(), 1500);
+        } else {
+            alert('❌ ' + result.message);
+            button.innerHTML = originalText;
+            button.disabled = false;
+        }
+    })
+    .catch(error => {
+        console.error("❌ Error:", error);
+        alert('❌ Terjadi error: ' + error);
+        button.innerHTML = originalText;
+        button.disabled = false;
+    });
+}
+
+// Event delegation untuk form penjualan sederhana
+document.addEventListener('change', function(e) {
+    // Handle product type change
+    if (e.target && e.target.id === 'product_type') {
+        fillDefaultPrices();
+    }
+});
+
+document.addEventListener('input', function(e) {
+    // Handle quantity and price changes
+    if (e.target && (e.target.id === 'quantity' || e.target.id === 'selling_price' || e.target.id === 'cost_price')) {
+        calculateTotals();
+    }
+});
+
+function showSuccessModalCOD(orderNumber, totalAmount) {
+    const modalContent = `
+        <div class="modal-content">
+            <span class="close" onclick="closeModal('successModal')">&times;</span>
+            <div style="text-align: center;">
+                <div style="width: 80px; height: 80px; background: linear-gradient(135deg, var(--success) 0%, var(--teal) 100%); border-radius: 50%; display: flex; align-items: center; justify-content: center; margin: 0 auto 1.5rem;">
+                    <i class="fas fa-check" style="color: white; font-size: 2rem;"></i>
+                </div>
+                <h2 style="margin-bottom: 1rem; color: var(--success);">Pesanan COD Berhasil!</h2>
+                <p style="margin-bottom: 1rem; color: var(--dark);">
+                    Pesanan COD Anda telah berhasil dibuat dan sedang diproses.
+                </p>
+                <p style="color: var(--dark); opacity: 0.7; font-size: 0.9rem; margin-bottom: 2rem;">
+                    Order #: <strong>${orderNumber}</strong><br>
+                    Total: <strong>Rp ${totalAmount.toLocaleString()}</strong><br>
+                    Bayar ketika pesanan diterima
+                </p>
+            </div>
+
+            <div class="modal-buttons">
+                <button class="btn btn-success" onclick="closeModal('successModal'); window.location.href='/orders';" style="width: 100%;">
+                    <i class="fas fa-list"></i>
+                    Lihat Pesanan Saya
+                </button>
+                <button class="btn btn-primary" onclick="contactSellerCOD('${orderNumber}', ${totalAmount})" style="width: 100%;">
+                    <i class="fab fa-whatsapp"></i>
+                    Konfirmasi ke Penjual
+                </button>
+            </div>
+        </div>
+    `;
+
+    // Create or update modal
+    let modal = document.getElementById('successModal');
+    if (!modal) {
+        modal = document.createElement('div');
+        modal.id = 'successModal';
+        modal.className = 'modal';
+        document.body.appendChild(modal);
+    }
+    modal.innerHTML = modalContent;
+    modal.style.display = 'block';
+}
+
+function contactSellerCOD() {
+    const orderNumber = window.currentOrderNumber;
+    const totalAmount = window.currentTotalAmount;
+
+    const message = "Hai kak 👋, saya sudah melakukan pemesanan COD ya.\n\n" +
+                    "🧾 Detail Pesanan:\n" +
+                    "• Order ID: #" + orderNumber + "\n" +
+                    "• Total Pembayaran: Rp " + totalAmount.toLocaleString() + "\n" +
+                    "• Metode: Cash on Delivery (COD)\n\n" +
+                    "Mohon dipersiapkan pesanannya ya kak 🙏😊\n" +
+                    "Terima kasih!";
+
+    const phone = '+6285876127696';
+    const url = 'https://wa.me/' + phone + '?text=' + encodeURIComponent(message);
+    window.open(url, '_blank');
+}
+
+
+function showPaymentModal(orderNumber, paymentMethod, totalAmount) {
+    const paymentInstructions = {
+        'qris': `
+            <h4 style="margin-bottom: 1rem; color: var(--primary); text-align: center;">
+                <i class="fas fa-qrcode"></i> PEMBAYARAN QRIS
+            </h4>
+            <div style="text-align: center; margin: 1rem 0;">
+                <img src="/static/uploads/assets/qris_code.jpg"
+                     alt="QRIS Code Kang-Mas Shop"
+                     style="max-width: 300px; width: 100%; height: auto; border-radius: var(--border-radius); border: 3px solid var(--primary); box-shadow: var(--shadow-lg);">
+            </div>
+
+            <div style="background: rgba(56, 161, 105, 0.1); padding: 1.5rem; border-radius: var(--border-radius); margin: 1.5rem 0; text-align: center;">
+                <h5 style="color: var(--success); margin-bottom: 0.5rem;">TOTAL PEMBAYARAN</h5>
+                <div style="font-size: 1.5rem; font-weight: bold; color: var(--success);">
+                    Rp ${totalAmount.toLocaleString()}
+                </div>
+            </div>
+        `,
+        'bri': `
+            <h4 style="margin-bottom: 1rem; color: var(--primary); text-align: center;">
+                <i class="fas fa-university"></i> TRANSFER BANK BRI
+            </h4>
+            <div style="background: white; padding: 1.5rem; border-radius: var(--border-radius); border-left: 4px solid var(--primary); text-align: center;">
+                <p style="margin: 0.75rem 0; font-size: 1.1rem;">
+                    <strong>No. Rekening:</strong><br>
+                    <span style="color: var(--primary); font-weight: bold; font-size: 1.3rem;">1234 5678 9012</span>
+                </p>
+                <p style="margin: 0.75rem 0; font-size: 1.1rem;">
+                    <strong>Atas Nama:</strong><br>
+                    <span style="color: var(--dark); font-weight: bold;">KANG-MAS SHOP</span>
+                </p>
+                <div style="margin: 1.5rem 0; padding: 1rem; background: rgba(56, 161, 105, 0.1); border-radius: var(--border-radius);">
+                    <p style="margin: 0; color: var(--success); font-weight: bold; font-size: 1.2rem;">
+                        TOTAL: Rp ${totalAmount.toLocaleString()}
+                    </p>
+                </div>
+            </div>
+        `,
+        'bca': `
+            <h4 style="margin-bottom: 1rem; color: var(--primary); text-align: center;">
+                <i class="fas fa-university"></i> TRANSFER BANK BCA
+            </h4>
+            <div style="background: white; padding: 1.5rem; border-radius: var(--border-radius); border-left: 4px solid var(--primary); text-align: center;">
+                <p style="margin: 0.75rem 0; font-size: 1.1rem;">
+                    <strong>No. Rekening:</strong><br>
+                    <span style="color: var(--primary); font-weight: bold; font-size: 1.3rem;">9876 5432 1098</span>
+                </p>
+                <p style="margin: 0.75rem 0; font-size: 1.1rem;">
+                    <strong>Atas Nama:</strong><br>
+                    <span style="color: var(--dark); font-weight: bold;">KANG-MAS SHOP</span>
+                </p>
+                <div style="margin: 1.5rem 0; padding: 1rem; background: rgba(56, 161, 105, 0.1); border-radius: var(--border-radius);">
+                    <p style="margin: 0; color: var(--success); font-weight: bold; font-size: 1.2rem;">
+                        TOTAL: Rp ${totalAmount.toLocaleString()}
+                    </p>
+                </div>
+            </div>
+        `,
+        'mandiri': `
+            <h4 style="margin-bottom: 1rem; color: var(--primary); text-align: center;">
+                <i class="fas fa-university"></i> TRANSFER BANK MANDIRI
+            </h4>
+            <div style="background: white; padding: 1.5rem; border-radius: var(--border-radius); border-left: 4px solid var(--primary); text-align: center;">
+                <p style="margin: 0.75rem 0; font-size: 1.1rem;">
+                    <strong>No. Rekening:</strong><br>
+                    <span style="color: var(--primary); font-weight: bold; font-size: 1.3rem;">1122 3344 5566</span>
+                </p>
+                <p style="margin: 0.75rem 0; font-size: 1.1rem;">
+                    <strong>Atas Nama:</strong><br>
+                    <span style="color: var(--dark); font-weight: bold;">KANG-MAS SHOP</span>
+                </p>
+                <div style="margin: 1.5rem 0; padding: 1rem; background: rgba(56, 161, 105, 0.1); border-radius: var(--border-radius);">
+                    <p style="margin: 0; color: var(--success); font-weight: bold; font-size: 1.2rem;">
+                        TOTAL: Rp ${totalAmount.toLocaleString()}
+                    </p>
+                </div>
+            </div>
+        `,
+        'gopay': `
+            <h4 style="margin-bottom: 1rem; color: var(--primary); text-align: center;">
+                <i class="fas fa-mobile-alt"></i> GOPAY
+            </h4>
+            <div style="background: white; padding: 1.5rem; border-radius: var(--border-radius); border-left: 4px solid #00AA13; text-align: center;">
+                <p style="margin: 0.75rem 0; font-size: 1.1rem;">
+                    <strong>No. Telepon:</strong><br>
+                    <span style="color: var(--primary); font-weight: bold; font-size: 1.3rem;">+62 896-5473-3875</span>
+                </p>
+                <p style="margin: 0.75rem 0; font-size: 1.1rem;">
+                    <strong>Atas Nama:</strong><br>
+                    <span style="color: var(--dark); font-weight: bold;">KANG-MAS SHOP</span>
+                </p>
+                <div style="margin: 1.5rem 0; padding: 1rem; background: rgba(56, 161, 105, 0.1); border-radius: var(--border-radius);">
+                    <p style="margin: 0; color: var(--success); font-weight: bold; font-size: 1.2rem;">
+                        TOTAL: Rp ${totalAmount.toLocaleString()}
+                    </p>
+                </div>
+            </div>
+        `,
+        'dana': `
+            <h4 style="margin-bottom: 1rem; color: var(--primary); text-align: center;">
+                <i class="fas fa-wallet"></i> DANA
+            </h4>
+            <div style="background: white; padding: 1.5rem; border-radius: var(--border-radius); border-left: 4px solid #00B2FF; text-align: center;">
+                <p style="margin: 0.75rem 0; font-size: 1.1rem;">
+                    <strong>No. Telepon:</strong><br>
+                    <span style="color: var(--primary); font-weight: bold; font-size: 1.3rem;">+62 896-5473-3875</span>
+                </p>
+                <p style="margin: 0.75rem 0; font-size: 1.1rem;">
+                    <strong>Atas Nama:</strong><br>
+                    <span style="color: var(--dark); font-weight: bold;">KANG-MAS SHOP</span>
+                </p>
+                <div style="margin: 1.5rem 0; padding: 1rem; background: rgba(56, 161, 105, 0.1); border-radius: var(--border-radius);">
+                    <p style="margin: 0; color: var(--success); font-weight: bold; font-size: 1.2rem;">
+                        TOTAL: Rp ${totalAmount.toLocaleString()}
+                    </p>
+                </div>
+            </div>
+        `
+    };
+
+    // Tampilkan instruksi pembayaran
+    document.getElementById('paymentInstructions').innerHTML = paymentInstructions[paymentMethod] || `
+        <div style="text-align: center; padding: 2rem;">
+            <i class="fas fa-credit-card" style="font-size: 3rem; color: var(--primary); margin-bottom: 1rem;"></i>
+            <p>Silakan selesaikan pembayaran dengan metode <strong>${paymentMethod.toUpperCase()}</strong></p>
+            <p style="color: var(--success); font-weight: bold; font-size: 1.2rem;">Total: Rp ${totalAmount.toLocaleString()}</p>
+        </div>
+    `;
+
+    document.getElementById('paymentModal').style.display = 'block';
+    window.currentOrderNumber = orderNumber;
+    window.currentPaymentMethod = paymentMethod;
+    window.currentTotalAmount = totalAmount;
+}
+
+function showSuccessModal() {
+    closeModal('paymentModal');
+
+    const modalContent = `
+        <div class="modal-content">
+            <span class="close" onclick="closeModal('successModal')">&times;</span>
+            <div style="text-align: center;">
+                <div style="width: 80px; height: 80px; background: linear-gradient(135deg, var(--success) 0%, var(--teal) 100%); border-radius: 50%; display: flex; align-items: center; justify-content: center; margin: 0 auto 1.5rem;">
+                    <i class="fas fa-check" style="color: white; font-size: 2rem;"></i>
+                </div>
+                <h2 style="margin-bottom: 1rem; color: var(--success);">Sukses!</h2>
+                <p style="margin-bottom: 1rem; color: var(--dark);">Pembayaran berhasil dikonfirmasi</p>
+                <p style="color: var(--dark); opacity: 0.7; font-size: 0.9rem; margin-bottom: 2rem;">
+                    Pesanan Anda sedang diproses dan akan segera dikirim
+                </p>
+            </div>
+
+            <div class="modal-buttons">
+                <button class="btn btn-success" onclick="closeModal('successModal'); window.location.href='/orders';" style="width: 100%;">
+                    <i class="fas fa-list"></i>
+                    Lihat Pesanan Saya
+                </button>
+                <button class="btn btn-primary" onclick="contactSeller()" style="width: 100%;">
+                    <i class="fab fa-whatsapp"></i>
+                    Hubungi Penjual
+                </button>
+            </div>
+        </div>
+    `;
+
+    let modal = document.getElementById('successModal');
+    if (!modal) {
+        modal = document.createElement('div');
+        modal.id = 'successModal';
+        modal.className = 'modal';
+        document.body.appendChild(modal);
+    }
+    modal.innerHTML = modalContent;
+    modal.style.display = 'block';
+
+    confirmPayment();
+}
+
+function closeModal(modalId) {
+    document.getElementById(modalId).style.display = 'none';
+}
+
+function contactSeller() {
+    // Pilih template chat sesuai metode pembayaran
+    if (window.currentPaymentMethod === 'cod') {
+        contactSellerCOD();
+    } else {
+        contactSellerNonCOD();
+    }
+}
+
+function contactSellerNonCOD() {
+    const orderNumber = window.currentOrderNumber;
+    const totalAmount = window.currentTotalAmount;
+
+    const message = "Hai kak 👋, saya sudah melakukan pembayaran untuk pesanan saya.\n\n" +
+                    "🧾 Detail Pesanan:\n" +
+                    "• Order ID: #" + orderNumber + "\n" +
+                    "• Total Pembayaran: Rp " + totalAmount.toLocaleString() + "\n" +
+                    "• Metode Pembayaran: Non-COD\n\n" +
+                    "Mohon bantu konfirmasi pembayarannya ya kak 🙏😊\n" +
+                    "Terima kasih!";
+
+    const phone = '+6285876127696';
+    const url = 'https://wa.me/' + phone + '?text=' + encodeURIComponent(message);
+    window.open(url, '_blank');
+}
+
+function confirmPayment() {
+    fetch('/confirm_payment/' + window.currentOrderNumber, {
+        method: 'POST'
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            console.log('Payment confirmed successfully');
+        }
+    });
+}
+
+function updateCartCount() {
+    fetch('/api/cart/count')
+        .then(response => response.json())
+        .then(data => setCartCount(data.count));
+}
+
+function setCartCount(count) {
+    const cartBadge = document.getElementById('cart-count');
+    const cartFab = document.getElementById('cart-count-fab');
+
+    if (cartBadge) {
+        cartBadge.textContent = count;
+        cartBadge.style.display = count > 0 ? 'flex' : 'none';
+    }
+
+    if (cartFab) {
+        cartFab.textContent = count;
+        cartFab.style.display = count > 0 ? 'flex' : 'none';
+    }
+}
+
+// Kirim sekumpulan operasi keranjang ({op: 'add'|'set'|'remove', product_id, quantity}) dalam satu request.
+// Respons selalu membawa isi keranjang terbaru, sehingga badge langsung diperbarui tanpa request tambahan.
+function syncCart(operations) {
+    return fetch('/api/cart/batch', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'Accept': 'application/json'
+        },
+        body: JSON.stringify({operations: operations})
+    })
+    .then(response => response.json().then(data => {
+        if (!response.ok && !data.cart) {
+            throw new Error(data.message || `HTTP error! status: ${response.status}`);
+        }
+        return data;
+    }))
+    .then(data => {
+        if (data.cart) {
+            setCartCount(data.cart.count);
+        }
+        return data;
+    });
+}
+
+function resetBalances() {
+    const confirmMessage = '⚠️ PERINGATAN: RESET SALDO AWAL\n\n' +
+                         'Tindakan ini akan:\n' +
+                         '1. Mengembalikan SEMUA saldo akun ke nilai default\n' +
+                         '2. Mengatur ulang stok produk ke nilai awal\n' +
+                         '3. TIDAK menghapus transaksi jurnal yang sudah ada\n' +
+                         '4. Membutuhkan penyesuaian manual setelah reset\n\n' +
+                         'Apakah Anda yakin ingin mereset semua saldo ke default?';
+
+    if (!confirm(confirmMessage)) {
+        return;
+    }
+
+    // Tampilkan konfirmasi kedua
+    const secondConfirm = '🔄 KONFIRMASI AKHIR\n\n' +
+                        'Reset saldo akan:\n\n' +
+                        'Lanjutkan reset?';
+
+    if (!confirm(secondConfirm)) {
+        return;
+    }
+
+    const button = event.target;
+    const originalText = button.innerHTML;
+
+    button.innerHTML = '<div class="loading"></div> Resetting...';
+    button.disabled = true;
+
+    fetch('/seller/reset_balances', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ confirm: true })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            showNotification('✅ ' + data.message, 'success');
+            setTimeout(() => location.reload(), 2000);
+        } else if (data.requires_confirm) {
+            // Jika butuh konfirmasi, tampilkan modal konfirmasi
+            showResetConfirmationModal();
+        } else {
+            showNotification('❌ ' + data.message, 'error');
+        }
+    })
+    .catch(error => {
+        showNotification('❌ Terjadi error saat reset saldo', 'error');
+    })
+    .finally(() => {
+        setTimeout(() => {
+            button.innerHTML = originalText;
+            button.disabled = false;
+        }, 2000);
+    });
+}
+
+// Fungsi untuk menampilkan modal konfirmasi reset
+function showResetConfirmationModal() {
+    const modalContent = `
+        <div class="modal-content">
+            <span class="close" onclick="closeModal('resetConfirmModal')">&times;</span>
+            <div style="text-align: center;">
+                <div style="width: 80px; height: 80px; background: linear-gradient(135deg, var(--warning) 0%, #b7791f 100%); border-radius: 50%; display: flex; align-items: center; justify-content: center; margin: 0 auto 1.5rem;">
+                    <i class="fas fa-exclamation-triangle" style="color: white; font-size: 2rem;"></i>
+                </div>
+                <h2 style="margin-bottom: 1rem; color: var(--warning);">Konfirmasi Reset</h2>
+                <p style="margin-bottom: 1rem; color: var(--dark);">
+                    Reset saldo akan mengembalikan semua nilai ke default sistem.
+                </p>
+                <div style="text-align: left; background: rgba(229, 62, 62, 0.1); padding: 1rem; border-radius: var(--border-radius); margin: 1rem 0;">
+                    <p style="margin: 0.5rem 0; font-weight: bold; color: var(--error);">
+                        <i class="fas fa-bomb"></i> PERINGATAN:
+                    </p>
+                    <ul style="margin: 0.5rem 0; padding-left: 1.2rem; color: var(--error); font-size: 0.9rem;">
+                        <li>Semua saldo akun akan diubah</li>
+                        <li>Stok produk akan disesuaikan</li>
+                        <li>Transaksi yang sudah ada TIDAK akan dihapus</li>
+                        <li>Pastikan sudah backup data penting</li>
+                    </ul>
+                </div>
+                <p style="color: var(--dark); opacity: 0.7; font-size: 0.9rem; margin-bottom: 2rem;">
+                    Masukkan kata "RESET" untuk mengkonfirmasi:
+                </p>
+                <input type="text" id="resetConfirmInput" class="form-control" 
+                       placeholder="Ketik RESET di sini" style="margin-bottom: 1rem;">
+            </div>
+
+            <div class="modal-buttons">
+                <button class="btn btn-danger" onclick="confirmReset()" 
+                        style="width: 100%;" id="confirmResetBtn" disabled>
+                    <i class="fas fa-bomb"></i>
+                    Konfirmasi Reset
+                </button>
+            </div>
+        </div>
+    `;
+
+    // Create modal
+    let modal = document.createElement('div');
+    modal.id = 'resetConfirmModal';
+    modal.className = 'modal';
+    modal.innerHTML = modalContent;
+    document.body.appendChild(modal);
+    modal.style.display = 'block';
+
+    // Add input validation
+    document.getElementById('resetConfirmInput').addEventListener('input', function() {
+        const confirmBtn = document.getElementById('confirmResetBtn');
+        confirmBtn.disabled = this.value.toUpperCase() !== 'RESET';
+    });
+}
+
+function confirmReset() {
+    const button = document.getElementById('confirmResetBtn');
+    const originalText = button.innerHTML;
+
+    button.innerHTML = '<div class="loading"></div> Resetting...';
+    button.disabled = true;
+
+    fetch('/seller/reset_balances', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ confirm: true })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            closeModal('resetConfirmModal');
+            showNotification('✅ ' + data.message, 'success');
+            setTimeout(() => location.reload(), 1500);
+        } else {
+            showNotification('❌ ' + data.message, 'error');
+            button.innerHTML = originalText;
+            button.disabled = false;
+        }
+    })
+    .catch(error => {
+        showNotification('❌ Terjadi error saat reset saldo', 'error');
+        button.innerHTML = originalText;
+        button.disabled = false;
+    });
+}
+
+function updateTracking(orderId, status) {
+    fetch('/update_tracking/' + orderId, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            status: status,
+            tracking_info: document.getElementById('tracking-info-' + orderId).value
+        })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            showNotification('✅ Status pengiriman diperbarui!', 'success');
+            setTimeout(() => location.reload(), 1000);
+        } else {
+            showNotification('❌ ' + data.message, 'error');
+        }
+    });
+}
+
+function loadTransactionTemplate() {
+    const templateKey = document.getElementById('transaction_template').value;
+    if (!templateKey) return;
+
+    // === PENJUALAN SEDERHANA ===
+    if (templateKey === 'penjualan_sederhana') {
+        fetch('/api/get_sales_form')
+            .then(response => response.json())
+            .then(data => {
+                if (data.success) {
+                    const formContainer = document.getElementById('templateFormContainer');
+                    formContainer.innerHTML = data.form_html;
+                } else {
+                    showNotification('❌ ' + data.message, 'error');
+                }
+            });
+        return;
+    }
+
+    // === PEMBELIAN SEDERHANA ===
+    if (templateKey === 'pembelian_sederhana') {
+        fetch('/api/get_purchase_form')
+            .then(response => response.json())
+            .then(data => {
+                if (data.success) {
+                    const formContainer = document.getElementById('templateFormContainer');
+                    formContainer.innerHTML = data.form_html;
+                } else {
+                    showNotification('❌ ' + data.message, 'error');
+                }
+            });
+        return;
+    }
+
+    // === TEMPLATE LAINNYA ===
+    fetch('/api/get_transaction_template/' + templateKey)
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                const formContainer = document.getElementById('templateFormContainer');
+                formContainer.innerHTML = data.form_html;
+
+                // Nonaktifkan formatting untuk input number
+                document.querySelectorAll('#templateFormContainer input[type="number"]').forEach(input => {
+                    // Biarkan input number bekerja normal
+                    input.addEventListener('input', function() {
+                        // Hanya izinkan angka
+                        this.value = this.value.replace(/[^\d]/g, '');
+                    });
+                });
+            } else {
+                showNotification('❌ ' + data.message, 'error');
+            }
+        });
+}
+
+function submitTemplateJournal() {
+    const formData = new FormData(document.getElementById('templateJournalForm'));
+    const data = {
+        template_key: formData.get('template_key'),
+        date: formData.get('date'),
+        amounts: {},
+        inputs: {}  // Tambah inputs
+    };
+
+    // Collect amounts from form
+    document.querySelectorAll('[id^="amount_"]').forEach(input => {
+        const accountType = input.id.replace('amount_', '');
+        data.amounts[accountType] = parseInt(input.value) || 0;
+    });
+
+    // Collect inputs (quantity, unit_cost, dll)
+    document.querySelectorAll('[id^="input_"]').forEach(input => {
+        const inputName = input.id.replace('input_', '');
+        data.inputs[inputName] = parseInt(input.value) || 0;
+    });
+
+    // Validasi untuk template kerugian
+    const templateKey = data.template_key;
+    if (templateKey.includes('kerugian') || templateKey.includes('hibah')) {
+        if (!data.inputs.quantity || data.inputs.quantity <= 0) {
+            showNotification('❌ Harap isi jumlah bibit yang mati/diberikan!', 'error');
+            return;
+        }
+        if (!data.inputs.unit_cost || data.inputs.unit_cost <= 0) {
+            showNotification('❌ Harap isi harga cost per unit!', 'error');
+            return;
+        }
+    }
+
+    fetch('/seller/add_template_journal', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(data)
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            showNotification('✅ ' + data.message, 'success');
+            setTimeout(() => location.reload(), 1000);
+        } else {
+            showNotification('❌ ' + data.message, 'error');
+        }
+    });
+}
+
+function deleteJournal(journalId) {
+    if (!confirm('Yakin ingin menghapus jurnal ini?')) {
+        return;
+    }
+
+    const buttons = document.querySelectorAll('button[onclick="deleteJournal(' + journalId + ')"]');
+    let button = null;
+    let originalHtml = '';
+
+    if (buttons.length > 0) {
+        button = buttons[0];
+        originalHtml = button.innerHTML;
+        button.innerHTML = '<div class="loading"></div>';
+        button.disabled = true;
+    }
+
+    // 🔴 TADI: '/seller/delete_journal/' + journalId
+    // ✅ SEKARANG: pake route yang bener di Flask
+    fetch('/accounting/journal/' + journalId + '/delete', {
+        method: 'POST',
+        headers: {
+            'X-Requested-With': 'XMLHttpRequest'
+        }
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success || data.status === 'success') {
+            showNotification('✅ Jurnal berhasil dihapus', 'success');
+            setTimeout(() => location.reload(), 800);
+        } else {
+            showNotification('❌ ' + (data.message || 'Gagal menghapus jurnal'), 'error');
+            if (button) {
+                button.innerHTML = originalHtml;
+                button.disabled = false;
+            }
+        }
+    })
+    .catch(err => {
+        console.error(err);
+        showNotification('❌ Terjadi error saat menghapus jurnal', 'error');
+        if (button) {
+            button.innerHTML = originalHtml;
+            button.disabled = false;
+        }
+    });
+}
+
+// Jurnal Penyesuaian Functions
+function loadAdjustmentTemplate() {
+    const templateKey = document.getElementById('adjustment_template').value;
+    if (!templateKey) return;
+
+    fetch('/api/get_adjustment_template/' + templateKey)
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                const formContainer = document.getElementById('adjustmentFormContainer');
+                formContainer.innerHTML = data.form_html;
+
+                // Add auto-format untuk input number
+                document.querySelectorAll('#adjustmentFormContainer input[type="number"]').forEach(input => {
+                    input.addEventListener('input', function() {
+                        formatNumberInput(this);
+                    });
+
+                    input.addEventListener('blur', function() {
+                        formatNumberInput(this);
+                    });
+
+                    input.addEventListener('focus', function() {
+                        this.value = this.value.replace(/[^\d]/g, '');
+                    });
+                });
+            } else {
+                showNotification('❌ ' + data.message, 'error');
+            }
+        });
+}
+
+function submitAdjustmentJournal() {
+    const formData = new FormData(document.getElementById('adjustmentJournalForm'));
+    const data = {
+        template_key: formData.get('template_key'),
+        date: formData.get('date'),
+        inputs: {}
+    };
+
+    // Collect inputs from form dengan format number
+    document.querySelectorAll('[id^="input_"]').forEach(input => {
+        const inputName = input.id.replace('input_', '');
+        data.inputs[inputName] = parseFormattedNumber(input.value);
+    });
+
+    fetch('/seller/add_adjustment_journal', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(data)
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            showNotification('✅ ' + data.message, 'success');
+            setTimeout(() => location.reload(), 1000);
+        } else {
+            showNotification('❌ ' + data.message, 'error');
+        }
+    });
+}
+
+// Jurnal Penutup Functions
+function createClosingEntries() {
+    // Tampilkan konfirmasi detail
+    const confirmMessage = 'APAKAH ANDA YAKIN INGIN MEMBUAT JURNAL PENUTUP?\n\n' +
+                        'Jurnal penutup akan:\n' +
+                        '1. Menutup semua akun pendapatan ke 0\n' +
+                        '2. Menutup semua akun beban ke 0\n' +
+                        '3. Menghitung laba/rugi bersih\n' +
+                        '4. Memindahkan laba/rugi ke akun Modal\n' +
+                        '5. Menutup akun Prive (jika ada)\n\n' +
+                        'Proses ini TIDAK DAPAT DIBATALKAN!\n\n' +
+                        'Lanjutkan membuat jurnal penutup?';
+
+    if (!confirm(confirmMessage)) {
+        return;
+    }
+
+    const button = event.target;
+    const originalText = button.innerHTML;
+
+    button.innerHTML = '<div class="loading"></div> Membuat Jurnal Penutup...';
+    button.disabled = true;
+
+    fetch('/seller/create_closing_entries', {
+        method: 'POST'
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            showNotification('✅ ' + data.message, 'success');
+
+            // 🔄 TAMPILKAN TAB JURNAL PENUTUP SETELAH BERHASIL
+            setTimeout(() => {
+                // Aktifkan tab Jurnal Penutup
+                const closingTab = document.querySelector('[onclick*="jurnal-penutup"]');
+                if (closingTab) {
+                    closingTab.click();
+                }
+
+                // Refresh konten tab Jurnal Penutup
+                refreshClosingTabContent();
+
+                button.innerHTML = originalText;
+                button.disabled = false;
+            }, 1500);
+        } else {
+            showNotification('❌ ' + data.message, 'error');
+            button.innerHTML = originalText;
+            button.disabled = false;
+        }
+    })
+    .catch(error => {
+        showNotification('❌ Terjadi error saat membuat jurnal penutup', 'error');
+        button.innerHTML = originalText;
+        button.disabled = false;
+    });
+}
+
+// Fungsi untuk refresh konten tab Jurnal Penutup
+function refreshClosingTabContent() {
+    // Ambil tab content untuk Jurnal Penutup
+    const closingTabContent = document.getElementById('jurnal-penutup');
+    if (!closingTabContent) return;
+
+    // Tampilkan loading
+    closingTabContent.innerHTML = '<div style="text-align: center; padding: 2rem;"><div class="loading"></div> Memuat ulang data jurnal penutup...</div>';
+
+    // Ambil data terbaru dari server
+    fetch('/api/get_closing_entries_html')
+    .then(response => response.text())
+    .then(html => {
+        // Ganti konten tab dengan data terbaru
+        closingTabContent.innerHTML = html;
+        console.log('✅ Tab Jurnal Penutup di-refresh');
+    })
+    .catch(error => {
+        console.error('Error refreshing closing tab:', error);
+        closingTabContent.innerHTML = '<div class="card"><p>Error loading closing entries</p></div>';
+    });
+}
+
+// Number Formatting Functions - DISABLED untuk input number
+function formatNumberInput(input) {
+    // NONAKTIFKAN FORMATTING - biarkan input number seperti biasa
+    // Hanya hapus karakter non-digit
+    let value = input.value.replace(/[^\d]/g, '');
+    input.value = value; // Simpan nilai tanpa formatting
+}
+
+function parseFormattedNumber(formattedValue) {
+    return parseInt(formattedValue.replace(/[^\d]/g, '')) || 0;
+}
+
+// Initialize when DOM is loaded
+document.addEventListener('DOMContentLoaded', function() {
+    updateCartCount();
+
+    // Activate first tab by default
+    const firstTab = document.querySelector('.tab');
+    const firstTabContent = document.querySelector('.tab-content');
+    if (firstTab && firstTabContent) {
+        firstTab.classList.add('active');
+        firstTabContent.classList.add('active');
+    }
+
+    // FIX: Remove auto-format untuk input number di form produk
+    // Biarkan input number seperti biasa tanpa formatting
+    document.querySelectorAll('input[type="number"]').forEach(input => {
+        // Hapus event listener yang mengganggu
+        input.removeEventListener('input', formatNumberInput);
+        input.removeEventListener('blur', formatNumberInput);
+        input.removeEventListener('focus', formatNumberInput);
+
+        // Set nilai asli dari value attribute
+        if (input.value) {
+            input.value = input.value.replace(/\./g, ''); // Hapus titik yang ada
+        }
+    });
+
+    // Auto-hide flash messages after 5 seconds
+    setTimeout(() => {
+        const flashMessages = document.querySelector('.flash-messages');
+        if (flashMessages) {
+            flashMessages.style.display = 'none';
+        }
+    }, 5000);
+
+    // Close modal when clicking outside
+    window.onclick = function(event) {
+        const modals = document.getElementsByClassName('modal');
+        for (let modal of modals) {
+            if (event.target == modal) {
+                modal.style.display = 'none';
+            }
+        }
+    }
+
+    // Add smooth scrolling
+    document.querySelectorAll('a[href^="#"]').forEach(anchor => {
+        anchor.addEventListener('click', function (e) {
+            e.preventDefault();
+            document.querySelector(this.getAttribute('href')).scrollIntoView({
+                behavior: 'smooth'
+            });
+        });
+    });
+});